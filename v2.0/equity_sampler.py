@@ -0,0 +1,123 @@
+"""
+🔥 V3.4 장중 평가금액 샘플러 - 고정 크기 링 버퍼에 시가 평가 자산을 N초마다 기록, 장중 고점/최대 낙폭 증분 추적
+Intraday mark-to-market equity sampler (fixed-size ring buffer, incremental peak / max drawdown)
+"""
+
+import json
+import threading
+from array import array
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from market_clock import market_timestamp
+
+# ================================================================================
+# 샘플러 설정
+# ================================================================================
+EQUITY_SAMPLE_INTERVAL = 10        # 버퍼 기록 주기 (초)
+EQUITY_BUFFER_SIZE = 2_400         # 버퍼 크기 (10초 간격이면 6시간 40분) - 넘으면 오래된 것부터 덮어씀
+
+class EquitySampler:
+    """📈 장중 평가금액 링 버퍼
+
+    observe()는 호출될 때마다 고점/최대 낙폭을 갱신하고 (평가 시점 사이의 순간 낙폭도 반영),
+    버퍼에는 interval초마다 한 번만 기록한다. 메모리는 size개 고정.
+    """
+
+    def __init__(self, start_equity: int, interval: float = EQUITY_SAMPLE_INTERVAL,
+                 size: int = EQUITY_BUFFER_SIZE, clock: Callable[[], float] = market_timestamp):
+        self.interval = interval
+        self.size = size
+        self.clock = clock
+        self._times = array('d', [0.0]) * size
+        self._values = array('q', [0]) * size
+        self._head = 0                     # 다음 기록 위치
+        self._count = 0
+        self._last_sample: Optional[float] = None
+        self._lock = threading.Lock()
+
+        self.start_equity = start_equity
+        self.last_equity = start_equity
+        self.peak = start_equity
+        self.peak_time: Optional[float] = None
+        self.trough = start_equity
+        self.max_drawdown = 0.0            # 고점 대비 최대 낙폭 (%)
+        self.max_drawdown_time: Optional[float] = None
+        self.observations = 0
+
+    def observe(self, equity: int, now: float = None) -> bool:
+        """평가금액 반영 → 버퍼에 기록했으면 True"""
+        now = self.clock() if now is None else now
+        with self._lock:
+            self.observations += 1
+            self.last_equity = equity
+            if equity > self.peak:
+                self.peak, self.peak_time = equity, now
+            self.trough = min(self.trough, equity)
+            drawdown = (self.peak - equity) / self.peak * 100 if self.peak > 0 else 0.0
+            if drawdown > self.max_drawdown:
+                self.max_drawdown, self.max_drawdown_time = drawdown, now
+
+            if self._last_sample is not None and now - self._last_sample < self.interval:
+                return False
+            self._times[self._head] = now
+            self._values[self._head] = int(equity)
+            self._head = (self._head + 1) % self.size
+            self._count = min(self._count + 1, self.size)
+            self._last_sample = now
+            return True
+
+    @property
+    def current_drawdown(self) -> float:
+        """현재 고점 대비 낙폭 (%)"""
+        return (self.peak - self.last_equity) / self.peak * 100 if self.peak > 0 else 0.0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def samples(self) -> List[Tuple[float, int]]:
+        """기록된 (시각, 평가금액) - 오래된 순"""
+        with self._lock:
+            start = (self._head - self._count) % self.size
+            order = [(start + i) % self.size for i in range(self._count)]
+            return [(self._times[i], self._values[i]) for i in order]
+
+    def get_summary(self) -> Dict[str, Any]:
+        """고점/저점/낙폭 요약"""
+        return {
+            "start_equity": self.start_equity,
+            "last_equity": self.last_equity,
+            "peak": self.peak,
+            "trough": self.trough,
+            "max_drawdown": self.max_drawdown,
+            "current_drawdown": self.current_drawdown,
+            "samples": self._count,
+            "observations": self.observations
+        }
+
+    def to_compact(self) -> Dict[str, Any]:
+        """저장용 압축 형식 - 시작 시각 + 초 단위 간격, 시작 금액 대비 변화량 (모두 정수)"""
+        samples = self.samples()
+        start = int(samples[0][0]) if samples else 0
+        offsets = [int(t) - start for t, _ in samples]
+        deltas = [value - self.start_equity for _, value in samples]
+        return {
+            "interval": self.interval,
+            "start": start,
+            "start_equity": self.start_equity,
+            "offsets": offsets,
+            "deltas": deltas,
+            "peak": self.peak,
+            "trough": self.trough,
+            "max_drawdown": round(self.max_drawdown, 4),
+            "max_drawdown_time": int(self.max_drawdown_time) if self.max_drawdown_time else None
+        }
+
+    def save(self, path: str):
+        """압축 형식 JSON 저장 (공백 없이)"""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_compact(), f, separators=(',', ':'))
+
+def expand_compact(data: Dict[str, Any]) -> List[Tuple[int, int]]:
+    """to_compact() 결과 → [(시각, 평가금액)]"""
+    start, base = data["start"], data["start_equity"]
+    return [(start + offset, base + delta) for offset, delta in zip(data["offsets"], data["deltas"])]
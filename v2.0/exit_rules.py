@@ -0,0 +1,213 @@
+"""
+🔥 V3.4 청산 규칙 - 익절/손절 외 트레일링 스탑, 보유 시간 제한, 본전 청산, 거래대금 감소 청산을 조합
+Composable exit rules with incremental per-position state (O(1) per price tick)
+"""
+
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from market_clock import market_timestamp
+from trading_calendar import MARKET_OPEN_TIME
+
+# ================================================================================
+# 청산 규칙 설정
+# ================================================================================
+VOLUME_FADE_HALF_LIFE = 60         # 거래대금 속도 지수평균 반감기 (초)
+VOLUME_FADE_MIN_BASE = 60          # 진입 전 평균 속도 계산 시 최소 경과 시간 (초)
+
+# build_exit_rules 설정 키 (스윕/백테스트 파라미터 이름과 같음)
+EXIT_RULE_KEYS = ("trailing_stop", "trailing_activate", "max_hold_minutes",
+                  "break_even", "break_even_floor", "volume_fade", "volume_fade_min_hold")
+
+def fixed_target_reason(profit_rate: float, profit_target: float, stop_loss: float) -> str:
+    """익절/손절 판정 ("익절" / "손절" / "")"""
+    if profit_rate >= profit_target:
+        return "익절"
+    elif profit_rate <= stop_loss:
+        return "손절"
+    return ""
+
+class ExitRule:
+    """청산 규칙 기본 클래스
+
+    start()가 포지션별 상태를 만들고, check()가 시세 1건마다 상태를 갱신하며 청산 사유를
+    돌려준다 (없으면 ""). 상태는 고정 크기라 시세 1건 처리는 O(1).
+    """
+    name = ""
+
+    def start(self, position, now: float) -> Dict[str, Any]:
+        return {}
+
+    def check(self, state: Dict[str, Any], price: int, profit_rate: float,
+              amount: Optional[int], now: float) -> str:
+        raise NotImplementedError
+
+class FixedTargetRule(ExitRule):
+    """고정 익절/손절 (Position.should_exit와 같은 판정)"""
+    name = "익절/손절"
+
+    def __init__(self, profit_target: float, stop_loss: float):
+        self.profit_target = profit_target
+        self.stop_loss = stop_loss
+
+    def check(self, state, price, profit_rate, amount, now) -> str:
+        return fixed_target_reason(profit_rate, self.profit_target, self.stop_loss)
+
+class TrailingStopRule(ExitRule):
+    """트레일링 스탑 - 고점 수익률이 activate_percent 이상이 된 뒤 고점 대비 trail_percent 하락 시 청산"""
+    name = "트레일링스탑"
+
+    def __init__(self, trail_percent: float, activate_percent: float = 0.0):
+        self.trail_percent = trail_percent
+        self.activate_percent = activate_percent
+
+    def start(self, position, now):
+        return {"buy_price": position.buy_price, "peak": position.buy_price}
+
+    def check(self, state, price, profit_rate, amount, now) -> str:
+        if price > state["peak"]:
+            state["peak"] = price
+        peak, buy_price = state["peak"], state["buy_price"]
+        if buy_price <= 0 or (peak - buy_price) / buy_price * 100 < self.activate_percent:
+            return ""
+        return self.name if price <= peak * (1 - self.trail_percent / 100) else ""
+
+class TimeStopRule(ExitRule):
+    """보유 시간 제한 - 매수 후 max_hold_seconds 경과 시 청산"""
+    name = "시간청산"
+
+    def __init__(self, max_hold_seconds: float):
+        self.max_hold_seconds = max_hold_seconds
+
+    def start(self, position, now):
+        return {"deadline": _entry_timestamp(position, now) + self.max_hold_seconds}
+
+    def check(self, state, price, profit_rate, amount, now) -> str:
+        return self.name if now >= state["deadline"] else ""
+
+class BreakEvenRule(ExitRule):
+    """본전 청산 - 수익률이 trigger_percent에 한 번 닿은 뒤 floor_percent 이하로 내려오면 청산"""
+    name = "본전청산"
+
+    def __init__(self, trigger_percent: float, floor_percent: float = 0.0):
+        self.trigger_percent = trigger_percent
+        self.floor_percent = floor_percent
+
+    def start(self, position, now):
+        return {"armed": False}
+
+    def check(self, state, price, profit_rate, amount, now) -> str:
+        if not state["armed"]:
+            state["armed"] = profit_rate >= self.trigger_percent
+            return ""
+        return self.name if profit_rate <= self.floor_percent else ""
+
+class VolumeFadeRule(ExitRule):
+    """거래대금 감소 청산
+
+    매수 시점 누적 거래대금(buy_amount)을 장 시작부터 경과 시간으로 나눈 값을 진입 전 평균
+    속도로 보고, 보유 중 누적 거래대금 증가 속도의 지수평균이 그 fade_ratio 배 아래로
+    떨어지면 청산한다 (min_hold_seconds 이후부터). buy_amount를 모르는 포지션은 검사하지 않는다.
+    """
+    name = "거래대금감소"
+
+    def __init__(self, fade_ratio: float, min_hold_seconds: float = 60,
+                 half_life: float = VOLUME_FADE_HALF_LIFE):
+        self.fade_ratio = fade_ratio
+        self.min_hold_seconds = min_hold_seconds
+        self.half_life = half_life
+
+    def start(self, position, now):
+        entry = _entry_timestamp(position, now)
+        buy_time = getattr(position, "buy_time", None)
+        elapsed = (buy_time - datetime.combine(buy_time.date(), MARKET_OPEN_TIME)).total_seconds() if buy_time else 0
+        base_rate = position.buy_amount / max(elapsed, VOLUME_FADE_MIN_BASE) if position.buy_amount > 0 else 0.0
+        return {"entry": entry, "base_rate": base_rate, "rate": base_rate,
+                "last_amount": None, "last_time": entry}
+
+    def check(self, state, price, profit_rate, amount, now) -> str:
+        if not amount or state["base_rate"] <= 0:
+            return ""
+        if state["last_amount"] is None:
+            state["last_amount"], state["last_time"] = amount, now
+            return ""
+        elapsed = now - state["last_time"]
+        if elapsed <= 0:
+            return ""
+        speed = max(amount - state["last_amount"], 0) / elapsed
+        state["rate"] += (1 - 0.5 ** (elapsed / self.half_life)) * (speed - state["rate"])
+        state["last_amount"], state["last_time"] = amount, now
+        if now - state["entry"] < self.min_hold_seconds:
+            return ""
+        return self.name if state["rate"] < state["base_rate"] * self.fade_ratio else ""
+
+def _entry_timestamp(position, now: float) -> float:
+    buy_time = getattr(position, "buy_time", None)
+    return buy_time.timestamp() if buy_time else now
+
+class ExitRuleSet:
+    """🚪 청산 규칙 묶음 - 앞 규칙부터 검사해 처음 나온 사유로 청산
+
+    포지션은 처음 검사할 때 자동 등록되고 (매수 경로 수정 불필요), 매도 시 detach()로
+    상태를 지운다. 폴링(일괄 시세)과 실시간 체결 양쪽에서 같은 check()를 부른다.
+    """
+
+    def __init__(self, rules: List[ExitRule], clock: Callable[[], float] = market_timestamp):
+        self.rules = list(rules)
+        self.clock = clock
+        self._states: Dict[int, Tuple[Any, List[Dict[str, Any]]]] = {}
+
+    def attach(self, position, now: float = None) -> List[Dict[str, Any]]:
+        now = self.clock() if now is None else now
+        states = [rule.start(position, now) for rule in self.rules]
+        self._states[id(position)] = (position, states)
+        return states
+
+    def detach(self, position):
+        entry = self._states.get(id(position))
+        if entry and entry[0] is position:
+            del self._states[id(position)]
+
+    def prune(self, positions: List[Any]):
+        """보유 목록에 없는 포지션 상태 정리"""
+        active = {id(position) for position in positions}
+        for key in [key for key in self._states if key not in active]:
+            del self._states[key]
+
+    def check(self, position, price: int, amount: Optional[int] = None,
+              now: float = None) -> Tuple[bool, str]:
+        """시세 1건 반영 → (청산 여부, 사유)"""
+        now = self.clock() if now is None else now
+        entry = self._states.get(id(position))
+        states = entry[1] if entry and entry[0] is position else self.attach(position, now)
+        _, profit_rate = position.get_profit_loss(price)
+        for rule, state in zip(self.rules, states):
+            reason = rule.check(state, price, profit_rate, amount, now)
+            if reason:
+                return True, reason
+        return False, ""
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    def describe(self) -> str:
+        return ", ".join(rule.name for rule in self.rules) or "없음"
+
+def build_exit_rules(config: Optional[Dict[str, Any]], clock: Callable[[], float] = market_timestamp) -> Optional[ExitRuleSet]:
+    """설정 딕셔너리(EXIT_RULE_KEYS) → 추가 청산 규칙 (설정이 없으면 None)
+
+    예: {"trailing_stop": 1.0, "trailing_activate": 1.5, "max_hold_minutes": 30,
+         "break_even": 1.0, "volume_fade": 0.3}
+    익절/손절은 엔진이 자금 관리자 설정으로 먼저 검사하므로 여기에 넣지 않는다.
+    """
+    config = config or {}
+    rules: List[ExitRule] = []
+    if config.get("trailing_stop"):
+        rules.append(TrailingStopRule(config["trailing_stop"], config.get("trailing_activate", 0.0)))
+    if config.get("break_even"):
+        rules.append(BreakEvenRule(config["break_even"], config.get("break_even_floor", 0.0)))
+    if config.get("volume_fade"):
+        rules.append(VolumeFadeRule(config["volume_fade"], config.get("volume_fade_min_hold", 60)))
+    if config.get("max_hold_minutes"):
+        rules.append(TimeStopRule(config["max_hold_minutes"] * 60))
+    return ExitRuleSet(rules, clock) if rules else None
@@ -0,0 +1,225 @@
+"""
+🔥 V3.4 청산 시뮬레이터 - 익절/손절 배리어 최초 도달을 NumPy로 일괄 계산 (강제 청산 포함)
+Vectorized first-passage simulator for the take-profit / stop-loss / force-sell exit rule
+"""
+
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+import numpy as np
+from tabulate import tabulate
+
+# ================================================================================
+# 시뮬레이터 설정
+# ================================================================================
+EXIT_SIM_CHUNK_CELLS = 8_000_000   # 한 번에 비교할 (진입 × 시점) 칸 수 - 메모리 상한
+EXIT_SIM_WINDOW = 16               # 진입 직후 첫 검사 창 (시점 수, 이후 두 배씩)
+BARRIER_UNREACHABLE = 2 ** 31 - 1  # 도달할 수 없는 배리어 가격
+EXIT_OPEN = 0                      # 청산 없음 (진입 시점이 경로 밖)
+EXIT_TAKE_PROFIT = 1               # 익절
+EXIT_STOP_LOSS = 2                 # 손절
+EXIT_FORCE = 3                     # 강제청산 (force_step 도달)
+
+EXIT_REASON_NAMES = {
+    EXIT_OPEN: "미청산",
+    EXIT_TAKE_PROFIT: "익절",
+    EXIT_STOP_LOSS: "손절",
+    EXIT_FORCE: "강제청산"
+}
+
+def profit_rates(prices: np.ndarray, buy_prices: np.ndarray, quantities: np.ndarray) -> np.ndarray:
+    """Position.get_profit_loss와 같은 순서의 수익률 계산 (원가 → 손익 → 손익/원가×100)"""
+    cost = buy_prices * quantities
+    profit = prices * quantities - cost
+    rates = np.divide(profit, cost, out=np.zeros(np.broadcast(profit, cost).shape), where=cost > 0)
+    return rates * 100
+
+def barrier_prices(buy_prices: np.ndarray, quantities: np.ndarray,
+                   profit_target: float, stop_loss: float):
+    """진입별 정수 가격 배리어 → (익절가, 손절가)
+
+    익절가는 수익률 >= profit_target인 최소 가격, 손절가는 수익률 <= stop_loss인 최대
+    가격이다. 수익률은 가격에 대해 단조이므로 시점마다 수익률을 계산하는 대신 가격만
+    비교해도 should_exit와 같은 판정이 된다. 근사값 한 칸 바깥에서 시작해 실제 수익률
+    식을 만족할 때까지 옮기므로 부동소수점 경계도 같다.
+    """
+    upper = np.ceil(buy_prices * (1 + profit_target / 100)).astype(np.int64) - 1
+    lower = np.floor(buy_prices * (1 + stop_loss / 100)).astype(np.int64) + 1
+
+    # 원가 0이면 수익률이 항상 0 → 가격과 무관하게 도달 / 미도달
+    free = buy_prices * quantities <= 0
+    upper[free] = -1 if 0 >= profit_target else BARRIER_UNREACHABLE
+    lower[free] = BARRIER_UNREACHABLE if 0 <= stop_loss else -1
+
+    pending = np.flatnonzero(~free)
+    while pending.size:
+        pending = pending[profit_rates(upper[pending], buy_prices[pending], quantities[pending]) < profit_target]
+        upper[pending] += 1
+    pending = np.flatnonzero(~free)
+    while pending.size:
+        pending = pending[profit_rates(lower[pending], buy_prices[pending], quantities[pending]) > stop_loss]
+        lower[pending] -= 1
+    return upper, lower
+
+@dataclass
+class ExitResult:
+    """진입별 청산 결과 (모두 길이 n_entries 배열)"""
+    exit_step: np.ndarray           # 청산 시점 색인 (미청산 -1)
+    exit_price: np.ndarray
+    reason: np.ndarray              # EXIT_* 코드
+    profit_amount: np.ndarray
+    profit_rate: np.ndarray
+    holding_steps: np.ndarray
+    elapsed: float = 0.0            # 계산 시간 (초)
+
+    def __len__(self) -> int:
+        return len(self.reason)
+
+    def reason_names(self) -> np.ndarray:
+        """청산 사유 문자열 (엔진과 같은 '익절'/'손절'/'강제청산')"""
+        return np.array([EXIT_REASON_NAMES[r] for r in self.reason.tolist()])
+
+    def get_summary(self) -> Dict[str, Any]:
+        """사유별 건수, 승률, 평균 수익률, 처리 속도"""
+        closed = self.reason != EXIT_OPEN
+        rates = self.profit_rate[closed]
+        return {
+            "entries": len(self),
+            "take_profit": int((self.reason == EXIT_TAKE_PROFIT).sum()),
+            "stop_loss": int((self.reason == EXIT_STOP_LOSS).sum()),
+            "force": int((self.reason == EXIT_FORCE).sum()),
+            "open": int((~closed).sum()),
+            "win_rate": float((rates > 0).mean() * 100) if len(rates) else 0.0,
+            "avg_return": float(rates.mean()) if len(rates) else 0.0,
+            "total_profit": int(self.profit_amount[closed].sum()),
+            "avg_holding_steps": float(self.holding_steps[closed].mean()) if len(rates) else 0.0,
+            "entries_per_second": len(self) / self.elapsed if self.elapsed > 0 else 0.0
+        }
+
+    def print_summary(self):
+        s = self.get_summary()
+        print(tabulate([[
+            f"{s['entries']:,}", f"{s['take_profit']:,}", f"{s['stop_loss']:,}", f"{s['force']:,}",
+            f"{s['win_rate']:.1f}%", f"{s['avg_return']:+.3f}%", f"{s['total_profit']:+,}",
+            f"{s['avg_holding_steps']:.1f}", f"{s['entries_per_second']:,.0f}"
+        ]], headers=["진입", "익절", "손절", "강제청산", "승률", "평균수익률", "총손익", "평균보유", "건/초"],
+            tablefmt="grid"))
+
+def simulate_exits(paths: np.ndarray, buy_prices: np.ndarray, profit_target: float, stop_loss: float,
+                   path_index: np.ndarray = None, entry_steps: np.ndarray = None,
+                   force_steps: np.ndarray = None, quantities: np.ndarray = None,
+                   chunk_cells: int = EXIT_SIM_CHUNK_CELLS) -> ExitResult:
+    """🎯 진입 이벤트 일괄 청산 시뮬레이션
+
+    paths: (경로 수, 시점 수) 정수 가격 행렬 (분봉 종가 등). 진입 i는 paths[path_index[i]]를
+    따라 entry_steps[i] 다음 시점부터 Position.should_exit(price, profit_target, stop_loss)와
+    같은 규칙으로 검사하고 (익절 우선), force_steps[i]에 닿으면 그 가격으로 강제청산한다.
+    path_index를 생략하면 진입 i가 경로 i, entry_steps는 0, force_steps는 마지막 시점,
+    quantities는 1주로 본다.
+    """
+    start = time.perf_counter()
+    paths = np.asarray(paths, dtype=np.int64)
+    if paths.ndim == 1:
+        paths = paths[None, :]
+    n_steps = paths.shape[1]
+
+    buy_prices = np.asarray(buy_prices, dtype=np.int64).ravel()
+    n = len(buy_prices)
+    path_index = np.arange(n) if path_index is None else np.asarray(path_index, dtype=np.int64)
+    entry_steps = np.zeros(n, dtype=np.int64) if entry_steps is None else np.asarray(entry_steps, dtype=np.int64)
+    if force_steps is None:
+        force_steps = np.full(n, n_steps - 1, dtype=np.int64)
+    else:
+        force_steps = np.minimum(np.broadcast_to(np.asarray(force_steps, dtype=np.int64), (n,)), n_steps - 1)
+    quantities = np.ones(n, dtype=np.int64) if quantities is None else \
+        np.broadcast_to(np.asarray(quantities, dtype=np.int64), (n,))
+
+    upper, lower = barrier_prices(buy_prices, quantities, profit_target, stop_loss)
+
+    # 경로를 1차원으로 펴고 끝에 한 경로 길이만큼 덧대어, 창이 경로 끝을 넘어가도 색인이 유효하게 함
+    # (넘어간 칸은 force_step 이후라 검사 대상이 아님). 범위가 허용하면 int32로 비교량을 줄임
+    compact = paths.size + n_steps < 2 ** 31 and paths.max(initial=0) < 2 ** 31 and paths.min(initial=0) >= 0
+    dtype = np.int32 if compact else np.int64
+    flat = np.concatenate([paths.ravel(), np.zeros(n_steps, dtype=np.int64)]).astype(dtype)
+    start_index = (path_index * n_steps + entry_steps).astype(dtype)
+    upper_c = np.clip(upper, 0, np.iinfo(dtype).max).astype(dtype)
+    lower_c = np.clip(lower, -1, np.iinfo(dtype).max).astype(dtype)
+
+    exit_step = np.full(n, -1, dtype=np.int64)
+    reason = np.full(n, EXIT_OPEN, dtype=np.int8)
+    rows = max(1, chunk_cells // EXIT_SIM_WINDOW)
+
+    for lo in range(0, n, rows):
+        active = np.arange(lo, min(n, lo + rows))
+        active = active[entry_steps[active] < n_steps]
+        offset, width = 1, EXIT_SIM_WINDOW
+
+        # 진입 직후부터 창 단위로 검사 - 대부분 첫 창에서 청산되므로 전체 경로를 비교하지 않음
+        while active.size:
+            window = np.arange(offset, min(offset + width, n_steps), dtype=dtype)
+            eligible = window < (force_steps[active] - entry_steps[active]).astype(dtype)[:, None]
+            block = flat.take(start_index[active, None] + window)
+            hit = ((block >= upper_c[active, None]) | (block <= lower_c[active, None])) & eligible
+
+            first = hit.argmax(axis=1)
+            row = np.arange(active.size)
+            found = hit[row, first]
+            done = active[found]
+            exit_step[done] = entry_steps[done] + offset + first[found]
+            reason[done] = np.where(block[row, first][found] >= upper_c[done], EXIT_TAKE_PROFIT, EXIT_STOP_LOSS)
+
+            remaining = ~found & eligible[:, -1]     # 창 끝까지 검사 가능했던 진입만 다음 창으로
+            forced = active[~found & ~remaining]
+            exit_step[forced] = np.maximum(force_steps[forced], entry_steps[forced])
+            reason[forced] = EXIT_FORCE
+
+            active = active[remaining]
+            offset += width
+            width *= 2
+
+    closed = exit_step >= 0
+    exit_price = np.zeros(n, dtype=np.int64)
+    exit_price[closed] = paths[path_index[closed], exit_step[closed]]
+    cost = buy_prices * quantities
+    profit_amount = np.where(closed, exit_price * quantities - cost, 0)
+    profit_rate = np.where(closed, profit_rates(exit_price, buy_prices, quantities), 0.0)
+    holding_steps = np.where(closed, exit_step - entry_steps, 0)
+
+    return ExitResult(exit_step, exit_price, reason, profit_amount, profit_rate, holding_steps,
+                      time.perf_counter() - start)
+
+def cross_check(result: ExitResult, paths: np.ndarray, buy_prices: np.ndarray, profit_target: float,
+                stop_loss: float, path_index: np.ndarray = None, entry_steps: np.ndarray = None,
+                force_steps: np.ndarray = None, quantities: np.ndarray = None,
+                sample: Optional[int] = 1000, seed: int = 0) -> int:
+    """🔍 표본 진입을 실제 Position.should_exit로 한 시점씩 돌려 결과가 다른 건수 반환"""
+    from scalping_engine import Position
+
+    paths = np.asarray(paths, dtype=np.int64)
+    if paths.ndim == 1:
+        paths = paths[None, :]
+    n_steps = paths.shape[1]
+    n = len(result)
+    indices = np.arange(n) if not sample or sample >= n else \
+        np.random.default_rng(seed).choice(n, sample, replace=False)
+
+    mismatches = 0
+    for i in indices.tolist():
+        path = paths[i if path_index is None else path_index[i]]
+        entry = 0 if entry_steps is None else int(entry_steps[i])
+        force = n_steps - 1 if force_steps is None else min(int(np.broadcast_to(force_steps, (n,))[i]), n_steps - 1)
+        quantity = 1 if quantities is None else int(np.broadcast_to(quantities, (n,))[i])
+        position = Position("000000", "", int(buy_prices[i]), quantity)
+
+        expected_step, expected_reason = max(force, entry), EXIT_FORCE
+        for step in range(entry + 1, force):
+            should_exit, exit_reason = position.should_exit(int(path[step]), profit_target, stop_loss)
+            if should_exit:
+                expected_step = step
+                expected_reason = EXIT_TAKE_PROFIT if exit_reason == "익절" else EXIT_STOP_LOSS
+                break
+
+        if int(result.exit_step[i]) != expected_step or int(result.reason[i]) != expected_reason:
+            mismatches += 1
+    return mismatches
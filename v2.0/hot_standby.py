@@ -0,0 +1,357 @@
+"""
+🔥 V3.4 핫 스탠바이 - 주 프로세스의 거래 저널을 따라 읽어 장부 복제본을 유지하고, 하트비트가 끊기면 수 초 안에 인계
+Hot-standby replication: append-only trade journal + lease heartbeat, warm replica, fenced takeover
+"""
+
+import asyncio
+import json
+import os
+import socket
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from scalping_engine import ScalpingEngine, Position
+from virtual_money_manager import VirtualMoneyManager, VirtualTransaction
+from equity_sampler import EquitySampler
+from market_clock import market_now
+from trading_calendar import get_trading_calendar, PHASE_PRE_MARKET, PHASE_OPENING, PHASE_TRADING
+
+# ================================================================================
+# 복제 설정
+# ================================================================================
+HEARTBEAT_INTERVAL = 1.0           # 주 프로세스 하트비트 주기 (초)
+HEARTBEAT_TIMEOUT = 5.0            # 하트비트가 이 시간 이상 끊기면 인계 (초)
+STANDBY_POLL_INTERVAL = 0.5        # 스탠바이 저널/하트비트 확인 주기 (초)
+TAKEOVER_GRACE = 0.2               # 펜싱 직전에 임대를 확인한 이전 세대의 마지막 기록을 기다리는 시간 (초)
+JOURNAL_FSYNC = True               # 거래 기록마다 디스크 동기화 (전원 장애 대비)
+LEASE_FILE = "primary_lease.json"  # 주 프로세스 임대 (세대 번호 + 하트비트 + 반납 여부)
+TAKEOVER_PHASES = (PHASE_TRADING,)                      # 인계 가능한 장 구간 (09:05~14:00, 러너도 14:00에 종료)
+STANDBY_WAIT_PHASES = (PHASE_PRE_MARKET, PHASE_OPENING)  # 매매 시작 전 - 인계 없이 계속 감시
+
+def journal_path(save_dir: str, date_str: str = None) -> str:
+    """일별 거래 저널 경로 (JSON Lines)"""
+    date_str = date_str or market_now().strftime('%Y%m%d')
+    return os.path.join(save_dir, f"trade_journal_{date_str}.jsonl")
+
+class FencedError(RuntimeError):
+    """더 높은 세대가 임대를 가져가 이 프로세스는 더 이상 거래할 수 없음"""
+
+class PrimaryLease:
+    """🔑 주 프로세스 임대 - 세대 번호(epoch)와 하트비트를 한 파일에 기록
+
+    새 주 프로세스(재시작 또는 스탠바이 인계)는 세대를 하나 올려 임대를 가져가고, 이전 세대는
+    다음 거래/하트비트에서 자기 세대가 아님을 보고 멈춘다 (펜싱). 정상 종료 시 release()로
+    반납 표시(closed)를 남겨 스탠바이가 장애로 오인하지 않게 한다. 파일은 임시 파일 교체로 쓴다.
+    """
+
+    def __init__(self, save_dir: str, clock: Callable[[], float] = time.time):
+        self.path = os.path.join(save_dir, LEASE_FILE)
+        self.clock = clock
+        self.epoch = 0
+
+    def read(self) -> Dict[str, Any]:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _write(self, epoch: int, closed: bool = False):
+        lease = {"epoch": epoch, "pid": os.getpid(), "host": socket.gethostname(), "beat": self.clock(),
+                 "closed": closed}
+        tmp_file = self.path + f".{os.getpid()}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(lease, f)
+        os.replace(tmp_file, self.path)
+
+    def acquire(self) -> int:
+        """세대를 올려 임대 획득 → 새 세대 번호"""
+        self.epoch = int(self.read().get("epoch", 0)) + 1
+        self._write(self.epoch)
+        return self.epoch
+
+    def held(self) -> bool:
+        """아직 이 세대가 임대를 갖고 있는지 (파일을 읽지 못하면 유지로 봄)"""
+        current = self.read()
+        return not current or int(current.get("epoch", 0)) <= self.epoch
+
+    def beat(self) -> bool:
+        """하트비트 기록 (펜싱됐으면 False)"""
+        if not self.held():
+            return False
+        try:
+            self._write(self.epoch)
+        except OSError as e:
+            print(f"[WARN] 하트비트 기록 실패: {e}")
+        return True
+
+    def release(self) -> bool:
+        """정상 종료 - 이 세대로 반납 표시 (펜싱됐으면 새 세대 임대를 건드리지 않고 False)"""
+        if not self.held():
+            return False
+        try:
+            self._write(self.epoch, closed=True)
+        except OSError as e:
+            print(f"[WARN] 임대 반납 기록 실패: {e}")
+            return False
+        return True
+
+class TradeJournal:
+    """📓 거래 저널 - 장부를 바꾸는 기록만 한 줄씩 추가 (snapshot / buy / sell)
+
+    각 줄에는 세대 번호와 기록 후 현금/투자금이 들어 있어, 스탠바이는 거래를 그대로 적용하고
+    금액은 기록 값으로 맞춘다. append()는 임대를 확인한 뒤 쓰므로 펜싱된 프로세스는 쓰지 못한다.
+    """
+
+    def __init__(self, path: str, lease: PrimaryLease, fsync: bool = JOURNAL_FSYNC):
+        self.path = path
+        self.lease = lease
+        self.fsync = fsync
+        self.seq = 0
+        self._file = open(path, 'a', encoding='utf-8')
+
+    def writable(self) -> bool:
+        return self.lease.held()
+
+    def append(self, kind: str, **fields):
+        if not self.writable():
+            raise FencedError(f"세대 {self.lease.epoch} 임대 상실 - 저널 기록 중단")
+        self.seq += 1
+        record = {"seq": self.seq, "epoch": self.lease.epoch, "type": kind,
+                  "time": market_now().strftime('%Y-%m-%d %H:%M:%S'), **fields}
+        self._file.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')) + "\n")
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+class ReplicationPrimary:
+    """📤 주 프로세스 쪽 복제 - 임대 획득, 자금 관리자에 저널 연결 (snapshot 기록), 하트비트, 종료 시 반납"""
+
+    def __init__(self, money_manager: VirtualMoneyManager, save_dir: str = None, lease: PrimaryLease = None):
+        self.money_manager = money_manager
+        self.save_dir = save_dir or money_manager.save_dir
+        if lease is None:
+            lease = PrimaryLease(self.save_dir)
+            lease.acquire()
+        self.lease = lease
+        self.journal = TradeJournal(journal_path(self.save_dir), self.lease)
+        money_manager.attach_journal(self.journal)
+        self.fenced = False
+        self.released = False
+        print(f"[복제] 주 프로세스 세대 {self.lease.epoch} - 저널 {os.path.basename(self.journal.path)}")
+
+    def beat(self) -> bool:
+        """하트비트 (펜싱되면 False - 호출 측은 거래를 멈춤)"""
+        if self.fenced:
+            return False
+        if not self.lease.beat():
+            self.fenced = True
+            print(f"[ERROR] 세대 {self.lease.epoch} 펜싱됨 - 다른 프로세스가 인계, 거래 중단")
+        return not self.fenced
+
+    def release(self):
+        """정상 종료 (장 종료, 강제 청산 후, Ctrl-C) - 임대 반납 표시로 스탠바이가 인계하지 않고 끝나게 함"""
+        if self.released:
+            return
+        self.released = True
+        if not self.fenced and self.lease.release():
+            print(f"[복제] 세대 {self.lease.epoch} 임대 반납 - 스탠바이 인계 없음")
+        self.journal.close()
+
+class ReplicaMoneyManager(VirtualMoneyManager):
+    """자금 관리자 복제본 - 오늘 거래는 파일이 아니라 저널 기록으로 채움 (인계 전에는 저장하지 않음)"""
+    replicating = True
+
+    def load_today_transactions(self):
+        pass
+
+    def save_daily_data(self):
+        if not self.replicating:
+            super().save_daily_data()
+
+    def apply_record(self, record: Dict[str, Any]):
+        """저널 기록 1건 적용"""
+        kind = record.get("type")
+        with self._lock:
+            if kind == "snapshot":
+                state = record["state"]
+                for key in ("available_cash", "initial_capital", "original_capital", "cumulative_days",
+                            "max_capital", "min_capital", "total_invested", "daily_pnl"):
+                    setattr(self, key, state[key])
+                self.buy_transactions = [VirtualTransaction(**tx) for tx in state["buy_transactions"]]
+                self.sell_transactions = [VirtualTransaction(**tx) for tx in state["sell_transactions"]]
+                self.equity_sampler = EquitySampler(self.available_cash + self.total_invested)
+            elif kind == "buy":
+                self.buy_transactions.append(VirtualTransaction(**record["tx"]))
+            elif kind == "sell":
+                self.sell_transactions.append(VirtualTransaction(**record["tx"]))
+            else:
+                return
+            if kind != "snapshot":
+                self.available_cash = record["cash"]
+                self.total_invested = record["invested"]
+                self.daily_pnl = record["daily_pnl"]
+                total = self.available_cash + self.total_invested
+                self.max_capital = max(self.max_capital, total)
+                self.min_capital = min(self.min_capital, total)
+
+    def open_buy_transactions(self) -> List[VirtualTransaction]:
+        sold = {tx.buy_transaction_id for tx in self.sell_transactions}
+        return [tx for tx in self.buy_transactions if tx.transaction_id not in sold]
+
+class HotStandby:
+    """🛡️ 스탠바이 - 저널을 따라 읽어 복제본 유지, 하트비트가 끊기면 인계
+
+    poll()은 지난번 이후 추가된 완성된 줄만 읽는다 (쓰는 중인 마지막 줄은 다음에). 인계는
+    1) 임대 세대를 올려 이전 주 프로세스를 펜싱하고 2) 저널 끝까지 마저 읽은 뒤
+    3) 미청산 매수로 포지션을, 오늘 매수 종목으로 재매수 금지 목록을 복원한 엔진을 돌려준다.
+    주 프로세스가 임대를 반납했거나, 날짜가 바뀌었거나, 매매 시간이 지나면 인계 없이 끝낸다.
+    """
+
+    def __init__(self, save_dir: str = "virtual_money_data", initial_capital: int = 500_000,
+                 heartbeat_timeout: float = HEARTBEAT_TIMEOUT, clock: Callable[[], float] = time.time):
+        self.save_dir = save_dir
+        self.heartbeat_timeout = heartbeat_timeout
+        self.clock = clock
+        self.money_manager = ReplicaMoneyManager(initial_capital, save_dir)
+        self.lease = PrimaryLease(save_dir, clock)
+        self.journal_file = journal_path(save_dir)
+        self._offset = 0
+        self._pending = b""
+        self.epoch = 0                  # 마지막으로 적용한 기록의 세대
+        self.applied = 0
+        self.started = clock()
+        self.primary: Optional[ReplicationPrimary] = None
+        self.calendar = get_trading_calendar()
+
+    def poll(self) -> int:
+        """새 저널 기록 적용 → 적용 건수"""
+        try:
+            with open(self.journal_file, 'rb') as f:
+                f.seek(self._offset)
+                chunk = f.read()
+        except FileNotFoundError:
+            return 0
+        if not chunk:
+            return 0
+        self._offset += len(chunk)
+        lines = (self._pending + chunk).split(b"\n")
+        self._pending = lines.pop()     # 줄바꿈 전이면 아직 쓰는 중
+        applied = 0
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                print(f"[WARN] 저널 기록 해석 실패: {line[:80]!r}")
+                continue
+            if record.get("epoch", 0) < self.epoch:
+                continue                # 펜싱된 이전 세대가 늦게 쓴 기록
+            self.epoch = record.get("epoch", 0)
+            self.money_manager.apply_record(record)
+            applied += 1
+        self.applied += applied
+        return applied
+
+    def primary_alive(self) -> bool:
+        """하트비트가 제한 시간 안에 있는지 (임대 파일이 없으면 스탠바이 시작 시각 기준)"""
+        lease = self.lease.read()
+        last_beat = lease.get("beat", self.started)
+        return self.clock() - last_beat < self.heartbeat_timeout
+
+    def stop_reason(self) -> str:
+        """감시를 끝낼 사유 (계속 감시면 빈 문자열)"""
+        lease = self.lease.read()
+        if lease.get("closed") and self.epoch and int(lease.get("epoch", 0)) >= self.epoch:
+            return f"주 프로세스 정상 종료 (세대 {lease['epoch']} 임대 반납)"
+        if journal_path(self.save_dir) != self.journal_file:
+            return f"날짜 변경 (저널 {os.path.basename(self.journal_file)})"
+        phase = self.calendar.session_phase(market_now())
+        if phase not in TAKEOVER_PHASES and phase not in STANDBY_WAIT_PHASES:
+            return f"매매 시간 아님 ({phase})"
+        return ""
+
+    def can_take_over(self) -> bool:
+        """매매 구간이고 오늘 주 프로세스의 저널을 받은 적이 있을 때만 인계 (어제 임대로 오인 방지)"""
+        return self.applied > 0 and self.calendar.session_phase(market_now()) in TAKEOVER_PHASES
+
+    def takeover(self):
+        """🚨 인계 → 복제본으로 만든 ScalpingEngine"""
+        started = time.perf_counter()
+        lease = PrimaryLease(self.save_dir, self.clock)
+        lease.acquire()                 # 이후 이전 세대의 거래/하트비트는 거부됨
+        time.sleep(TAKEOVER_GRACE)
+        self.poll()
+
+        manager = self.money_manager
+        manager.replicating = False
+        manager.txid_generator.reload()
+        self.primary = ReplicationPrimary(manager, self.save_dir, lease)
+
+        engine = ScalpingEngine(money_manager=manager, monitor_only=False)
+        for tx in manager.open_buy_transactions():
+            position = Position(tx.code, tx.name, tx.price, tx.quantity, tx.condition_seq, virtual_transaction=tx)
+            try:
+                position.buy_time = datetime.strptime(tx.timestamp, '%Y-%m-%d %H:%M:%S')
+            except ValueError:
+                pass
+            engine.positions.append(position)
+        engine.traded_today.update(position.code for position in engine.positions)
+        engine.traded_today.update(tx.code for tx in manager.buy_transactions)
+        engine.update_trading_strategy()
+        manager.save_daily_data()
+
+        engine.log_activity(f"🛡️ 스탠바이 인계 완료 (세대 {self.primary.lease.epoch}) - 포지션 {len(engine.positions)}개, "
+                            f"현금 {manager.available_cash:,}원, 저널 {self.applied}건 반영, "
+                            f"{(time.perf_counter() - started) * 1000:.0f}ms")
+        return engine
+
+    async def wait_for_failure(self, poll_interval: float = STANDBY_POLL_INTERVAL) -> Optional[ScalpingEngine]:
+        """주 프로세스 하트비트가 끊길 때까지 복제 → 인계한 엔진 (인계 없이 끝나면 None)"""
+        print(f"[스탠바이] {self.save_dir} 감시 시작 (하트비트 제한 {self.heartbeat_timeout:.0f}초)")
+        holding = False
+        while True:
+            self.poll()
+            reason = self.stop_reason()
+            if reason:
+                print(f"[스탠바이] {reason} - 인계 없이 종료 (세대 {self.epoch}, 기록 {self.applied}건)")
+                return None
+            if not self.primary_alive():
+                if self.can_take_over():
+                    print(f"[스탠바이] 🚨 하트비트 끊김 - 인계 시작 (세대 {self.epoch}, 기록 {self.applied}건)")
+                    return self.takeover()
+                if not holding:
+                    print("[스탠바이] 하트비트 없음 - 오늘 저널 기록이 없거나 매매 시간 전이라 인계 보류")
+                holding = True
+            else:
+                holding = False
+            await asyncio.sleep(poll_interval)
+
+if __name__ == "__main__":
+    import sys
+    from scalping_engine import ensure_token_for_full_trading_day
+    from scalping_runner import run_trading_task_graph      # 러너의 UI 라이브러리 안내 출력은 인계 프로세스에서만
+
+    async def main():
+        save_dir = sys.argv[1] if len(sys.argv) > 1 else "virtual_money_data"
+        standby = HotStandby(save_dir)
+        engine = await standby.wait_for_failure()
+        if engine is None:
+            return
+        try:
+            token = ensure_token_for_full_trading_day()
+            stop_reason = await run_trading_task_graph(engine, token, test_mode=False, monitor_only=False,
+                                                       loop_interval=60, replication=standby.primary)
+            if stop_reason == "force_sell":
+                engine.force_sell_all(token)
+                engine.money_manager.save_daily_data()
+            print(f"🏁 인계 후 거래 종료 ({stop_reason})")
+        finally:
+            standby.primary.release()
+
+    asyncio.run(main())
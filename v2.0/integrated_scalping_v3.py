@@ -6,15 +6,14 @@
 import asyncio
 import sys
 import os
-import time
-from datetime import datetime, timedelta
 from typing import List, Dict, Any, Optional, Tuple
 
 # 기존 모듈 import
 from scalping_engine import (
     get_valid_access_token, ensure_token_for_full_trading_day,
-    get_condition_codes, get_stock_info, get_current_price,
-    normalize_code, is_etf_etn, WS_URL, CONDITION_SEQ_LIST,
+    get_stock_infos_bulk, get_current_price, collect_condition_matches,
+    enrich_condition_matches, prefilter_condition_matches,
+    normalize_code, is_etf_etn, WS_URL,
     INITIAL_CAPITAL, MAX_POSITION_VALUE, MAX_POSITIONS,
     PROFIT_TARGET, STOP_LOSS, TRADING_START_HOUR, TRADING_END_HOUR,
     FORCE_SELL_HOUR, FORCE_SELL_MINUTE, LOOP_INTERVAL
@@ -24,13 +23,21 @@ from scalping_engine import (
 from virtual_money_manager import VirtualMoneyManager, VirtualTransaction
 from scalping_portfolio import ScalpingPortfolio, ScalpingPosition
 from scalping_monitor import ScalpingMonitor
+from scalping_candidates import ConditionScanner, PricePrefilter, select_top_candidates, get_candidate_limit
+from scalping_orders import OrderPipeline
+from scalping_liquidation import DeadlineLiquidator, FORCE_SELL_DEADLINE
+from exit_rules import ExitRuleSet
+from market_clock import market_now
 
 class ScalpingEngineV3:
     """🔥 V3.0 단타 매매 엔진 - 완전 통합 버전"""
     
-    def __init__(self, log_dir: str = None):
+    def __init__(self, log_dir: str = None, exit_rules: ExitRuleSet = None):
         self.log_dir = log_dir
         
+        # 🚪 익절/손절 외 추가 청산 규칙 (트레일링 스탑, 시간 청산 등 - 없으면 None)
+        self.exit_rules = exit_rules
+        
         # 🔥 새로운 모듈들로 구성
         self.money_manager = VirtualMoneyManager(INITIAL_CAPITAL, log_dir)
         self.portfolio = ScalpingPortfolio(MAX_POSITIONS, MAX_POSITION_VALUE, log_dir)
@@ -40,6 +47,11 @@ class ScalpingEngineV3:
         self.virtual_capital = INITIAL_CAPITAL
         self.daily_trades = []
         
+        # 🔄 루프 간 조건검색 결과 증분 추적
+        self.condition_scanner = ConditionScanner()
+        self.price_prefilter = PricePrefilter()
+        self.monitor.negative_cache = self.condition_scanner.negative_cache
+        
         # 기존 상태 복원 시도
         if log_dir:
             self._load_existing_state()
@@ -48,7 +60,7 @@ class ScalpingEngineV3:
         """기존 상태 복원"""
         try:
             # 오늘 날짜로 기존 상태 로드
-            today = datetime.now().strftime('%Y%m%d')
+            today = market_now().strftime('%Y%m%d')
             
             # 가상 자금 상태 복원
             if self.money_manager.load_daily_transactions(today):
@@ -83,37 +95,62 @@ class ScalpingEngineV3:
     
     def log_activity(self, message: str):
         """활동 로그 기록"""
-        timestamp = datetime.now().strftime("%H:%M:%S")
+        timestamp = market_now().strftime("%H:%M:%S")
         log_entry = f"[{timestamp}] {message}"
         
         print(log_entry, flush=True)
         
         if self.log_dir:
             try:
-                log_file = os.path.join(self.log_dir, f"scalping_log_{datetime.now().strftime('%Y%m%d')}.txt")
+                log_file = os.path.join(self.log_dir, f"scalping_log_{market_now().strftime('%Y%m%d')}.txt")
                 with open(log_file, "a", encoding="utf-8") as f:
                     f.write(log_entry + "\n")
             except Exception:
                 pass
     
     def can_buy_stock(self, code: str) -> Tuple[bool, str]:
-        """매수 가능 여부 확인 (기존 호환성)"""
-        return self.portfolio.can_buy_stock(code, self.money_manager.available_cash)
+        """매수 가능 여부 확인 (기존 호환성, 예약 자금 제외)"""
+        return self.portfolio.can_buy_stock(code, self.money_manager.free_cash)
+    
+    async def buy_candidates_concurrently(self, candidates: List[Dict], target_count: int, token: str = None) -> int:
+        """🚀 동시 매수 - 빈 슬롯마다 자금 예약 후 병렬 진행 (주문 직전 현재가 확인)"""
+        def place_order(candidate: Dict, reservation_id: str, price: int) -> bool:
+            return self.buy_stock(candidate["code"], candidate["name"], price,
+                                  candidate["condition_seq"], candidate["amount"], reservation_id)
+        
+        pipeline = OrderPipeline(
+            self.money_manager, place_order,
+            quote=(lambda code: get_current_price(code, token)) if token else None,
+            precheck=self.can_buy_stock
+        )
+        await pipeline.run(candidates, target_count, MAX_POSITION_VALUE)
+        
+        summary = pipeline.get_summary()
+        self.log_activity(f"🎯 동시 매수 완료: {summary['filled']}개 성공 / {summary['attempts']}개 시도 "
+                          f"(최장 {summary['max_elapsed']:.2f}초)")
+        return summary['filled']
     
-    def buy_stock(self, code: str, name: str, price: int, condition_seq: int = 0, buy_amount: int = 0) -> bool:
-        """🔥 V3.0 가상 매수 실행"""
+    def buy_stock(self, code: str, name: str, price: int, condition_seq: int = 0, buy_amount: int = 0,
+                  reservation_id: str = None) -> bool:
+        """🔥 V3.0 가상 매수 실행 (reservation_id가 있으면 예약 자금으로 확정)"""
         code = normalize_code(code)
         
-        # 매수 가능 여부 확인
-        can_buy, reason = self.portfolio.can_buy_stock(code, self.money_manager.available_cash)
+        # 매수 가능 여부 확인 (예약 주문은 자금 확보 완료)
+        available_cash = None if reservation_id else self.money_manager.free_cash
+        can_buy, reason = self.portfolio.can_buy_stock(code, available_cash)
         if not can_buy:
             self.log_activity(f"❌ 매수 실패 {name}({code}): {reason}")
             return False
         
         # 가상 매수 실행
-        transaction = self.money_manager.execute_virtual_buy(
-            code, name, price, MAX_POSITION_VALUE, condition_seq
-        )
+        if reservation_id:
+            transaction = self.money_manager.commit_reservation(
+                reservation_id, code, name, price, condition_seq, MAX_POSITION_VALUE
+            )
+        else:
+            transaction = self.money_manager.execute_virtual_buy(
+                code, name, price, MAX_POSITION_VALUE, condition_seq
+            )
         
         if not transaction:
             self.log_activity(f"❌ 매수 실패 {name}({code}): 자금 부족")
@@ -121,7 +158,8 @@ class ScalpingEngineV3:
         
         # 포트폴리오에 포지션 추가
         success = self.portfolio.add_position(
-            code, name, price, transaction.quantity, condition_seq, buy_amount
+            code, name, price, transaction.quantity, condition_seq, buy_amount,
+            transaction.transaction_id
         )
         
         if not success:
@@ -137,7 +175,7 @@ class ScalpingEngineV3:
             "quantity": transaction.quantity,
             "amount": transaction.amount,
             "buy_amount": buy_amount,
-            "time": datetime.now().strftime("%H:%M:%S"),
+            "time": market_now().strftime("%H:%M:%S"),
             "condition_seq": condition_seq
         }
         self.daily_trades.append(trade_record)
@@ -146,19 +184,25 @@ class ScalpingEngineV3:
                          f"(투자: {transaction.amount:,}원)")
         return True
     
+    def _find_buy_transaction(self, position: ScalpingPosition) -> Optional[VirtualTransaction]:
+        """포지션의 매수 거래 찾기 (거래 ID 우선, 이전 포지션은 종목코드+수량)"""
+        for transaction in self.money_manager.buy_transactions:
+            if position.transaction_id:
+                matched = transaction.transaction_id == position.transaction_id
+            else:
+                matched = (transaction.code == position.code and 
+                           transaction.quantity == position.quantity)
+            if matched:
+                return transaction
+        return None
+    
     def sell_position(self, position: ScalpingPosition, current_price: int, reason: str) -> bool:
         """🔥 V3.0 포지션 매도"""
         if position not in self.portfolio.positions:
             return False
         
         # 해당 포지션의 매수 거래 찾기
-        buy_transaction = None
-        for transaction in self.money_manager.transactions:
-            if (transaction.type == 'buy' and 
-                transaction.code == position.code and 
-                transaction.quantity == position.quantity):
-                buy_transaction = transaction
-                break
+        buy_transaction = self._find_buy_transaction(position)
         
         if not buy_transaction:
             self.log_activity(f"⚠️  매수 거래 기록을 찾을 수 없음: {position.name}")
@@ -176,6 +220,8 @@ class ScalpingEngineV3:
         removed_position = self.portfolio.remove_position(position.code)
         if not removed_position:
             return False
+        if self.exit_rules is not None:
+            self.exit_rules.detach(position)
         
         # 기존 호환성을 위한 거래 기록
         trade_record = {
@@ -188,8 +234,8 @@ class ScalpingEngineV3:
             "profit_amount": sell_transaction.profit_amount,
             "profit_rate": sell_transaction.profit_rate,
             "reason": reason,
-            "time": datetime.now().strftime("%H:%M:%S"),
-            "hold_duration": str(datetime.now() - position.buy_time).split('.')[0]
+            "time": market_now().strftime("%H:%M:%S"),
+            "hold_duration": str(market_now() - position.buy_time).split('.')[0]
         }
         self.daily_trades.append(trade_record)
         
@@ -203,26 +249,37 @@ class ScalpingEngineV3:
     def check_exit_conditions(self, token: str) -> int:
         """🔥 V3.0 청산 조건 체크 및 실행"""
         if not self.portfolio.positions:
+            self.money_manager.record_equity([], {})
             return 0
         
         exit_count = 0
-        current_prices = {}
+        
+        # 보유 종목 일괄 시세 (누락분은 개별 조회)
+        try:
+            infos = get_stock_infos_bulk([p.code for p in self.portfolio.positions], token)
+        except Exception:
+            infos = {}
+        current_prices = {code: info["price"] for code, info in infos.items()}
         
         # 현재가 조회
         for position in self.portfolio.positions:
             try:
-                current_price = get_current_price(position.code, token)
+                current_price = current_prices.get(position.code, 0) or get_current_price(position.code, token)
                 if current_price > 0:
                     current_prices[position.code] = current_price
             except Exception as e:
                 self.log_activity(f"⚠️  {position.name} 현재가 조회 실패: {e}")
         
+        # 📈 조회한 시세로 장중 평가금액 기록
+        self.money_manager.record_equity(self.portfolio.positions, current_prices)
+        
         # 청산 조건 체크 및 실행
         positions_to_exit = []
         for position in self.portfolio.positions:
             current_price = current_prices.get(position.code, 0)
             if current_price > 0:
-                should_exit, exit_reason = position.should_exit(current_price, PROFIT_TARGET, STOP_LOSS)
+                amount = infos.get(position.code, {}).get("amount")
+                should_exit, exit_reason = self.exit_signal(position, current_price, amount)
                 if should_exit:
                     positions_to_exit.append((position, current_price, exit_reason))
         
@@ -233,27 +290,71 @@ class ScalpingEngineV3:
         
         return exit_count
     
-    def force_sell_all(self, token: str) -> int:
-        """🔥 V3.0 강제 청산 (15:10)"""
+    def exit_signal(self, position: ScalpingPosition, current_price: int,
+                    amount: Optional[int] = None) -> Tuple[bool, str]:
+        """익절/손절 → 추가 청산 규칙 순서로 판정"""
+        should_exit, exit_reason = position.should_exit(current_price, PROFIT_TARGET, STOP_LOSS)
+        if not should_exit and self.exit_rules is not None:
+            should_exit, exit_reason = self.exit_rules.check(position, current_price, amount)
+        return should_exit, exit_reason
+    
+    def force_sell_all(self, token: str, deadline_seconds: float = FORCE_SELL_DEADLINE) -> int:
+        """🔥 V3.0 강제 청산 (15:10) - 일괄 시세 + 동시 매도, 마감 시한까지 재시도 후 한 번에 반영"""
         if not self.portfolio.positions:
             return 0
         
-        self.log_activity("🚨 강제 청산 시작 (15:10)")
+        self.log_activity(f"🚨 강제 청산 시작 (15:10, 시한 {deadline_seconds:.1f}초)")
         
-        force_sell_count = 0
-        positions_copy = self.portfolio.positions.copy()
+        liquidator = DeadlineLiquidator(
+            fetch_quote=lambda code: get_current_price(code, token),
+            fetch_quotes=lambda codes: {code: info["price"] for code, info in get_stock_infos_bulk(codes, token).items()},
+            submit_sell=lambda position, price: self._find_buy_transaction(position) is not None,
+            apply_fills=self._apply_liquidation_fills,
+            deadline_seconds=deadline_seconds
+        )
+        report = liquidator.run(self.portfolio.positions.copy())
+        report.print_report()
         
-        for position in positions_copy:
-            try:
-                current_price = get_current_price(position.code, token)
-                if current_price > 0:
-                    if self.sell_position(position, current_price, "강제청산"):
-                        force_sell_count += 1
-            except Exception as e:
-                self.log_activity(f"⚠️  {position.name} 강제청산 실패: {e}")
+        for outcome in report.unsold:
+            self.log_activity(f"⚠️  {outcome.name} 강제청산 실패: {outcome.error or '시한 초과'}")
         
-        self.log_activity(f"🚨 강제 청산 완료: {force_sell_count}건")
-        return force_sell_count
+        self.log_activity(f"🚨 강제 청산 완료: {report.sold_count}건 ({report.elapsed:.2f}초)")
+        return report.sold_count
+    
+    def _apply_liquidation_fills(self, fills: List[Tuple[ScalpingPosition, int]]) -> Dict[str, int]:
+        """강제 청산 체결분 일괄 반영 (거래/포트폴리오 저장 각 1회) - 반영된 종목만 종목코드별 손익 반환"""
+        orders = [(self._find_buy_transaction(position), price, "강제청산") for position, price in fills]
+        sell_transactions = self.money_manager.execute_virtual_sells_batch(orders)
+        sold = [(position, price, sell_transaction)
+                for (position, price), sell_transaction in zip(fills, sell_transactions) if sell_transaction is not None]
+        self.portfolio.remove_positions([position.code for position, _, _ in sold])
+        
+        profits = {}
+        now = market_now()
+        for position, price, sell_transaction in sold:
+            if self.exit_rules is not None:
+                self.exit_rules.detach(position)
+            profits[position.code] = sell_transaction.profit_amount
+            
+            self.daily_trades.append({
+                "type": "sell",
+                "code": position.code,
+                "name": position.name,
+                "buy_price": position.buy_price,
+                "sell_price": price,
+                "quantity": position.quantity,
+                "profit_amount": sell_transaction.profit_amount,
+                "profit_rate": sell_transaction.profit_rate,
+                "reason": "강제청산",
+                "time": now.strftime("%H:%M:%S"),
+                "hold_duration": str(now - position.buy_time).split('.')[0]
+            })
+            
+            emoji = "🟢" if sell_transaction.profit_amount > 0 else "🔴"
+            self.log_activity(f"{emoji} 매도 {position.name}({position.code}) "
+                             f"{position.buy_price:,}→{price:,} "
+                             f"({sell_transaction.profit_rate:+.2f}%) 강제청산")
+        return profits
     
     def get_portfolio_status(self) -> Dict[str, Any]:
         """🔥 V3.0 포트폴리오 현황 (기존 호환성)"""
@@ -316,7 +417,7 @@ class ScalpingEngineV3:
         if not self.log_dir:
             return
         
-        today = datetime.now().strftime('%Y%m%d')
+        today = market_now().strftime('%Y%m%d')
         report_file = os.path.join(self.log_dir, f"daily_report_{today}.json")
         
         try:
@@ -361,72 +462,36 @@ class ScalpingEngineV3:
 # 🔥 V3.0 조건검색 함수 (기존과 동일하지만 새 엔진 사용)
 # ================================================================================
 
-async def find_scalping_targets_v3(engine: ScalpingEngineV3, token: str, top_n: int = None) -> List[Dict]:
-    """🔥 V3.0 단타 매수 대상 검색"""
-    all_candidates = []
-    
+async def find_scalping_targets_v3(engine: ScalpingEngineV3, token: str, top_n: int = None,
+                                   max_candidates: int = None) -> List[Dict]:
+    """🔥 V3.0 단타 매수 대상 검색 (조건식 간 중복 제거 + 상위 후보 선택)"""
     print(f"\n🔍 조건검색식 매수 대상 검색 시작...", flush=True)
     
-    for seq in CONDITION_SEQ_LIST:
-        try:
-            print(f"\n📡 조건검색식 {seq}번 실행 중...", flush=True)
-            codes, cond_name = await get_condition_codes(seq, token)
-            
-            if not codes:
-                print(f"📝 조건검색식 {seq}번 결과 없음", flush=True)
-                continue
-            
-            print(f"✅ 조건검색식 {seq}번 ({cond_name}) - {len(codes)}개 종목 발견", flush=True)
-            
-            # 처리할 종목 수 결정
-            if top_n is None:
-                process_count = len(codes)
-            else:
-                process_count = min(len(codes), top_n)
-            
-            # 종목 정보 수집 및 필터링
-            candidates = []
-            for i, code in enumerate(codes[:process_count]):
-                if i > 0:
-                    time.sleep(0.1)
-                
-                code = normalize_code(code)
-                info = get_stock_info(code, token)
-                
-                if not info:
-                    continue
-                
-                if is_etf_etn(info.get("name", "")):
-                    continue
-                
-                candidate = {
-                    "code": code,
-                    "name": info["name"],
-                    "price": info["price"],
-                    "amount": info["amount"],
-                    "condition_seq": seq,
-                    "condition_name": cond_name
-                }
-                candidates.append(candidate)
-            
-            # 거래대금 순으로 정렬
-            candidates.sort(key=lambda x: x["amount"], reverse=True)
-            
-            # 매수 가능한 종목만 전체 후보에 추가
-            for candidate in candidates:
-                can_buy, reason = engine.can_buy_stock(candidate["code"])
-                if can_buy:
-                    all_candidates.append(candidate)
-                    
-        except Exception as e:
-            print(f"[WARN] 조건검색식 {seq} 실행 실패: {e}", flush=True)
+    # 조건검색식 실행 및 병합
+    merger = await collect_condition_matches(token, top_n)
+    
+    # 가격 사전 필터 후 고유 종목 정보 확보 (신규만 개별 조회) 및 필터링
+    excluded = engine.portfolio.traded_today | set(engine.portfolio.blocked_codes)
+    fetch_codes = prefilter_condition_matches(engine.price_prefilter, engine.condition_scanner, merger,
+                                              token, engine.portfolio.max_position_value, excluded)
+    infos = enrich_condition_matches(engine.condition_scanner, merger, token, codes=fetch_codes)
+    
+    candidates = []
+    for code in fetch_codes:
+        info = infos.get(code)
+        
+        if not info:
+            continue
         
-        time.sleep(0.5)
+        if is_etf_etn(info.get("name", "")):
+            continue
+        
+        candidates.append(merger.build_candidate(code, info))
     
-    # 전체 후보 거래대금 순으로 정렬
-    all_candidates.sort(key=lambda x: x["amount"], reverse=True)
+    # 매수 가능한 종목 중 상위 후보 선택 (다중 조건 점수 순)
+    buyable = [c for c in candidates if engine.can_buy_stock(c["code"])[0]]
     
-    return all_candidates
+    return select_top_candidates(buyable, max_candidates)
 
 # ================================================================================
 # 🔥 V3.0 메인 실행 루프
@@ -438,6 +503,11 @@ async def execute_scalping_loop_v3(engine: ScalpingEngineV3, token: str, loop_co
     executed_actions = 0
     
     try:
+        # 0. 만료된 일시 차단 해제
+        released = engine.portfolio.release_expired_blocks()
+        if released:
+            print(f"🔓 차단 해제: {', '.join(released)}", flush=True)
+        
         # 1. 청산 조건 체크
         print(f"🔍 청산 조건 체크 중...", flush=True)
         exit_count = engine.check_exit_conditions(token)
@@ -454,29 +524,14 @@ async def execute_scalping_loop_v3(engine: ScalpingEngineV3, token: str, loop_co
         if available_slots > 0:
             print(f"🔍 신규 매수 대상 검색 중... (빈 자리: {available_slots}개)", flush=True)
             
-            candidates = await find_scalping_targets_v3(engine, token, top_n=None)
+            candidates = await find_scalping_targets_v3(engine, token, top_n=None,
+                                                        max_candidates=get_candidate_limit(available_slots))
             
             if candidates:
                 print(f"📋 매수 후보 {len(candidates)}개 발견", flush=True)
                 
-                buy_count = 0
-                for i, candidate in enumerate(candidates, 1):
-                    if buy_count >= available_slots:
-                        break
-                    
-                    success = engine.buy_stock(
-                        candidate["code"],
-                        candidate["name"],
-                        candidate["price"],
-                        candidate["condition_seq"],
-                        candidate["amount"]
-                    )
-                    
-                    if success:
-                        buy_count += 1
-                        executed_actions += 1
-                    
-                    time.sleep(0.3)
+                buy_count = await engine.buy_candidates_concurrently(candidates, available_slots, token)
+                executed_actions += buy_count
                 
                 if buy_count > 0:
                     print(f"🎉 신규 매수 완료: {buy_count}개 종목", flush=True)
@@ -0,0 +1,309 @@
+"""
+🔥 V3.4 공용 시계 서비스 - 백그라운드 NTP 오프셋 측정 + 단조 시계 기반 now(), 배속 모의 시계 주입
+Background clock-offset service (smoothed NTP offset, monotonic timeline, injectable simulated clock)
+"""
+
+import asyncio
+import statistics
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple, Any
+
+try:
+    import ntplib
+    NTP_AVAILABLE = True
+except ImportError:
+    NTP_AVAILABLE = False
+
+# ================================================================================
+# 시계 설정
+# ================================================================================
+NTP_SERVERS = ['time.google.com', 'pool.ntp.org', 'time.nist.gov', 'time.windows.com']
+NTP_TIMEOUT = 2                    # 서버당 응답 대기 (초)
+CLOCK_SYNC_INTERVAL = 600          # 백그라운드 측정 주기 (초)
+CLOCK_RETRY_INTERVAL = 30          # 측정 실패 시 재시도 주기 (초)
+CLOCK_SAMPLE_WINDOW = 8            # 오프셋 평활에 쓰는 최근 표본 수
+CLOCK_STALE_AFTER = 3600           # 마지막 측정이 이보다 오래되면 stale (초)
+
+def query_ntp_server(server: str) -> Tuple[float, float]:
+    """NTP 서버 1회 조회 → (시스템 시계 대비 오프셋, 왕복 지연) 초"""
+    response = ntplib.NTPClient().request(server, version=3, timeout=NTP_TIMEOUT)
+    return response.offset, response.delay
+
+class MarketClock:
+    """🕐 보정 시계 - now()는 단조 시계 + 평활 오프셋만 계산 (네트워크 I/O 없음)
+
+    시스템 시계를 한 번만 읽어 기준점으로 삼고 이후는 time.monotonic()으로 흐르므로,
+    시스템 시계가 바뀌어도 now()가 튀지 않는다. 오프셋은 최근 표본 중 왕복 지연이 짧은
+    절반의 중앙값이고, now()는 뒤로 가지 않는다.
+    """
+
+    def __init__(self, servers: List[str] = None,
+                 query: Callable[[str], Tuple[float, float]] = None,
+                 sync_interval: float = CLOCK_SYNC_INTERVAL,
+                 sample_window: int = CLOCK_SAMPLE_WINDOW):
+        self.servers = servers or list(NTP_SERVERS)
+        self.query = query or (query_ntp_server if NTP_AVAILABLE else None)
+        self.sync_interval = sync_interval
+
+        self._epoch_base = time.time()
+        self._mono_base = time.monotonic()
+        self._offset = 0.0
+        self._samples: deque = deque(maxlen=sample_window)   # (오프셋, 지연, 서버, 측정 monotonic)
+        self._last_now = 0.0
+        self._last_success: Optional[float] = None
+        self._server_index = 0
+        self.failures = 0
+
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # ------------------------------------------------------------------
+    # 시각 조회 (호출 경로 I/O 없음)
+    # ------------------------------------------------------------------
+    def _timeline(self) -> float:
+        """기준점 + 단조 경과 시간 (epoch 초)"""
+        return self._epoch_base + (time.monotonic() - self._mono_base)
+
+    def timestamp(self) -> float:
+        """보정된 epoch 초 (단조 증가)"""
+        with self._lock:
+            value = max(self._timeline() + self._offset, self._last_now)
+            self._last_now = value
+            return value
+
+    def now(self) -> datetime:
+        """보정된 현재 시각"""
+        return datetime.fromtimestamp(self.timestamp())
+
+    def to_real_seconds(self, seconds: float) -> float:
+        """시계 기준 대기 시간 → 실제 대기 시간 (실시계는 그대로)"""
+        return seconds
+
+    # ------------------------------------------------------------------
+    # 오프셋 측정
+    # ------------------------------------------------------------------
+    @property
+    def offset(self) -> float:
+        return self._offset
+
+    @property
+    def is_synced(self) -> bool:
+        return self._last_success is not None
+
+    def add_sample(self, system_offset: float, delay: float, server: str = ""):
+        """측정 표본 반영 (시스템 시계 대비 오프셋 → 단조 기준 오프셋으로 변환)"""
+        with self._lock:
+            offset = system_offset + (time.time() - self._timeline())
+            self._samples.append((offset, delay, server, time.monotonic()))
+            if self._last_success is None:
+                self._last_now = 0.0   # 첫 측정 전 로컬 시계로 앞서 나간 값은 버림
+            self._last_success = time.monotonic()
+
+            # 왕복 지연이 짧은 절반의 중앙값
+            best = sorted(self._samples, key=lambda s: s[1])[:max(1, (len(self._samples) + 1) // 2)]
+            self._offset = statistics.median(s[0] for s in best)
+
+    def sync_once(self) -> bool:
+        """서버를 돌아가며 표본 1개 측정 (실패 시 다음 서버)"""
+        if not self.query:
+            return False
+
+        for _ in range(len(self.servers)):
+            server = self.servers[self._server_index % len(self.servers)]
+            self._server_index += 1
+            try:
+                system_offset, delay = self.query(server)
+                self.add_sample(system_offset, delay, server)
+                return True
+            except Exception:
+                self.failures += 1
+                continue
+        return False
+
+    def sync_now(self, samples: int = 3) -> bool:
+        """즉시 여러 표본 측정 (시작 시 1회 - 블로킹)"""
+        results = [self.sync_once() for _ in range(samples)]
+        return any(results)
+
+    # ------------------------------------------------------------------
+    # 백그라운드 측정
+    # ------------------------------------------------------------------
+    def start(self):
+        """백그라운드 측정 스레드 시작 (이미 실행 중이면 무시)"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="market-clock", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """백그라운드 측정 중지"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=NTP_TIMEOUT * len(self.servers) + 1)
+
+    def _run(self):
+        while not self._stop.is_set():
+            success = self.sync_once()
+            self._stop.wait(self.sync_interval if success else CLOCK_RETRY_INTERVAL)
+
+    # ------------------------------------------------------------------
+    # 지표
+    # ------------------------------------------------------------------
+    def staleness(self) -> float:
+        """마지막 측정 이후 경과 (초, 측정 이력 없으면 inf)"""
+        if self._last_success is None:
+            return float('inf')
+        return time.monotonic() - self._last_success
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """오프셋 / 지터 / 경과 지표"""
+        with self._lock:
+            offsets = [s[0] for s in self._samples]
+            last_server = self._samples[-1][2] if self._samples else ""
+            delays = [s[1] for s in self._samples]
+
+        staleness = self.staleness()
+        return {
+            "offset": self._offset,
+            "jitter": statistics.pstdev(offsets) if len(offsets) > 1 else 0.0,
+            "samples": len(offsets),
+            "min_delay": min(delays, default=0.0),
+            "last_server": last_server,
+            "staleness": staleness,
+            "stale": staleness > CLOCK_STALE_AFTER,
+            "failures": self.failures,
+            "ntp_available": self.query is not None
+        }
+
+class SimulatedClock:
+    """🧪 모의 시계 - start 시각부터 실제 시간의 speed배로 흐름 (speed=3600이면 1초에 1시간)
+
+    MarketClock과 같은 인터페이스라 set_market_clock()으로 주입하면 엔진·자금 관리·
+    스케줄러가 모두 이 시계를 본다. advance()로 즉시 건너뛸 수 있고, 대기 시간은
+    to_real_seconds()로 배속만큼 줄어든다. 네트워크 측정은 하지 않는다.
+    """
+
+    def __init__(self, start: datetime, speed: float = 1.0):
+        if speed <= 0:
+            raise ValueError("speed는 0보다 커야 합니다")
+        self.speed = speed
+        self.servers: List[str] = []
+        self.failures = 0
+        self._base = start.timestamp()
+        self._mono_base = time.monotonic()
+        self._lock = threading.Lock()
+
+    def timestamp(self) -> float:
+        """모의 epoch 초"""
+        with self._lock:
+            return self._base + (time.monotonic() - self._mono_base) * self.speed
+
+    def now(self) -> datetime:
+        """모의 현재 시각"""
+        return datetime.fromtimestamp(self.timestamp())
+
+    def to_real_seconds(self, seconds: float) -> float:
+        """모의 대기 시간 → 실제 대기 시간"""
+        return seconds / self.speed
+
+    def advance(self, seconds: float):
+        """모의 시각을 seconds만큼 앞당김"""
+        with self._lock:
+            self._base += seconds
+
+    def set_time(self, at: datetime):
+        """모의 시각을 at으로 이동 (뒤로는 가지 않음)"""
+        delta = at.timestamp() - self.timestamp()
+        if delta > 0:
+            self.advance(delta)
+
+    # MarketClock 호환 (모의 시계는 항상 동기화 상태)
+    @property
+    def offset(self) -> float:
+        return 0.0
+
+    @property
+    def is_synced(self) -> bool:
+        return True
+
+    def sync_once(self) -> bool:
+        return True
+
+    def sync_now(self, samples: int = 3) -> bool:
+        return True
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def staleness(self) -> float:
+        return 0.0
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {
+            "offset": 0.0,
+            "jitter": 0.0,
+            "samples": 0,
+            "min_delay": 0.0,
+            "last_server": f"simulated x{self.speed:g}",
+            "staleness": 0.0,
+            "stale": False,
+            "failures": 0,
+            "ntp_available": False
+        }
+
+_clock = None
+_clock_lock = threading.Lock()
+
+def get_market_clock():
+    """프로세스 공용 시계 (처음 호출 시 백그라운드 측정 시작)"""
+    global _clock
+    with _clock_lock:
+        if _clock is None:
+            _clock = MarketClock()
+            _clock.start()
+        return _clock
+
+def set_market_clock(clock):
+    """공용 시계 교체 (모의 시계 주입용) → 이전 시계 반환"""
+    global _clock
+    with _clock_lock:
+        previous, _clock = _clock, clock
+        return previous
+
+@contextmanager
+def use_market_clock(clock):
+    """with 블록 동안만 공용 시계 교체"""
+    previous = set_market_clock(clock)
+    try:
+        yield clock
+    finally:
+        set_market_clock(previous)
+
+def market_now() -> datetime:
+    """공용 시계 현재 시각"""
+    return get_market_clock().now()
+
+def market_timestamp() -> float:
+    """공용 시계 epoch 초 (time.time() 대신)"""
+    return get_market_clock().timestamp()
+
+def real_seconds(seconds: float) -> float:
+    """공용 시계 기준 대기 시간 → 실제 대기 시간 (모의 시계면 배속만큼 줄어듦)"""
+    return get_market_clock().to_real_seconds(max(0.0, seconds))
+
+async def market_sleep(seconds: float):
+    """공용 시계 기준 seconds만큼 대기"""
+    await asyncio.sleep(real_seconds(seconds))
+
+def market_sleep_blocking(seconds: float):
+    """공용 시계 기준 seconds만큼 대기 (동기 루프용)"""
+    time.sleep(real_seconds(seconds))
@@ -0,0 +1,476 @@
+"""
+🔥 V3.4 시세 게이트웨이 - 토큰과 API 호출을 한 데몬이 소유하고 로컬 소켓으로 여러 엔진 프로세스에 조회 응답/발행
+Local market-data gateway daemon: request/response lookups from a shared cache plus pub/sub fan-out over IPC
+"""
+
+import asyncio
+import itertools
+import json
+import os
+import socket
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional, Set, Tuple, Union
+
+import scalping_engine
+from scalping_engine import CONDITION_SEQ_LIST, normalize_code, ensure_token_for_full_trading_day
+from strategy_host import SharedMarketData
+from quote_table import QuoteTable
+from market_clock import market_timestamp, market_sleep
+
+# ================================================================================
+# 게이트웨이 설정
+# ================================================================================
+GATEWAY_SOCKET_PATH = os.path.join(tempfile.gettempdir(), "scalping_gateway.sock")  # 유닉스 소켓 경로
+GATEWAY_TCP_ADDRESS = ("127.0.0.1", 18765)   # 유닉스 소켓이 없는 환경(Windows)용 로컬 주소
+GATEWAY_MAX_MESSAGE = 32 * 1024 * 1024       # 메시지 1건 최대 크기 (종목마스터 전체 응답 포함)
+GATEWAY_REQUEST_TIMEOUT = 30                 # 클라이언트 요청 제한 시간 (초)
+GATEWAY_TOKEN_CHECK = 600                    # 토큰 유효성 재확인 주기 (초)
+QUOTE_PUBLISH_INTERVAL = 1.0                 # 구독 종목 시세 발행 주기 (초)
+CONDITION_PUBLISH_INTERVAL = 20.0            # 조건검색 결과 발행 주기 (초)
+SUBSCRIBER_QUEUE_SIZE = 1_000                # 구독자별 대기 메시지 상한 (넘으면 오래된 것부터 버림)
+GATEWAY_WORKERS = 8                          # 블로킹 API 조회 작업 스레드 수
+
+Address = Union[str, Tuple[str, int]]
+
+def default_address() -> Address:
+    """유닉스 소켓을 쓸 수 있으면 소켓 경로, 아니면 로컬 TCP 주소"""
+    return GATEWAY_SOCKET_PATH if hasattr(socket, "AF_UNIX") else GATEWAY_TCP_ADDRESS
+
+def encode_message(message: Dict[str, Any]) -> bytes:
+    """JSON 한 줄 (줄바꿈 구분 프로토콜)"""
+    return json.dumps(message, ensure_ascii=False, separators=(',', ':')).encode('utf-8') + b"\n"
+
+class MarketGateway:
+    """📡 시세 게이트웨이 데몬
+
+    - 요청/응답: {"id", "op", "args"} → {"id", "ok", "result" | "error"}. op는 scalping_engine의
+      get_stock_info / get_stock_infos_bulk / get_current_price / get_stock_master / get_condition_codes
+      이고 token 인자는 받지 않는다 (게이트웨이 토큰 사용). 조회는 SharedMarketData 캐시를 거친다.
+    - 발행: {"op": "subscribe", "topics": [...], "codes": [...]}를 보낸 연결은 구독 연결이 되어
+      "quote"(구독 종목 시세 변화)와 "condition"(조건검색 결과 변화) 메시지를 받는다.
+      {"op": "watch", "codes": [...]}로 구독 종목을 바꾼다.
+    """
+
+    def __init__(self, source=scalping_engine, address: Address = None,
+                 token_provider: Callable[[], str] = ensure_token_for_full_trading_day,
+                 clock: Callable[[], float] = market_timestamp,
+                 condition_seqs: List[int] = None,
+                 quote_interval: float = QUOTE_PUBLISH_INTERVAL,
+                 condition_interval: float = CONDITION_PUBLISH_INTERVAL,
+                 quote_table: QuoteTable = None):
+        self.address = address or default_address()
+        self.market = SharedMarketData(source, clock=clock)
+        self.token_provider = token_provider
+        self.clock = clock
+        self.condition_seqs = list(condition_seqs or CONDITION_SEQ_LIST)
+        self.quote_interval = quote_interval
+        self.condition_interval = condition_interval
+        self.quote_table = quote_table     # 있으면 받은 시세를 공유 메모리 테이블에도 기록 (종료 시 닫음)
+
+        self._token: Optional[str] = None
+        self._token_checked = 0.0
+        self._subscribers: Dict[int, Dict[str, Any]] = {}
+        self._subscriber_ids = itertools.count(1)
+        self._last_quotes: Dict[str, Tuple[int, int]] = {}
+        self._last_conditions: Dict[int, List[str]] = {}
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._stopped: Optional[asyncio.Event] = None
+        self._handlers: Dict[asyncio.Task, asyncio.StreamWriter] = {}
+        self._executor = ThreadPoolExecutor(GATEWAY_WORKERS, thread_name_prefix="gateway")
+
+        self.requests = 0
+        self.errors = 0
+        self.published = 0
+        self.dropped = 0
+        self.connections = 0
+
+    # ------------------------------------------------------------------
+    # 토큰 / 조회
+    # ------------------------------------------------------------------
+    def token(self) -> str:
+        """게이트웨이 토큰 (GATEWAY_TOKEN_CHECK마다 유효성 재확인)"""
+        now = time.time()
+        if self._token is None or now - self._token_checked >= GATEWAY_TOKEN_CHECK:
+            self._token = self.token_provider()
+            self._token_checked = now
+        return self._token
+
+    async def _blocking(self, func, *args):
+        """블로킹 조회를 게이트웨이 전용 작업 스레드에서 실행"""
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    async def handle_request(self, op: str, args: Dict[str, Any]) -> Any:
+        """요청 1건 처리"""
+        token = await self._blocking(self.token)
+        if op == "get_stock_info":
+            info = await self._blocking(self.market.get_stock_info, args["stock_code"], token)
+            self._record({args["stock_code"]: info})
+            return info
+        if op == "get_current_price":
+            return await self._blocking(self.market.get_current_price, args["stock_code"], token)
+        if op == "get_stock_infos_bulk":
+            infos = await self._blocking(self.market.get_stock_infos_bulk, args["stock_codes"], token)
+            self._record(infos)
+            return infos
+        if op == "get_stock_master":
+            markets = tuple(args.get("markets", ("0", "10")))
+            return await self._blocking(self.market.get_stock_master, token, markets)
+        if op == "get_condition_codes":
+            codes, name = await self.market.get_condition_codes(int(args["seq"]), token)
+            return [codes, name]
+        if op == "stats":
+            return self.get_summary()
+        raise ValueError(f"알 수 없는 요청: {op}")
+
+    def _record(self, infos: Dict[str, Dict[str, Any]]):
+        """시세 테이블 기록 (이벤트 루프 스레드에서만 호출 - 쓰기 주체 1개 유지)"""
+        if self.quote_table is not None:
+            self.quote_table.update_infos(infos, self.clock())
+
+    # ------------------------------------------------------------------
+    # 연결 처리
+    # ------------------------------------------------------------------
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        self._handlers[asyncio.current_task()] = writer
+        subscriber_id = None
+        write_lock = asyncio.Lock()
+
+        async def send(message: Dict[str, Any]):
+            async with write_lock:
+                writer.write(encode_message(message))
+                await writer.drain()
+
+        async def serve(message: Dict[str, Any]):
+            try:
+                result = await self.handle_request(message.get("op", ""), message.get("args") or {})
+                await send({"id": message.get("id"), "ok": True, "result": result})
+            except Exception as e:
+                self.errors += 1
+                await send({"id": message.get("id"), "ok": False, "error": f"{type(e).__name__}: {e}"})
+
+        pending: Set[asyncio.Task] = set()
+        sender: Optional[asyncio.Task] = None
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    message = json.loads(line)
+                except ValueError:
+                    self.errors += 1
+                    continue
+                op = message.get("op")
+                if op in ("subscribe", "watch"):
+                    if subscriber_id is None:
+                        subscriber_id = next(self._subscriber_ids)
+                        queue: asyncio.Queue = asyncio.Queue(SUBSCRIBER_QUEUE_SIZE)
+                        self._subscribers[subscriber_id] = {"queue": queue, "topics": set(), "codes": set()}
+                        sender = asyncio.create_task(self._run_sender(queue, send))
+                    subscriber = self._subscribers[subscriber_id]
+                    if op == "subscribe":
+                        subscriber["topics"] = set(message.get("topics") or ("quote", "condition"))
+                    subscriber["codes"] = {normalize_code(code) for code in message.get("codes") or []}
+                    if "condition" in subscriber["topics"]:
+                        for seq, codes in self._last_conditions.items():
+                            self._enqueue(subscriber, {"topic": "condition", "seq": seq, "codes": codes})
+                    continue
+                self.requests += 1
+                task = asyncio.create_task(serve(message))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            if subscriber_id is not None:
+                self._subscribers.pop(subscriber_id, None)
+            for task in list(pending) + ([sender] if sender else []):
+                task.cancel()
+            self._handlers.pop(asyncio.current_task(), None)
+            writer.close()
+
+    async def _run_sender(self, queue: asyncio.Queue, send):
+        try:
+            while True:
+                await send(await queue.get())
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+
+    def _enqueue(self, subscriber: Dict[str, Any], message: Dict[str, Any]):
+        """구독자 큐에 넣기 (가득 차면 가장 오래된 메시지를 버림 - 느린 구독자가 게이트웨이를 막지 않음)"""
+        queue: asyncio.Queue = subscriber["queue"]
+        if queue.full():
+            queue.get_nowait()
+            self.dropped += 1
+        queue.put_nowait(message)
+        self.published += 1
+
+    # ------------------------------------------------------------------
+    # 발행 루프
+    # ------------------------------------------------------------------
+    async def publish_quotes(self):
+        """구독 종목 합집합을 일괄 조회해 가격/거래대금이 바뀐 종목만 발행"""
+        codes = sorted(set().union(*(s["codes"] for s in self._subscribers.values() if "quote" in s["topics"])))
+        if not codes:
+            return
+        token = await self._blocking(self.token)
+        infos = await self._blocking(self.market.get_stock_infos_bulk, codes, token)
+        self._record(infos)
+        now = self.clock()
+        for code, info in infos.items():
+            quote = (info.get("price", 0), info.get("amount", 0))
+            if quote[0] <= 0 or self._last_quotes.get(code) == quote:
+                continue
+            self._last_quotes[code] = quote
+            message = {"topic": "quote", "code": code, "price": quote[0], "amount": quote[1], "time": now}
+            for subscriber in list(self._subscribers.values()):
+                if "quote" in subscriber["topics"] and code in subscriber["codes"]:
+                    self._enqueue(subscriber, message)
+
+    async def publish_conditions(self):
+        """조건검색식별 편입 종목이 바뀌면 발행"""
+        if not any("condition" in s["topics"] for s in self._subscribers.values()):
+            return
+        token = await self._blocking(self.token)
+        for seq in self.condition_seqs:
+            codes, name = await self.market.get_condition_codes(seq, token)
+            if self._last_conditions.get(seq) == codes:
+                continue
+            self._last_conditions[seq] = codes
+            message = {"topic": "condition", "seq": seq, "name": name, "codes": codes, "time": self.clock()}
+            for subscriber in list(self._subscribers.values()):
+                if "condition" in subscriber["topics"]:
+                    self._enqueue(subscriber, message)
+
+    async def _run_loop(self, interval: float, step):
+        while True:
+            try:
+                await step()
+            except Exception as e:
+                print(f"[WARN] 게이트웨이 발행 실패 ({step.__name__}): {e}", flush=True)
+            await market_sleep(interval)
+
+    # ------------------------------------------------------------------
+    # 실행
+    # ------------------------------------------------------------------
+    async def start(self):
+        """소켓 열기 (유닉스 소켓 경로에 남은 파일은 지움)"""
+        if isinstance(self.address, str):
+            if os.path.exists(self.address):
+                os.remove(self.address)
+            self._server = await asyncio.start_unix_server(self._handle_connection, self.address,
+                                                           limit=GATEWAY_MAX_MESSAGE)
+        else:
+            host, port = self.address
+            self._server = await asyncio.start_server(self._handle_connection, host, port,
+                                                      limit=GATEWAY_MAX_MESSAGE)
+        self._stopped = asyncio.Event()
+
+    async def serve(self):
+        """▶️ stop()까지 응답/발행"""
+        if self._server is None:
+            await self.start()
+        loops = [asyncio.create_task(self._run_loop(self.quote_interval, self.publish_quotes)),
+                 asyncio.create_task(self._run_loop(self.condition_interval, self.publish_conditions))]
+        try:
+            await self._stopped.wait()
+        finally:
+            for task in loops:
+                task.cancel()
+            self._server.close()
+            for writer in list(self._handlers.values()):
+                writer.close()
+            await asyncio.gather(*self._handlers, return_exceptions=True)
+            await self._server.wait_closed()
+            self._executor.shutdown(wait=False)
+            if self.quote_table is not None:
+                self.quote_table.close()
+            if isinstance(self.address, str) and os.path.exists(self.address):
+                os.remove(self.address)
+
+    def stop(self):
+        if self._stopped is not None:
+            self._stopped.set()
+
+    def get_summary(self) -> Dict[str, Any]:
+        return {
+            "address": self.address if isinstance(self.address, str) else f"{self.address[0]}:{self.address[1]}",
+            "connections": self.connections,
+            "subscribers": len(self._subscribers),
+            "requests": self.requests,
+            "errors": self.errors,
+            "published": self.published,
+            "dropped": self.dropped,
+            "market": self.market.get_summary(),
+            "quote_table": self.quote_table.get_summary() if self.quote_table is not None else None
+        }
+
+def _connect(address: Address) -> socket.socket:
+    if isinstance(address, str):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    else:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.settimeout(GATEWAY_REQUEST_TIMEOUT)
+    sock.connect(address if isinstance(address, str) else tuple(address))
+    return sock
+
+class GatewayClient:
+    """🔌 게이트웨이 클라이언트 - scalping_engine 조회 함수와 같은 시그니처
+
+    simulated_market(GatewayClient())로 엔진 프로세스의 조회를 게이트웨이로 돌린다 (token 인자는
+    무시). 작업 스레드에서도 부를 수 있게 스레드마다 연결을 따로 둔다.
+    """
+
+    def __init__(self, address: Address = None):
+        self.address = address or default_address()
+        self._local = threading.local()
+        self._ids = itertools.count(1)
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            sock = _connect(self.address)
+            conn = (sock, sock.makefile('rb'))
+            self._local.conn = conn
+        return conn
+
+    def _close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn:
+            conn[1].close()
+            conn[0].close()
+        self._local.conn = None
+
+    def request(self, op: str, **args) -> Any:
+        """요청 1건 (연결이 끊겼으면 한 번 다시 연결)"""
+        message_id = next(self._ids)
+        for attempt in range(2):
+            try:
+                sock, stream = self._connection()
+                sock.sendall(encode_message({"id": message_id, "op": op, "args": args}))
+                line = stream.readline()
+                if not line:
+                    raise ConnectionError("게이트웨이 연결 종료")
+                break
+            except (ConnectionError, socket.timeout, OSError):
+                self._close()
+                if attempt:
+                    raise
+        response = json.loads(line)
+        if not response.get("ok"):
+            raise RuntimeError(f"게이트웨이 오류 ({op}): {response.get('error')}")
+        return response["result"]
+
+    def get_stock_info(self, stock_code: str, token: str = None) -> Dict[str, Any]:
+        try:
+            return self.request("get_stock_info", stock_code=stock_code) or {}
+        except Exception as e:
+            print(f"[WARN] 게이트웨이 시세 조회 실패 ({stock_code}): {e}", flush=True)
+            return {}
+
+    def get_current_price(self, stock_code: str, token: str = None) -> int:
+        return self.get_stock_info(stock_code).get("price", 0)
+
+    def get_stock_infos_bulk(self, stock_codes: List[str], token: str = None) -> Dict[str, Dict[str, Any]]:
+        if not stock_codes:
+            return {}
+        try:
+            return self.request("get_stock_infos_bulk", stock_codes=list(stock_codes))
+        except Exception as e:
+            print(f"[WARN] 게이트웨이 일괄 시세 조회 실패 ({len(stock_codes)}종목): {e}", flush=True)
+            return {}
+
+    def get_stock_master(self, token: str = None, markets: Tuple[str, ...] = ("0", "10")) -> Dict[str, Dict[str, Any]]:
+        return self.request("get_stock_master", markets=list(markets))
+
+    async def get_condition_codes(self, seq: int, token: str = None) -> Tuple[List[str], str]:
+        try:
+            codes, name = await asyncio.to_thread(self.request, "get_condition_codes", seq=seq)
+            return codes, name
+        except Exception as e:
+            print(f"[ERROR] 조건검색식 {seq} 게이트웨이 조회 실패: {e}", flush=True)
+            return [], ""
+
+    def stats(self) -> Dict[str, Any]:
+        return self.request("stats")
+
+class GatewaySubscription:
+    """📨 발행 구독 연결 - async for로 "quote" / "condition" 메시지 수신"""
+
+    def __init__(self, address: Address = None, topics: Iterable[str] = ("quote", "condition"),
+                 codes: Iterable[str] = ()):
+        self.address = address or default_address()
+        self.topics = list(topics)
+        self.codes = list(codes)
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+
+    async def connect(self):
+        if isinstance(self.address, str):
+            self._reader, self._writer = await asyncio.open_unix_connection(self.address, limit=GATEWAY_MAX_MESSAGE)
+        else:
+            host, port = self.address
+            self._reader, self._writer = await asyncio.open_connection(host, port, limit=GATEWAY_MAX_MESSAGE)
+        await self._send({"op": "subscribe", "topics": self.topics, "codes": self.codes})
+        return self
+
+    async def watch(self, codes: Iterable[str]):
+        """시세 구독 종목 교체"""
+        codes = sorted({normalize_code(code) for code in codes})
+        if codes != self.codes:
+            self.codes = codes
+            await self._send({"op": "watch", "codes": codes})
+
+    async def _send(self, message: Dict[str, Any]):
+        self._writer.write(encode_message(message))
+        await self._writer.drain()
+
+    def __aiter__(self) -> AsyncIterator[Dict[str, Any]]:
+        return self._messages()
+
+    async def _messages(self):
+        while True:
+            line = await self._reader.readline()
+            if not line:
+                return
+            yield json.loads(line)
+
+    async def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            await self._writer.wait_closed()
+
+async def feed_engine_ticks(engine, subscription: GatewaySubscription) -> int:
+    """게이트웨이 시세 발행 → engine.on_price_tick (보유 종목으로 구독 갱신) - 청산 건수 반환"""
+    exits = 0
+    await subscription.watch(p.code for p in engine.positions)
+    async for message in subscription:
+        if message.get("topic") == "quote":
+            exits += engine.on_price_tick(message["code"], message["price"], message.get("amount"))
+        await subscription.watch(p.code for p in engine.positions)
+    return exits
+
+if __name__ == "__main__":
+    async def main():
+        gateway = MarketGateway()
+        master = gateway.market.get_stock_master(gateway.token())
+        gateway.quote_table = QuoteTable.create(sorted(master))
+        await gateway.start()
+        print(f"📡 시세 게이트웨이 시작 ({datetime.now():%Y-%m-%d %H:%M:%S}) - {gateway.get_summary()['address']}, "
+              f"시세 테이블 {len(gateway.quote_table):,}종목")
+        try:
+            await gateway.serve()
+        finally:
+            summary = gateway.get_summary()
+            print(f"🏁 게이트웨이 종료 - 요청 {summary['requests']:,}회, 발행 {summary['published']:,}건, "
+                  f"버림 {summary['dropped']:,}건")
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
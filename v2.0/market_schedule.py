@@ -3,92 +3,28 @@
 # ================================================================================
 
 import requests
-import ntplib
-from datetime import datetime, timedelta, date
 import time
 import json
 import os
 
-# 한국거래소 휴장일 API (또는 수동 관리)
-HOLIDAYS_2025 = [
-    "2025-01-01",  # 신정
-    "2025-01-28",  # 설날 연휴
-    "2025-01-29",  # 설날
-    "2025-01-30",  # 설날 연휴
-    "2025-03-01",  # 삼일절
-    "2025-05-05",  # 어린이날
-    "2025-05-06",  # 부처님오신날 대체공휴일
-    "2025-06-06",  # 현충일
-    "2025-08-15",  # 광복절
-    "2025-09-06",  # 추석 연휴
-    "2025-09-07",  # 추석 연휴
-    "2025-09-08",  # 추석
-    "2025-09-09",  # 추석 연휴
-    "2025-10-03",  # 개천절
-    "2025-10-09",  # 한글날
-    "2025-12-25",  # 성탄절
-]
+from market_clock import market_now
+from trading_calendar import get_trading_calendar, TRADING_START_TIME, MARKET_CLOSE_TIME
 
 def get_ntp_time():
-    """NTP 서버에서 정확한 시간 가져오기"""
-    try:
-        ntp_servers = [
-            'time.google.com',
-            'pool.ntp.org', 
-            'time.nist.gov',
-            'time.windows.com'
-        ]
-        
-        for server in ntp_servers:
-            try:
-                client = ntplib.NTPClient()
-                response = client.request(server, version=3, timeout=5)
-                ntp_time = datetime.fromtimestamp(response.tx_time)
-                print(f"🌐 NTP 시간 동기화 완료: {server} ({ntp_time.strftime('%Y-%m-%d %H:%M:%S')})")
-                return ntp_time
-            except Exception:
-                continue
-                
-        print("⚠️  NTP 동기화 실패 - 로컬 시간 사용")
-        return datetime.now()
-        
-    except Exception as e:
-        print(f"⚠️  시간 동기화 오류: {e} - 로컬 시간 사용")
-        return datetime.now()
+    """NTP 보정 시간 (공용 시계 서비스 - 호출 시 네트워크 조회 없음)"""
+    return market_now()
 
 def is_market_holiday(check_date=None):
-    """한국거래소 휴장일 여부 확인"""
+    """한국거래소 휴장일 여부 확인 (거래일 달력)"""
     if check_date is None:
         check_date = get_ntp_time().date()
     
-    # 문자열로 변환하여 비교
-    date_str = check_date.strftime('%Y-%m-%d')
-    
-    # 주말 체크
-    weekday = check_date.weekday()  # 0=월요일, 6=일요일
-    if weekday >= 5:  # 토요일(5), 일요일(6)
-        return True, "주말"
-    
-    # 공휴일 체크
-    if date_str in HOLIDAYS_2025:
-        return True, "공휴일"
-    
-    return False, "개장일"
+    return get_trading_calendar().holiday_reason(check_date)
 
 def get_next_trading_day():
-    """다음 개장일 찾기"""
-    current_date = get_ntp_time().date()
-    
-    # 오늘부터 최대 10일 후까지 검색
-    for i in range(10):
-        check_date = current_date + timedelta(days=i)
-        is_holiday, reason = is_market_holiday(check_date)
-        
-        if not is_holiday:
-            return check_date, reason
-    
-    # 10일 후에도 개장일이 없으면 (연휴가 매우 긴 경우)
-    return current_date + timedelta(days=1), "추정개장일"
+    """다음 개장일 찾기 (오늘 포함)"""
+    next_date = get_trading_calendar().next_trading_day(get_ntp_time().date())
+    return next_date, "개장일"
 
 def is_trading_session():
     """현재 장시간인지 확인"""
@@ -103,11 +39,11 @@ def is_trading_session():
     current_time = now.time()
     
     # 장 시작 전 (00:00 ~ 09:04)
-    if current_time < datetime.strptime("09:05", "%H:%M").time():
+    if current_time < TRADING_START_TIME:
         return False, "장시작전"
     
     # 장중 (09:05 ~ 15:30)
-    elif datetime.strptime("09:05", "%H:%M").time() <= current_time <= datetime.strptime("15:30", "%H:%M").time():
+    elif current_time <= MARKET_CLOSE_TIME:
         return True, "장중"
     
     # 장 종료 후 (15:31 ~ 23:59)
@@ -115,34 +51,13 @@ def is_trading_session():
         return False, "장종료"
 
 def calculate_time_until_market():
-    """장 시작까지 남은 시간 계산"""
+    """장 시작(다음 개장일 09:05)까지 남은 시간 계산"""
     now = get_ntp_time()
+    next_market_start = get_trading_calendar().next_session_time(now, TRADING_START_TIME)
     
-    # 오늘이 개장일인지 확인
-    is_holiday, holiday_reason = is_market_holiday(now.date())
-    
-    if not is_holiday:
-        # 오늘이 개장일이면
-        market_start_today = now.replace(hour=9, minute=5, second=0, microsecond=0)
-        
-        if now < market_start_today:
-            # 오늘 장 시작 전
-            return market_start_today - now, "오늘"
-    
-    # 오늘이 휴장일이거나 장 종료 후라면 다음 개장일 찾기
-    next_trading_date, _ = get_next_trading_day()
-    
-    # 다음 개장일의 9시 5분
-    if next_trading_date == now.date():
-        # 오늘이 개장일인데 장 종료 후
-        next_market_start = (now + timedelta(days=1)).replace(hour=9, minute=5, second=0, microsecond=0)
-        next_trading_date, _ = get_next_trading_day()  # 내일이 개장일인지 재확인
-        next_market_start = datetime.combine(next_trading_date, datetime.strptime("09:05", "%H:%M").time())
-    else:
-        next_market_start = datetime.combine(next_trading_date, datetime.strptime("09:05", "%H:%M").time())
-    
-    time_diff = next_market_start - now
-    return time_diff, next_trading_date.strftime('%Y-%m-%d')
+    if next_market_start.date() == now.date():
+        return next_market_start - now, "오늘"
+    return next_market_start - now, next_market_start.strftime('%Y-%m-%d')
 
 def print_market_status():
     """시장 상태 출력"""
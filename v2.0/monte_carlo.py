@@ -0,0 +1,209 @@
+"""
+🔥 V3.4 몬테카를로 리스크 시뮬레이션 - 일별/매매별 수익률 (블록) 부트스트랩으로 수익률 분포·낙폭·파산 확률 계산
+Vectorized bootstrap / block-bootstrap risk simulation over daily and per-trade returns
+"""
+
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from tabulate import tabulate
+
+# ================================================================================
+# 시뮬레이션 설정
+# ================================================================================
+MC_PATHS = 20_000                  # 경로 수
+MC_DAYS_PER_MONTH = 20             # 월 거래일 (print_detailed_returns와 같은 가정)
+MC_HORIZON_MONTHS = (1, 3, 6, 12)  # 결과를 보는 기간 (개월)
+MC_PERCENTILES = (5, 25, 50, 75, 95)
+MC_BLOCK_DAYS = 5                  # 일별 블록 부트스트랩 블록 길이 (거래일)
+MC_BLOCK_TRADES = 10               # 매매별 블록 부트스트랩 블록 길이 (연속 매매 수)
+MC_RUIN_LEVEL = 0.5                # 자금이 시작의 50% 아래로 내려가면 파산으로 집계
+MC_MIN_SAMPLES = 5                 # 시뮬레이션에 필요한 최소 표본 수
+MC_CHUNK_CELLS = 4_000_000         # 한 번에 만드는 (경로 × 표본) 칸 수 - 메모리 상한
+
+@dataclass
+class MonteCarloResult:
+    """시뮬레이션 결과 (기간별 분포)"""
+    mode: str                          # "일별" / "매매별"
+    method: str                        # "부트스트랩" / "블록 부트스트랩(n)"
+    paths: int
+    samples: int                       # 재표집한 원본 표본 수
+    initial_capital: int
+    horizons: Tuple[int, ...]          # 개월
+    return_percentiles: np.ndarray     # (기간, 백분위) 누적 수익률 %
+    drawdown_percentiles: np.ndarray   # (기간, 백분위) 기간 내 최대 낙폭 %
+    loss_probability: np.ndarray       # (기간,) 원금 손실 확률 %
+    ruin_probability: np.ndarray       # (기간,) 파산 확률 %
+    elapsed: float = 0.0
+
+    def get_summary(self) -> Dict[str, Any]:
+        """기간별 요약 딕셔너리"""
+        summary = {}
+        for i, months in enumerate(self.horizons):
+            summary[months] = {
+                "returns": dict(zip(MC_PERCENTILES, self.return_percentiles[i].round(2).tolist())),
+                "drawdowns": dict(zip(MC_PERCENTILES, self.drawdown_percentiles[i].round(2).tolist())),
+                "loss_probability": round(float(self.loss_probability[i]), 2),
+                "ruin_probability": round(float(self.ruin_probability[i]), 2)
+            }
+        return summary
+
+    def print_summary(self):
+        print(f"\n🎲 {self.mode} {self.method} - 표본 {self.samples}개, 경로 {self.paths:,}개 "
+              f"({self.elapsed * 1000:.0f}ms), 시작 {self.initial_capital:,}원")
+        table = []
+        for i, months in enumerate(self.horizons):
+            returns = self.return_percentiles[i]
+            drawdowns = self.drawdown_percentiles[i]
+            table.append([
+                f"{months}개월",
+                " / ".join(f"{r:+.1f}" for r in returns),
+                f"{drawdowns[len(MC_PERCENTILES) // 2]:.1f}% / {drawdowns[-1]:.1f}%",
+                f"{self.loss_probability[i]:.1f}%",
+                f"{self.ruin_probability[i]:.2f}%"
+            ])
+        pct = "/".join(f"p{p}" for p in MC_PERCENTILES)
+        print(tabulate(table, headers=["기간", f"누적 수익률 % ({pct})", "최대낙폭 (중앙/p95)", "손실 확률",
+                                       f"파산 확률 (<{MC_RUIN_LEVEL:.0%})"], tablefmt="grid"))
+
+def bootstrap_indices(rng: np.random.Generator, n_obs: int, n_paths: int, length: int,
+                      block: int = 1) -> np.ndarray:
+    """(n_paths, length) 표본 색인 - block>1이면 원형 블록 부트스트랩 (연속 구간을 통째로 뽑아 자기상관 유지)"""
+    if block <= 1:
+        return rng.integers(0, n_obs, size=(n_paths, length), dtype=np.int32)
+    block = min(block, n_obs)
+    n_blocks = -(-length // block)
+    starts = rng.integers(0, n_obs, size=(n_paths, n_blocks, 1), dtype=np.int32)
+    return ((starts + np.arange(block, dtype=np.int32)) % n_obs).reshape(n_paths, -1)[:, :length]
+
+def _path_stats(equity: np.ndarray, initial_capital: float, steps: np.ndarray) -> Tuple[np.ndarray, ...]:
+    """자산 경로 (경로, 일) → 기간 끝 자산, 기간 내 최대 낙폭 %, 파산 여부"""
+    peak = np.maximum(np.maximum.accumulate(equity, axis=1), initial_capital)
+    max_drawdown = np.maximum.accumulate(1 - equity / peak, axis=1) * 100
+    ruined = np.minimum.accumulate(equity, axis=1) < initial_capital * MC_RUIN_LEVEL
+    return equity[:, steps], max_drawdown[:, steps], ruined[:, steps]
+
+def _build_result(mode: str, block: int, samples: int, initial_capital: int, horizons: Sequence[int],
+                  chunks: List[Tuple[np.ndarray, ...]], started: float) -> MonteCarloResult:
+    values, drawdowns, ruined = (np.concatenate(parts) for parts in zip(*chunks))
+    returns = (values / initial_capital - 1) * 100
+    return MonteCarloResult(
+        mode=mode,
+        method=f"블록 부트스트랩({block})" if block > 1 else "부트스트랩",
+        paths=len(values),
+        samples=samples,
+        initial_capital=initial_capital,
+        horizons=tuple(horizons),
+        return_percentiles=np.percentile(returns, MC_PERCENTILES, axis=0).T,
+        drawdown_percentiles=np.percentile(drawdowns, MC_PERCENTILES, axis=0).T,
+        loss_probability=(returns < 0).mean(axis=0) * 100,
+        ruin_probability=ruined.mean(axis=0) * 100,
+        elapsed=time.time() - started
+    )
+
+def _chunks(paths: int, cells_per_path: int):
+    size = max(1, MC_CHUNK_CELLS // max(1, cells_per_path))
+    for start in range(0, paths, size):
+        yield min(size, paths - start)
+
+def simulate_daily(daily_returns: Sequence[float], initial_capital: int, paths: int = MC_PATHS,
+                   horizons: Sequence[int] = MC_HORIZON_MONTHS, block: int = 1,
+                   seed: Optional[int] = None) -> MonteCarloResult:
+    """일별 수익률(%) 재표집 → 복리 자산 경로 (과거 비중 그대로의 성과를 이어 붙인 분포)"""
+    started = time.time()
+    returns = np.asarray(daily_returns, dtype=np.float64)
+    if len(returns) < MC_MIN_SAMPLES:
+        raise ValueError(f"일별 수익률 표본 부족: {len(returns)}개 (최소 {MC_MIN_SAMPLES}개)")
+
+    rng = np.random.default_rng(seed)
+    length = max(horizons) * MC_DAYS_PER_MONTH
+    steps = np.array(horizons) * MC_DAYS_PER_MONTH - 1
+    growth = 1 + returns / 100
+    chunks = []
+    for size in _chunks(paths, length):
+        equity = initial_capital * np.cumprod(growth[bootstrap_indices(rng, len(growth), size, length, block)], axis=1)
+        chunks.append(_path_stats(equity, initial_capital, steps))
+    return _build_result("일별", block, len(returns), initial_capital, horizons, chunks, started)
+
+def _daily_trade_sums(rng: np.random.Generator, rates: np.ndarray, n_paths: int, days: int,
+                      per_day: int, block: int) -> np.ndarray:
+    """(n_paths, days) 하루 매매 수익률 합
+
+    블록 부트스트랩은 매매 단위 색인을 만들지 않고, 뽑은 블록 시작점과 원형 누적합으로
+    하루 경계의 누적 수익률만 계산한다 (블록 수만큼만 난수를 뽑음).
+    """
+    if block <= 1:
+        picked = rates[bootstrap_indices(rng, len(rates), n_paths, days * per_day)]
+        return (picked.reshape(-1, per_day) @ np.ones(per_day)).reshape(n_paths, days)
+
+    n_obs = len(rates)
+    block = min(block, n_obs)
+    prefix = np.concatenate(([0.0], np.cumsum(np.concatenate((rates, rates)))))
+    block_sums = prefix[block:block + n_obs] - prefix[:n_obs]
+
+    n_blocks = days * per_day // block + 1                      # 마지막 경계용 여분 블록 포함
+    starts = rng.integers(0, n_obs, size=(n_paths, n_blocks), dtype=np.int32)
+    before = np.zeros((n_paths, n_blocks))
+    np.cumsum(block_sums[starts[:, :-1]], axis=1, out=before[:, 1:])
+
+    bounds = np.arange(days + 1) * per_day                      # 하루 경계의 매매 위치
+    q, r = bounds // block, bounds % block
+    first = starts[:, q]
+    cumulative = before[:, q] + prefix[first + r] - prefix[first]
+    return np.diff(cumulative, axis=1)
+
+def simulate_trades(trade_rates: Sequence[float], trades_per_day: float, initial_capital: int,
+                    tiers: List[Tuple[int, int, int, int, str]] = None, paths: int = MC_PATHS,
+                    horizons: Sequence[int] = MC_HORIZON_MONTHS, block: int = 1,
+                    seed: Optional[int] = None) -> MonteCarloResult:
+    """매매별 수익률(%) 재표집 + 자금 구간별 종목당 금액 → 자산 경로
+
+    하루 trades_per_day건을 뽑고, 각 매매 금액은 그날 시작 자금으로 정한 구간의
+    min(상한, 자금 // 분할) (TradingStrategy와 같은 규칙)이다. 자금이 줄면 작은 구간으로
+    내려가므로 현재 비중 규칙에서의 파산 확률을 본다.
+    """
+    started = time.time()
+    rates = np.asarray(trade_rates, dtype=np.float64)
+    if len(rates) < MC_MIN_SAMPLES:
+        raise ValueError(f"매매 수익률 표본 부족: {len(rates)}개 (최소 {MC_MIN_SAMPLES}개)")
+    if tiers is None:
+        from scalping_engine import CAPITAL_TIERS
+        tiers = CAPITAL_TIERS
+
+    ordered = sorted(tiers, key=lambda tier: tier[0])
+    minimums = np.array([t[0] for t in ordered], dtype=np.float64)
+    caps = np.array([t[1] for t in ordered], dtype=np.float64)
+    divisors = np.array([t[2] for t in ordered], dtype=np.float64)
+
+    rng = np.random.default_rng(seed)
+    per_day = max(1, int(round(trades_per_day)))
+    days = max(horizons) * MC_DAYS_PER_MONTH
+    steps = np.array(horizons) * MC_DAYS_PER_MONTH - 1
+    chunks = []
+    for size in _chunks(paths, days * per_day // max(1, block)):
+        day_rates = _daily_trade_sums(rng, rates, size, days, per_day, block) / 100
+        equity = np.empty((size, days))
+        capital = np.full(size, float(initial_capital))
+        for day in range(days):
+            tier = np.maximum(np.searchsorted(minimums, capital, side="right") - 1, 0)
+            position = np.minimum(caps[tier], np.floor(capital / divisors[tier]))
+            capital = np.maximum(capital + position * day_rates[:, day], 0.0)
+            equity[:, day] = capital
+        chunks.append(_path_stats(equity, initial_capital, steps))
+    return _build_result("매매별", block, len(rates), initial_capital, horizons, chunks, started)
+
+def run_monte_carlo(daily_returns: Sequence[float], trade_rates: Sequence[float], trades_per_day: float,
+                    initial_capital: int, tiers: List[Tuple[int, int, int, int, str]] = None,
+                    paths: int = MC_PATHS, seed: Optional[int] = None) -> List[MonteCarloResult]:
+    """표본이 있는 모드마다 부트스트랩 + 블록 부트스트랩 실행 (표본 부족 모드는 건너뜀)"""
+    results = []
+    if len(daily_returns) >= MC_MIN_SAMPLES:
+        for block in (1, MC_BLOCK_DAYS):
+            results.append(simulate_daily(daily_returns, initial_capital, paths, block=block, seed=seed))
+    if len(trade_rates) >= MC_MIN_SAMPLES and trades_per_day > 0:
+        for block in (1, MC_BLOCK_TRADES):
+            results.append(simulate_trades(trade_rates, trades_per_day, initial_capital, tiers, paths,
+                                           block=block, seed=seed))
+    return results
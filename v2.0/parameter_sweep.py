@@ -0,0 +1,315 @@
+"""
+🔥 V3.4 파라미터 스윕 - 익절/손절·자금 구간·루프 주기·조건식 조합을 프로세스 풀로 백테스트, 결과 캐시로 재개
+Multiprocess parameter sweep over the backtester (shared-memory history, hash-keyed resumable cache)
+"""
+
+import hashlib
+import itertools
+import json
+import os
+import time
+from datetime import date, datetime
+from multiprocessing import Pool, shared_memory
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from tabulate import tabulate
+
+from scalping_backtest import (Backtester, BacktestDay, ConditionHit, PriceSeries,
+                               load_backtest_days, BACKTEST_DATA_DIR)
+from scalping_engine import CAPITAL_TIERS, CONDITION_SEQ_LIST, LOOP_INTERVAL
+from exit_rules import EXIT_RULE_KEYS
+
+# ================================================================================
+# 스윕 설정
+# ================================================================================
+SWEEP_CACHE_DIR = "sweep_cache"                           # 설정별 결과 캐시 폴더
+SWEEP_PROCESSES = max(1, (os.cpu_count() or 2) - 1)       # 작업 프로세스 수
+SWEEP_RANK_KEYS = ("sharpe", "total_return", "max_drawdown", "win_rate")
+
+# 기본 격자 (conditions: None이면 CONDITION_SEQ_LIST 전체)
+DEFAULT_GRID = {
+    "profit_target": [1.0, 2.0, 3.0, 5.0],
+    "stop_loss": [-1.0, -2.0, -3.0, -5.0],
+    "position_scale": [0.5, 1.0, 1.5],
+    "loop_interval": [60, LOOP_INTERVAL],
+    "conditions": [None]
+}
+
+def expand_grid(grid: Dict[str, List[Any]]) -> List[Dict[str, Any]]:
+    """격자 → 설정 목록 (모든 조합)"""
+    names = sorted(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+def param_hash(params: Dict[str, Any]) -> str:
+    """설정 해시 (키 순서 무관)"""
+    text = json.dumps(params, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()[:16]
+
+def scale_tiers(position_scale: float = 1.0, max_positions: int = None,
+                tiers: List[Tuple[int, int, int, int, str]] = None) -> List[Tuple[int, int, int, int, str]]:
+    """자금 구간 종목당 금액을 position_scale배 (상한·분할 수 조정), max_positions로 종목 수 상한"""
+    scaled = []
+    for min_capital, cap, divisor, positions, name in tiers or CAPITAL_TIERS:
+        scaled.append((
+            min_capital,
+            int(cap * position_scale),
+            max(1, round(divisor / position_scale)),
+            min(positions, max_positions) if max_positions else positions,
+            name
+        ))
+    return scaled
+
+# ================================================================================
+# 공유 메모리 데이터
+# ================================================================================
+
+class SharedHistory:
+    """📦 백테스트 데이터를 공유 메모리 한 블록에 담아 작업 프로세스에 넘김
+
+    시세(시각·가격·누적 거래대금)는 (3, 전체 시점) int64 배열 하나로, 종목/편입 정보는
+    작은 메타데이터로 보낸다. 작업 프로세스는 시작 시 한 번 attach_days()로 복원한다.
+    """
+
+    def __init__(self, days: List[BacktestDay]):
+        meta = []
+        columns = []
+        position = 0
+        for backtest_day in days:
+            series_meta = []
+            for series in backtest_day.series.values():
+                count = len(series.times)
+                columns.append(np.array([
+                    [int(round(t.timestamp() * 1_000_000)) for t in series.times],
+                    series.prices,
+                    series.amounts
+                ], dtype=np.int64).reshape(3, count))
+                series_meta.append((series.code, series.name, position, position + count))
+                position += count
+            hits = [(h.time.timestamp(), h.code, h.condition_seq, h.condition_name) for h in backtest_day.hits]
+            meta.append((backtest_day.day.isoformat(), series_meta, hits))
+
+        data = np.concatenate(columns, axis=1) if columns else np.zeros((3, 0), dtype=np.int64)
+        self.shape = data.shape
+        self.meta = meta
+        self.fingerprint = hashlib.sha1(data.tobytes() + repr(meta).encode('utf-8')).hexdigest()[:16]
+        self.shm = shared_memory.SharedMemory(create=True, size=max(1, data.nbytes))
+        np.ndarray(self.shape, dtype=np.int64, buffer=self.shm.buf)[:] = data
+
+    @property
+    def handle(self) -> Tuple[str, Tuple[int, int], list]:
+        return self.shm.name, self.shape, self.meta
+
+    def close(self):
+        self.shm.close()
+        self.shm.unlink()
+
+def attach_days(handle: Tuple[str, Tuple[int, int], list]) -> List[BacktestDay]:
+    """공유 메모리 → BacktestDay 목록 복원"""
+    name, shape, meta = handle
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        data = np.ndarray(shape, dtype=np.int64, buffer=shm.buf)
+        days = []
+        for day_text, series_meta, hits in meta:
+            series = {}
+            for code, series_name, start, end in series_meta:
+                times = [datetime.fromtimestamp(us / 1_000_000) for us in data[0, start:end].tolist()]
+                series[code] = PriceSeries(code, series_name, times,
+                                           data[1, start:end].tolist(), data[2, start:end].tolist())
+            days.append(BacktestDay(
+                date.fromisoformat(day_text),
+                [ConditionHit(datetime.fromtimestamp(ts), code, seq, cond) for ts, code, seq, cond in hits],
+                series
+            ))
+        del data
+    finally:
+        shm.close()
+    return days
+
+# ================================================================================
+# 설정 1개 평가
+# ================================================================================
+
+def evaluate_params(days: List[BacktestDay], params: Dict[str, Any],
+                    initial_capital: int = 500_000) -> Dict[str, Any]:
+    """설정 1개 백테스트 → 수익률/낙폭/승률/샤프 지표"""
+    start = time.perf_counter()
+    conditions = params.get("conditions")
+    result = Backtester(
+        days, initial_capital,
+        profit_target=params.get("profit_target"),
+        stop_loss=params.get("stop_loss"),
+        tiers=scale_tiers(params.get("position_scale", 1.0), params.get("max_positions")),
+        scan_interval=params.get("loop_interval"),
+        conditions=conditions if conditions is not None else CONDITION_SEQ_LIST,
+        reset_daily=params.get("reset_daily", False),
+        exit_rules={key: params[key] for key in EXIT_RULE_KEYS if key in params},
+        optimize_sizing=params.get("optimize_sizing", True)
+    ).run()
+
+    analysis = result.analysis
+    return {
+        "total_return": analysis.total_return,
+        "daily_avg_return": analysis.daily_avg_return,
+        "volatility": analysis.volatility,
+        "max_drawdown": analysis.max_drawdown,
+        "win_rate": analysis.win_rate,
+        "sharpe": analysis.daily_avg_return / analysis.volatility if analysis.volatility > 0 else 0.0,
+        "trades": analysis.total_trades,
+        "trading_days": analysis.trading_days,
+        "end_capital": analysis.end_capital,
+        "daily": result.daily_records(),   # 구간 재조합용
+        "elapsed": time.perf_counter() - start
+    }
+
+_worker_days: List[BacktestDay] = []
+_worker_index: Dict[str, int] = {}
+
+def _init_worker(handle):
+    """작업 프로세스 시작 시 공유 메모리 데이터 1회 복원"""
+    global _worker_days, _worker_index
+    _worker_days = attach_days(handle)
+    _worker_index = {d.day.isoformat(): i for i, d in enumerate(_worker_days)}
+
+def _select_days(days: List[BacktestDay], day_range: Optional[Tuple[str, str]]) -> List[BacktestDay]:
+    if not day_range:
+        return days
+    first, last = day_range
+    return [d for d in days if first <= d.day.isoformat() <= last]
+
+def _run_task(task: Tuple[str, Dict[str, Any], Optional[Tuple[str, str]], int]) -> Tuple[str, Dict[str, Any]]:
+    key, params, day_range, initial_capital = task
+    return key, evaluate_params(_select_days(_worker_days, day_range), params, initial_capital)
+
+# ================================================================================
+# 결과 캐시
+# ================================================================================
+
+class SweepCache:
+    """💾 설정 해시별 결과 파일 - 데이터가 바뀌면 (fingerprint) 다른 폴더를 씀"""
+
+    def __init__(self, cache_dir: str, fingerprint: str):
+        self.directory = os.path.join(cache_dir, fingerprint)
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._path(key), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, key: str, record: Dict[str, Any]):
+        temp_path = self._path(key) + ".tmp"
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(record, f, ensure_ascii=False, indent=2)
+            os.replace(temp_path, self._path(key))
+        except Exception as e:
+            print(f"[WARN] 스윕 결과 캐시 저장 실패 ({key}): {e}")
+
+# ================================================================================
+# 스윕 실행
+# ================================================================================
+
+def task_key(params: Dict[str, Any], day_range: Optional[Tuple[str, str]], initial_capital: int) -> str:
+    return param_hash({"params": params, "days": day_range, "capital": initial_capital})
+
+def run_tasks(shared: SharedHistory, tasks: List[Tuple[Dict[str, Any], Optional[Tuple[str, str]]]],
+              processes: int = SWEEP_PROCESSES, cache_dir: str = SWEEP_CACHE_DIR,
+              initial_capital: int = 500_000, days: List[BacktestDay] = None) -> Dict[str, Dict[str, Any]]:
+    """(설정, 기간) 작업 목록 실행 → {작업 키: 지표} (캐시에 있는 작업은 건너뜀)"""
+    cache = SweepCache(cache_dir, shared.fingerprint)
+    results: Dict[str, Dict[str, Any]] = {}
+    pending = []
+    for params, day_range in tasks:
+        key = task_key(params, day_range, initial_capital)
+        if key in results:
+            continue
+        record = cache.get(key)
+        if record:
+            results[key] = record["metrics"]
+        else:
+            results[key] = None
+            pending.append((key, params, day_range, initial_capital))
+
+    if pending:
+        print(f"🧮 스윕: {len(tasks)}개 작업 중 캐시 {len(tasks) - len(pending)}개, 실행 {len(pending)}개 "
+              f"(프로세스 {processes}개)")
+
+    params_by_key = {key: (params, day_range) for key, params, day_range, _ in pending}
+    start = time.perf_counter()
+
+    def record_result(index: int, key: str, metrics: Dict[str, Any]):
+        params, day_range = params_by_key[key]
+        cache.put(key, {"params": params, "days": day_range, "metrics": metrics})
+        results[key] = metrics
+        if index % max(1, len(pending) // 10) == 0 or index == len(pending):
+            print(f"   {index}/{len(pending)} 완료 ({time.perf_counter() - start:.1f}초)")
+
+    if processes <= 1 or len(pending) <= 1:
+        local_days = days if days is not None else attach_days(shared.handle)
+        for index, (key, params, day_range, capital) in enumerate(pending, 1):
+            record_result(index, key, evaluate_params(_select_days(local_days, day_range), params, capital))
+    elif pending:
+        with Pool(processes, initializer=_init_worker, initargs=(shared.handle,)) as pool:
+            for index, (key, metrics) in enumerate(pool.imap_unordered(_run_task, pending), 1):
+                record_result(index, key, metrics)
+
+    return results
+
+def rank_results(rows: List[Dict[str, Any]], rank_by: str = "sharpe") -> List[Dict[str, Any]]:
+    """지표 순위 (max_drawdown은 작을수록 위)"""
+    if rank_by not in SWEEP_RANK_KEYS:
+        raise ValueError(f"알 수 없는 순위 기준: {rank_by} ({', '.join(SWEEP_RANK_KEYS)})")
+    reverse = rank_by != "max_drawdown"
+    return sorted(rows, key=lambda row: row["metrics"][rank_by], reverse=reverse)
+
+def run_sweep(grid: Dict[str, List[Any]] = None, days: List[BacktestDay] = None,
+              data_dir: str = BACKTEST_DATA_DIR, processes: int = SWEEP_PROCESSES,
+              cache_dir: str = SWEEP_CACHE_DIR, initial_capital: int = 500_000,
+              rank_by: str = "sharpe") -> List[Dict[str, Any]]:
+    """🔬 격자 전체 백테스트 → 순위 목록 [{"params", "metrics"}]"""
+    days = days if days is not None else load_backtest_days(data_dir)
+    if not days:
+        print(f"[WARN] 스윕할 백테스트 데이터가 없습니다: {data_dir}")
+        return []
+
+    configs = expand_grid(grid or DEFAULT_GRID)
+    shared = SharedHistory(days)
+    try:
+        results = run_tasks(shared, [(params, None) for params in configs], processes, cache_dir,
+                            initial_capital, days)
+    finally:
+        shared.close()
+
+    rows = [{"params": params, "metrics": results[task_key(params, None, initial_capital)]} for params in configs]
+    return rank_results(rows, rank_by)
+
+def format_params(params: Dict[str, Any]) -> str:
+    parts = []
+    for name, value in sorted(params.items()):
+        if value is None:
+            continue
+        parts.append(f"{name}={','.join(map(str, value)) if isinstance(value, (list, tuple)) else value}")
+    return " ".join(parts)
+
+def print_sweep_table(rows: List[Dict[str, Any]], top: int = 20):
+    """순위표 출력"""
+    if not rows:
+        print("📝 스윕 결과가 없습니다.")
+        return
+    table = []
+    for rank, row in enumerate(rows[:top], 1):
+        m = row["metrics"]
+        table.append([rank, format_params(row["params"]), f"{m['total_return']:+.2f}%", f"{m['max_drawdown']:.2f}%",
+                      f"{m['win_rate']:.1f}%", f"{m['sharpe']:.2f}", m['trades']])
+    print(tabulate(table, headers=["순위", "설정", "총수익률", "최대낙폭", "승률", "샤프", "거래수"], tablefmt="grid"))
+    print(f"📊 총 {len(rows)}개 설정 중 상위 {min(top, len(rows))}개")
+
+if __name__ == "__main__":
+    print_sweep_table(run_sweep())
@@ -0,0 +1,121 @@
+"""
+🔥 V3.4 매수 자금 배분 최적화 - 빈 슬롯·후보 가격·순위·가용 자금으로 종목과 수량을 골라 놀리는 현금 최소화
+Capital-utilization sizing for multi-slot buys (greedy knapsack with residual fill)
+"""
+
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List
+
+# ================================================================================
+# 배분 설정
+# ================================================================================
+SIZING_CAP_SLACK = 0.2             # 종목당 금액 상한 여유 (남는 자금으로 목표의 120%까지 추가 매수)
+SIZING_RANK_WEIGHT = 0.1           # 순위 가중치 (1위 1.0 → 마지막 0.9, 배분 금액에 곱함)
+SIZING_MIN_AMOUNT = 10_000         # 최소 주문 금액 (get_adjusted_investment_amount와 같음)
+
+@dataclass
+class Allocation:
+    """후보 1개 배분 결과"""
+    candidate: Dict[str, Any]
+    rank: int                      # 원래 후보 순서 (0부터)
+    price: int
+    quantity: int
+
+    @property
+    def amount(self) -> int:
+        return self.price * self.quantity
+
+@dataclass
+class SizingPlan:
+    """배분 계획 - allocations는 순위 순"""
+    budget: int
+    allocations: List[Allocation] = field(default_factory=list)
+    elapsed: float = 0.0
+
+    @property
+    def deployed(self) -> int:
+        return sum(a.amount for a in self.allocations)
+
+    @property
+    def idle(self) -> int:
+        return self.budget - self.deployed
+
+    @property
+    def utilization(self) -> float:
+        return self.deployed / self.budget * 100 if self.budget > 0 else 0.0
+
+def optimize_allocation(candidates: List[Dict[str, Any]], slots: int, cash: int, position_value: int,
+                        cap_slack: float = SIZING_CAP_SLACK, rank_weight: float = SIZING_RANK_WEIGHT,
+                        min_amount: int = SIZING_MIN_AMOUNT) -> SizingPlan:
+    """💎 빈 슬롯 수만큼 후보와 수량 선택 (후보 순서 = 순위)
+
+    예산은 min(가용 자금, 슬롯 × 종목당 금액)이고, 종목당 목표는 예산을 슬롯으로 나눈 금액이다.
+    1) 후보별 목표 금액 안에서 살 수 있는 최대 수량을 정하고 (1주가 목표의 cap_slack 여유
+       안이면 1주), 배분 금액 × 순위 가중치가 큰 순으로 슬롯을 채운다 (호가 단위 때문에 목표에
+       못 미치는 후보가 뒤로 밀림).
+    2) 남은 예산은 비싼 종목부터 종목당 상한(목표 × (1 + cap_slack)) 안에서 주식을 더 사서 채운다.
+    후보 수 n, 슬롯 k에 대해 O(n log n + k log k).
+    """
+    started = time.perf_counter()
+    budget = max(0, min(cash, slots * position_value))
+    plan = SizingPlan(budget)
+    if slots <= 0 or budget < min_amount or not candidates:
+        plan.elapsed = time.perf_counter() - started
+        return plan
+
+    target = min(position_value, budget // slots)
+    limit = int(target * (1 + cap_slack))
+    last_rank = max(len(candidates) - 1, 1)
+
+    scored = []
+    for rank, candidate in enumerate(candidates):
+        price = int(candidate.get("price", 0) or 0)
+        if price <= 0 or price > limit:
+            continue
+        quantity = max(1, target // price)
+        amount = price * quantity
+        if amount < min_amount:
+            continue
+        weight = 1 - rank_weight * rank / last_rank
+        scored.append((-amount * weight, rank, price, quantity, candidate))
+    scored.sort()
+
+    chosen = []
+    spent = 0
+    for _, rank, price, quantity, candidate in scored:
+        if len(chosen) >= slots:
+            break
+        if spent + price * quantity > budget:
+            continue
+        chosen.append(Allocation(candidate, rank, price, quantity))
+        spent += price * quantity
+
+    # 남은 예산 채우기 (비싼 종목부터 - 싼 종목이 마지막 자투리를 메움)
+    residual = budget - spent
+    for allocation in sorted(chosen, key=lambda a: -a.price):
+        if residual < allocation.price:
+            continue
+        extra = min((limit - allocation.amount) // allocation.price, residual // allocation.price)
+        if extra > 0:
+            allocation.quantity += extra
+            residual -= extra * allocation.price
+
+    plan.allocations = sorted(chosen, key=lambda a: a.rank)
+    plan.elapsed = time.perf_counter() - started
+    return plan
+
+def naive_allocation(candidates: List[Dict[str, Any]], slots: int, cash: int, position_value: int) -> SizingPlan:
+    """비교용 기존 방식 - 순위대로 슬롯마다 position_value // 가격 주"""
+    budget = max(0, min(cash, slots * position_value))
+    plan = SizingPlan(budget)
+    remaining = budget
+    for rank, candidate in enumerate(candidates):
+        if len(plan.allocations) >= slots:
+            break
+        price = int(candidate.get("price", 0) or 0)
+        quantity = min(position_value, remaining) // price if price > 0 else 0
+        if quantity > 0:
+            plan.allocations.append(Allocation(candidate, rank, price, quantity))
+            remaining -= price * quantity
+    return plan
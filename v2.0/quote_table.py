@@ -0,0 +1,193 @@
+"""
+🔥 V3.4 공유 메모리 시세 테이블 - 종목마스터 순서로 고정 배치한 행을 쓰기 1개/읽기 여러 프로세스가 복사 없이 공유
+Shared-memory quote table (fixed layout keyed by stock-master index, single writer, seqlock readers)
+"""
+
+import struct
+import time
+from multiprocessing import shared_memory
+from typing import Any, Dict, Iterable, List, Optional
+
+from scalping_engine import normalize_code
+from market_clock import market_timestamp
+
+# ================================================================================
+# 테이블 설정
+# ================================================================================
+QUOTE_TABLE_NAME = "scalping_quotes"   # 공유 메모리 이름 (쓰기 프로세스가 만들고 읽기 프로세스가 붙음)
+QUOTE_TABLE_MAGIC = b"QTB1"            # 배치 식별자 (배치가 바뀌면 올림)
+QUOTE_TABLE_CAPACITY = 4_096           # 최대 종목 수 (코스피+코스닥 약 2,700)
+QUOTE_READ_RETRIES = 100               # 읽기 재시도 상한 (쓰는 중인 행을 만나면 다시 읽음)
+
+# 배치: [헤더 64B][종목코드 capacity × 8B][행 capacity × 40B]
+HEADER = struct.Struct("<4sIIId")      # 식별자, 행 크기, 용량, 종목 수, 생성 시각
+HEADER_SIZE = 64
+CODE = struct.Struct("<8s")            # "A005930" (ASCII, 0 채움)
+ROW = struct.Struct("<Qqqqd")          # 순번, 현재가, 누적 거래량, 누적 거래대금, 시각
+SEQ = struct.Struct("<Q")
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """기존 공유 메모리에 붙기 - 읽기 프로세스가 종료될 때 블록을 지우지 않도록 추적에 등록하지 않음
+    (Python 3.13부터는 track=False, 이전 버전은 등록 함수를 잠시 막음)"""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        pass
+    from multiprocessing import resource_tracker
+    register = resource_tracker.register
+    resource_tracker.register = lambda name, rtype: None if rtype == "shared_memory" else register(name, rtype)
+    try:
+        return shared_memory.SharedMemory(name=name)
+    finally:
+        resource_tracker.register = register
+
+class QuoteTable:
+    """📊 공유 메모리 시세 테이블
+
+    행마다 순번(seqlock)을 둔다. 쓰기 프로세스는 순번을 홀수로 올리고 → 값을 쓰고 → 짝수로
+    올리며, 읽기 프로세스는 순번·값·순번을 읽어 두 순번이 같은 짝수일 때만 받아들인다.
+    잠금이 없어 읽기가 쓰기를 막지 않고, 읽기 1건은 행 1개(40B)만 읽는다.
+    쓰기는 create()로 만든 프로세스 하나만 한다.
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory, writer: bool):
+        self.shm = shm
+        self.writer = writer
+        self.buf = shm.buf
+        magic, row_size, capacity, count, created = HEADER.unpack_from(self.buf, 0)
+        if magic != QUOTE_TABLE_MAGIC or row_size != ROW.size:
+            raise ValueError(f"시세 테이블 배치 불일치 ({shm.name}: {magic!r}, 행 {row_size}B)")
+        self.capacity = capacity
+        self.created = created
+        self._rows_offset = HEADER_SIZE + capacity * CODE.size
+        self.codes: List[str] = [
+            CODE.unpack_from(self.buf, HEADER_SIZE + i * CODE.size)[0].rstrip(b"\0").decode('ascii')
+            for i in range(count)
+        ]
+        self.index: Dict[str, int] = {code: i for i, code in enumerate(self.codes)}
+        self._seqs = [0] * count if writer else None
+        self.writes = 0
+        self.misses = 0
+        self.retries = 0
+
+    @classmethod
+    def create(cls, codes: Iterable[str], name: str = QUOTE_TABLE_NAME,
+               capacity: int = QUOTE_TABLE_CAPACITY) -> "QuoteTable":
+        """쓰기용 테이블 생성 (같은 이름의 이전 블록은 지움) - codes 순서가 행 번호"""
+        codes = list(dict.fromkeys(normalize_code(code) for code in codes))
+        if len(codes) > capacity:
+            print(f"[WARN] 시세 테이블 용량 초과: {len(codes):,}종목 중 {capacity:,}종목만 등록")
+            codes = codes[:capacity]
+        try:
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+        except FileNotFoundError:
+            pass
+        size = HEADER_SIZE + capacity * (CODE.size + ROW.size)
+        shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        shm.buf[:size] = bytes(size)
+        for i, code in enumerate(codes):
+            CODE.pack_into(shm.buf, HEADER_SIZE + i * CODE.size, code.encode('ascii'))
+        HEADER.pack_into(shm.buf, 0, QUOTE_TABLE_MAGIC, ROW.size, capacity, len(codes), time.time())
+        return cls(shm, writer=True)
+
+    @classmethod
+    def attach(cls, name: str = QUOTE_TABLE_NAME) -> "QuoteTable":
+        """읽기용으로 붙기 (없으면 FileNotFoundError)"""
+        return cls(_attach(name), writer=False)
+
+    # ------------------------------------------------------------------
+    # 쓰기 (생성 프로세스 전용)
+    # ------------------------------------------------------------------
+    def update(self, code: str, price: int, volume: int, amount: int, now: float = None) -> bool:
+        """행 1개 갱신 (테이블에 없는 종목이면 False)"""
+        if not self.writer:
+            raise PermissionError("읽기용 시세 테이블에는 쓸 수 없습니다")
+        row = self.index.get(normalize_code(code))
+        if row is None:
+            self.misses += 1
+            return False
+        now = market_timestamp() if now is None else now
+        offset = self._rows_offset + row * ROW.size
+        seq = self._seqs[row]
+        SEQ.pack_into(self.buf, offset, seq + 1)
+        ROW.pack_into(self.buf, offset, seq + 1, int(price), int(volume), int(amount), now)
+        SEQ.pack_into(self.buf, offset, seq + 2)
+        self._seqs[row] = seq + 2
+        self.writes += 1
+        return True
+
+    def update_infos(self, infos: Dict[str, Dict[str, Any]], now: float = None) -> int:
+        """get_stock_infos_bulk 결과 반영 (누적 거래량이 없는 응답이면 0) - 갱신 행 수 반환"""
+        now = market_timestamp() if now is None else now
+        written = 0
+        for code, info in infos.items():
+            price = info.get("price", 0) if info else 0
+            if price > 0:
+                written += self.update(code, price, info.get("volume", 0), info.get("amount", 0), now)
+        return written
+
+    # ------------------------------------------------------------------
+    # 읽기
+    # ------------------------------------------------------------------
+    def read_row(self, row: int) -> Optional[Dict[str, Any]]:
+        """행 1개 일관된 읽기 (한 번도 쓰지 않은 행이면 None)"""
+        offset = self._rows_offset + row * ROW.size
+        for _ in range(QUOTE_READ_RETRIES):
+            before = SEQ.unpack_from(self.buf, offset)[0]
+            if before & 1:
+                self.retries += 1
+                continue
+            _, price, volume, amount, stamp = ROW.unpack_from(self.buf, offset)
+            if SEQ.unpack_from(self.buf, offset)[0] == before:
+                if before == 0:
+                    return None
+                return {"price": price, "volume": volume, "amount": amount, "time": stamp, "seq": before}
+            self.retries += 1
+        return None
+
+    def get(self, code: str) -> Optional[Dict[str, Any]]:
+        """종목 1개 시세 (없거나 아직 안 쓴 종목이면 None)"""
+        row = self.index.get(normalize_code(code))
+        return self.read_row(row) if row is not None else None
+
+    def get_many(self, codes: Iterable[str], max_age: float = None, now: float = None) -> Dict[str, Dict[str, Any]]:
+        """여러 종목 시세 - max_age(초)를 주면 그보다 오래된 행은 뺀다"""
+        if max_age is not None:
+            now = market_timestamp() if now is None else now
+        result = {}
+        for code in codes:
+            code = normalize_code(code)
+            quote = self.get(code)
+            if quote and (max_age is None or now - quote["time"] <= max_age):
+                result[code] = quote
+        return result
+
+    def get_price(self, code: str) -> int:
+        quote = self.get(code)
+        return quote["price"] if quote else 0
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def get_summary(self) -> Dict[str, Any]:
+        return {
+            "name": self.shm.name,
+            "writer": self.writer,
+            "codes": len(self.codes),
+            "capacity": self.capacity,
+            "bytes": self.shm.size,
+            "writes": self.writes,
+            "misses": self.misses,
+            "retries": self.retries
+        }
+
+    def close(self):
+        """연결 해제 (쓰기 프로세스면 블록도 지움)"""
+        self.shm.close()
+        if self.writer:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
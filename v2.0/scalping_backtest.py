@@ -0,0 +1,381 @@
+"""
+🔥 V3.4 백테스트 - 기록된 조건검색 편입 + 분봉/체결 시세를 실제 ScalpingEngine 매수·청산 로직으로 재생
+Event-driven backtester replaying recorded condition hits and price series through ScalpingEngine
+"""
+
+import bisect
+import glob
+import io
+import json
+import os
+import time
+from contextlib import nullcontext, redirect_stdout
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta, time as dtime
+from typing import Any, Dict, Iterable, List, Tuple
+from tabulate import tabulate
+
+from scalping_engine import ScalpingEngine, TradingStrategy, is_etf_etn, normalize_code
+from scalping_candidates import CandidateMerger, select_top_candidates, get_candidate_limit
+from scalping_simulation import simulated_market
+from scalping_scheduler import IntervalSchedule
+from exit_rules import build_exit_rules
+from virtual_money_manager import InMemoryMoneyManager, DailyReturn, PeriodAnalysis
+from market_clock import SimulatedClock, use_market_clock, market_timestamp
+from trading_calendar import MARKET_OPEN_TIME, TRADING_START_TIME, TRADING_END_TIME, FORCE_SELL_TIME
+
+# ================================================================================
+# 백테스트 설정
+# ================================================================================
+BACKTEST_DATA_DIR = "backtest_data"            # 일별 데이터 파일 폴더
+BACKTEST_FILE_PATTERN = "backtest_*.json"      # backtest_YYYYMMDD.json
+BACKTEST_TOKEN = "BACKTEST"                    # 재생용 토큰 (실제 API 호출 없음)
+KA10080_LIST_KEY = "stk_min_pole_chart_qry"    # 주식분봉차트조회 응답 목록 키
+
+@dataclass
+class ConditionHit:
+    """조건검색 편입 기록 1건"""
+    time: datetime
+    code: str
+    condition_seq: int
+    condition_name: str = ""
+
+@dataclass
+class PriceSeries:
+    """종목 시세 시계열 (시각 오름차순, amount는 그 시각까지 누적 거래대금)"""
+    code: str
+    name: str
+    times: List[datetime]
+    prices: List[int]
+    amounts: List[int]
+
+    def index_at(self, when: datetime) -> int:
+        """when 이전(포함) 마지막 시세 색인 (없으면 -1)"""
+        return bisect.bisect_right(self.times, when) - 1
+
+@dataclass
+class BacktestDay:
+    """하루치 재생 데이터"""
+    day: date
+    hits: List[ConditionHit]
+    series: Dict[str, PriceSeries]
+
+    def timeline(self, until: dtime = FORCE_SELL_TIME) -> List[datetime]:
+        """편입/시세 시각 합집합 (until 전까지, 오름차순)"""
+        end = datetime.combine(self.day, until)
+        times = {hit.time for hit in self.hits}
+        for series in self.series.values():
+            times.update(series.times)
+        return sorted(t for t in times if t < end)
+
+# ================================================================================
+# 데이터 로드
+# ================================================================================
+
+def _parse_price(value) -> int:
+    return abs(int(str(value).replace("+", "").replace("-", "").replace(",", "") or 0))
+
+def parse_minute_bars(response: Dict[str, Any], day: date = None) -> List[Tuple[datetime, int, int]]:
+    """주식분봉차트조회(ka10080) 응답 → [(시각, 종가, 거래량)] 오름차순 (day를 주면 그날만)
+
+    cntr_tm(YYYYMMDDHHMMSS)은 봉이 끝난 시각으로 보고 그 시각부터 종가를 쓴다.
+    """
+    bars = []
+    for item in response.get(KA10080_LIST_KEY, []):
+        try:
+            when = datetime.strptime(str(item["cntr_tm"]), '%Y%m%d%H%M%S')
+            if day and when.date() != day:
+                continue
+            bars.append((when, _parse_price(item.get("cur_prc", 0)), int(str(item.get("trde_qty", 0)).replace(",", "") or 0)))
+        except (KeyError, ValueError):
+            continue
+    return sorted(bars)
+
+def build_price_series(code: str, name: str, bars: List[Tuple[datetime, int, int]]) -> PriceSeries:
+    """(시각, 가격, 거래량) 목록 → 누적 거래대금을 포함한 시계열"""
+    times, prices, amounts = [], [], []
+    amount = 0
+    for when, price, volume in sorted(bars):
+        amount += price * volume
+        times.append(when)
+        prices.append(price)
+        amounts.append(amount)
+    return PriceSeries(normalize_code(code), name, times, prices, amounts)
+
+def load_backtest_day(path: str) -> BacktestDay:
+    """일별 데이터 파일 로드
+
+    {"date": "2025-07-01",
+     "hits": [{"time": "09:06:00", "code": "005930", "condition_seq": 3, "condition_name": "..."}],
+     "stocks": {"005930": {"name": "삼성전자", "bars": [["09:01:00", 71000, 1200], ...]}}}
+
+    bars 대신 "ka10080": {분봉 API 응답}을 넣으면 그대로 파싱한다. 체결 기록도 같은
+    형식(초 단위 시각)으로 넣으면 된다.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    day = datetime.strptime(data["date"], '%Y-%m-%d').date()
+
+    def at(value: str) -> datetime:
+        return datetime.combine(day, datetime.strptime(value, '%H:%M:%S').time())
+
+    series = {}
+    for code, stock in data.get("stocks", {}).items():
+        if "ka10080" in stock:
+            bars = parse_minute_bars(stock["ka10080"], day)
+        else:
+            bars = [(at(t), int(price), int(volume)) for t, price, volume in stock.get("bars", [])]
+        item = build_price_series(code, stock.get("name", code), bars)
+        series[item.code] = item
+
+    hits = [ConditionHit(at(h["time"]), normalize_code(h["code"]), int(h["condition_seq"]), h.get("condition_name", ""))
+            for h in data.get("hits", [])]
+    hits.sort(key=lambda h: h.time)
+    return BacktestDay(day, hits, series)
+
+def load_backtest_days(data_dir: str = BACKTEST_DATA_DIR, start: date = None, end: date = None) -> List[BacktestDay]:
+    """폴더의 일별 데이터 파일 전체 로드 (start~end, 날짜 순)"""
+    days = []
+    for path in sorted(glob.glob(os.path.join(data_dir, BACKTEST_FILE_PATTERN))):
+        try:
+            backtest_day = load_backtest_day(path)
+        except Exception as e:
+            print(f"[WARN] {path} 로드 실패: {e}")
+            continue
+        if (start and backtest_day.day < start) or (end and backtest_day.day > end):
+            continue
+        days.append(backtest_day)
+    return sorted(days, key=lambda d: d.day)
+
+# ================================================================================
+# 재생용 시장
+# ================================================================================
+
+class HistoricalMarket:
+    """📼 기록 시세 시장 - 공용 시계 시각 이전 마지막 시세를 돌려줌 (scalping_engine 함수 호환)"""
+
+    def __init__(self, backtest_day: BacktestDay, clock=market_timestamp):
+        self.backtest_day = backtest_day
+        self.clock = clock
+        self.requests = 0
+
+    def _info(self, code: str) -> Dict[str, Any]:
+        series = self.backtest_day.series.get(normalize_code(code))
+        if not series:
+            return {}
+        index = series.index_at(datetime.fromtimestamp(self.clock()))
+        if index < 0:
+            return {}
+        return {"name": series.name, "price": series.prices[index], "amount": series.amounts[index]}
+
+    def get_stock_info(self, stock_code: str, token: str) -> Dict[str, Any]:
+        self.requests += 1
+        return self._info(stock_code)
+
+    def get_stock_infos_bulk(self, stock_codes: List[str], token: str) -> Dict[str, Dict[str, Any]]:
+        self.requests += 1
+        infos = {normalize_code(code): self._info(code) for code in stock_codes}
+        return {code: info for code, info in infos.items() if info}
+
+    def get_current_price(self, stock_code: str, token: str) -> int:
+        return self.get_stock_info(stock_code, token).get("price", 0)
+
+# ================================================================================
+# 백테스트 실행
+# ================================================================================
+
+@dataclass
+class BacktestResult:
+    """백테스트 결과 (실제 운용과 같은 DailyReturn / PeriodAnalysis)"""
+    daily_returns: List[DailyReturn]
+    analysis: PeriodAnalysis
+    buys: int
+    sells: int
+    events: int                                 # 재생한 시각 수
+    real_seconds: float
+    store: Dict[str, Any] = field(repr=False, default_factory=dict)
+
+    def daily_records(self) -> List[list]:
+        """날짜별 [날짜, 일수익률(%), 매도 건수, 수익 매도 건수]"""
+        records = []
+        for date_str, (_, portfolio, _, sells) in sorted(self.store.get('days', {}).items()):
+            records.append([date_str, portfolio['daily_return'], len(sells),
+                            len([tx for tx in sells if tx.profit_amount > 0])])
+        return records
+
+    def print_report(self):
+        """일별 수익률 + 기간 분석 출력"""
+        if self.daily_returns:
+            print(tabulate(
+                [[dr.date, f"{dr.start_capital:,}", f"{dr.end_capital:,}", f"{dr.daily_pnl:+,}",
+                  f"{dr.daily_return:+.2f}%", f"{dr.cumulative_return:+.2f}%", dr.trades_count]
+                 for dr in self.daily_returns],
+                headers=["날짜", "시작자본", "종료자본", "손익", "일수익률", "누적수익률", "거래"],
+                tablefmt="grid"
+            ))
+        a = self.analysis
+        print(f"\n📼 백테스트 {a.period_name}: {a.start_date} ~ {a.end_date} | 총 {a.total_return:+.2f}% | "
+              f"일평균 {a.daily_avg_return:+.2f}% | 변동성 {a.volatility:.2f}% | 최대낙폭 {a.max_drawdown:.2f}% | "
+              f"승률 {a.win_rate:.1f}% ({a.total_trades}거래)")
+        print(f"   매수 {self.buys}건 / 매도 {self.sells}건 | 재생 {self.events:,}시점 | 실제 {self.real_seconds:.2f}초")
+
+class Backtester:
+    """📼 기록 데이터를 하루씩 실제 엔진에 재생
+
+    하루마다 새 ScalpingEngine과 InMemoryMoneyManager(같은 store)를 만들어 실제 재시작과
+    같이 전날 결과로 이어간다. 각 시각에서 모의 시계를 옮긴 뒤 보유 종목 청산
+    (check_exit_conditions) → 매매 시간이면 그 시각 편입 종목 매수(buy_available_stocks_smartly)
+    순으로 처리하고, 15:10에 force_sell_all로 강제 청산한다.
+
+    tiers는 TradingStrategy 자금 구간, conditions는 사용할 조건검색식 번호, scan_interval을
+    주면 편입 종목을 실제 루프처럼 다음 스캔 경계(초)에 모아 매수한다. reset_daily면 매일
+    initial_capital로 새로 시작해 날마다 독립된 결과를 낸다 (구간별 재조합용). exit_rules는
+    build_exit_rules 설정 (트레일링 스탑 등 추가 청산 규칙), optimize_sizing은 빈 슬롯 자금 배분 최적화 사용 여부.
+    """
+
+    def __init__(self, days: List[BacktestDay], initial_capital: int = 500_000,
+                 profit_target: float = None, stop_loss: float = None, quiet: bool = True,
+                 tiers: List[Tuple[int, int, int, int, str]] = None, scan_interval: float = None,
+                 conditions: Iterable[int] = None, reset_daily: bool = False,
+                 exit_rules: Dict[str, Any] = None, optimize_sizing: bool = True):
+        self.days = sorted(days, key=lambda d: d.day)
+        self.initial_capital = initial_capital
+        self.profit_target = profit_target
+        self.stop_loss = stop_loss
+        self.quiet = quiet
+        self.tiers = tiers
+        self.scan_schedule = IntervalSchedule(scan_interval) if scan_interval else None
+        self.conditions = set(conditions) if conditions is not None else None
+        self.reset_daily = reset_daily
+        self.exit_rules = exit_rules
+        self.optimize_sizing = optimize_sizing
+        self.store: Dict[str, Any] = {}
+        self.buys = 0
+        self.sells = 0
+        self.events = 0
+
+    def run(self) -> BacktestResult:
+        real_start = time.time()
+        manager = None
+
+        if self.days:
+            clock = SimulatedClock(datetime.combine(self.days[0].day, MARKET_OPEN_TIME))
+            with use_market_clock(clock), (redirect_stdout(io.StringIO()) if self.quiet else nullcontext()):
+                for backtest_day in self.days:
+                    manager = self._run_day(backtest_day, clock)
+
+        if manager:
+            manager.store = self.store   # reset_daily면 날짜별 store를 모은 전체 기록으로 분석
+            analysis = manager.analyze_historical_performance()
+        else:
+            analysis = PeriodAnalysis(
+                period_name="데이터 없음",
+                start_date="", end_date="", start_capital=0, end_capital=0,
+                total_return=0, daily_avg_return=0, volatility=0, max_drawdown=0,
+                win_rate=0, total_trades=0, trading_days=0
+            )
+        return BacktestResult(
+            daily_returns=list(self.store.get('history', [])),
+            analysis=analysis,
+            buys=self.buys,
+            sells=self.sells,
+            events=self.events,
+            real_seconds=time.time() - real_start,
+            store=self.store
+        )
+
+    def _run_day(self, backtest_day: BacktestDay, clock: SimulatedClock) -> InMemoryMoneyManager:
+        clock.set_time(datetime.combine(backtest_day.day, MARKET_OPEN_TIME))
+        store = {} if self.reset_daily else self.store
+        manager = InMemoryMoneyManager(self.initial_capital, store)
+        if self.profit_target is not None:
+            manager.profit_target = self.profit_target
+        if self.stop_loss is not None:
+            manager.stop_loss = self.stop_loss
+        engine = ScalpingEngine(money_manager=manager, trading_strategy=TradingStrategy(self.tiers),
+                                exit_rules=build_exit_rules(self.exit_rules, clock.timestamp),
+                                optimize_sizing=self.optimize_sizing)
+
+        market = HistoricalMarket(backtest_day, clock.timestamp)
+        hits_by_time = self._group_hits(backtest_day)
+        trading_start = datetime.combine(backtest_day.day, TRADING_START_TIME)
+        trading_end = datetime.combine(backtest_day.day, TRADING_END_TIME)
+        force_sell = datetime.combine(backtest_day.day, FORCE_SELL_TIME)
+        timeline = sorted(set(backtest_day.timeline()) | {t for t in hits_by_time if t < force_sell})
+
+        with simulated_market(market):
+            for when in timeline:
+                clock.set_time(when)
+                self.events += 1
+
+                if engine.positions:
+                    engine.check_exit_conditions(BACKTEST_TOKEN)
+
+                hits = hits_by_time.get(when)
+                if hits and trading_start <= when < trading_end:
+                    self._buy_hits(engine, market, hits)
+
+            clock.set_time(force_sell)
+            if engine.positions:
+                engine.force_sell_all(BACKTEST_TOKEN)
+            else:
+                manager.finalize_day()
+            manager.save_daily_data()
+
+        if self.reset_daily:
+            self.store.setdefault('days', {}).update(store['days'])
+            self.store.setdefault('history', []).extend(store['history'])
+            self.store.setdefault('equity', {}).update(store.get('equity', {}))
+
+        self.buys += len(manager.buy_transactions)
+        self.sells += len(manager.sell_transactions)
+        return manager
+
+    def _group_hits(self, backtest_day: BacktestDay) -> Dict[datetime, List[ConditionHit]]:
+        """매수 시각별 편입 종목 (조건식 필터, 스캔 경계로 모으기)"""
+        grouped: Dict[datetime, List[ConditionHit]] = {}
+        for hit in backtest_day.hits:
+            if self.conditions is not None and hit.condition_seq not in self.conditions:
+                continue
+            when = hit.time
+            if self.scan_schedule:
+                when = self.scan_schedule.next_boundary(when - timedelta(microseconds=1))
+            grouped.setdefault(when, []).append(hit)
+        return grouped
+
+    def _buy_hits(self, engine: ScalpingEngine, market: HistoricalMarket, hits: List[ConditionHit]):
+        """같은 시각 편입 종목을 조건식 간 병합 → 상위 후보 매수 (실제 스캔과 같은 선택 규칙)"""
+        _, max_positions = engine.update_trading_strategy()
+        slots = max_positions - len(engine.positions)
+        if slots <= 0:
+            return
+
+        merger = CandidateMerger()
+        by_condition: Dict[int, Tuple[str, List[str]]] = {}
+        for hit in hits:
+            by_condition.setdefault(hit.condition_seq, (hit.condition_name, []))[1].append(hit.code)
+        for seq, (name, codes) in by_condition.items():
+            merger.add_condition_result(seq, name, codes)
+
+        candidates = []
+        for code in merger.get_unique_codes():
+            info = market.get_stock_info(code, BACKTEST_TOKEN)
+            if info and info["price"] > 0 and not is_etf_etn(info["name"]) and engine.can_buy_stock(code)[0]:
+                candidates.append(merger.build_candidate(code, info))
+
+        candidates = select_top_candidates(candidates, get_candidate_limit(slots))
+        if candidates:
+            engine.buy_available_stocks_smartly(candidates, slots)
+
+def run_backtest(data_dir: str = BACKTEST_DATA_DIR, start: date = None, end: date = None,
+                 initial_capital: int = 500_000, profit_target: float = None, stop_loss: float = None,
+                 quiet: bool = True, exit_rules: Dict[str, Any] = None) -> BacktestResult:
+    """📼 폴더의 기록 데이터로 백테스트 실행"""
+    days = load_backtest_days(data_dir, start, end)
+    if not days:
+        print(f"[WARN] 백테스트 데이터 없음: {os.path.join(data_dir, BACKTEST_FILE_PATTERN)}")
+    return Backtester(days, initial_capital, profit_target, stop_loss, quiet=quiet, exit_rules=exit_rules).run()
+
+if __name__ == "__main__":
+    run_backtest().print_report()
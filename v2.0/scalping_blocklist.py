@@ -0,0 +1,170 @@
+"""
+🔥 V3.3 종목 차단 관리 - 만료 시각 힙 기반 일시 차단 + 조회 실패 네거티브 캐시
+Expiring blocklist (heap ordered, O(log n) eviction) and exponential-backoff negative cache
+"""
+
+import heapq
+from datetime import datetime
+from typing import Dict, List, Tuple, Callable, Iterator, Any
+
+from market_clock import market_timestamp
+
+# ================================================================================
+# 차단 설정
+# ================================================================================
+DEFAULT_BLOCK_MINUTES = 30         # 일시 차단 기본 시간
+NEGATIVE_CACHE_BASE = 60           # 첫 조회 실패 시 재시도 대기 (초)
+NEGATIVE_CACHE_MAX = 1800          # 재시도 대기 상한 (초) - 30분
+
+class ExpiringBlocklist:
+    """⏳ 만료 시각 순 힙으로 관리하는 차단 목록 (만료된 종목은 조회 시 자동 해제)
+
+    재차단/해제 시 힙의 이전 항목은 그대로 두고 꺼낼 때 무시한다 (지연 삭제).
+    """
+
+    def __init__(self, clock: Callable[[], float] = market_timestamp):
+        self.clock = clock
+        self.entries: Dict[str, Tuple[float, str]] = {}   # 종목코드 → (만료 시각, 사유)
+        self._heap: List[Tuple[float, str]] = []
+
+    def block(self, code: str, duration_seconds: float, reason: str = ""):
+        """종목 차단 (이미 차단 중이면 만료 시각 갱신)"""
+        expires_at = self.clock() + duration_seconds
+        self.entries[code] = (expires_at, reason)
+        heapq.heappush(self._heap, (expires_at, code))
+
+        # 지연 삭제로 쌓인 항목이 많으면 힙 재구성
+        if len(self._heap) > 2 * len(self.entries) + 32:
+            self._heap = [(exp, c) for c, (exp, _) in self.entries.items()]
+            heapq.heapify(self._heap)
+
+    def unblock(self, code: str) -> bool:
+        """차단 해제 (힙 항목은 만료 시 정리)"""
+        return self.entries.pop(code, None) is not None
+
+    def discard(self, code: str):
+        """set 호환 - 차단 해제"""
+        self.unblock(code)
+
+    def purge_expired(self) -> List[str]:
+        """만료된 차단 해제 후 해제된 종목코드 반환 (항목당 O(log n))"""
+        now = self.clock()
+        released = []
+
+        while self._heap and self._heap[0][0] <= now:
+            expires_at, code = heapq.heappop(self._heap)
+            entry = self.entries.get(code)
+            if entry and entry[0] == expires_at:
+                del self.entries[code]
+                released.append(code)
+
+        return released
+
+    def is_blocked(self, code: str) -> bool:
+        """차단 여부 (만료 항목 먼저 정리)"""
+        self.purge_expired()
+        return code in self.entries
+
+    def remaining_seconds(self, code: str) -> float:
+        """남은 차단 시간 (차단 중이 아니면 0)"""
+        entry = self.entries.get(code)
+        if not entry:
+            return 0.0
+        return max(0.0, entry[0] - self.clock())
+
+    def clear(self):
+        """전체 해제"""
+        self.entries.clear()
+        self._heap.clear()
+
+    def __contains__(self, code: str) -> bool:
+        return self.is_blocked(code)
+
+    def __len__(self) -> int:
+        self.purge_expired()
+        return len(self.entries)
+
+    def __iter__(self) -> Iterator[str]:
+        self.purge_expired()
+        return iter(list(self.entries.keys()))
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """모니터링용 차단 목록 (만료 임박 순)"""
+        self.purge_expired()
+        rows = []
+        for code, (expires_at, reason) in sorted(self.entries.items(), key=lambda x: x[1][0]):
+            rows.append({
+                "code": code,
+                "reason": reason,
+                "remaining_seconds": int(max(0, expires_at - self.clock())),
+                "expires_at": datetime.fromtimestamp(expires_at).strftime('%H:%M:%S')
+            })
+        return rows
+
+    def to_dict(self) -> Dict[str, Dict[str, Any]]:
+        """JSON 저장용"""
+        self.purge_expired()
+        return {code: {"expires_at": exp, "reason": reason} for code, (exp, reason) in self.entries.items()}
+
+    def load_dict(self, data: Dict[str, Dict[str, Any]]):
+        """JSON 복원 (이미 만료된 항목은 버림)"""
+        now = self.clock()
+        for code, entry in data.items():
+            remaining = entry.get("expires_at", 0) - now
+            if remaining > 0:
+                self.block(code, remaining, entry.get("reason", ""))
+
+class NegativeCache:
+    """❌ 조회 실패 종목 네거티브 캐시 - 연속 실패마다 재시도 대기 2배 (상한 있음)"""
+
+    def __init__(self, base_seconds: float = NEGATIVE_CACHE_BASE, max_seconds: float = NEGATIVE_CACHE_MAX,
+                 clock: Callable[[], float] = market_timestamp):
+        self.base_seconds = base_seconds
+        self.max_seconds = max_seconds
+        self.failures: Dict[str, int] = {}     # 종목코드 → 연속 실패 횟수
+        self.blocklist = ExpiringBlocklist(clock)
+        self.skipped_total = 0                  # 대기 중이라 건너뛴 조회 수 (누적)
+
+    def get_backoff(self, failure_count: int) -> float:
+        """연속 실패 횟수에 따른 재시도 대기 (초)"""
+        return min(self.max_seconds, self.base_seconds * (2 ** max(0, failure_count - 1)))
+
+    def record_failure(self, code: str) -> float:
+        """조회 실패 기록 후 재시도 대기 시간 반환"""
+        count = self.failures.get(code, 0) + 1
+        self.failures[code] = count
+        backoff = self.get_backoff(count)
+        self.blocklist.block(code, backoff, f"조회실패 {count}회")
+        return backoff
+
+    def record_success(self, code: str):
+        """조회 성공 시 실패 기록 초기화"""
+        if self.failures.pop(code, None) is not None:
+            self.blocklist.unblock(code)
+
+    def should_skip(self, code: str) -> bool:
+        """재시도 대기 중인지"""
+        return code in self.blocklist
+
+    def filter_codes(self, codes: List[str]) -> Tuple[List[str], List[str]]:
+        """(조회할 종목, 대기 중이라 건너뛸 종목)"""
+        allowed, skipped = [], []
+        for code in codes:
+            (skipped if self.should_skip(code) else allowed).append(code)
+        self.skipped_total += len(skipped)
+        return allowed, skipped
+
+    def clear(self):
+        """전체 초기화 (새로운 거래일)"""
+        self.failures.clear()
+        self.blocklist.clear()
+
+    def __len__(self) -> int:
+        return len(self.blocklist)
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """모니터링용 네거티브 캐시 목록"""
+        rows = self.blocklist.snapshot()
+        for row in rows:
+            row["failures"] = self.failures.get(row["code"], 0)
+        return rows
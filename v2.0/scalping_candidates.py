@@ -0,0 +1,367 @@
+"""
+🔥 V3.3 조건검색 후보 병합 - 조건식 간 중복 제거 + 상위 K개 힙 선택 + 루프 간 증분 스캔 + 가격 사전 필터
+Cross-condition candidate merge with de-duplication, bounded top-k selection, incremental scanning and price prefilter
+"""
+
+import heapq
+from datetime import datetime
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Optional, Callable, Set
+
+from scalping_blocklist import NegativeCache
+from market_clock import market_now, market_timestamp
+
+# ================================================================================
+# 병합 설정
+# ================================================================================
+MULTI_CONDITION_BONUS = 0.5    # 추가로 매칭된 조건 1개당 점수 가중치 (+50%)
+CANDIDATE_OVERSAMPLE = 3       # 매수 실패 대비 빈 슬롯당 후보 배수 (스마트 매수 최대 시도와 동일)
+QUOTE_REFRESH_TTL = 60         # 기존 종목 시세 재사용 시간 (초) - 지나면 일괄 시세로 갱신
+BULK_REFRESH_CHUNK = 100       # 일괄 시세 조회 1회당 종목 수
+PREFILTER_PRICE_TOLERANCE = 0.10  # 최근 가격 기준 한도 초과 여유 (+10%까지는 조회 후 판단)
+
+def _normalize_code(code) -> str:
+    """종목코드 정규화 (A 접두사 추가)"""
+    code = str(code).replace("A", "").zfill(6)
+    return "A" + code
+
+@dataclass
+class ConditionMatch:
+    """종목별 조건검색식 매칭 정보"""
+    code: str
+    order: int                                  # 최초 발견 순서 (조건식 순서 → 조건 내 순위)
+    condition_seqs: List[int] = field(default_factory=list)
+    condition_names: List[str] = field(default_factory=list)
+    best_rank: int = 0                          # 조건식 결과 내 최고 순위 (0부터)
+
+class CandidateMerger:
+    """🔗 여러 조건검색식 결과를 종목 단위로 병합 (정보 조회 전 중복 제거)"""
+
+    def __init__(self, condition_weights: Dict[int, float] = None,
+                 multi_condition_bonus: float = MULTI_CONDITION_BONUS):
+        self.condition_weights = condition_weights or {}
+        self.multi_condition_bonus = multi_condition_bonus
+
+        self.matches: Dict[str, ConditionMatch] = {}
+        self.condition_order: List[int] = []        # 결과가 있었던 조건식 순서
+        self.condition_names: Dict[int, str] = {}
+        self.condition_hits: Dict[int, int] = {}    # 조건식별 결과 수
+        self.total_hits = 0                         # 조건식별 결과 합계 (중복 포함)
+
+    @property
+    def duplicate_count(self) -> int:
+        """병합으로 제거된 중복 건수"""
+        return self.total_hits - len(self.matches)
+
+    def add_condition_result(self, seq: int, cond_name: str, codes: List[str]):
+        """조건검색식 한 개의 결과 추가"""
+        if seq not in self.condition_names:
+            self.condition_order.append(seq)
+        self.condition_names[seq] = cond_name
+        self.condition_hits[seq] = self.condition_hits.get(seq, 0) + len(codes)
+
+        for rank, code in enumerate(codes):
+            code = _normalize_code(code)
+            self.total_hits += 1
+
+            match = self.matches.get(code)
+            if match is None:
+                match = ConditionMatch(code=code, order=len(self.matches), best_rank=rank)
+                self.matches[code] = match
+            elif seq in match.condition_seqs:
+                continue  # 같은 조건식 내 중복
+
+            match.condition_seqs.append(seq)
+            match.condition_names.append(cond_name)
+            match.best_rank = min(match.best_rank, rank)
+
+    def get_unique_codes(self) -> List[str]:
+        """정보 조회 대상 고유 종목코드 (최초 발견 순서)"""
+        return list(self.matches.keys())
+
+    def get_match(self, code: str) -> Optional[ConditionMatch]:
+        """종목의 매칭 정보 조회"""
+        return self.matches.get(_normalize_code(code))
+
+    def score(self, amount: int, condition_seqs: List[int]) -> float:
+        """🎯 다중 조건 점수: 거래대금 × (1 + 보너스 × (조건 가중치 합 - 1))"""
+        weight_sum = sum(self.condition_weights.get(seq, 1.0) for seq in condition_seqs)
+        return amount * (1 + self.multi_condition_bonus * max(weight_sum - 1, 0))
+
+    def build_candidate(self, code: str, info: Dict[str, Any]) -> Dict[str, Any]:
+        """조회된 종목 정보 + 매칭 정보로 후보 딕셔너리 생성"""
+        match = self.matches[_normalize_code(code)]
+
+        return {
+            "code": match.code,
+            "name": info["name"],
+            "price": info["price"],
+            "amount": info["amount"],
+            "condition_seq": match.condition_seqs[0],       # 기존 호환 (최초 매칭 조건)
+            "condition_name": match.condition_names[0],
+            "matched_conditions": list(match.condition_seqs),
+            "matched_condition_names": list(match.condition_names),
+            "score": self.score(info["amount"], match.condition_seqs)
+        }
+
+    def group_by_condition(self, candidates: List[Dict]) -> Dict[int, List[Dict]]:
+        """조건식별 후보 목록 (조건식 결과 테이블 출력용, 거래대금 순)"""
+        grouped = {seq: [] for seq in self.condition_order}
+        for candidate in candidates:
+            for seq in candidate.get("matched_conditions", [candidate["condition_seq"]]):
+                grouped.setdefault(seq, []).append(candidate)
+
+        for seq in grouped:
+            grouped[seq].sort(key=lambda x: x["amount"], reverse=True)
+        return grouped
+
+    def get_summary(self) -> Dict[str, int]:
+        """병합 통계"""
+        multi = len([m for m in self.matches.values() if len(m.condition_seqs) > 1])
+        return {
+            "conditions": len(self.condition_order),
+            "total_hits": self.total_hits,
+            "unique_codes": len(self.matches),
+            "duplicates_removed": self.duplicate_count,
+            "multi_condition_codes": multi
+        }
+
+# ================================================================================
+# 상위 K개 선택
+# ================================================================================
+
+def candidate_score(candidate: Dict) -> float:
+    """후보 정렬 키 (점수가 없으면 거래대금)"""
+    return candidate.get("score", candidate["amount"])
+
+def select_top_candidates(candidates: List[Dict], k: Optional[int] = None,
+                          key: Callable[[Dict], float] = candidate_score) -> List[Dict]:
+    """🏆 상위 K개 후보 선택 (크기 K 힙 사용, 점수 내림차순)
+
+    k가 None이면 전체 정렬과 동일하다. 동점은 입력 순서를 유지한다.
+    """
+    if k is None or k >= len(candidates):
+        return sorted(candidates, key=key, reverse=True)
+    if k <= 0:
+        return []
+
+    return heapq.nlargest(k, candidates, key=key)
+
+def get_candidate_limit(available_slots: int) -> int:
+    """빈 슬롯 수에 맞는 후보 개수 (매수 실패 여유분 포함)"""
+    return max(0, available_slots) * CANDIDATE_OVERSAMPLE
+
+# ================================================================================
+# 루프 간 증분 스캔
+# ================================================================================
+
+@dataclass
+class ScanEvent:
+    """조건검색 결과 변경 이벤트 (added: 새로 편입, removed: 이탈)"""
+    kind: str
+    code: str
+    condition_seq: int
+    condition_name: str
+    timestamp: datetime = field(default_factory=market_now)
+
+class ConditionScanner:
+    """🔄 루프 간 조건검색 결과 비교 - 신규 종목만 전체 조회, 기존 종목은 시세만 갱신"""
+
+    def __init__(self, refresh_ttl: float = QUOTE_REFRESH_TTL, bulk_chunk: int = BULK_REFRESH_CHUNK):
+        self.refresh_ttl = refresh_ttl
+        self.bulk_chunk = bulk_chunk
+
+        self.previous_codes: Dict[int, Set[str]] = {}   # 조건식별 직전 결과
+        self.info_cache: Dict[str, Dict[str, Any]] = {} # 종목코드 → 종목 정보 (name, price, amount)
+        self.refreshed_at: Dict[str, float] = {}        # 종목코드 → 마지막 시세 갱신 시각
+        self.listeners: List[Callable[[ScanEvent], None]] = []
+        self.negative_cache = NegativeCache()           # 조회 실패 종목 재시도 대기 (지수 백오프)
+
+        self.scan_count = 0
+        self.last_events: List[ScanEvent] = []
+        self.last_stats: Dict[str, int] = {}
+
+    def add_listener(self, callback: Callable[[ScanEvent], None]):
+        """편입/이탈 이벤트 수신 함수 등록"""
+        self.listeners.append(callback)
+
+    def update(self, merger: CandidateMerger) -> List[ScanEvent]:
+        """📡 이번 조건검색 결과를 직전 결과와 비교하여 편입/이탈 이벤트 생성"""
+        events = []
+        current_codes: Dict[int, Set[str]] = {seq: set() for seq in merger.condition_order}
+        for match in merger.matches.values():
+            for seq in match.condition_seqs:
+                current_codes[seq].add(match.code)
+
+        # 결과가 없었던 조건식은 조회 실패일 수 있으므로 직전 결과 유지
+        for seq, codes in current_codes.items():
+            previous = self.previous_codes.get(seq, set())
+            cond_name = merger.condition_names.get(seq, "")
+
+            for code in sorted(codes - previous):
+                events.append(ScanEvent("added", code, seq, cond_name))
+            for code in sorted(previous - codes):
+                events.append(ScanEvent("removed", code, seq, cond_name))
+
+            self.previous_codes[seq] = codes
+
+        # 어느 조건식에도 남지 않은 종목은 캐시에서 제거
+        active = set().union(*self.previous_codes.values()) if self.previous_codes else set()
+        for code in list(self.info_cache.keys()):
+            if code not in active:
+                self.info_cache.pop(code, None)
+                self.refreshed_at.pop(code, None)
+
+        self.scan_count += 1
+        self.last_events = events
+
+        for event in events:
+            for callback in self.listeners:
+                try:
+                    callback(event)
+                except Exception as e:
+                    print(f"[WARN] 스캔 이벤트 처리 실패: {e}", flush=True)
+
+        return events
+
+    def count_new(self, codes: List[str]) -> int:
+        """개별 조회가 필요한 신규 종목 수 (재시도 대기 종목 제외)"""
+        return len([c for c in codes if c not in self.info_cache and not self.negative_cache.should_skip(c)])
+
+    def enrich(self, codes: List[str],
+               fetch_info: Callable[[str], Dict[str, Any]],
+               fetch_bulk: Callable[[List[str]], Dict[str, Dict[str, Any]]] = None,
+               on_fetch: Callable[[str], None] = None) -> Dict[str, Dict[str, Any]]:
+        """🔍 종목 정보 확보 - 신규는 개별 조회, 오래된 기존 종목은 일괄 시세 갱신
+
+        fetch_info(code)는 이름/현재가/거래대금 전체를, fetch_bulk(codes)는
+        종목코드별 현재가/거래대금을 돌려준다. 조회 실패 종목은 결과에서 빠지고
+        네거티브 캐시에 올라 재시도 대기 동안 조회하지 않는다.
+        """
+        now = market_timestamp()
+        new_codes, backoff_codes = self.negative_cache.filter_codes(
+            [c for c in codes if c not in self.info_cache])
+        stale_codes = [c for c in codes if c in self.info_cache
+                       and now - self.refreshed_at.get(c, 0) >= self.refresh_ttl]
+
+        single_requests = 0
+        bulk_requests = 0
+
+        # 1. 기존 종목 시세 일괄 갱신 (실패분은 개별 조회로 대체)
+        fallback_codes = []
+        if stale_codes and fetch_bulk:
+            for i in range(0, len(stale_codes), self.bulk_chunk):
+                chunk = stale_codes[i:i + self.bulk_chunk]
+                bulk_requests += 1
+                quotes = fetch_bulk(chunk) or {}
+                for code in chunk:
+                    quote = quotes.get(code)
+                    if quote:
+                        self.info_cache[code].update(price=quote["price"], amount=quote["amount"])
+                        self.refreshed_at[code] = now
+                    else:
+                        fallback_codes.append(code)
+        else:
+            fallback_codes = stale_codes
+
+        # 2. 신규 종목 및 갱신 실패 종목 개별 조회
+        for code in new_codes + fallback_codes:
+            info = fetch_info(code)
+            single_requests += 1
+            if info:
+                self.info_cache[code] = dict(info)
+                self.refreshed_at[code] = now
+                self.negative_cache.record_success(code)
+            else:
+                self.info_cache.pop(code, None)
+                self.refreshed_at.pop(code, None)
+                self.negative_cache.record_failure(code)
+            if on_fetch:
+                on_fetch(code)
+
+        self.last_stats = {
+            "codes": len(codes),
+            "new": len(new_codes),
+            "refreshed": len(stale_codes),
+            "cached": len(codes) - len(new_codes) - len(backoff_codes) - len(stale_codes),
+            "backoff_skipped": len(backoff_codes),
+            "requests": single_requests + bulk_requests,
+            "requests_saved": max(0, len(codes) - single_requests - bulk_requests)
+        }
+
+        return {code: self.info_cache[code] for code in codes if code in self.info_cache}
+
+    def get_event_summary(self) -> Dict[str, int]:
+        """직전 스캔의 편입/이탈 종목 수 (종목 단위)"""
+        added = {e.code for e in self.last_events if e.kind == "added"}
+        removed = {e.code for e in self.last_events if e.kind == "removed"}
+        return {"added": len(added), "removed": len(removed)}
+
+# ================================================================================
+# 가격 기반 사전 필터
+# ================================================================================
+
+class PricePrefilter:
+    """💰 최근 가격으로 종목 조회 전 매수 불가 종목 제외 (직전 루프 시세 → 종목마스터 전일종가)"""
+
+    def __init__(self, tolerance: float = PREFILTER_PRICE_TOLERANCE):
+        self.tolerance = tolerance
+        self.master: Dict[str, Dict[str, Any]] = {}     # 종목코드 → {"name", "price"} (전일종가)
+        self.master_date: Optional[str] = None          # 종목마스터 로드 날짜 (YYYYMMDD)
+        self.last_stats: Dict[str, int] = {}
+
+    def needs_master(self) -> bool:
+        """오늘 종목마스터를 아직 불러오지 않았는지"""
+        return self.master_date != market_now().strftime('%Y%m%d')
+
+    def load_master(self, master: Dict[str, Dict[str, Any]]):
+        """종목마스터 등록 (비어 있으면 다음 루프에 재시도)"""
+        if not master:
+            return
+        self.master = master
+        self.master_date = market_now().strftime('%Y%m%d')
+
+    def get_last_known(self, code: str, known_infos: Dict[str, Dict[str, Any]] = None) -> Dict[str, Any]:
+        """최근 알려진 종목 정보 (없으면 빈 딕셔너리)"""
+        if known_infos and code in known_infos:
+            return known_infos[code]
+        return self.master.get(code, {})
+
+    def apply(self, codes: List[str], price_limit: int,
+              known_infos: Dict[str, Dict[str, Any]] = None,
+              excluded_codes: Set[str] = None,
+              name_filter: Callable[[str], bool] = None) -> List[str]:
+        """🔍 사전 필터 적용 - 가격을 모르는 종목은 통과시켜 조회 후 판단
+
+        known_infos는 직전 루프/일괄 시세 캐시, name_filter는 제외할 종목명이면 True를 돌려준다.
+        """
+        excluded_codes = excluded_codes or set()
+        known_infos = known_infos or {}
+        max_price = price_limit * (1 + self.tolerance) if price_limit > 0 else None
+
+        kept = []
+        stats = {"input": len(codes), "excluded": 0, "name_filtered": 0,
+                 "over_price": 0, "unknown_price": 0, "requests_saved": 0}
+
+        for code in codes:
+            last = self.get_last_known(code, known_infos)
+
+            if code in excluded_codes:
+                reason = "excluded"
+            elif name_filter and last.get("name") and name_filter(last["name"]):
+                reason = "name_filtered"
+            elif max_price is not None and last.get("price", 0) > max_price:
+                reason = "over_price"
+            else:
+                if not last.get("price"):
+                    stats["unknown_price"] += 1
+                kept.append(code)
+                continue
+
+            stats[reason] += 1
+            if code not in known_infos:
+                stats["requests_saved"] += 1   # 신규 종목이었다면 개별 조회 1회
+
+        stats["kept"] = len(kept)
+        self.last_stats = stats
+        return kept
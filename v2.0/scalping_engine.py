@@ -19,6 +19,13 @@ from typing import List, Dict, Any, Optional, Tuple
 
 # 🔥 누적 수익률 강화 VirtualMoneyManager 통합
 from virtual_money_manager import VirtualMoneyManager, VirtualTransaction
+from scalping_candidates import CandidateMerger, ConditionScanner, PricePrefilter, select_top_candidates
+from scalping_orders import OrderPipeline
+from scalping_liquidation import DeadlineLiquidator, FORCE_SELL_DEADLINE
+from exit_rules import ExitRuleSet, fixed_target_reason
+from position_sizing import optimize_allocation
+from market_clock import market_now, market_sleep, market_sleep_blocking
+from trading_calendar import get_trading_calendar
 
 # ================================================================================
 # 환경설정 및 상수 (API 관련만)
@@ -35,6 +42,15 @@ FORCE_SELL_HOUR = 15           # 15:10 강제 청산
 FORCE_SELL_MINUTE = 10
 LOOP_INTERVAL = 300            # 5분(300초) 간격
 
+# 자금 구간별 전략: (최소 자금, 종목당 상한, 자금 분할 수, 최대 종목 수, 이름)
+CAPITAL_TIERS = [
+    (2_000_000, 400_000, 5, 6, "🚀 대형 전략"),   # 200만원 이상: 40만원 또는 1/5
+    (1_000_000, 200_000, 5, 5, "📈 중형 전략"),   # 100만원 이상: 20만원 또는 1/5
+    (500_000, 100_000, 5, 5, "📊 일반 전략"),     # 50만원 이상: 10만원 또는 1/5
+    (200_000, 50_000, 4, 4, "⚠️  소형 전략"),     # 20만원 이상: 5만원 또는 1/4
+    (0, 30_000, 3, 3, "🔴 최소 전략")             # 20만원 미만: 3만원 또는 1/3
+]
+
 # 출력 인코딩 설정
 if hasattr(sys.stdout, "reconfigure"):
     sys.stdout.reconfigure(line_buffering=True)
@@ -75,7 +91,9 @@ def is_trading_time_safe():
     if is_test_mode():
         return True
     
-    now = datetime.now()
+    now = market_now()
+    if not get_trading_calendar().is_trading_day(now.date()):
+        return False
     return TRADING_START_HOUR <= now.hour < TRADING_END_HOUR
 
 def is_force_sell_time_safe():
@@ -83,8 +101,8 @@ def is_force_sell_time_safe():
     if is_test_mode():
         return False
     
-    now = datetime.now()
-    return now.hour >= FORCE_SELL_HOUR and now.minute >= FORCE_SELL_MINUTE
+    now = market_now()
+    return (now.hour, now.minute) >= (FORCE_SELL_HOUR, FORCE_SELL_MINUTE)
 
 # ================================================================================
 # 토큰 관리 시스템
@@ -111,14 +129,14 @@ def get_token_info():
         return {
             "issued_at": issued_at,
             "expired_time": expired_time,
-            "remaining_hours": (expired_time - datetime.now()).total_seconds() / 3600
+            "remaining_hours": (expired_time - market_now()).total_seconds() / 3600
         }
     except Exception:
         return None
 
 def should_refresh_token():
     """토큰 재발급 필요 여부 종합 판단"""
-    now = datetime.now()
+    now = market_now()
     
     # 1. 8시 50분 ~ 8시 55분 정기 재발급
     morning_refresh = now.replace(hour=8, minute=50, second=0, microsecond=0)
@@ -164,7 +182,7 @@ def load_access_token(token_path=TOKEN_FILE):
     issued_at = datetime.strptime(issued_at_str, "%Y-%m-%d %H:%M:%S")
     expired_time = issued_at + timedelta(seconds=int(expires_in))
     
-    if datetime.now() > expired_time:
+    if market_now() > expired_time:
         raise ValueError(f"토큰이 만료되었습니다. (만료시각: {expired_time.strftime('%Y-%m-%d %H:%M:%S')})")
     
     return access_token
@@ -215,7 +233,7 @@ def get_valid_access_token():
         return new_token
     else:
         # 상태 정보 출력 (너무 자주 출력하지 않도록 조건부)
-        now = datetime.now()
+        now = market_now()
         if now.minute % 30 == 0 and now.second < 30:  # 30분마다 한 번씩만
             print(f"[토큰 상태] {reason}", flush=True)
         return load_access_token()
@@ -229,7 +247,7 @@ def ensure_token_for_full_trading_day():
     # 토큰 정보 상세 출력
     token_info = get_token_info()
     if token_info:
-        now = datetime.now()
+        now = market_now()
         market_end = now.replace(hour=15, minute=30, second=0, microsecond=0)
         
         print(f"[토큰 정보] 📅 발급: {token_info['issued_at'].strftime('%m/%d %H:%M')}, "
@@ -300,6 +318,83 @@ def get_stock_info(stock_code: str, token: str) -> Dict[str, Any]:
     except Exception:
         return {}
 
+def get_stock_infos_bulk(stock_codes: List[str], token: str) -> Dict[str, Dict[str, Any]]:
+    """여러 종목 시세 일괄 조회 (관심종목정보 ka10095) - 종목코드별 이름, 현재가, 누적 거래량, 거래대금"""
+    if not stock_codes:
+        return {}
+    
+    url = "https://api.kiwoom.com/api/dostk/stkinfo"
+    headers = {
+        "Content-Type": "application/json;charset=UTF-8",
+        "authorization": f"Bearer {token}",
+        "api-id": "ka10095"
+    }
+    body = {"stk_cd": "|".join(code.replace("A", "").zfill(6) for code in stock_codes)}
+    
+    data = make_api_call_with_retry(url, headers, body, stock_codes[0])
+    if not data:
+        return {}
+    
+    results = {}
+    for item in data.get("atn_stk_infr", []):
+        try:
+            code = normalize_code(str(item.get("stk_cd", "")).split("_")[0])
+            price = int(str(item.get("cur_prc", "0")).replace("+", "").replace("-", "").replace(",", ""))
+            qty = int(str(item.get("trde_qty", "0")).replace(",", ""))
+            
+            results[code] = {
+                "name": item.get("stk_nm", ""),
+                "price": price,
+                "volume": qty,
+                "amount": price * qty
+            }
+        except Exception:
+            continue
+    
+    return results
+
+def get_stock_master(token: str, markets: Tuple[str, ...] = ("0", "10")) -> Dict[str, Dict[str, Any]]:
+    """종목마스터 조회 (종목정보 리스트 ka10099) - 종목코드별 이름, 전일종가 (0:코스피, 10:코스닥)"""
+    url = "https://api.kiwoom.com/api/dostk/stkinfo"
+    master = {}
+    
+    for market in markets:
+        cont_yn, next_key = "N", ""
+        
+        for _ in range(50):  # 연속조회 안전장치
+            headers = {
+                "Content-Type": "application/json;charset=UTF-8",
+                "authorization": f"Bearer {token}",
+                "api-id": "ka10099",
+                "cont-yn": cont_yn,
+                "next-key": next_key
+            }
+            
+            try:
+                r = requests.post(url, headers=headers, json={"mrkt_tp": market}, timeout=15)
+                if r.status_code != 200:
+                    break
+                data = r.json()
+            except Exception as e:
+                print(f"[WARN] 종목마스터 조회 실패 (시장 {market}): {e}", flush=True)
+                break
+            
+            for item in data.get("list", []):
+                try:
+                    master[normalize_code(item.get("code", ""))] = {
+                        "name": item.get("name", ""),
+                        "price": int(str(item.get("lastPrice", "0")).replace(",", "") or 0)
+                    }
+                except Exception:
+                    continue
+            
+            if r.headers.get("cont-yn") != "Y":
+                break
+            cont_yn, next_key = "Y", r.headers.get("next-key", "")
+            time.sleep(0.3)
+    
+    return master
+
 def get_current_price(stock_code: str, token: str) -> int:
     """현재가 조회"""
     info = get_stock_info(stock_code, token)
@@ -363,41 +458,22 @@ async def get_condition_codes(seq: int, token: str) -> Tuple[List[str], str]:
 # ================================================================================
 
 class TradingStrategy:
-    """🔥 VirtualMoneyManager와 연동된 동적 전략 조정"""
+    """🔥 VirtualMoneyManager와 연동된 동적 전략 조정 (tiers로 자금 구간 교체 가능)"""
     
-    def __init__(self):
-        self.last_update_time = datetime.now()
+    def __init__(self, tiers: List[Tuple[int, int, int, int, str]] = None):
+        self.tiers = sorted(tiers or CAPITAL_TIERS, key=lambda tier: tier[0], reverse=True)
+        self.last_update_time = market_now()
     
     def update_strategy_based_on_capital(self, current_capital: int) -> Tuple[int, int]:
         """🔥 자금 상황에 따른 전략 동적 조정 (VirtualMoneyManager 기준)"""
         
-        if current_capital >= 2_000_000:  # 200만원 이상 (대형)
-            position_value = min(400_000, current_capital // 5)  # 40만원 또는 1/5
-            max_positions = 6
-            strategy_name = "🚀 대형 전략"
-            
-        elif current_capital >= 1_000_000:  # 100만원 이상 (중형)
-            position_value = min(200_000, current_capital // 5)  # 20만원 또는 1/5
-            max_positions = 5
-            strategy_name = "📈 중형 전략"
-            
-        elif current_capital >= 500_000:  # 50만원 이상 (일반)
-            position_value = min(100_000, current_capital // 5)  # 10만원 또는 1/5  
-            max_positions = 5
-            strategy_name = "📊 일반 전략"
-            
-        elif current_capital >= 200_000:  # 20만원 이상 (소형)
-            position_value = min(50_000, current_capital // 4)   # 5만원 또는 1/4
-            max_positions = 4
-            strategy_name = "⚠️  소형 전략"
-            
-        else:  # 20만원 미만 (최소)
-            position_value = min(30_000, current_capital // 3)   # 3만원 또는 1/3
-            max_positions = 3
-            strategy_name = "🔴 최소 전략"
+        # 자금 이상인 첫 구간: 종목당 min(상한, 자금 // 분할), 최대 종목 수
+        tier = next((t for t in self.tiers if current_capital >= t[0]), self.tiers[-1])
+        _, position_cap, divisor, max_positions, strategy_name = tier
+        position_value = min(position_cap, current_capital // divisor)
         
         # 전략 변경 알림 (5분마다 한 번씩만)
-        now = datetime.now()
+        now = market_now()
         if (now - self.last_update_time).total_seconds() > 300:  # 5분
             print(f"[전략 조정] {strategy_name}: 종목당 {position_value:,}원, 최대 {max_positions}종목")
             self.last_update_time = now
@@ -417,7 +493,7 @@ class Position:
         self.buy_price = buy_price
         self.quantity = quantity
         self.condition_seq = condition_seq
-        self.buy_time = datetime.now()
+        self.buy_time = market_now()
         self.cost = buy_price * quantity
         self.buy_amount = buy_amount  # 매수시점 거래대금
         self.virtual_transaction = virtual_transaction  # 🔥 VirtualTransaction 연결
@@ -436,13 +512,8 @@ class Position:
     def should_exit(self, current_price: int, profit_target: float, stop_loss: float) -> Tuple[bool, str]:
         """청산 조건 체크 (VirtualMoneyManager의 설정 사용)"""
         _, profit_rate = self.get_profit_loss(current_price)
-        
-        if profit_rate >= profit_target:
-            return True, "익절"
-        elif profit_rate <= stop_loss:
-            return True, "손절"
-        
-        return False, ""
+        reason = fixed_target_reason(profit_rate, profit_target, stop_loss)
+        return bool(reason), reason
 
 # ================================================================================
 # 🔥 V3.2 ScalpingEngine 클래스 (스마트 자동 매수 시스템 통합)
@@ -451,20 +522,35 @@ class Position:
 class ScalpingEngine:
     """🔥 V3.2 스마트 자동 매수 시스템이 통합된 단타 매매 엔진"""
     
-    def __init__(self, log_dir: str = None):
-        # 🔥 VirtualMoneyManager로 모든 자금 및 전략 관리
-        self.money_manager = VirtualMoneyManager(500_000, "virtual_money_data")
+    def __init__(self, log_dir: str = None, money_manager: VirtualMoneyManager = None,
+                 trading_strategy: "TradingStrategy" = None, exit_rules: ExitRuleSet = None,
+                 optimize_sizing: bool = True, monitor_only: bool = False):
+        # 🔥 VirtualMoneyManager로 모든 자금 및 전략 관리 (모의 실행은 별도 저장소 주입)
+        self.money_manager = money_manager or VirtualMoneyManager(500_000, "virtual_money_data")
         
         # 🔥 동적 전략 조정 시스템 (VirtualMoneyManager와 연동)
-        self.trading_strategy = TradingStrategy()
+        self.trading_strategy = trading_strategy or TradingStrategy()
+        
+        # 🚪 익절/손절 외 추가 청산 규칙 (트레일링 스탑, 시간 청산 등 - 없으면 None)
+        self.exit_rules = exit_rules
+        
+        # 💎 빈 슬롯 자금 배분 최적화 (False면 슬롯마다 position_value // 가격)
+        self.optimize_sizing = optimize_sizing
+        
+        # 👀 모니터링 전용 (조건검색 결과만 분석, 매수/매도 없음)
+        self.monitor_only = monitor_only
         
         self.positions: List[Position] = []
         self.traded_today: set = set()  # 오늘 거래한 종목들
         
+        # 🔄 루프 간 조건검색 결과 증분 추적 (신규 종목만 전체 조회)
+        self.condition_scanner = ConditionScanner()
+        self.price_prefilter = PricePrefilter()
+        
         # 로그 설정
         if log_dir:
             ensure_parent_dir(log_dir)
-            self.log_file = os.path.join(log_dir, f"scalping_log_{datetime.now().strftime('%Y%m%d')}.txt")
+            self.log_file = os.path.join(log_dir, f"scalping_log_{market_now().strftime('%Y%m%d')}.txt")
         else:
             self.log_file = None
         
@@ -473,7 +559,7 @@ class ScalpingEngine:
     
     def log_activity(self, message: str):
         """활동 로그 기록"""
-        timestamp = datetime.now().strftime("%H:%M:%S")
+        timestamp = market_now().strftime("%H:%M:%S")
         log_entry = f"[{timestamp}] {message}"
         
         print(log_entry, flush=True)
@@ -507,6 +593,7 @@ class ScalpingEngine:
     
     def buy_available_stocks_smartly(self, candidates: List[Dict], target_count: int) -> int:
         """🚀 스마트 자동 매수: 실패 시 다음 종목 자동 시도"""
+        candidates = self.plan_candidate_sizes(candidates, target_count)
         bought_count = 0
         attempt_count = 0
         max_attempts = min(len(candidates), target_count * 3)  # 최대 3배까지 시도
@@ -533,7 +620,7 @@ class ScalpingEngine:
             success = self.buy_stock(
                 candidate["code"], candidate["name"], 
                 candidate["price"], candidate["condition_seq"], 
-                candidate["amount"]
+                candidate["amount"], target_amount=candidate.get("target_amount")
             )
             
             if success:
@@ -551,42 +638,64 @@ class ScalpingEngine:
         
         return bought_count
     
-    def get_optimized_candidate_order(self, candidates: List[Dict]) -> List[Dict]:
-        """💎 가격대별 최적화된 매수 순서 결정"""
+    async def buy_available_stocks_concurrently(self, candidates: List[Dict], target_count: int,
+                                                token: str = None) -> int:
+        """🚀 동시 매수: 빈 슬롯마다 자금을 예약하고 병렬 진행 (실패 슬롯은 다음 종목 즉시 시도)
+        
+        token이 있으면 주문 직전 현재가를 병렬로 확인해 그 가격으로 체결한다.
+        """
         position_value, _ = self.update_trading_strategy()
+        candidates = self.plan_candidate_sizes(candidates, target_count)
         
-        # 가격대별 분류
-        affordable = []         # 적정 가격대 (목표금액의 50-100%)
-        very_affordable = []    # 저렴한것 (50% 이하)
-        expensive = []          # 비싼것 (100-200%)
-        too_expensive = []      # 너무비싼것 (200% 이상)
+        def place_order(candidate: Dict, reservation_id: str, price: int) -> bool:
+            return self.buy_stock(candidate["code"], candidate["name"], price,
+                                  candidate["condition_seq"], candidate["amount"], reservation_id)
         
-        for candidate in candidates:
-            # 100주 기준 비용 vs 목표 투자금액 비율
-            estimated_cost = candidate["price"] * 100
-            cost_ratio = estimated_cost / position_value if position_value > 0 else 99999
-            
-            if cost_ratio <= 0.5:
-                very_affordable.append(candidate)
-            elif cost_ratio <= 1.0:
-                affordable.append(candidate)
-            elif cost_ratio <= 2.0:
-                expensive.append(candidate)
-            else:
-                too_expensive.append(candidate)
+        pipeline = OrderPipeline(
+            self.money_manager, place_order,
+            quote=(lambda code: get_current_price(code, token)) if token else None,
+            precheck=self.can_buy_stock
+        )
+        
+        self.log_activity(f"🚀 동시 매수 시작: 목표 {target_count}개, 후보 {len(candidates)}개")
+        results = await pipeline.run(candidates, target_count, position_value)
+        summary = pipeline.get_summary()
         
-        # 🎯 우선순위: 적정가격 → 저렴 → 비쌈 → 초과
-        optimized_order = []
-        optimized_order.extend(affordable)      # 1순위: 가장 이상적
-        optimized_order.extend(very_affordable) # 2순위: 자금 효율성 좋음
-        optimized_order.extend(expensive)       # 3순위: 가능하지만 비효율
-        optimized_order.extend(too_expensive)   # 4순위: 최후의 수단
+        for result in results:
+            if not result.success:
+                self.log_activity(f"❌ 매수 불가: {result.name} - {result.reason}")
         
-        if len(candidates) > 0:
-            self.log_activity(f"📊 가격대별 분류: 적정 {len(affordable)}개, 저렴 {len(very_affordable)}개, "
-                             f"비쌈 {len(expensive)}개, 초과 {len(too_expensive)}개")
+        self.log_activity(f"🎯 동시 매수 완료: {summary['filled']}개 성공 / {summary['attempts']}개 시도 "
+                          f"(최장 {summary['max_elapsed']:.2f}초)")
         
-        return optimized_order
+        if summary['attempts'] > summary['filled']:
+            self.print_buy_failure_analysis(candidates[:summary['attempts']])
+        
+        return summary['filled']
+    
+    def get_optimized_candidate_order(self, candidates: List[Dict]) -> List[Dict]:
+        """💎 자금 배분 최적화된 매수 순서 결정 (빈 슬롯 전체 기준)"""
+        _, max_positions = self.update_trading_strategy()
+        return self.plan_candidate_sizes(candidates, max_positions - len(self.positions))
+    
+    def plan_candidate_sizes(self, candidates: List[Dict], slots: int) -> List[Dict]:
+        """💎 빈 슬롯 자금 배분 → 배분된 후보(target_amount 포함)를 순위 순으로 먼저, 나머지는 예비로 뒤에"""
+        if not self.optimize_sizing or slots <= 0 or not candidates:
+            return candidates
+        
+        position_value, _ = self.update_trading_strategy()
+        eligible = [c for c in candidates if normalize_code(c["code"]) not in self.traded_today]
+        plan = optimize_allocation(eligible, slots, self.money_manager.free_cash, position_value)
+        if not plan.allocations:
+            return candidates
+        
+        planned_ids = {id(a.candidate) for a in plan.allocations}
+        planned = [dict(a.candidate, target_amount=a.amount) for a in plan.allocations]
+        rest = [c for c in candidates if id(c) not in planned_ids]
+        
+        self.log_activity(f"💎 자금 배분: {len(planned)}개 종목 {plan.deployed:,}원 / 예산 {plan.budget:,}원 "
+                          f"({plan.utilization:.1f}%, 잔여 {plan.idle:,}원)")
+        return planned + rest
     
     def analyze_buy_failures(self, candidates: List[Dict]) -> Dict[str, int]:
         """📊 매수 실패 원인 분석"""
@@ -630,8 +739,8 @@ class ScalpingEngine:
     # 매수/매도 핵심 로직 (VirtualMoneyManager 연동)
     # =========================================================================
     
-    def can_buy_stock(self, code: str) -> Tuple[bool, str]:
-        """매수 가능 여부 확인"""
+    def can_buy_stock(self, code: str, has_reservation: bool = False) -> Tuple[bool, str]:
+        """매수 가능 여부 확인 (자금을 이미 예약한 주문은 자금 체크 생략)"""
         code = normalize_code(code)
         
         # 동적 전략 업데이트
@@ -647,27 +756,37 @@ class ScalpingEngine:
         
         # 3. 자금 부족? (VirtualMoneyManager의 자동 조정 활용)
         min_required = min(10_000, position_value)
-        if not self.money_manager.can_afford(min_required):
+        if not has_reservation and not self.money_manager.can_afford(min_required):
             return False, "자금부족"
         
         return True, "매수가능"
     
-    def buy_stock(self, code: str, name: str, price: int, condition_seq: int = 0, buy_amount: int = 0) -> bool:
-        """🔥 가상 매수 실행 (VirtualMoneyManager 사용)"""
+    def buy_stock(self, code: str, name: str, price: int, condition_seq: int = 0, buy_amount: int = 0,
+                  reservation_id: str = None, target_amount: int = None) -> bool:
+        """🔥 가상 매수 실행 (VirtualMoneyManager 사용, reservation_id가 있으면 예약 자금으로 확정)
+        
+        target_amount는 자금 배분 최적화가 정한 주문 금액 (없으면 전략의 종목당 금액).
+        """
         code = normalize_code(code)
         
-        can_buy, reason = self.can_buy_stock(code)
+        can_buy, reason = self.can_buy_stock(code, has_reservation=reservation_id is not None)
         if not can_buy:
             self.log_activity(f"❌ 매수 실패 {name}({code}): {reason}")
             return False
         
         # 동적 투자 금액 결정
         position_value, _ = self.update_trading_strategy()
+        position_value = target_amount or position_value
         
         # VirtualMoneyManager로 매수 실행
-        virtual_transaction = self.money_manager.execute_virtual_buy(
-            code, name, price, position_value, condition_seq
-        )
+        if reservation_id:
+            virtual_transaction = self.money_manager.commit_reservation(
+                reservation_id, code, name, price, condition_seq, position_value
+            )
+        else:
+            virtual_transaction = self.money_manager.execute_virtual_buy(
+                code, name, price, position_value, condition_seq
+            )
         
         if not virtual_transaction:
             self.log_activity(f"❌ 매수 실패 {name}({code}): VirtualMoneyManager 오류")
@@ -709,6 +828,8 @@ class ScalpingEngine:
         
         # 포지션 제거
         self.positions.remove(position)
+        if self.exit_rules is not None:
+            self.exit_rules.detach(position)
         
         # 누적 수익률 정보와 함께 로그
         portfolio = self.money_manager.get_portfolio_value()
@@ -723,58 +844,125 @@ class ScalpingEngine:
     
     def check_exit_conditions(self, token: str) -> int:
         """청산 조건 체크 및 실행 (VirtualMoneyManager 설정 사용)"""
-        if not self.positions:
-            return 0
+        return self.execute_exits(self.collect_exit_signals(token))
+    
+    def collect_exit_signals(self, token: str) -> List[Tuple[Position, int, str]]:
+        """청산 대상 수집 (시세 조회만, 장부 변경 없음) - 작업 스레드에서 호출 가능"""
+        positions = list(self.positions)
+        if not positions:
+            self.money_manager.record_equity([], {})
+            return []
         
-        exit_count = 0
         positions_to_exit = []
         
         # VirtualMoneyManager에서 익절/손절 설정 가져오기
         profit_target = getattr(self.money_manager, 'profit_target', 5.0)
         stop_loss = getattr(self.money_manager, 'stop_loss', -5.0)
         
+        # 보유 종목 일괄 시세 (누락분은 개별 조회)
+        try:
+            infos = get_stock_infos_bulk([p.code for p in positions], token)
+        except Exception:
+            infos = {}
+        quotes = {code: info["price"] for code, info in infos.items()}
+        
         # 현재가 조회 및 청산 조건 체크
-        for position in self.positions:
+        for position in positions:
             try:
-                current_price = get_current_price(position.code, token)
+                current_price = quotes.get(position.code, 0) or get_current_price(position.code, token)
                 if current_price > 0:
-                    should_exit, exit_reason = position.should_exit(current_price, profit_target, stop_loss)
+                    quotes[position.code] = current_price
+                    amount = infos.get(position.code, {}).get("amount")
+                    should_exit, exit_reason = self.exit_signal(position, current_price, amount,
+                                                                profit_target, stop_loss)
                     if should_exit:
                         positions_to_exit.append((position, current_price, exit_reason))
             except Exception as e:
                 self.log_activity(f"⚠️  {position.name} 현재가 조회 실패: {e}")
         
-        # 청산 실행
+        # 📈 조회한 시세로 장중 평가금액 기록
+        self.money_manager.record_equity(positions, quotes)
+        
+        return positions_to_exit
+    
+    def exit_signal(self, position: Position, current_price: int, amount: Optional[int],
+                    profit_target: float, stop_loss: float) -> Tuple[bool, str]:
+        """익절/손절 → 추가 청산 규칙 순서로 판정"""
+        should_exit, exit_reason = position.should_exit(current_price, profit_target, stop_loss)
+        if not should_exit and self.exit_rules is not None:
+            should_exit, exit_reason = self.exit_rules.check(position, current_price, amount)
+        return should_exit, exit_reason
+    
+    def on_price_tick(self, code: str, current_price: int, amount: Optional[int] = None) -> int:
+        """실시간 체결 1건 → 해당 종목 보유분만 청산 판정 후 즉시 매도 (매도 건수 반환)"""
+        code = normalize_code(code)
+        positions = [p for p in self.positions if p.code == code]
+        if not positions or current_price <= 0:
+            return 0
+        
+        profit_target = getattr(self.money_manager, 'profit_target', 5.0)
+        stop_loss = getattr(self.money_manager, 'stop_loss', -5.0)
+        positions_to_exit = []
+        for position in positions:
+            should_exit, exit_reason = self.exit_signal(position, current_price, amount, profit_target, stop_loss)
+            if should_exit:
+                positions_to_exit.append((position, current_price, exit_reason))
+        return self.execute_exits(positions_to_exit)
+    
+    def execute_exits(self, positions_to_exit: List[Tuple[Position, int, str]]) -> int:
+        """수집된 청산 대상 매도 (이미 정리된 포지션은 sell_position에서 건너뜀)"""
+        exit_count = 0
         for position, current_price, reason in positions_to_exit:
             if self.sell_position(position, current_price, reason):
                 exit_count += 1
         
         return exit_count
     
-    def force_sell_all(self, token: str) -> int:
-        """강제 청산 (15:10)"""
+    def force_sell_all(self, token: str, deadline_seconds: float = FORCE_SELL_DEADLINE) -> int:
+        """강제 청산 (15:10) - 일괄 시세 + 동시 매도, 마감 시한까지 재시도 후 한 번에 반영"""
         if not self.positions:
             return 0
         
-        self.log_activity("🚨 강제 청산 시작 (15:10)")
+        self.log_activity(f"🚨 강제 청산 시작 (15:10, 시한 {deadline_seconds:.1f}초)")
         
-        force_sell_count = 0
-        positions_copy = self.positions.copy()
+        liquidator = DeadlineLiquidator(
+            fetch_quote=lambda code: get_current_price(code, token),
+            fetch_quotes=lambda codes: {code: info["price"] for code, info in get_stock_infos_bulk(codes, token).items()},
+            submit_sell=lambda position, price: position in self.positions and position.virtual_transaction is not None,
+            apply_fills=self._apply_liquidation_fills,
+            deadline_seconds=deadline_seconds
+        )
+        report = liquidator.run(self.positions.copy())
+        report.print_report()
         
-        for position in positions_copy:
-            try:
-                current_price = get_current_price(position.code, token)
-                if current_price > 0:
-                    if self.sell_position(position, current_price, "강제청산"):
-                        force_sell_count += 1
-            except Exception as e:
-                self.log_activity(f"⚠️  {position.name} 강제청산 실패: {e}")
+        for outcome in report.unsold:
+            self.log_activity(f"⚠️  {outcome.name} 강제청산 실패: {outcome.error or '시한 초과'}")
         
         # 하루 마감 처리
         self.money_manager.finalize_day()
         
-        self.log_activity(f"🚨 강제 청산 완료: {force_sell_count}건")
-        return force_sell_count
+        self.log_activity(f"🚨 강제 청산 완료: {report.sold_count}건 ({report.elapsed:.2f}초)")
+        return report.sold_count
+    
+    def _apply_liquidation_fills(self, fills: List[Tuple[Position, int]]) -> Dict[str, int]:
+        """강제 청산 체결분 일괄 반영 (거래 저장 1회) - 반영된 종목만 종목코드별 손익 반환"""
+        orders = [(position.virtual_transaction, price, "강제청산") for position, price in fills]
+        sell_transactions = self.money_manager.execute_virtual_sells_batch(orders)
+        
+        profits = {}
+        for (position, price), sell_transaction in zip(fills, sell_transactions):
+            if sell_transaction is None:
+                continue
+            self.positions.remove(position)
+            if self.exit_rules is not None:
+                self.exit_rules.detach(position)
+            profits[position.code] = sell_transaction.profit_amount
+            
+            emoji = "🟢" if sell_transaction.profit_amount > 0 else "🔴"
+            self.log_activity(f"{emoji} 매도 {position.name}({position.code}) "
+                             f"{position.buy_price:,}→{price:,} "
+                             f"({sell_transaction.profit_rate:+.2f}%) 강제청산")
+        return profits
     
     def get_portfolio_status(self) -> Dict[str, Any]:
         """🔥 포트폴리오 현황 (VirtualMoneyManager에서 가져오기)"""
@@ -922,7 +1110,7 @@ def print_detailed_positions_table(engine: ScalpingEngine, token: str):
                 total_profit += profit_amount
                 
                 # 보유 시간 계산
-                hold_duration = datetime.now() - pos.buy_time
+                hold_duration = market_now() - pos.buy_time
                 hold_minutes = int(hold_duration.total_seconds() / 60)
                 hold_time_str = f"{hold_minutes}분" if hold_minutes < 60 else f"{hold_minutes//60}시간{hold_minutes%60}분"
                 
@@ -1002,13 +1190,12 @@ def print_detailed_positions_table(engine: ScalpingEngine, token: str):
 # 🚀 스마트 매수 통합 조건검색 함수
 # ================================================================================
 
-async def find_scalping_targets(engine: ScalpingEngine, token: str, top_n: int = None) -> List[Dict]:
-    """단타 매수 대상 종목 검색 (기존 함수 유지)"""
-    all_candidates = []
-    
-    print(f"\n🔍 조건검색식 매수 대상 검색 시작...", flush=True)
+async def collect_condition_matches(token: str, top_n: int = None,
+                                    condition_seqs: List[int] = None) -> CandidateMerger:
+    """🔗 조건검색식 실행 후 종목 단위로 병합 (정보 조회 전 중복 제거) - condition_seqs가 없으면 전체"""
+    merger = CandidateMerger()
     
-    for seq in CONDITION_SEQ_LIST:
+    for seq in (CONDITION_SEQ_LIST if condition_seqs is None else condition_seqs):
         try:
             print(f"\n📡 조건검색식 {seq}번 실행 중...", flush=True)
             codes, cond_name = await get_condition_codes(seq, token)
@@ -1020,74 +1207,134 @@ async def find_scalping_targets(engine: ScalpingEngine, token: str, top_n: int =
             print(f"✅ 조건검색식 {seq}번 ({cond_name}) - {len(codes)}개 종목 발견", flush=True)
             
             # 처리할 종목 수 결정
-            if top_n is None:
-                process_count = len(codes)  # 전체 처리
-                print(f"📊 전체 {process_count}개 종목 처리 중...", flush=True)
-            else:
-                process_count = min(len(codes), top_n)
-                print(f"📊 상위 {process_count}개 종목 처리 중...", flush=True)
+            process_count = len(codes) if top_n is None else min(len(codes), top_n)
+            merger.add_condition_result(seq, cond_name, codes[:process_count])
             
-            # 종목 정보 수집 및 필터링
-            candidates = []
-            etf_count = 0
-            api_fail_count = 0
-            
-            for i, code in enumerate(codes[:process_count]):
-                if i > 0:
-                    time.sleep(0.1)  # API 호출 간격
-                
-                code = normalize_code(code)
-                info = get_stock_info(code, token)
-                
-                if not info:
-                    api_fail_count += 1
-                    print(f"  ❌ API 실패: {code}", flush=True)
-                    continue
-                
-                if is_etf_etn(info.get("name", "")):
-                    etf_count += 1
-                    print(f"  🚫 ETF/ETN 제외: {info.get('name', '')}({code})", flush=True)
-                    continue
-                
-                candidate = {
-                    "code": code,
-                    "name": info["name"],
-                    "price": info["price"],
-                    "amount": info["amount"],
-                    "condition_seq": seq,
-                    "condition_name": cond_name
-                }
-                candidates.append(candidate)
-                print(f"  ✅ 추가: {info['name']}({code}) - {info['amount']:,}원", flush=True)
-            
-            # 필터링 결과 요약
-            print(f"📊 필터링 결과: {process_count}개 처리 → {len(candidates)}개 유효 "
-                  f"(ETF제외: {etf_count}개, API실패: {api_fail_count}개)", flush=True)
-            
-            # 거래대금 순으로 정렬
-            candidates.sort(key=lambda x: x["amount"], reverse=True)
-            
-            # 조건검색식 결과 테이블 표시
-            print_condition_results_table(candidates, engine, seq, cond_name)
-            
-            # 매수 가능한 종목만 전체 후보에 추가
-            for candidate in candidates:
-                can_buy, reason = engine.can_buy_stock(candidate["code"])
-                if can_buy:
-                    all_candidates.append(candidate)
-                    
         except Exception as e:
             print(f"[WARN] 조건검색식 {seq} 실행 실패: {e}", flush=True)
         
-        time.sleep(0.5)  # 조건검색식 간 대기
+        await market_sleep(0.5)  # 조건검색식 간 대기 (이벤트 루프의 다른 작업은 계속 진행)
+    
+    summary = merger.get_summary()
+    if summary["total_hits"] > 0:
+        print(f"\n🔗 조건식 병합: 총 {summary['total_hits']}건 → 고유 {summary['unique_codes']}개 "
+              f"(중복 {summary['duplicates_removed']}건 제거, 다중조건 {summary['multi_condition_codes']}개)", flush=True)
+    
+    return merger
+
+def prefilter_condition_matches(prefilter: PricePrefilter, scanner: ConditionScanner, merger: CandidateMerger,
+                                token: str, price_limit: int, excluded_codes: set = None) -> List[str]:
+    """💰 가격 사전 필터 - 직전 루프 시세/종목마스터 가격으로 한도 초과·제외 종목을 조회 전에 제거"""
+    codes = merger.get_unique_codes()
+    if not codes:
+        return codes
+    
+    if prefilter.needs_master():
+        master = get_stock_master(token)
+        prefilter.load_master(master)
+        if master:
+            print(f"📚 종목마스터 로드: {len(master):,}개 종목 (전일종가 기준 사전 필터)", flush=True)
+    
+    kept = prefilter.apply(codes, price_limit, scanner.info_cache, excluded_codes, is_etf_etn)
+    
+    stats = prefilter.last_stats
+    if len(kept) < len(codes):
+        print(f"💰 사전 필터: {len(codes)}개 → {len(kept)}개 (가격초과 {stats['over_price']}개, "
+              f"ETF {stats['name_filtered']}개, 거래완료 {stats['excluded']}개) | "
+              f"개별 조회 {stats['requests_saved']}회 절약", flush=True)
+    
+    return kept
+
+def enrich_condition_matches(scanner: ConditionScanner, merger: CandidateMerger, token: str,
+                             on_fetch=None, codes: List[str] = None) -> Dict[str, Dict[str, Any]]:
+    """🔄 증분 스캔 - 편입/이탈 비교 후 신규 종목만 개별 조회, 기존 종목은 일괄 시세 갱신
+
+    codes를 주면 (사전 필터 통과 종목) 그 종목만 조회하고, 편입/이탈 비교는 전체 결과로 한다.
+    """
+    if codes is None:
+        codes = merger.get_unique_codes()
+    scanner.update(merger)
+    
+    fetch_count = 0
+    
+    def fetch_info(code: str) -> Dict[str, Any]:
+        nonlocal fetch_count
+        if fetch_count > 0:
+            market_sleep_blocking(0.1)  # API 호출 간격
+        fetch_count += 1
+        return get_stock_info(code, token)
+    
+    infos = scanner.enrich(codes, fetch_info, lambda chunk: get_stock_infos_bulk(chunk, token), on_fetch)
+    
+    if codes:
+        events = scanner.get_event_summary()
+        stats = scanner.last_stats
+        print(f"🔄 증분 스캔 #{scanner.scan_count}: 편입 {events['added']}개, 이탈 {events['removed']}개 | "
+              f"신규조회 {stats['new']}개, 시세갱신 {stats['refreshed']}개, 캐시 {stats['cached']}개, "
+              f"재시도대기 {stats['backoff_skipped']}개 (API {stats['requests']}회, {stats['requests_saved']}회 절약)", flush=True)
+    
+    return infos
+
+async def find_scalping_targets(engine: ScalpingEngine, token: str, top_n: int = None,
+                                max_candidates: int = None, condition_seqs: List[int] = None) -> List[Dict]:
+    """단타 매수 대상 종목 검색 (조건식 간 중복 제거 + 상위 max_candidates개 선택)
+
+    condition_seqs를 주면 그 조건검색식만 실행해, 상위 후보 선택 전에 조건이 걸러진다.
+    """
+    print(f"\n🔍 조건검색식 매수 대상 검색 시작...", flush=True)
+    
+    # 1. 조건검색식 실행 및 병합
+    merger = await collect_condition_matches(token, top_n, condition_seqs)
+    
+    # 2. 가격 사전 필터 후 고유 종목 정보 확보 (신규만 개별 조회) 및 필터링
+    candidates = []
+    etf_count = 0
+    api_fail_count = 0
+    
+    position_value, _ = engine.update_trading_strategy()
+    fetch_codes = prefilter_condition_matches(engine.price_prefilter, engine.condition_scanner, merger,
+                                              token, position_value, engine.traded_today)
+    
+    if fetch_codes:
+        print(f"📊 고유 {len(fetch_codes)}개 종목 처리 중...", flush=True)
+    
+    infos = enrich_condition_matches(engine.condition_scanner, merger, token, codes=fetch_codes)
+    
+    for code in fetch_codes:
+        info = infos.get(code)
+        
+        if not info:
+            api_fail_count += 1
+            print(f"  ❌ API 실패: {code}", flush=True)
+            continue
+        
+        if is_etf_etn(info.get("name", "")):
+            etf_count += 1
+            print(f"  🚫 ETF/ETN 제외: {info.get('name', '')}({code})", flush=True)
+            continue
+        
+        candidate = merger.build_candidate(code, info)
+        candidates.append(candidate)
+        print(f"  ✅ 추가: {info['name']}({code}) - {info['amount']:,}원 "
+              f"(조건 {','.join(map(str, candidate['matched_conditions']))})", flush=True)
+    
+    if fetch_codes:
+        print(f"📊 필터링 결과: {len(fetch_codes)}개 처리 → {len(candidates)}개 유효 "
+              f"(ETF제외: {etf_count}개, API실패: {api_fail_count}개)", flush=True)
+    
+    # 3. 조건검색식별 결과 테이블 표시
+    for seq, seq_candidates in merger.group_by_condition(candidates).items():
+        print_condition_results_table(seq_candidates, engine, seq, merger.condition_names.get(seq, ""))
     
-    # 전체 후보 거래대금 순으로 정렬
-    all_candidates.sort(key=lambda x: x["amount"], reverse=True)
+    # 4. 매수 가능한 종목 중 상위 후보 선택 (다중 조건 점수 순)
+    buyable = [c for c in candidates if engine.can_buy_stock(c["code"])[0]]
+    all_candidates = select_top_candidates(buyable, max_candidates)
     
     if all_candidates:
-        print(f"\n🎯 최종 매수 후보: {len(all_candidates)}개 종목 (거래대금 순)", flush=True)
+        print(f"\n🎯 최종 매수 후보: {len(all_candidates)}개 종목 (매수가능 {len(buyable)}개 중, 다중조건 점수 순)", flush=True)
         for i, candidate in enumerate(all_candidates[:5], 1):
-            print(f"  {i}. {candidate['name']} - {candidate['amount']:,}원 (조건{candidate['condition_seq']})", flush=True)
+            conditions = ",".join(map(str, candidate["matched_conditions"]))
+            print(f"  {i}. {candidate['name']} - {candidate['amount']:,}원 (조건{conditions})", flush=True)
     else:
         print(f"\n📝 매수 가능한 종목이 없습니다.", flush=True)
     
@@ -1132,7 +1379,7 @@ if __name__ == "__main__":
                 if available_positions > 0:
                     # 🚀 스마트 자동 매수 실행 (실패 시 자동으로 다음 종목 시도)
                     target_count = min(available_positions, 3)  # 테스트용으로 최대 3개
-                    bought_count = engine.buy_available_stocks_smartly(optimized_candidates, target_count)
+                    bought_count = await engine.buy_available_stocks_concurrently(optimized_candidates, target_count, token)
                     
                     print(f"🎯 스마트 매수 테스트 결과: {bought_count}개 성공")
                 else:
@@ -19,6 +19,9 @@ from typing import List, Dict, Any, Optional, Tuple
 
 # 🔥 누적 수익률 강화 VirtualMoneyManager 통합
 from virtual_money_manager import VirtualMoneyManager, VirtualTransaction
+from market_clock import market_now
+from exit_rules import fixed_target_reason
+from trading_calendar import get_trading_calendar
 
 # ================================================================================
 # 환경설정 및 상수
@@ -427,13 +430,8 @@ class Position:
     def should_exit(self, current_price: int) -> Tuple[bool, str]:
         """청산 조건 체크"""
         _, profit_rate = self.get_profit_loss(current_price)
-        
-        if profit_rate >= PROFIT_TARGET:
-            return True, "익절"
-        elif profit_rate <= STOP_LOSS:
-            return True, "손절"
-        
-        return False, ""
+        reason = fixed_target_reason(profit_rate, PROFIT_TARGET, STOP_LOSS)
+        return bool(reason), reason
 
 # ================================================================================
 # 🔥 V3.1 핵심: ScalpingEngine 클래스 (누적 수익률 강화 VirtualMoneyManager 완전 통합)
@@ -965,7 +963,9 @@ def is_trading_time_safe():
         print("[테스트 모드] ⚡ 시간 제약 무시 - 매매 실행", flush=True)
         return True
     
-    now = datetime.now()
+    now = market_now()
+    if not get_trading_calendar().is_trading_day(now.date()):
+        return False
     return TRADING_START_HOUR <= now.hour < TRADING_END_HOUR
 
 def is_force_sell_time_safe():
@@ -974,8 +974,8 @@ def is_force_sell_time_safe():
         print("[테스트 모드] ⚡ 강제청산 방지", flush=True)
         return False
     
-    now = datetime.now()
-    return now.hour >= FORCE_SELL_HOUR and now.minute >= FORCE_SELL_MINUTE
+    now = market_now()
+    return (now.hour, now.minute) >= (FORCE_SELL_HOUR, FORCE_SELL_MINUTE)
 
 # ================================================================================
 # 테스트용 메인 실행부
@@ -0,0 +1,169 @@
+"""
+🔥 V3.3 강제 청산 - 일괄 시세 + 동시 매도 주문 + 마감 시한 내 재시도 + 일괄 반영
+Deadline-bounded parallel liquidation with a per-position outcome report
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import List, Dict, Any, Callable, Tuple
+from tabulate import tabulate
+
+# ================================================================================
+# 청산 설정
+# ================================================================================
+FORCE_SELL_DEADLINE = 5.0          # 강제 청산 마감 시한 (초)
+LIQUIDATION_RETRY_INTERVAL = 0.2   # 실패 주문 재시도 간격 (초)
+LIQUIDATION_MAX_WORKERS = 8        # 동시 시세/주문 스레드 수
+
+@dataclass
+class LiquidationOutcome:
+    """포지션별 청산 결과 (status: sold / failed / deadline)"""
+    code: str
+    name: str
+    quantity: int
+    status: str = "pending"
+    price: int = 0
+    attempts: int = 0
+    error: str = ""
+    profit_amount: int = 0
+
+@dataclass
+class LiquidationReport:
+    """청산 결과 보고서"""
+    outcomes: List[LiquidationOutcome]
+    elapsed: float
+    deadline: float
+
+    @property
+    def sold_count(self) -> int:
+        return len([o for o in self.outcomes if o.status == "sold"])
+
+    @property
+    def unsold(self) -> List[LiquidationOutcome]:
+        return [o for o in self.outcomes if o.status != "sold"]
+
+    def print_report(self):
+        """📋 포지션별 청산 결과 출력"""
+        if not self.outcomes:
+            return
+        table_data = []
+        for o in self.outcomes:
+            status = {"sold": "✅ 청산", "failed": "❌ 실패", "deadline": "⏰ 시한초과"}.get(o.status, o.status)
+            table_data.append([o.name, o.code, f"{o.quantity}주", f"{o.price:,}원" if o.price else "-",
+                               f"{o.profit_amount:+,}원" if o.status == "sold" else "-",
+                               o.attempts, status, o.error or ""])
+        print(tabulate(table_data, headers=["종목명", "코드", "수량", "매도가", "손익", "시도", "결과", "오류"],
+                       tablefmt="simple"))
+        print(f"🚨 강제 청산: {self.sold_count}/{len(self.outcomes)}건 완료 "
+              f"({self.elapsed:.2f}초 / 시한 {self.deadline:.1f}초)")
+
+class DeadlineLiquidator:
+    """⏱️ 마감 시한 내 전 포지션 청산
+
+    매 라운드: 시세 없는 포지션 일괄 시세 조회(누락분은 개별 조회 병렬) → 매도 주문 병렬 제출 →
+    실패분은 시세를 비우고 다음 라운드 재시도. 체결분은 마지막에 apply_fills로 한 번에 반영한다.
+    apply_fills는 장부에 실제 반영된 체결분만 종목코드별 손익으로 돌려주고, 빠진 체결분은 실패로 남긴다.
+    """
+
+    def __init__(self,
+                 fetch_quote: Callable[[str], int],
+                 submit_sell: Callable[[Any, int], bool],
+                 apply_fills: Callable[[List[Tuple[Any, int]]], Dict[str, int]],
+                 fetch_quotes: Callable[[List[str]], Dict[str, int]] = None,
+                 deadline_seconds: float = FORCE_SELL_DEADLINE,
+                 retry_interval: float = LIQUIDATION_RETRY_INTERVAL,
+                 max_workers: int = LIQUIDATION_MAX_WORKERS):
+        self.fetch_quote = fetch_quote
+        self.fetch_quotes = fetch_quotes
+        self.submit_sell = submit_sell
+        self.apply_fills = apply_fills
+        self.deadline_seconds = deadline_seconds
+        self.retry_interval = retry_interval
+        self.max_workers = max_workers
+
+    def run(self, positions: List[Any]) -> LiquidationReport:
+        """🚨 청산 실행 - positions는 code/name/quantity 속성을 가진 포지션 객체"""
+        start = time.time()
+        deadline = start + self.deadline_seconds
+
+        outcomes = {id(p): LiquidationOutcome(p.code, p.name, p.quantity) for p in positions}
+        pending = list(positions)
+        prices: Dict[int, int] = {}
+        fills: List[Tuple[Any, int]] = []
+
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        try:
+            while pending and time.time() < deadline:
+                self._fetch_prices(executor, pending, prices, outcomes, deadline)
+                pending = self._submit_orders(executor, pending, prices, outcomes, fills, deadline)
+
+                if pending:
+                    time.sleep(max(0.0, min(self.retry_interval, deadline - time.time())))
+        finally:
+            executor.shutdown(wait=False)
+
+        # 체결분 일괄 반영
+        profits = self.apply_fills(fills) if fills else {}
+        for position, price in fills:
+            outcome = outcomes[id(position)]
+            outcome.price = price
+            if position.code not in profits:
+                outcome.status = "failed"
+                outcome.error = "장부 반영 실패"
+                continue
+            outcome.status = "sold"
+            outcome.error = ""
+            outcome.profit_amount = profits.get(position.code, 0)
+
+        for position in pending:
+            outcome = outcomes[id(position)]
+            outcome.status = "failed" if outcome.error else "deadline"
+
+        return LiquidationReport(list(outcomes.values()), time.time() - start, self.deadline_seconds)
+
+    def _fetch_prices(self, executor, pending, prices, outcomes, deadline):
+        """시세 없는 포지션 시세 확보 (일괄 1회 + 누락분 개별 병렬)"""
+        missing = [p for p in pending if prices.get(id(p), 0) <= 0]
+        if not missing:
+            return
+
+        if self.fetch_quotes:
+            future = executor.submit(self.fetch_quotes, [p.code for p in missing])
+            done, _ = wait([future], timeout=max(0.0, deadline - time.time()))
+            quotes = future.result() if done and not future.exception() else {}
+            for p in missing:
+                if quotes.get(p.code, 0) > 0:
+                    prices[id(p)] = quotes[p.code]
+            missing = [p for p in missing if prices.get(id(p), 0) <= 0]
+
+        futures = {executor.submit(self.fetch_quote, p.code): p for p in missing}
+        done, _ = wait(futures, timeout=max(0.0, deadline - time.time()))
+        for future in done:
+            position = futures[future]
+            if future.exception():
+                outcomes[id(position)].error = f"시세 오류: {future.exception()}"
+            elif future.result() > 0:
+                prices[id(position)] = future.result()
+            else:
+                outcomes[id(position)].error = "시세 없음"
+
+    def _submit_orders(self, executor, pending, prices, outcomes, fills, deadline) -> List[Any]:
+        """시세가 있는 포지션 매도 주문 병렬 제출 - 남은(실패/미제출) 포지션 반환"""
+        ready = [p for p in pending if prices.get(id(p), 0) > 0]
+        futures = {executor.submit(self.submit_sell, p, prices[id(p)]): p for p in ready}
+        done, _ = wait(futures, timeout=max(0.0, deadline - time.time()))
+
+        filled = set()
+        for future in done:
+            position = futures[future]
+            outcome = outcomes[id(position)]
+            outcome.attempts += 1
+            if not future.exception() and future.result():
+                fills.append((position, prices[id(position)]))
+                filled.add(id(position))
+            else:
+                outcome.error = f"주문 오류: {future.exception()}" if future.exception() else "주문 거부"
+                prices.pop(id(position), None)  # 다음 라운드에 시세 재조회
+
+        return [p for p in pending if id(p) not in filled]
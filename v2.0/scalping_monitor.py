@@ -1,21 +1,23 @@
 import time
-from datetime import datetime, timedelta
 from typing import Dict, List, Optional
 from tabulate import tabulate
 import os
 import json
 
 from scalping_portfolio import ScalpingPortfolio, ScalpingPosition
+from scalping_blocklist import NegativeCache
 from virtual_money_manager import VirtualMoneyManager
+from market_clock import market_now
 
 class ScalpingMonitor:
     """🔥 V2.0 단타 매매 실시간 모니터링 시스템"""
     
     def __init__(self, portfolio: ScalpingPortfolio, money_manager: VirtualMoneyManager, 
-                 save_dir: str = None):
+                 save_dir: str = None, negative_cache: NegativeCache = None):
         self.portfolio = portfolio
         self.money_manager = money_manager
         self.save_dir = save_dir
+        self.negative_cache = negative_cache  # 조회 실패 종목 (엔진의 조건검색 스캐너 소유)
         
         # 모니터링 설정
         self.profit_target = 5.0
@@ -25,17 +27,17 @@ class ScalpingMonitor:
         
         # 성능 추적
         self.loop_count = 0
-        self.last_update_time = datetime.now()
-        self.monitoring_start_time = datetime.now()
+        self.last_update_time = market_now()
+        self.monitoring_start_time = market_now()
         
     def update_loop_count(self):
         """루프 카운트 업데이트"""
         self.loop_count += 1
-        self.last_update_time = datetime.now()
+        self.last_update_time = market_now()
     
     def print_system_header(self, mode: str = "실제 매매"):
         """시스템 시작 헤더"""
-        now = datetime.now()
+        now = market_now()
         
         print("="*100)
         print(f"🔥 V2.0 단타 매매 모니터링 시스템 [{mode}]")
@@ -49,7 +51,7 @@ class ScalpingMonitor:
     
     def print_loop_header(self, loop_count: int):
         """루프 시작 헤더"""
-        now = datetime.now()
+        now = market_now()
         portfolio_summary = self.portfolio.get_portfolio_summary()
         money_status = self.money_manager.get_portfolio_value()
         
@@ -239,7 +241,7 @@ class ScalpingMonitor:
             print(f"   🎯 승률: {trading_stats['win_rate']:.1f}%")
         
         # 시스템 성능
-        runtime = datetime.now() - self.monitoring_start_time
+        runtime = market_now() - self.monitoring_start_time
         print(f"\n⚡ 시스템 성능:")
         print(f"   🔄 실행 루프: {self.loop_count}회")
         print(f"   ⏱️ 총 운영: {str(runtime).split('.')[0]}")
@@ -247,16 +249,39 @@ class ScalpingMonitor:
         
         print(f"{'='*80}")
         
+        # 차단 종목 / 조회 실패 종목
+        self.print_blocklist_status()
+        
         # 포지션 상세 (현재가 있을 때만)
         if current_prices and self.portfolio.positions:
             self.print_detailed_positions_table(current_prices)
     
+    def print_blocklist_status(self):
+        """🚫 일시 차단 종목 및 조회 실패 (재시도 대기) 종목 출력"""
+        blocked = self.portfolio.blocked_codes.snapshot()
+        failed = self.negative_cache.snapshot() if self.negative_cache else []
+        
+        if not blocked and not failed:
+            return
+        
+        if blocked:
+            print(f"\n🚫 일시 차단 종목: {len(blocked)}개")
+            table_data = [[row['code'], row['reason'] or "-", row['expires_at'], f"{row['remaining_seconds'] // 60}분"]
+                          for row in blocked]
+            print(tabulate(table_data, headers=["종목코드", "사유", "해제시각", "남은시간"], tablefmt="simple"))
+        
+        if failed:
+            print(f"\n❌ 조회 실패 재시도 대기: {len(failed)}개 (누적 {self.negative_cache.skipped_total}회 조회 생략)")
+            table_data = [[row['code'], f"{row['failures']}회", row['expires_at'], f"{row['remaining_seconds']}초"]
+                          for row in failed]
+            print(tabulate(table_data, headers=["종목코드", "연속실패", "재시도시각", "남은시간"], tablefmt="simple"))
+    
     def save_monitoring_report(self):
         """모니터링 보고서 저장"""
         if not self.save_dir:
             return
         
-        today = datetime.now().strftime('%Y%m%d')
+        today = market_now().strftime('%Y%m%d')
         report_file = os.path.join(self.save_dir, f"monitoring_report_{today}.json")
         
         try:
@@ -266,7 +291,7 @@ class ScalpingMonitor:
             portfolio_summary = self.portfolio.get_portfolio_summary()
             trading_stats = self.money_manager.get_trading_statistics()
             
-            runtime = datetime.now() - self.monitoring_start_time
+            runtime = market_now() - self.monitoring_start_time
             
             report_data = {
                 'monitoring_summary': {
@@ -279,13 +304,15 @@ class ScalpingMonitor:
                 'portfolio_summary': portfolio_summary,
                 'trading_statistics': trading_stats,
                 'current_positions': self.portfolio.get_position_details(),
+                'blocked_codes': self.portfolio.blocked_codes.snapshot(),
+                'negative_cache': self.negative_cache.snapshot() if self.negative_cache else [],
                 'settings': {
                     'profit_target': self.profit_target,
                     'stop_loss': self.stop_loss,
                     'max_positions': self.portfolio.max_positions,
                     'max_position_value': self.portfolio.max_position_value
                 },
-                'generated_at': datetime.now().isoformat()
+                'generated_at': market_now().isoformat()
             }
             
             with open(report_file, 'w', encoding='utf-8') as f:
@@ -298,7 +325,7 @@ class ScalpingMonitor:
     
     def print_final_summary(self, mode: str = "실제 매매"):
         """최종 요약 출력"""
-        completion_time = datetime.now()
+        completion_time = market_now()
         runtime = completion_time - self.monitoring_start_time
         
         money_status = self.money_manager.get_portfolio_value()
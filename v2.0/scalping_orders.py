@@ -0,0 +1,127 @@
+"""
+🔥 V3.3 동시 매수 파이프라인 - 주문별 자금 예약 + 병렬 시세 확인 + 순차 체결 확정
+Concurrent buy pipeline with two-phase cash reservation (reserve → commit / release)
+"""
+
+import asyncio
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import List, Dict, Optional, Callable, Tuple
+
+from virtual_money_manager import VirtualMoneyManager
+from scalping_candidates import CANDIDATE_OVERSAMPLE
+
+@dataclass
+class OrderResult:
+    """주문 한 건의 처리 결과"""
+    code: str
+    name: str
+    success: bool
+    reason: str = ""
+    reserved_amount: int = 0
+    fill_price: int = 0
+    elapsed: float = 0.0            # 예약부터 확정/반환까지 (초)
+
+class OrderPipeline:
+    """🚀 빈 슬롯 수만큼 주문을 동시에 진행 (실패한 슬롯은 다음 후보로 즉시 재시도)
+
+    1. 예약: VirtualMoneyManager.reserve_cash로 주문 자금을 먼저 잡아 동시 주문이 자금을 초과할 수 없다.
+    2. 시세 확인: quote(code)가 있으면 스레드에서 병렬로 현재가를 확인한다 (I/O 구간).
+    3. 확정: place_order(candidate, reservation_id, price)를 이벤트 루프에서 순서대로 실행해
+       장부 갱신이 겹치지 않는다. 실패하거나 예외가 나면 예약은 즉시 반환된다.
+    """
+
+    def __init__(self, money_manager: VirtualMoneyManager,
+                 place_order: Callable[[Dict, str, int], bool],
+                 quote: Callable[[str], int] = None,
+                 precheck: Callable[[str], Tuple[bool, str]] = None):
+        self.money_manager = money_manager
+        self.place_order = place_order
+        self.quote = quote
+        self.precheck = precheck
+
+        self.results: List[OrderResult] = []
+        self._queue = deque()
+        self._attempts = 0
+        self._max_attempts = 0
+
+    async def run(self, candidates: List[Dict], target_count: int, target_amount: int) -> List[OrderResult]:
+        """🎯 후보 순서대로 최대 target_count개 동시 매수 (전체 시도는 목표의 CANDIDATE_OVERSAMPLE배까지)"""
+        self.results = []
+        self._queue = deque(candidates)
+        self._attempts = 0
+        self._max_attempts = min(len(candidates), target_count * CANDIDATE_OVERSAMPLE)
+
+        worker_count = min(target_count, len(candidates))
+        if worker_count <= 0:
+            return []
+
+        await asyncio.gather(*(self._worker(target_amount) for _ in range(worker_count)))
+        return self.results
+
+    def _next_candidate(self) -> Optional[Dict]:
+        """다음 후보 (시도 한도 도달 또는 후보 소진 시 None)"""
+        if self._attempts >= self._max_attempts or not self._queue:
+            return None
+        self._attempts += 1
+        return self._queue.popleft()
+
+    def _return_candidate(self, candidate: Dict):
+        """시도하지 못한 후보를 대기열 맨 앞으로 되돌림"""
+        self._attempts -= 1
+        self._queue.appendleft(candidate)
+
+    async def _worker(self, target_amount: int):
+        """슬롯 하나 - 매수 성공 또는 후보 소진까지 반복"""
+        while True:
+            candidate = self._next_candidate()
+            if candidate is None:
+                return
+
+            if self.precheck:
+                can_buy, reason = self.precheck(candidate["code"])
+                if not can_buy:
+                    self.results.append(OrderResult(candidate["code"], candidate["name"], False, reason))
+                    continue
+
+            # 자금 부족이면 이 슬롯은 종료 (진행 중인 주문이 실패해 예약이 반환되면 그 슬롯이 이어서 시도)
+            # 자금 배분 최적화가 정한 후보별 금액(target_amount)이 있으면 그 금액으로 예약
+            reservation = self.money_manager.reserve_cash(candidate.get("target_amount", target_amount))
+            if reservation is None:
+                self._return_candidate(candidate)
+                return
+
+            reservation_id, reserved_amount = reservation
+            start = time.time()
+            price = candidate["price"]
+            success = False
+            reason = ""
+
+            try:
+                if self.quote:
+                    current_price = await asyncio.to_thread(self.quote, candidate["code"])
+                    if current_price > 0:
+                        price = current_price
+
+                success = self.place_order(candidate, reservation_id, price)
+                reason = "체결" if success else "주문실패"
+            except Exception as e:
+                reason = f"오류: {e}"
+            finally:
+                # 확정된 예약은 이미 소진되어 0이 반환된다
+                self.money_manager.release_reservation(reservation_id)
+
+            self.results.append(OrderResult(candidate["code"], candidate["name"], success, reason,
+                                            reserved_amount, price, time.time() - start))
+            if success:
+                return
+
+    def get_summary(self) -> Dict[str, float]:
+        """처리 요약 (성공/시도 수, 가장 느린 주문 시간)"""
+        return {
+            "attempts": len(self.results),
+            "filled": len([r for r in self.results if r.success]),
+            "failed": len([r for r in self.results if not r.success]),
+            "max_elapsed": max((r.elapsed for r in self.results), default=0.0)
+        }
@@ -4,6 +4,10 @@ from dataclasses import dataclass
 import json
 import os
 
+from scalping_blocklist import ExpiringBlocklist, DEFAULT_BLOCK_MINUTES
+from market_clock import market_now
+from exit_rules import fixed_target_reason
+
 @dataclass
 class ScalpingPosition:
     """단타 포지션 정보"""
@@ -15,6 +19,7 @@ class ScalpingPosition:
     condition_seq: int
     buy_amount: int  # 매수시점 거래대금
     cost: int  # 총 매수 비용
+    transaction_id: str = ""  # 매수 거래 ID (VirtualTransaction 연결)
     
     def get_current_value(self, current_price: int) -> int:
         """현재 평가금액"""
@@ -30,17 +35,12 @@ class ScalpingPosition:
     def should_exit(self, current_price: int, profit_target: float = 5.0, stop_loss: float = -5.0) -> Tuple[bool, str]:
         """청산 조건 체크"""
         _, profit_rate = self.get_profit_loss(current_price)
-        
-        if profit_rate >= profit_target:
-            return True, "익절"
-        elif profit_rate <= stop_loss:
-            return True, "손절"
-        
-        return False, ""
+        reason = fixed_target_reason(profit_rate, profit_target, stop_loss)
+        return bool(reason), reason
     
     def get_hold_duration(self) -> timedelta:
         """보유 시간"""
-        return datetime.now() - self.buy_time
+        return market_now() - self.buy_time
 
 class ScalpingPortfolio:
     """🔥 V2.0 단타 전용 포트폴리오 관리"""
@@ -50,7 +50,7 @@ class ScalpingPortfolio:
         self.max_position_value = max_position_value
         self.positions: List[ScalpingPosition] = []
         self.traded_today: Set[str] = set()  # 오늘 거래한 종목들
-        self.blocked_codes: Set[str] = set()  # 일시적 차단 종목
+        self.blocked_codes = ExpiringBlocklist()  # 일시적 차단 종목 (만료 시 자동 해제)
         self.save_dir = save_dir
         
         if save_dir:
@@ -88,7 +88,7 @@ class ScalpingPortfolio:
         return True, "매수가능"
     
     def add_position(self, code: str, name: str, buy_price: int, quantity: int, 
-                    condition_seq: int = 0, buy_amount: int = 0) -> bool:
+                    condition_seq: int = 0, buy_amount: int = 0, transaction_id: str = "") -> bool:
         """포지션 추가"""
         code = self.normalize_code(code)
         
@@ -103,10 +103,11 @@ class ScalpingPortfolio:
             name=name,
             buy_price=buy_price,
             quantity=quantity,
-            buy_time=datetime.now(),
+            buy_time=market_now(),
             condition_seq=condition_seq,
             buy_amount=buy_amount,
-            cost=buy_price * quantity
+            cost=buy_price * quantity,
+            transaction_id=transaction_id
         )
         
         # 포지션 추가
@@ -130,6 +131,17 @@ class ScalpingPortfolio:
         
         return None
     
+    def remove_positions(self, codes: List[str]) -> List[ScalpingPosition]:
+        """여러 포지션 일괄 제거 (상태 저장 1회)"""
+        targets = {self.normalize_code(code) for code in codes}
+        removed = [pos for pos in self.positions if pos.code in targets]
+        
+        if removed:
+            self.positions = [pos for pos in self.positions if pos.code not in targets]
+            self._save_portfolio_state()
+        
+        return removed
+    
     def get_position_by_code(self, code: str) -> Optional[ScalpingPosition]:
         """코드로 포지션 조회"""
         code = self.normalize_code(code)
@@ -160,18 +172,20 @@ class ScalpingPortfolio:
         """포트폴리오 만석 여부"""
         return len(self.positions) >= self.max_positions
     
-    def block_code_temporarily(self, code: str, duration_minutes: int = 30):
-        """종목 일시적 차단 (API 오류 등의 경우)"""
+    def block_code_temporarily(self, code: str, duration_minutes: int = DEFAULT_BLOCK_MINUTES, reason: str = ""):
+        """종목 일시적 차단 (API 오류 등의 경우) - duration_minutes 후 자동 해제"""
         code = self.normalize_code(code)
-        self.blocked_codes.add(code)
-        
-        # TODO: 시간 기반 자동 해제 로직 필요
-        # 현재는 간단하게 set으로만 관리
+        self.blocked_codes.block(code, duration_minutes * 60, reason)
+        self._save_portfolio_state()
     
     def unblock_code(self, code: str):
         """종목 차단 해제"""
         code = self.normalize_code(code)
-        self.blocked_codes.discard(code)
+        self.blocked_codes.unblock(code)
+    
+    def release_expired_blocks(self) -> List[str]:
+        """만료된 차단 해제 (해제된 종목코드 반환)"""
+        return self.blocked_codes.purge_expired()
     
     def get_portfolio_summary(self) -> Dict:
         """포트폴리오 요약 정보"""
@@ -230,7 +244,7 @@ class ScalpingPortfolio:
         if not self.save_dir:
             return
         
-        today = datetime.now().strftime('%Y%m%d')
+        today = market_now().strftime('%Y%m%d')
         state_file = os.path.join(self.save_dir, f"portfolio_state_{today}.json")
         
         try:
@@ -245,15 +259,16 @@ class ScalpingPortfolio:
                     'buy_time': pos.buy_time.isoformat(),
                     'condition_seq': pos.condition_seq,
                     'buy_amount': pos.buy_amount,
-                    'cost': pos.cost
+                    'cost': pos.cost,
+                    'transaction_id': pos.transaction_id
                 })
             
             state_data = {
                 'positions': positions_data,
                 'traded_today': list(self.traded_today),
-                'blocked_codes': list(self.blocked_codes),
+                'blocked_codes': self.blocked_codes.to_dict(),
                 'portfolio_summary': self.get_portfolio_summary(),
-                'last_updated': datetime.now().isoformat()
+                'last_updated': market_now().isoformat()
             }
             
             with open(state_file, 'w', encoding='utf-8') as f:
@@ -268,7 +283,7 @@ class ScalpingPortfolio:
             return False
         
         if not date_str:
-            date_str = datetime.now().strftime('%Y%m%d')
+            date_str = market_now().strftime('%Y%m%d')
         
         state_file = os.path.join(self.save_dir, f"portfolio_state_{date_str}.json")
         
@@ -290,13 +305,20 @@ class ScalpingPortfolio:
                     buy_time=datetime.fromisoformat(pos_data['buy_time']),
                     condition_seq=pos_data.get('condition_seq', 0),
                     buy_amount=pos_data.get('buy_amount', 0),
-                    cost=pos_data['cost']
+                    cost=pos_data['cost'],
+                    transaction_id=pos_data.get('transaction_id', '')
                 )
                 self.positions.append(position)
             
             # 거래 목록 복원
             self.traded_today = set(state_data.get('traded_today', []))
-            self.blocked_codes = set(state_data.get('blocked_codes', []))
+            self.blocked_codes.clear()
+            blocked_data = state_data.get('blocked_codes', {})
+            if isinstance(blocked_data, list):  # 이전 형식 (만료 시각 없음) → 기본 차단 시간 적용
+                for code in blocked_data:
+                    self.blocked_codes.block(code, DEFAULT_BLOCK_MINUTES * 60)
+            else:
+                self.blocked_codes.load_dict(blocked_data)
             
             return True
             
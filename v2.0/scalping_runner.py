@@ -5,9 +5,15 @@ Beautiful UI scalping runner with modern interface + Rich tables + Color system
 
 import asyncio
 import time
-import ntplib
 from datetime import datetime, timedelta
 from scalping_engine import *
+from scalping_candidates import get_candidate_limit
+from scalping_tasks import TradingTaskGraph, EXIT_WATCH_INTERVAL, PERSIST_INTERVAL
+from scalping_scheduler import TRADING_START_TIME, TRADING_END_TIME, FORCE_SELL_TIME
+from scalping_wait import wait_until, format_remaining
+from market_clock import get_market_clock, market_now
+from trading_calendar import get_trading_calendar, MARKET_OPEN_TIME, MARKET_CLOSE_TIME
+from hot_standby import ReplicationPrimary, HEARTBEAT_INTERVAL
 
 # ================================================================================
 # 🎨 Enhanced UI 라이브러리 임포트
@@ -109,73 +115,38 @@ def create_progress_bar(description, total=100):
 # 🕐 V2 방식 NTP 타임서버 시간 관리 시스템 (Enhanced UI)
 # ================================================================================
 
-# 글로벌 시간 관리 변수 (V2 방식)
-_ntp_time_offset = 0
-_last_ntp_sync = 0
-_ntp_sync_interval = 3600
-
 def sync_ntp_time(force=False):
-    """V2 방식: NTP 시간 동기화 (Enhanced UI)"""
-    global _ntp_time_offset, _last_ntp_sync
-    
-    current_time = time.time()
-    
-    if not force and (current_time - _last_ntp_sync) < _ntp_sync_interval:
-        return True
+    """NTP 시간 동기화 - 공용 시계 서비스가 백그라운드로 측정 (force면 즉시 측정)"""
+    clock = get_market_clock()
+    if not force:
+        return clock.is_synced
     
-    try:
-        ntp_servers = [
-            'time.google.com',
-            'pool.ntp.org', 
-            'time.nist.gov',
-            'time.windows.com'
-        ]
-        
-        for server in ntp_servers:
-            try:
-                client = ntplib.NTPClient()
-                response = client.request(server, version=3, timeout=5)
-                ntp_timestamp = response.tx_time
-                local_timestamp = time.time()
-                
-                _ntp_time_offset = ntp_timestamp - local_timestamp
-                _last_ntp_sync = current_time
-                
-                ntp_time = datetime.fromtimestamp(ntp_timestamp)
-                time_diff = abs(_ntp_time_offset)
-                
-                if time_diff > 2:
-                    print_enhanced(f"⚠️ 시간 차이 감지: {time_diff:.1f}초 - NTP 동기화 적용 ({server})", "bright_yellow")
-                elif force:
-                    print_enhanced(f"🌐 NTP 시간 동기화 완료: {server} ({ntp_time.strftime('%Y-%m-%d %H:%M:%S')})", "bright_green")
-                
-                return True
-                
-            except Exception as e:
-                print_enhanced(f"[NTP] ⚠️ {server} 실패: {e}", "red")
-                continue
-                
-        if force:
-            print_enhanced("⚠️ NTP 동기화 실패 - 로컬 시간 사용", "bright_red")
-        return False
-        
-    except Exception as e:
-        if force:
-            print_enhanced(f"⚠️ 시간 동기화 오류: {e} - 로컬 시간 사용", "bright_red")
+    if not clock.sync_now():
+        print_enhanced("⚠️ NTP 동기화 실패 - 로컬 시간 사용", "bright_red")
         return False
+    
+    metrics = clock.get_metrics()
+    if abs(metrics["offset"]) > 2:
+        print_enhanced(f"⚠️ 시간 차이 감지: {abs(metrics['offset']):.1f}초 - NTP 동기화 적용 ({metrics['last_server']})", "bright_yellow")
+    else:
+        print_enhanced(f"🌐 NTP 시간 동기화 완료: {metrics['last_server']} ({clock.now().strftime('%Y-%m-%d %H:%M:%S')}, "
+                       f"오프셋 {metrics['offset']*1000:+.0f}ms, 지터 {metrics['jitter']*1000:.0f}ms)", "bright_green")
+    return True
 
 def get_ntp_time():
-    """V2 방식: NTP 동기화된 시간 반환"""
-    sync_ntp_time()
-    return datetime.fromtimestamp(time.time() + _ntp_time_offset)
+    """NTP 보정 시간 반환 (공용 시계 - 호출 시 네트워크 조회 없음)"""
+    return market_now()
 
 def is_market_time(current_time: datetime) -> Tuple[bool, str]:
     """🕐 장 시간 체크"""
-    if current_time.weekday() >= 5:
-        return False, f"주말입니다 ({current_time.strftime('%A')})"
+    is_holiday, holiday_reason = get_trading_calendar().holiday_reason(current_time.date())
+    if is_holiday:
+        if holiday_reason == "주말":
+            return False, f"주말입니다 ({current_time.strftime('%A')})"
+        return False, f"휴장일입니다 ({holiday_reason})"
     
-    market_start = current_time.replace(hour=9, minute=0, second=0, microsecond=0)
-    market_end = current_time.replace(hour=15, minute=30, second=0, microsecond=0)
+    market_start = datetime.combine(current_time.date(), MARKET_OPEN_TIME)
+    market_end = datetime.combine(current_time.date(), MARKET_CLOSE_TIME)
     
     if current_time < market_start:
         time_to_start = market_start - current_time
@@ -194,23 +165,22 @@ def is_trading_time(current_time: datetime) -> Tuple[bool, str]:
     if not is_market:
         return False, market_msg
     
-    trading_start = current_time.replace(hour=9, minute=5, second=0, microsecond=0)
-    trading_end = current_time.replace(hour=14, minute=0, second=0, microsecond=0)
+    trading_start = datetime.combine(current_time.date(), TRADING_START_TIME)
+    trading_end = datetime.combine(current_time.date(), TRADING_END_TIME)
     
     if current_time < trading_start:
         time_to_start = trading_start - current_time
         minutes, seconds = divmod(time_to_start.seconds, 60)
         return False, f"매매 시작 전 ({minutes}분 {seconds}초 후 시작)"
     
-    if current_time > trading_end:
-        return False, "매매 시간 종료 (14:00 이후)"
+    if current_time >= trading_end:
+        return False, f"매매 시간 종료 ({TRADING_END_TIME:%H:%M} 이후)"
     
     return True, "매매 가능 시간"
 
 def is_force_sell_time(current_time: datetime) -> bool:
     """🕐 강제 청산 시간 체크"""
-    force_sell_time = current_time.replace(hour=15, minute=10, second=0, microsecond=0)
-    return current_time >= force_sell_time
+    return current_time >= datetime.combine(current_time.date(), FORCE_SELL_TIME)
 
 def show_time_status():
     """🕐 Enhanced 시간 상태 표시"""
@@ -228,10 +198,17 @@ def show_time_status():
         "💰 매매 상태": trade_msg,
     }
     
+    clock_metrics = get_market_clock().get_metrics()
+    if clock_metrics["samples"] > 0:
+        time_data["🌐 시계 보정"] = (f"오프셋 {clock_metrics['offset']*1000:+.0f}ms, 지터 {clock_metrics['jitter']*1000:.0f}ms, "
+                                 f"{int(clock_metrics['staleness'])}초 전 측정")
+    else:
+        time_data["🌐 시계 보정"] = "측정 전 (로컬 시간)"
+    
     if is_force:
-        time_data["🚨 강제 청산"] = "도달 (15:10 이후)"
+        time_data["🚨 강제 청산"] = f"도달 ({FORCE_SELL_TIME:%H:%M} 이후)"
     else:
-        force_time = current_time.replace(hour=15, minute=10, second=0, microsecond=0)
+        force_time = datetime.combine(current_time.date(), FORCE_SELL_TIME)
         time_to_force = force_time - current_time
         if time_to_force.days >= 0:
             hours, remainder = divmod(time_to_force.seconds, 3600)
@@ -247,63 +224,12 @@ def show_time_status():
 # ================================================================================
 
 def get_last_market_close(current_time: datetime) -> datetime:
-    """마지막 장 마감 시간 계산"""
-    # 현재 요일 확인 (0=월요일, 4=금요일, 5=토요일, 6=일요일)
-    weekday = current_time.weekday()
-    
-    # 장 마감 시간 (15:30)
-    market_close_time = current_time.replace(hour=15, minute=30, second=0, microsecond=0)
-    
-    # 오늘이 평일이고 장 마감 후라면
-    if weekday < 5 and current_time >= market_close_time:
-        return market_close_time
-    
-    # 오늘이 평일이고 장 시간 중이라면
-    elif weekday < 5 and current_time < market_close_time:
-        # 어제로 이동
-        days_back = 1
-        # 어제가 일요일이면 금요일로
-        if weekday == 0:  # 월요일
-            days_back = 3
-    
-    # 오늘이 토요일이면 금요일로
-    elif weekday == 5:
-        days_back = 1
-    
-    # 오늘이 일요일이면 금요일로
-    elif weekday == 6:
-        days_back = 2
-    
-    # 계산된 날짜의 15:30
-    last_close = current_time - timedelta(days=days_back)
-    return last_close.replace(hour=15, minute=30, second=0, microsecond=0)
+    """마지막 장 마감 시간 (거래일 달력 - 휴장일 건너뜀)"""
+    return get_trading_calendar().previous_close(current_time)
 
 def get_next_market_open(current_time: datetime) -> datetime:
-    """다음 장 시작 시간 계산"""
-    # 현재 요일 확인
-    weekday = current_time.weekday()
-    
-    # 장 시작 시간 (09:00)
-    market_open_time = current_time.replace(hour=9, minute=0, second=0, microsecond=0)
-    
-    # 오늘이 평일이고 장 시작 전이라면
-    if weekday < 5 and current_time < market_open_time:
-        return market_open_time
-    
-    # 그 외의 경우 다음 평일 계산
-    days_ahead = 1
-    
-    # 금요일 장 시간 후 또는 토요일
-    if weekday == 4 and current_time >= market_open_time:  # 금요일
-        days_ahead = 3
-    elif weekday == 5:  # 토요일
-        days_ahead = 2
-    elif weekday == 6:  # 일요일
-        days_ahead = 1
-    
-    # 계산된 날짜의 09:00
-    next_open = current_time + timedelta(days=days_ahead)
-    return next_open.replace(hour=9, minute=0, second=0, microsecond=0)
+    """다음 장 시작 시간 (거래일 달력 - 휴장일 건너뜀)"""
+    return get_trading_calendar().next_open(current_time)
 
 def calculate_market_cycle_progress(current_time: datetime) -> Tuple[float, timedelta, timedelta]:
     """장 마감 사이클 진행률 계산"""
@@ -328,322 +254,93 @@ def calculate_market_cycle_progress(current_time: datetime) -> Tuple[float, time
 # 🆕 Enhanced 장시작 대기 카운트다운 (전체 사이클 기반)
 # ================================================================================
 
-async def wait_for_market_open(ntp_time_func, test_mode=False):
-    """🕐 장시작 대기 카운트다운 (Enhanced UI with Full Cycle Progress)"""
+async def wait_for_market_open(ntp_time_func, test_mode=False, stop_event: asyncio.Event = None):
+    """🕐 장시작 대기 카운트다운 (다음 시각까지 잠들고 화면은 저빈도 갱신)
+    
+    08:50 토큰 확인 → 09:00 장 시작 → 09:05 매매 시작 순으로 각 시각까지 한 번에 대기한다.
+    화면 갱신 주기는 SCALPING_WAIT_REFRESH(초), SCALPING_HEADLESS=1이면 갱신 없음.
+    """
     
     if test_mode:
         return True  # 테스트 모드는 즉시 진행
     
-    # 색상 설정
-    if COLORAMA_AVAILABLE:
-        color_red = Fore.RED
-        color_yellow = Fore.YELLOW
-        color_green = Fore.GREEN
-        color_cyan = Fore.CYAN
-        color_white = Fore.WHITE
-        color_bright_yellow = Fore.LIGHTYELLOW_EX
-        color_bright_green = Fore.LIGHTGREEN_EX
-        color_magenta = Fore.MAGENTA
-        color_reset = Style.RESET_ALL
-    else:
-        color_red = color_yellow = color_green = color_cyan = color_white = ""
-        color_bright_yellow = color_bright_green = color_magenta = color_reset = ""
+    current_time = ntp_time_func()
     
-    # Rich Live 디스플레이 준비
-    if RICH_AVAILABLE:
-        from rich.live import Live
-        from rich.layout import Layout
-        from rich.table import Table
-        
-    while True:
-        current_time = ntp_time_func()
+    # 현재 시간이 매매 시간이면 즉시 반환
+    trading_start_today = datetime.combine(current_time.date(), TRADING_START_TIME)
+    if get_trading_calendar().is_trading_day(current_time.date()) and current_time >= trading_start_today:
+        if is_trading_time(current_time)[0]:
+            return True
+        print_enhanced(f"⚠️ 매매 시간({TRADING_START_TIME:%H:%M}~{TRADING_END_TIME:%H:%M})이 종료되었습니다.", "red")
+        return False
+    
+    market_open = get_next_market_open(current_time)
+    trading_start = datetime.combine(market_open.date(), TRADING_START_TIME)
+    token_check = market_open - timedelta(minutes=10)
+    events = {"stop": stop_event} if stop_event else None
+    
+    def render(now: datetime, remaining: float):
+        """대기 화면 (갱신 주기마다 한 번)"""
+        progress, _, total_cycle = calculate_market_cycle_progress(now)
+        last_close = get_last_market_close(now)
+        main_message = f"🕐 매매 시작까지 {format_remaining((trading_start - now).total_seconds())} 남음"
         
-        # 매매 시작 시간 (09:05)
-        trading_start = current_time.replace(hour=9, minute=5, second=0, microsecond=0)
+        bar_length = 50
+        filled_length = int(bar_length * progress // 100)
+        bar = '█' * filled_length + '░' * (bar_length - filled_length)
         
-        # 현재 시간이 매매 시간이면 즉시 반환
-        if current_time >= trading_start:
-            if current_time.hour < 14:  # 14시 이전이면 매매 가능
-                return True
-            else:
-                print_enhanced("⚠️ 매매 시간(09:05~14:00)이 종료되었습니다.", "red")
-                return False
+        lines = [
+            f"📅 현재 시간: {now.strftime('%Y-%m-%d %H:%M:%S')}",
+            f"📉 마지막 장 마감: {last_close.strftime('%m/%d %H:%M')} "
+            f"({'금요일' if last_close.weekday() == 4 else '어제'})",
+            f"📈 다음 장 시작: {market_open.strftime('%m/%d %H:%M')} "
+            f"({'월요일' if market_open.weekday() == 0 else '오늘'})",
+            f"⏱️ 전체 사이클: {int(total_cycle.total_seconds()/3600)}시간",
+            main_message,
+            f"진행률: [{bar}] {progress:5.1f}%"
+        ]
+        if now.weekday() >= 5:
+            weekend_day = "토요일" if now.weekday() == 5 else "일요일"
+            lines.append(f"🌴 현재 {weekend_day}입니다. 월요일 장 시작을 기다리는 중...")
         
-        # Rich를 사용한 고정 화면 업데이트
         if RICH_AVAILABLE:
-            with Live(console=console, refresh_per_second=1, transient=True) as live:
-                while True:
-                    current_time = ntp_time_func()
-                    
-                    # 매매 시작 시간 체크
-                    if current_time >= trading_start:
-                        if current_time.hour < 14:
-                            live.stop()
-                            return True
-                        else:
-                            live.stop()
-                            print_enhanced("⚠️ 매매 시간(09:05~14:00)이 종료되었습니다.", "red")
-                            return False
-                    
-                    # 프로그레스 및 시간 계산
-                    progress, time_remaining, total_cycle = calculate_market_cycle_progress(current_time)
-                    last_close = get_last_market_close(current_time)
-                    next_open = get_next_market_open(current_time)
-                    
-                    # 남은 시간 계산
-                    total_seconds = int(time_remaining.total_seconds())
-                    days = total_seconds // 86400
-                    hours = (total_seconds % 86400) // 3600
-                    minutes = (total_seconds % 3600) // 60
-                    seconds = total_seconds % 60
-                    
-                    # 메시지 결정
-                    if days > 0:
-                        main_message = f"🕐 장시작까지 {days}일 {hours}시간 {minutes}분 남음"
-                        rich_style = "yellow"
-                    elif hours >= 1:
-                        main_message = f"🕐 장시작까지 {hours}시간 {minutes}분 남음"
-                        rich_style = "yellow"
-                    elif minutes >= 30:
-                        main_message = f"🕐 장시작까지 {minutes}분 남음"
-                        rich_style = "bright_yellow"
-                    elif minutes >= 10:
-                        main_message = f"⏰ 장시작까지 {minutes}분 남음"
-                        rich_style = "cyan"
-                        
-                        # 토큰 체크 (8:50~8:55)
-                        if current_time.hour == 8 and 50 <= current_time.minute <= 55:
-                            # 토큰 체크는 별도로 처리 (한 번만)
-                            pass
-                    else:
-                        main_message = f"🚨 장시작까지 {minutes}분 {seconds}초!"
-                        rich_style = "bright_green"
-                    
-                    # 레이아웃 구성
-                    layout = Layout()
-                    
-                    # 시간 정보 패널
-                    time_panel = Panel(
-                        f"현재 시간: {current_time.strftime('%Y-%m-%d %H:%M:%S')}\n"
-                        f"마지막 장 마감: {last_close.strftime('%m/%d %H:%M')} "
-                        f"({'금요일' if last_close.weekday() == 4 else '어제'})\n"
-                        f"다음 장 시작: {next_open.strftime('%m/%d %H:%M')} "
-                        f"({'월요일' if next_open.weekday() == 0 else '오늘'})\n"
-                        f"전체 사이클: {int(total_cycle.total_seconds()/3600)}시간\n"
-                        f"{main_message}",
-                        title="⏰ 장 마감 사이클 진행 상황",
-                        style=rich_style
-                    )
-                    
-                    # 프로그레스 바
-                    progress_bar = Progress(
-                        SpinnerColumn(),
-                        TextColumn("[progress.description]{task.description}"),
-                        BarColumn(),
-                        TextColumn("[progress.percentage]{task.percentage:>3.0f}%"),
-                        TimeElapsedColumn(),
-                    )
-                    task = progress_bar.add_task("장 마감 → 장 시작", total=100)
-                    progress_bar.update(task, completed=progress)
-                    
-                    # 주말 메시지
-                    weekend_msg = ""
-                    if current_time.weekday() >= 5:
-                        weekend_day = "토요일" if current_time.weekday() == 5 else "일요일"
-                        weekend_msg = f"\n🌴 현재 {weekend_day}입니다. 월요일 장 시작을 기다리는 중..."
-                    
-                    # 전체 레이아웃 구성
-                    full_display = Layout()
-                    full_display.split_column(
-                        Layout(time_panel),
-                        Layout(progress_bar, size=3),
-                        Layout(Text(weekend_msg, style="cyan") if weekend_msg else Text(""))
-                    )
-                    
-                    # 화면 업데이트
-                    live.update(full_display)
-                    
-                    # 토큰 체크 시간대 처리 (한 번만)
-                    if current_time.hour == 8 and current_time.minute == 50 and current_time.second < 2:
-                        live.stop()
-                        print_enhanced("🔄 토큰 상태 확인 중...", "cyan")
-                        should_refresh, reason = should_refresh_token()
-                        if should_refresh:
-                            print_enhanced(f"🔄 토큰 재발급: {reason}", "yellow")
-                        # Live 재시작
-                        live = Live(console=console, refresh_per_second=1, transient=True)
-                        live.start()
-                    
-                    # 9시가 되면 특별 처리
-                    if current_time.hour == 9 and current_time.minute == 0 and current_time.weekday() < 5:
-                        live.stop()
-                        print_enhanced("\n🎉 장이 시작되었습니다! 5분 후 매매를 시작합니다.", "bright_green")
-                        
-                        # 9:00 ~ 9:05 카운트다운
-                        for i in range(300, 0, -1):
-                            minutes_left = i // 60
-                            seconds_left = i % 60
-                            
-                            if i % 30 == 0:
-                                print_enhanced(f"⏳ 매매 시작까지 {minutes_left}분 {seconds_left}초 남음", "cyan")
-                            
-                            await asyncio.sleep(1)
-                        
-                        return True
-                    
-                    await asyncio.sleep(1)
-        
+            console.print(Panel("\n".join(lines), title="⏰ 장 마감 사이클 진행 상황", style="yellow"))
         else:
-            # Rich가 없는 경우 기존 방식 (개선)
-            import os
-            
-            while True:
-                current_time = ntp_time_func()
-                
-                # 매매 시작 시간 체크
-                if current_time >= trading_start:
-                    if current_time.hour < 14:
-                        return True
-                    else:
-                        print_enhanced("⚠️ 매매 시간(09:05~14:00)이 종료되었습니다.", "red")
-                        return False
-                
-                # 화면 클리어 (Windows)
-                if os.name == 'nt':
-                    os.system('cls')
-                else:
-                    os.system('clear')
-                
-                # 프로그레스 및 시간 계산
-                progress, time_remaining, total_cycle = calculate_market_cycle_progress(current_time)
-                last_close = get_last_market_close(current_time)
-                next_open = get_next_market_open(current_time)
-                
-                # 남은 시간 계산
-                total_seconds = int(time_remaining.total_seconds())
-                days = total_seconds // 86400
-                hours = (total_seconds % 86400) // 3600
-                minutes = (total_seconds % 3600) // 60
-                seconds = total_seconds % 60
-                
-                # 메시지 및 색상 결정
-                if days > 0:
-                    main_message = f"🕐 장시작까지 {days}일 {hours}시간 {minutes}분 남음"
-                    color = color_yellow
-                elif hours >= 1:
-                    main_message = f"🕐 장시작까지 {hours}시간 {minutes}분 남음"
-                    color = color_yellow
-                elif minutes >= 30:
-                    main_message = f"🕐 장시작까지 {minutes}분 남음"
-                    color = color_bright_yellow
-                elif minutes >= 10:
-                    main_message = f"⏰ 장시작까지 {minutes}분 남음"
-                    color = color_cyan
-                else:
-                    main_message = f"🚨 장시작까지 {minutes}분 {seconds}초!"
-                    color = color_bright_green
-                
-                # 출력
-                print(f"\n{'='*70}")
-                print(f"{color_white}📅 현재 시간: {current_time.strftime('%Y-%m-%d %H:%M:%S')}{color_reset}")
-                print(f"{color_white}📉 마지막 장 마감: {last_close.strftime('%m/%d %H:%M')} "
-                      f"({'금요일' if last_close.weekday() == 4 else '어제'}){color_reset}")
-                print(f"{color_white}📈 다음 장 시작: {next_open.strftime('%m/%d %H:%M')} "
-                      f"({'월요일' if next_open.weekday() == 0 else '오늘'}){color_reset}")
-                print(f"{color_magenta}⏱️ 전체 사이클: {int(total_cycle.total_seconds()/3600)}시간{color_reset}")
-                print(f"{color}{main_message}{color_reset}")
-                
-                # 텍스트 프로그레스 바
-                bar_length = 50
-                filled_length = int(bar_length * progress // 100)
-                bar = '█' * filled_length + '░' * (bar_length - filled_length)
-                
-                print(f"\n진행률: [{bar}] {progress:5.1f}%")
-                print(f"{'='*70}")
-                
-                # 주말 특별 메시지
-                if current_time.weekday() >= 5:
-                    weekend_day = "토요일" if current_time.weekday() == 5 else "일요일"
-                    print(f"\n{color_cyan}🌴 현재 {weekend_day}입니다. 월요일 장 시작을 기다리는 중...{color_reset}")
-                
-                # 1초 대기
-                await asyncio.sleep(1)
-
-# ================================================================================
-# 🔄 Enhanced 카운트다운 대기 시스템
-# ================================================================================
-
-async def enhanced_countdown_wait(seconds: int, test_mode: bool = False, engine=None):
-    """🎨 Enhanced 카운트다운 대기 시스템"""
-    
-    start_time = get_ntp_time()
+            print(f"\n{'='*70}")
+            for line in lines:
+                print_enhanced(line, "white")
+            print(f"{'='*70}")
     
-    if RICH_AVAILABLE:
-        # Rich 프로그레스 바 사용
-        with create_progress_bar(f"💤 {seconds}초 대기 중... [{start_time.strftime('%H:%M:%S')}]") as progress:
-            task = progress.add_task("대기 중...", total=seconds)
-            
-            for elapsed in range(seconds + 1):
-                if elapsed > 0:
-                    await asyncio.sleep(1)
-                    
-                progress.update(task, advance=1)
-                
-                # 강제 청산 시간 체크 (15초마다)
-                if not test_mode and elapsed % 15 == 0:
-                    ntp_time = get_ntp_time()
-                    if is_force_sell_time(ntp_time):
-                        progress.stop()
-                        print_enhanced("🚨 대기 중 강제 청산 시간 도달! 대기 중단...", "bright_red")
-                        return True
+    for deadline, stage in ((token_check, "token_check"), (market_open, "market_open"), (trading_start, "trading_start")):
+        if ntp_time_func() >= deadline:
+            continue
         
-        print_enhanced("✅ 대기 완료! 다음 루프 시작...", "bright_green")
-    else:
-        # 기본 카운트다운 (Colorama 사용)
-        print_enhanced(f"\n💤 {seconds}초 대기 시작... [{start_time.strftime('%H:%M:%S')}]", "cyan")
-        print("=" * 60)
-        
-        for i in range(seconds):
-            await asyncio.sleep(1)
-            remaining = seconds - i - 1
-            progress = ((i + 1) / seconds) * 100
-            
-            # 프로그레스 바 생성
-            bar_length = 30
-            filled_length = int(bar_length * (i + 1) // seconds)
-            bar = '█' * filled_length + '░' * (bar_length - filled_length)
-            
-            current_time = datetime.now()
-            
-            if COLORAMA_AVAILABLE:
-                print(f"{Fore.YELLOW}⏰ [{current_time.strftime('%H:%M:%S')}] "
-                      f"경과: {i+1:2d}초 | 남은시간: {remaining:2d}초 | "
-                      f"[{Fore.GREEN}{bar}{Fore.YELLOW}] {progress:5.1f}%")
-            else:
-                print(f"⏰ [{current_time.strftime('%H:%M:%S')}] "
-                      f"경과: {i+1:2d}초 | 남은시간: {remaining:2d}초 | "
-                      f"[{bar}] {progress:5.1f}%")
-            
-            # 강제 청산 시간 체크
-            if not test_mode and (i + 1) % 15 == 0:
-                ntp_time = get_ntp_time()
-                if is_force_sell_time(ntp_time):
-                    print_enhanced("🚨 대기 중 강제 청산 시간 도달! 대기 중단...", "bright_red")
-                    return True
+        result = await wait_until(deadline, ntp_time_func, events, on_refresh=render)
+        if not result.reached_deadline:
+            print_enhanced("👋 장시작 대기 중단", "yellow")
+            return False
         
-        print_enhanced("✅ 대기 완료! 다음 루프 시작...", "bright_green")
-        print("=" * 60)
+        if stage == "token_check":
+            print_enhanced("🔄 토큰 상태 확인 중...", "cyan")
+            should_refresh, reason = should_refresh_token()
+            if should_refresh:
+                print_enhanced(f"🔄 토큰 재발급: {reason}", "yellow")
+        elif stage == "market_open":
+            print_enhanced(f"\n🎉 장이 시작되었습니다! {trading_start:%H:%M}에 매매를 시작합니다.", "bright_green")
     
-    return False
+    return True
 
 # ================================================================================
 # 🔧 Enhanced UI 매수 통합 함수
 # ================================================================================
 
-async def find_scalping_targets_enhanced(engine: ScalpingEngine, token: str, top_n: int = None) -> List[Dict]:
-    """🎨 Enhanced UI 10만원 한도 기반 단타 매수 대상 검색"""
-    all_candidates = []
+async def find_scalping_targets_enhanced(engine: ScalpingEngine, token: str, top_n: int = None,
+                                        auto_buy: bool = True) -> List[Dict]:
+    """🎨 Enhanced UI 10만원 한도 기반 단타 매수 대상 검색 (auto_buy=False면 후보만 반환)
     
+    조건검색(웹소켓)은 이벤트 루프에서, 종목 조회·필터·표 출력(동기 HTTP)은 작업 스레드에서 실행해
+    스캔이 길어져도 같은 루프의 청산 감시를 막지 않는다.
+    """
     mode_text = "모니터링 전용" if engine.monitor_only else "실제 거래"
     
     # 시작 패널 표시
@@ -656,6 +353,21 @@ async def find_scalping_targets_enhanced(engine: ScalpingEngine, token: str, top
     else:
         print_enhanced(f"\n🔍 조건검색식 매수 대상 검색 시작... [{mode_text}]", "bright_blue")
     
+    # 조건검색식 실행 및 병합 (조건식 간 중복 종목은 한 번만 조회)
+    merger = await collect_condition_matches(token, top_n)
+    
+    all_candidates = await asyncio.to_thread(select_targets_enhanced, engine, token, merger)
+    if not all_candidates:
+        return []
+    
+    # 스마트 자동 매수 실행 (작업 그래프에서는 매수 작업이 따로 처리)
+    if auto_buy:
+        await buy_candidates_enhanced(engine, all_candidates, token)
+    
+    return all_candidates
+
+def select_targets_enhanced(engine: ScalpingEngine, token: str, merger: CandidateMerger) -> List[Dict]:
+    """🎨 병합된 조건검색 결과 → 종목 조회/필터 → 최종 후보 (동기 - 작업 스레드에서 호출)"""
     # 조건검색 결과 테이블
     if RICH_AVAILABLE:
         results_table = Table(title="📋 조건검색식 결과", box=box.ROUNDED)
@@ -665,127 +377,68 @@ async def find_scalping_targets_enhanced(engine: ScalpingEngine, token: str, top
         results_table.add_column("유효종목", style="magenta")
         results_table.add_column("상태", style="white")
     
-    for seq in CONDITION_SEQ_LIST:
-        try:
-            print_enhanced(f"\n📡 조건검색식 {seq}번 실행 중...", "cyan")
-            codes, cond_name = await get_condition_codes(seq, token)
-            
-            if not codes:
-                status = "❌ 결과 없음"
-                if RICH_AVAILABLE:
-                    results_table.add_row(str(seq), "조회 실패", "0", "0", status)
-                print_enhanced(f"📝 조건검색식 {seq}번 결과 없음", "red")
-                continue
-            
-            print_enhanced(f"✅ 조건검색식 {seq}번 ({cond_name}) - {len(codes)}개 종목 발견", "green")
-            
-            # 종목 정보 수집
-            process_count = len(codes) if top_n is None else min(len(codes), top_n)
-            candidates = []
-            etf_count = 0
-            api_fail_count = 0
-            over_price_count = 0
-            
-            # Rich 프로그레스 바로 진행률 표시
-            if RICH_AVAILABLE:
-                with create_progress_bar(f"종목 정보 수집 중... (조건{seq})") as progress:
-                    task = progress.add_task("처리 중...", total=process_count)
-                    
-                    for i, code in enumerate(codes[:process_count]):
-                        if i > 0:
-                            time.sleep(0.1)
-                        
-                        code = normalize_code(code)
-                        info = get_stock_info(code, token)
-                        
-                        if not info:
-                            api_fail_count += 1
-                            progress.update(task, advance=1)
-                            continue
-                        
-                        if is_etf_etn(info.get("name", "")):
-                            etf_count += 1
-                            progress.update(task, advance=1)
-                            continue
-                        
-                        if info["price"] > 100_000:
-                            over_price_count += 1
-                            progress.update(task, advance=1)
-                            continue
-                        
-                        candidate = {
-                            "code": code,
-                            "name": info["name"],
-                            "price": info["price"],
-                            "amount": info["amount"],
-                            "condition_seq": seq,
-                            "condition_name": cond_name
-                        }
-                        candidates.append(candidate)
-                        progress.update(task, advance=1)
-            else:
-                # 기본 처리
-                for i, code in enumerate(codes[:process_count]):
-                    if i > 0:
-                        time.sleep(0.1)
-                    
-                    code = normalize_code(code)
-                    info = get_stock_info(code, token)
-                    
-                    if not info:
-                        api_fail_count += 1
-                        continue
-                    
-                    if is_etf_etn(info.get("name", "")):
-                        etf_count += 1
-                        continue
-                    
-                    if info["price"] > 100_000:
-                        over_price_count += 1
-                        continue
-                    
-                    candidate = {
-                        "code": code,
-                        "name": info["name"],
-                        "price": info["price"],
-                        "amount": info["amount"],
-                        "condition_seq": seq,
-                        "condition_name": cond_name
-                    }
-                    candidates.append(candidate)
-            
-            # 결과 정리
-            candidates.sort(key=lambda x: x["amount"], reverse=True)
-            status = f"✅ {len(candidates)}개 유효"
-            
-            if RICH_AVAILABLE:
-                results_table.add_row(
-                    str(seq), 
-                    cond_name[:20] + "..." if len(cond_name) > 20 else cond_name,
-                    str(len(codes)), 
-                    str(len(candidates)), 
-                    status
-                )
-            
-            # 필터링 결과 출력
-            filter_info = f"ETF제외: {etf_count}개, 주가초과: {over_price_count}개, API실패: {api_fail_count}개"
-            print_enhanced(f"📊 필터링 결과: {process_count}개 처리 → {len(candidates)}개 유효 ({filter_info})", "yellow")
-            
-            all_candidates.extend(candidates)
-                    
-        except Exception as e:
-            print_enhanced(f"[ERROR] 조건검색식 {seq} 조회 실패: {e}", "red")
-            if RICH_AVAILABLE:
-                results_table.add_row(str(seq), "오류 발생", "0", "0", "❌ 실패")
+    # 고유 종목 정보 확보 및 필터링
+    candidates = []
+    etf_count = 0
+    api_fail_count = 0
+    over_price_count = 0
+    
+    # 주가 10만원 초과/거래완료 종목은 최근 가격으로 조회 전에 제외
+    fetch_codes = prefilter_condition_matches(engine.price_prefilter, engine.condition_scanner, merger,
+                                              token, 100_000, set(engine.traded_today))
+    
+    # 신규 편입 종목만 개별 조회 (Rich 프로그레스 바로 진행률 표시)
+    new_count = engine.condition_scanner.count_new(fetch_codes)
+    if RICH_AVAILABLE and new_count > 0:
+        with create_progress_bar(f"신규 종목 정보 수집 중... ({new_count}/{len(fetch_codes)}개)") as progress:
+            task = progress.add_task("처리 중...", total=new_count)
+            infos = enrich_condition_matches(engine.condition_scanner, merger, token,
+                                             on_fetch=lambda code: progress.update(task, advance=1),
+                                             codes=fetch_codes)
+    else:
+        infos = enrich_condition_matches(engine.condition_scanner, merger, token, codes=fetch_codes)
+    
+    for code in fetch_codes:
+        info = infos.get(code)
+        
+        if not info:
+            api_fail_count += 1
+            continue
+        
+        if is_etf_etn(info.get("name", "")):
+            etf_count += 1
+            continue
         
-        time.sleep(0.5)
+        if info["price"] > 100_000:
+            over_price_count += 1
+            continue
+        
+        candidates.append(merger.build_candidate(code, info))
+    
+    # 필터링 결과 출력
+    if fetch_codes:
+        filter_info = f"ETF제외: {etf_count}개, 주가초과: {over_price_count}개, API실패: {api_fail_count}개"
+        print_enhanced(f"📊 필터링 결과: 고유 {len(fetch_codes)}개 처리 → {len(candidates)}개 유효 ({filter_info})", "yellow")
     
     # 조건검색 결과 테이블 출력
     if RICH_AVAILABLE:
+        for seq, seq_candidates in merger.group_by_condition(candidates).items():
+            cond_name = merger.condition_names.get(seq, "")
+            results_table.add_row(
+                str(seq), 
+                cond_name[:20] + "..." if len(cond_name) > 20 else cond_name,
+                str(merger.condition_hits.get(seq, 0)), 
+                str(len(seq_candidates)), 
+                f"✅ {len(seq_candidates)}개 유효"
+            )
         console.print(results_table)
     
-    # 최종 후보 정리
-    all_candidates.sort(key=lambda x: x["amount"], reverse=True)
+    # 최종 후보 정리 (다중 조건 점수 순, 실제 거래는 매수 가능 종목 중 빈 자리만큼만 선택)
+    if engine.monitor_only:
+        all_candidates = select_top_candidates(candidates)
+    else:
+        buyable = [c for c in candidates if engine.can_buy_stock(c["code"])[0]]
+        all_candidates = select_top_candidates(buyable, get_candidate_limit(5 - len(engine.positions)))
     
     if not all_candidates:
         print_enhanced("📝 10만원 한도 내 매수 가능한 종목이 없습니다.", "red")
@@ -793,7 +446,7 @@ async def find_scalping_targets_enhanced(engine: ScalpingEngine, token: str, top
     
     # 최종 후보 테이블
     if RICH_AVAILABLE:
-        final_table = Table(title="🎯 최종 매수 후보 (거래대금 순)", box=box.ROUNDED)
+        final_table = Table(title="🎯 최종 매수 후보 (다중조건 점수 순)", box=box.ROUNDED)
         final_table.add_column("순위", style="cyan", no_wrap=True)
         final_table.add_column("종목명", style="green")
         final_table.add_column("현재가", style="yellow", justify="right")
@@ -811,19 +464,25 @@ async def find_scalping_targets_enhanced(engine: ScalpingEngine, token: str, top
                 f"{candidate['price']:,}원",
                 f"{max_quantity}주",
                 f"{max_amount:,}원",
-                f"조건{candidate['condition_seq']}"
+                f"조건{','.join(map(str, candidate['matched_conditions']))}"
             )
         
         console.print(final_table)
     else:
-        print_enhanced(f"\n🎯 최종 후보: {len(all_candidates)}개 종목 (거래대금 순)", "bright_green")
+        print_enhanced(f"\n🎯 최종 후보: {len(all_candidates)}개 종목 (다중조건 점수 순)", "bright_green")
         for i, candidate in enumerate(all_candidates[:5], 1):
             max_quantity = 100_000 // candidate["price"]
             max_amount = max_quantity * candidate["price"]
             status_text = "분석만" if engine.monitor_only else f"조건{candidate['condition_seq']}"
             print_enhanced(f"  {i}. {candidate['name']} @{candidate['price']:,}원 - {max_quantity}주 = {max_amount:,}원 ({status_text})", "white")
     
-    # 스마트 자동 매수 실행
+    return all_candidates
+
+async def buy_candidates_enhanced(engine: ScalpingEngine, all_candidates: List[Dict], token: str,
+                                  show_positions: bool = True) -> int:
+    """🚀 최종 후보 스마트 자동 매수 (모니터링 전용이면 분석만) - 매수 종목 수 반환"""
+    bought_count = 0
+    
     if not engine.monitor_only:
         current_positions = len(engine.positions)
         available_positions = 5 - current_positions
@@ -839,7 +498,7 @@ async def find_scalping_targets_enhanced(engine: ScalpingEngine, token: str, top
                 print_enhanced(f"\n🚀 스마트 자동 매수 시작:", "bright_green")
                 print_enhanced(f"   🎯 목표: {available_positions}개 종목 (현재: {current_positions}/5)", "white")
             
-            bought_count = engine.buy_available_stocks_smartly(all_candidates, available_positions)
+            bought_count = await engine.buy_available_stocks_concurrently(all_candidates, available_positions, token)
             
             if bought_count > 0:
                 print_enhanced(f"✅ 스마트 매수 성공: {bought_count}개 종목", "bright_green")
@@ -852,7 +511,7 @@ async def find_scalping_targets_enhanced(engine: ScalpingEngine, token: str, top
                     print_enhanced(f"⚠️ 데이터 저장 실패: {save_error}", "red")
                 
                 # 매수 후 상태 출력
-                if engine.positions:
+                if show_positions and engine.positions:
                     print_detailed_positions_table_enhanced(engine, token)
             else:
                 print_enhanced("❌ 매수 실패: 모든 후보 종목 매수 불가", "red")
@@ -860,11 +519,10 @@ async def find_scalping_targets_enhanced(engine: ScalpingEngine, token: str, top
             print_enhanced(f"\n⚠️ 포지션 한도 초과: {current_positions}/5 - 매수 건너뜀", "yellow")
     else:
         print_enhanced("\n👀 [모니터링 전용] 실제 매수 없이 분석만 완료", "cyan")
-        available_positions = 5
-        analyze_count = engine.buy_available_stocks_smartly(all_candidates, available_positions)
+        analyze_count = len([c for c in all_candidates if engine.can_buy_stock(c["code"])[0]])
         print_enhanced(f"👀 분석 완료: {analyze_count}개 종목 분석", "cyan")
     
-    return all_candidates
+    return bought_count
 
 def print_detailed_positions_table_enhanced(engine: ScalpingEngine, token: str):
     """🎨 Enhanced 상세 포지션 현황 테이블"""
@@ -962,7 +620,7 @@ def print_detailed_positions_table_enhanced(engine: ScalpingEngine, token: str):
         # 포트폴리오 요약
         if total_cost > 0:
             total_profit_rate = (total_profit / total_cost * 100)
-            cumulative_return = engine.money_manager.cumulative_return
+            cumulative_return = engine.money_manager.get_portfolio_value().get('cumulative_return', 0)
             
             summary_data = {
                 "💼 투자금": f"{total_cost:,}원",
@@ -987,12 +645,128 @@ def print_detailed_positions_table_enhanced(engine: ScalpingEngine, token: str):
         # 기존 tabulate 방식 유지
         print_detailed_positions_table(engine, token)
 
+# ================================================================================
+# 🧵 작업 그래프 (청산 감시 / 후보 스캔 / 매수 / 보고·저장)
+# ================================================================================
+
+async def run_trading_task_graph(engine: ScalpingEngine, token: str, test_mode: bool, monitor_only: bool,
+                                 loop_interval: int, replication: ReplicationPrimary = None) -> str:
+    """🧵 독립 작업으로 거래 실행 - 종료 사유 반환 (force_sell / trading_end / fenced / ...)
+    
+    후보 스캔은 작업 스레드에서 돌아 오래 걸려도 청산 감시를 막지 않는다.
+    장부를 바꾸는 매수/청산은 이벤트 루프에서만 실행되어 서로 겹치지 않는다.
+    replication이 있으면 하트비트를 보내고, 스탠바이가 인계하면(펜싱) 즉시 멈춘다.
+    """
+    graph = TradingTaskGraph(clock=get_ntp_time)
+    mode_text = "모니터링 전용" if monitor_only else "실제 거래"
+    scan_count = 0
+    session_timers = not test_mode and not monitor_only
+    trading_open = not session_timers or is_trading_time(graph.now())[0]
+    
+    async def trading_start_step():
+        """09:05 매매 시작"""
+        nonlocal trading_open
+        if not trading_open and is_trading_time(graph.now())[0]:
+            print_enhanced(f"🔔 매매 시작 ({TRADING_START_TIME:%H:%M})", "bright_green")
+            trading_open = True
+            graph.wake("scanner")
+    
+    async def trading_end_step():
+        """14:00 신규 매매 종료"""
+        print_enhanced(f"⚠️ 매매 시간 종료 ({TRADING_END_TIME:%H:%M} 이후)", "red")
+        graph.stop("trading_end")
+    
+    async def force_sell_step():
+        """15:10 강제 청산"""
+        graph.stop("force_sell")
+    
+    async def exit_step():
+        """청산 감시 - 시세는 작업 스레드에서, 매도는 이벤트 루프에서"""
+        if monitor_only or not engine.positions:
+            return
+        signals = await asyncio.to_thread(engine.collect_exit_signals, token)
+        exit_count = engine.execute_exits(signals)
+        if exit_count > 0:
+            engine.log_activity(f"✅ 청산 완료: {exit_count}개 포지션")
+            graph.publish("reports", "exit", "exit_watcher", exit_count)
+    
+    async def scan_step():
+        """후보 스캔 - 결과는 매수 큐로 전달"""
+        nonlocal scan_count
+        if not trading_open:
+            return
+        scan_count += 1
+        
+        if RICH_AVAILABLE:
+            console.print(Panel(
+                f"시간: {graph.now().strftime('%H:%M:%S')}\n모드: {mode_text}",
+                title=f"🔄 후보 스캔 {scan_count}",
+                style="bright_blue"
+            ))
+        else:
+            print_enhanced(f"\n🔄 후보 스캔 {scan_count} 시작 ({graph.now().strftime('%H:%M:%S')}) [{mode_text}]", "bright_blue")
+        
+        start = time.time()
+        candidates = await find_scalping_targets_enhanced(engine, token, top_n=None, auto_buy=False)
+        print_enhanced(f"\n⏱️ 스캔 실행시간: {time.time() - start:.2f}초", "white")
+        
+        if candidates:
+            graph.publish("candidates", "candidates", "scanner", candidates)
+    
+    async def buy_handler(event):
+        """매수 - 밀린 스캔 결과는 최신 것만 사용"""
+        if graph.stopping:
+            return
+        bought_count = await buy_candidates_enhanced(engine, event.payload, token, show_positions=False)
+        if bought_count > 0:
+            graph.publish("reports", "buy", "buyer", bought_count)
+    
+    async def report_handler(event):
+        """매수/청산 후 저장 + 현황 출력"""
+        try:
+            save_result = engine.money_manager.save_daily_data()
+            engine.log_activity(f"💾 {event.kind} 후 데이터 저장: {save_result}")
+        except Exception as save_error:
+            engine.log_activity(f"⚠️ {event.kind} 후 데이터 저장 실패: {save_error}")
+        
+        if engine.positions:
+            await asyncio.to_thread(print_detailed_positions_table_enhanced, engine, token)
+        else:
+            await asyncio.to_thread(engine.print_status, token)
+    
+    async def persist_step():
+        """주기 저장"""
+        if not monitor_only:
+            engine.money_manager.save_daily_data()
+    
+    async def heartbeat_step():
+        """스탠바이용 하트비트 (이벤트 루프가 멈추면 하트비트도 멈춤)"""
+        if not replication.beat():
+            graph.stop("fenced")
+    
+    if session_timers:
+        graph.add_timer("trading_start", TRADING_START_TIME, trading_start_step)
+        graph.add_timer("trading_end", TRADING_END_TIME, trading_end_step)
+        graph.add_timer("force_sell", FORCE_SELL_TIME, force_sell_step)
+    graph.add_periodic("exit_watcher", EXIT_WATCH_INTERVAL, exit_step)
+    graph.add_periodic("scanner", loop_interval, scan_step)
+    graph.add_periodic("persister", PERSIST_INTERVAL, persist_step)
+    if replication is not None:
+        graph.add_periodic("heartbeat", HEARTBEAT_INTERVAL, heartbeat_step)
+    graph.add_consumer("buyer", "candidates", buy_handler, latest_only=True)
+    graph.add_consumer("reporter", "reports", report_handler)
+    
+    stop_reason = await graph.run()
+    graph.print_stats()
+    return stop_reason
+
 # ================================================================================
 # 🔄 Enhanced 메인 거래 루프
 # ================================================================================
 
 async def main_trading_loop_enhanced(test_mode: bool = False, monitor_only: bool = False):
     """🎨 Enhanced 메인 거래 루프"""
+    replication = None
     
     try:
         # 토큰 검증
@@ -1025,7 +799,7 @@ async def main_trading_loop_enhanced(test_mode: bool = False, monitor_only: bool
             "📅 시작 시간": server_time.strftime('%Y-%m-%d %H:%M:%S'),
             "🧪 테스트 모드": 'ON' if test_mode else 'OFF',
             "👀 모니터링 전용": 'ON' if monitor_only else 'OFF',
-            "⏰ 루프 간격": f"{loop_interval}초",
+            "⏰ 스캔 / 청산감시 간격": f"{loop_interval}초 / {EXIT_WATCH_INTERVAL}초",
             "🌐 시간 서버": "V2 NTP 시스템",
             "💰 시스템 설정": "50만원 가상자산, 종목당 10만원 한도, 최대 5종목"
         }
@@ -1074,112 +848,31 @@ async def main_trading_loop_enhanced(test_mode: bool = False, monitor_only: bool
             for feature in features:
                 print_enhanced(f"  • {feature}", "white")
         
-        loop_count = 0
+        # 작업 그래프 실행 (청산 감시 / 후보 스캔 / 매수 / 보고·저장이 각자 주기로 동작)
+        # 핫 스탠바이 복제 (거래 저널 + 하트비트) - 스탠바이: python hot_standby.py
+        replication = None if monitor_only else ReplicationPrimary(engine.money_manager)
+        stop_reason = await run_trading_task_graph(engine, token, test_mode, monitor_only, loop_interval,
+                                                   replication)
         
-        # 메인 거래 루프
-        while True:
-            loop_count += 1
-            loop_start_time = time.time()
-            
-            try:
-                current_server_time = get_ntp_time()
-                mode_text = "모니터링 전용" if monitor_only else "실제 거래"
+        # 강제 청산
+        if stop_reason == "force_sell":
+            print_enhanced(f"🚨 강제 청산 시간 도달 ({FORCE_SELL_TIME:%H:%M})", "bright_red")
+            force_count = engine.force_sell_all(token)
+            if force_count > 0:
+                print_enhanced(f"🚨 강제 청산 실행: {force_count}개", "bright_red")
                 
-                # 루프 시작 알림
-                if RICH_AVAILABLE:
-                    console.print(Panel(
-                        f"시간: {current_server_time.strftime('%H:%M:%S')}\n모드: {mode_text}",
-                        title=f"🔄 거래 루프 {loop_count}",
-                        style="bright_blue"
-                    ))
-                else:
-                    print_enhanced(f"\n🔄 거래 루프 {loop_count} 시작 ({current_server_time.strftime('%H:%M:%S')}) [{mode_text}]", "bright_blue")
-                
-                # 강제 청산 시간 체크
-                if not test_mode and not monitor_only and is_force_sell_time(current_server_time):
-                    print_enhanced("🚨 강제 청산 시간 도달 (15:10)", "bright_red")
-                    force_count = engine.force_sell_all(token)
-                    if force_count > 0:
-                        print_enhanced(f"🚨 강제 청산 실행: {force_count}개", "bright_red")
-                        
-                        # 데이터 저장
-                        try:
-                            save_result = engine.money_manager.save_daily_data()
-                            print_enhanced(f"💾 강제 청산 후 데이터 저장: {save_result}", "green")
-                        except Exception as save_error:
-                            print_enhanced(f"⚠️ 강제 청산 후 데이터 저장 실패: {save_error}", "red")
-                    else:
-                        print_enhanced("📝 강제 청산할 포지션이 없습니다.", "yellow")
-                    
-                    print_enhanced("🏁 거래 종료 - 장 마감", "bright_green")
-                    break
-                
-                # 매매 시간 재확인
-                if not test_mode and not monitor_only:
-                    can_trade_now, trade_status = is_trading_time(current_server_time)
-                    if not can_trade_now:
-                        print_enhanced(f"⚠️ 매매 시간 종료: {trade_status}", "red")
-                        print_enhanced("🏁 거래 루프 종료", "bright_green")
-                        break
-                
-                # 매수 대상 검색 (Enhanced UI)
-                candidates = await find_scalping_targets_enhanced(engine, token, top_n=None)
-                
-                # 청산 조건 체크
-                if not monitor_only and engine.positions:
-                    print_enhanced("\n🔍 청산 조건 체크 중...", "cyan")
-                    exit_count = engine.check_exit_conditions(token)
-                    if exit_count > 0:
-                        engine.log_activity(f"✅ 청산 완료: {exit_count}개 포지션")
-                        
-                        # 데이터 저장
-                        try:
-                            save_result = engine.money_manager.save_daily_data()
-                            engine.log_activity(f"💾 청산 후 데이터 저장: {save_result}")
-                        except Exception as save_error:
-                            engine.log_activity(f"⚠️ 청산 후 데이터 저장 실패: {save_error}")
-                        
-                        # 청산 후 상태 업데이트
-                        if engine.positions:
-                            print_detailed_positions_table_enhanced(engine, token)
-                        else:
-                            engine.print_status(token)
-                    else:
-                        print_enhanced("   📌 청산 조건 미충족 - 모든 포지션 유지", "yellow")
-                        
-                        if engine.positions:
-                            print_detailed_positions_table_enhanced(engine, token)
-                elif monitor_only:
-                    print_enhanced("\n👀 [모니터링 전용] 실제 매수/매도 없음 - 조건검색 결과만 분석", "cyan")
-                else:
-                    print_enhanced("\n📊 현재 보유 포지션 없음", "yellow")
-                
-                # 데이터 저장 보장
-                if not monitor_only and (len(engine.money_manager.all_buy_transactions) > 0 or len(engine.money_manager.all_sell_transactions) > 0):
-                    try:
-                        save_result = engine.money_manager.save_daily_data()
-                        if loop_count % 10 == 0:
-                            engine.log_activity(f"💾 루프 종료 시 데이터 저장: {save_result}")
-                    except Exception as save_error:
-                        engine.log_activity(f"⚠️ 루프 종료 시 데이터 저장 실패: {save_error}")
-                
-                # 루프 실행 시간
-                loop_duration = time.time() - loop_start_time
-                print_enhanced(f"\n⏱️ 루프 실행시간: {loop_duration:.2f}초", "white")
-                
-                # Enhanced 카운트다운 대기
-                force_exit = await enhanced_countdown_wait(loop_interval, test_mode or monitor_only, engine)
-                if force_exit:
-                    print_enhanced("🚨 강제 청산 시간 도달로 루프 종료", "bright_red")
-                    break
-                
-            except Exception as e:
-                engine.log_activity(f"❌ 거래 루프 {loop_count} 오류: {e}")
-                import traceback
-                traceback.print_exc()
-                print_enhanced(f"⚠️ 오류 발생, {loop_interval}초 후 재시도...", "red")
-                
-                await enhanced_countdown_wait(loop_interval, test_mode or monitor_only, engine)
+                # 데이터 저장
+                try:
+                    save_result = engine.money_manager.save_daily_data()
+                    print_enhanced(f"💾 강제 청산 후 데이터 저장: {save_result}", "green")
+                except Exception as save_error:
+                    print_enhanced(f"⚠️ 강제 청산 후 데이터 저장 실패: {save_error}", "red")
+            else:
+                print_enhanced("📝 강제 청산할 포지션이 없습니다.", "yellow")
+            
+            print_enhanced("🏁 거래 종료 - 장 마감", "bright_green")
+        else:
+            print_enhanced("🏁 거래 루프 종료", "bright_green")
             
     except KeyboardInterrupt:
         print_enhanced("\n\n👋 사용자가 프로그램을 종료했습니다.", "bright_yellow")
@@ -1199,13 +892,17 @@ async def main_trading_loop_enhanced(test_mode: bool = False, monitor_only: bool
                 final_save = engine.money_manager.save_daily_data()
                 print_enhanced(f"💾 최종 거래 데이터 저장 완료: {final_save}", "green")
                 
-                total_buy = len(engine.money_manager.all_buy_transactions)
-                total_sell = len(engine.money_manager.all_sell_transactions)
+                total_buy = len(engine.money_manager.buy_transactions)
+                total_sell = len(engine.money_manager.sell_transactions)
                 print_enhanced(f"📊 최종 거래 통계: 매수 {total_buy}회, 매도 {total_sell}회", "white")
                 
         except Exception as e:
             print_enhanced(f"⚠️ 최종 데이터 저장 실패: {e}", "red")
         
+        # 정상 종료 (장 종료 / 강제 청산 후 / Ctrl-C) - 임대 반납으로 스탠바이가 인계하지 않음
+        if replication is not None:
+            replication.release()
+        
         print_enhanced("✅ 프로그램 종료 완료", "bright_green")
 
 # ================================================================================
@@ -2,134 +2,48 @@ import asyncio
 import sys
 import os
 import time
-from datetime import datetime, timedelta, date
 from tabulate import tabulate
 import json
 import requests
-import ntplib
+from market_clock import get_market_clock, market_now
+from trading_calendar import get_trading_calendar, TRADING_START_TIME, MARKET_CLOSE_TIME
 
 # ================================================================================
 # 🔥 완전한 시장 대기모드 시스템 (리팩토링)
 # ================================================================================
 
-# 한국거래소 휴장일 (2025년)
-HOLIDAYS_2025 = [
-    "2025-01-01",  # 신정
-    "2025-01-28",  # 설날 연휴
-    "2025-01-29",  # 설날
-    "2025-01-30",  # 설날 연휴
-    "2025-03-01",  # 삼일절
-    "2025-05-05",  # 어린이날
-    "2025-05-06",  # 부처님오신날 대체공휴일
-    "2025-06-06",  # 현충일
-    "2025-08-15",  # 광복절
-    "2025-09-06",  # 추석 연휴
-    "2025-09-07",  # 추석 연휴
-    "2025-09-08",  # 추석
-    "2025-09-09",  # 추석 연휴
-    "2025-10-03",  # 개천절
-    "2025-10-09",  # 한글날
-    "2025-12-25",  # 성탄절
-]
-
-# 🔥 글로벌 시간 관리 변수
-_ntp_time_offset = 0  # NTP와 로컬 시간의 차이
-_last_ntp_sync = 0    # 마지막 NTP 동기화 시각
-_ntp_sync_interval = 3600  # 1시간마다 재동기화
-
 def sync_ntp_time(force=False):
-    """NTP 시간 동기화 (1시간마다 또는 강제 동기화)"""
-    global _ntp_time_offset, _last_ntp_sync
-    
-    current_time = time.time()
+    """NTP 시간 동기화 - 공용 시계 서비스가 백그라운드로 측정 (force면 즉시 측정)"""
+    clock = get_market_clock()
+    if not force:
+        return clock.is_synced
     
-    # 강제 동기화가 아니고, 마지막 동기화로부터 1시간이 지나지 않았으면 스킵
-    if not force and (current_time - _last_ntp_sync) < _ntp_sync_interval:
-        return True
-    
-    try:
-        ntp_servers = [
-            'time.google.com',
-            'pool.ntp.org', 
-            'time.nist.gov',
-            'time.windows.com'
-        ]
-        
-        for server in ntp_servers:
-            try:
-                client = ntplib.NTPClient()
-                response = client.request(server, version=3, timeout=5)
-                ntp_timestamp = response.tx_time
-                local_timestamp = time.time()
-                
-                _ntp_time_offset = ntp_timestamp - local_timestamp
-                _last_ntp_sync = current_time
-                
-                # 동기화 성공 메시지 (조건부 출력)
-                ntp_time = datetime.fromtimestamp(ntp_timestamp)
-                time_diff = abs(_ntp_time_offset)
-                
-                if time_diff > 2:  # 2초 이상 차이날 때만 경고
-                    print(f"⚠️  시간 차이 감지: {time_diff:.1f}초 - NTP 동기화 적용 ({server})")
-                elif force:  # 강제 동기화일 때만 성공 메시지
-                    print(f"🌐 NTP 시간 동기화 완료: {server} ({ntp_time.strftime('%Y-%m-%d %H:%M:%S')})")
-                
-                return True
-                
-            except Exception:
-                continue
-                
-        # 모든 서버 실패 시
-        if force:
-            print("⚠️  NTP 동기화 실패 - 로컬 시간 사용")
-        return False
-        
-    except Exception as e:
-        if force:
-            print(f"⚠️  시간 동기화 오류: {e} - 로컬 시간 사용")
+    if not clock.sync_now():
+        print("⚠️  NTP 동기화 실패 - 로컬 시간 사용")
         return False
+    
+    metrics = clock.get_metrics()
+    if abs(metrics["offset"]) > 2:  # 2초 이상 차이날 때만 경고
+        print(f"⚠️  시간 차이 감지: {abs(metrics['offset']):.1f}초 - NTP 동기화 적용 ({metrics['last_server']})")
+    else:
+        print(f"🌐 NTP 시간 동기화 완료: {metrics['last_server']} ({clock.now().strftime('%Y-%m-%d %H:%M:%S')})")
+    return True
 
 def get_ntp_time():
-    """NTP 동기화된 시간 반환 (효율적 버전)"""
-    # 첫 동기화 또는 1시간마다 재동기화
-    sync_ntp_time()
-    
-    # 오프셋을 적용한 현재 시간 반환
-    return datetime.fromtimestamp(time.time() + _ntp_time_offset)
+    """NTP 보정 시간 반환 (공용 시계 - 호출 시 네트워크 조회 없음)"""
+    return market_now()
 
 def is_market_holiday(check_date=None):
-    """한국거래소 휴장일 여부 확인"""
+    """한국거래소 휴장일 여부 확인 (거래일 달력)"""
     if check_date is None:
         check_date = get_ntp_time().date()
     
-    # 문자열로 변환하여 비교
-    date_str = check_date.strftime('%Y-%m-%d')
-    
-    # 주말 체크
-    weekday = check_date.weekday()  # 0=월요일, 6=일요일
-    if weekday >= 5:  # 토요일(5), 일요일(6)
-        return True, "주말"
-    
-    # 공휴일 체크
-    if date_str in HOLIDAYS_2025:
-        return True, "공휴일"
-    
-    return False, "개장일"
+    return get_trading_calendar().holiday_reason(check_date)
 
 def get_next_trading_day():
-    """다음 개장일 찾기"""
-    current_date = get_ntp_time().date()
-    
-    # 오늘부터 최대 10일 후까지 검색
-    for i in range(10):
-        check_date = current_date + timedelta(days=i)
-        is_holiday, reason = is_market_holiday(check_date)
-        
-        if not is_holiday:
-            return check_date, reason
-    
-    # 10일 후에도 개장일이 없으면 (연휴가 매우 긴 경우)
-    return current_date + timedelta(days=1), "추정개장일"
+    """다음 개장일 찾기 (오늘 포함)"""
+    next_date = get_trading_calendar().next_trading_day(get_ntp_time().date())
+    return next_date, "개장일"
 
 def is_trading_session():
     """현재 장시간인지 확인"""
@@ -144,11 +58,11 @@ def is_trading_session():
     current_time = now.time()
     
     # 장 시작 전 (00:00 ~ 09:04)
-    if current_time < datetime.strptime("09:05", "%H:%M").time():
+    if current_time < TRADING_START_TIME:
         return False, "장시작전"
     
     # 장중 (09:05 ~ 15:30)
-    elif datetime.strptime("09:05", "%H:%M").time() <= current_time <= datetime.strptime("15:30", "%H:%M").time():
+    elif current_time <= MARKET_CLOSE_TIME:
         return True, "장중"
     
     # 장 종료 후 (15:31 ~ 23:59)
@@ -156,37 +70,13 @@ def is_trading_session():
         return False, "장종료"
 
 def calculate_time_until_market():
-    """장 시작까지 남은 시간 계산"""
+    """장 시작(다음 개장일 09:05)까지 남은 시간 계산"""
     now = get_ntp_time()
+    next_market_start = get_trading_calendar().next_session_time(now, TRADING_START_TIME)
     
-    # 오늘이 개장일인지 확인
-    is_holiday, holiday_reason = is_market_holiday(now.date())
-    
-    if not is_holiday:
-        # 오늘이 개장일이면
-        market_start_today = now.replace(hour=9, minute=5, second=0, microsecond=0)
-        
-        if now < market_start_today:
-            # 오늘 장 시작 전
-            return market_start_today - now, "오늘"
-    
-    # 오늘이 휴장일이거나 장 종료 후라면 다음 개장일 찾기
-    next_trading_date, _ = get_next_trading_day()
-    
-    # 다음 개장일의 9시 5분
-    if next_trading_date == now.date():
-        # 오늘이 개장일인데 장 종료 후 - 다음 개장일 재계산
-        tomorrow = now.date() + timedelta(days=1)
-        for i in range(10):
-            check_date = tomorrow + timedelta(days=i)
-            is_holiday, _ = is_market_holiday(check_date)
-            if not is_holiday:
-                next_trading_date = check_date
-                break
-    
-    next_market_start = datetime.combine(next_trading_date, datetime.strptime("09:05", "%H:%M").time())
-    time_diff = next_market_start - now
-    return time_diff, next_trading_date.strftime('%Y-%m-%d')
+    if next_market_start.date() == now.date():
+        return next_market_start - now, "오늘"
+    return next_market_start - now, next_market_start.strftime('%Y-%m-%d')
 
 def format_time_diff(time_diff):
     """시간 차이를 읽기 쉽게 포맷"""
@@ -386,6 +276,8 @@ from scalping_engine import (
     LOOP_INTERVAL,
     INITIAL_CAPITAL
 )
+from scalping_candidates import get_candidate_limit
+from scalping_scheduler import WallClockTicker, IntervalSchedule, LATE_TOLERANCE
 
 # ================================================================================
 # V2.0 단타 매매 시스템 설정 (기존 유지)
@@ -595,41 +487,20 @@ async def execute_scalping_loop(engine: ScalpingEngine, token: str, loop_count:
         if available_slots > 0:
             print(f"🔍 신규 매수 대상 검색 중... (빈 자리: {available_slots}개)", flush=True)
             
-            # 🔥 리팩토링: top_n=None으로 전체 결과 처리
-            candidates = await find_scalping_targets(engine, token, top_n=None)
+            # 🔥 리팩토링: top_n=None으로 전체 결과 처리, 빈 자리만큼만 상위 후보 선택
+            candidates = await find_scalping_targets(engine, token, top_n=None,
+                                                     max_candidates=get_candidate_limit(available_slots))
             
             if candidates:
                 print(f"📋 매수 후보 {len(candidates)}개 발견:", flush=True)
                 for i, candidate in enumerate(candidates[:3], 1):
                     print(f"  {i}. {candidate['name']} - 거래대금 {candidate['amount']:,}원", flush=True)
                 
-                print(f"\n💰 매수 시도 시작... (최대 {available_slots}개)", flush=True)
+                print(f"\n💰 매수 시도 시작... (최대 {available_slots}개 동시 진행)", flush=True)
                 
-                # 상위 종목들 매수 시도
-                buy_count = 0
-                for i, candidate in enumerate(candidates, 1):
-                    if buy_count >= available_slots:
-                        print(f"🔄 포지션 한도 도달 - 매수 중단", flush=True)
-                        break
-                    
-                    print(f"🎯 [{i}번째 시도] {candidate['name']} 매수 중...", flush=True)
-                    
-                    success = engine.buy_stock(
-                        candidate["code"],
-                        candidate["name"],
-                        candidate["price"],
-                        candidate["condition_seq"],
-                        candidate["amount"]  # 🔥 매수시점 거래대금
-                    )
-                    
-                    if success:
-                        buy_count += 1
-                        executed_actions += 1
-                        print(f"✅ [{i}번째] 매수 성공! (총 {buy_count}개 매수 완료)", flush=True)
-                    else:
-                        print(f"❌ [{i}번째] 매수 실패", flush=True)
-                    
-                    time.sleep(0.3)  # API 호출 간격
+                # 🚀 빈 자리마다 자금 예약 후 동시 매수 (실패한 자리는 다음 후보로 즉시 재시도)
+                buy_count = await engine.buy_available_stocks_concurrently(candidates, available_slots, token)
+                executed_actions += buy_count
                 
                 if buy_count > 0:
                     print(f"🎉 신규 매수 완료: {buy_count}개 종목", flush=True)
@@ -693,6 +564,8 @@ async def main():
     # 5. 매매 설정
     loop_count = 0
     total_actions = 0
+    loop_interval = 30 if is_test_mode() else LOOP_INTERVAL
+    loop_ticker = WallClockTicker("loop", IntervalSchedule(loop_interval), get_ntp_time)
     
     mode_text = "테스트 모드" if is_test_mode() else "실제 매매"
     print(f"[INFO] 🎯 단타 매매 시작! ({mode_text})", flush=True)
@@ -737,17 +610,14 @@ async def main():
                 print(f"\n🚨 [15:10 도달] 강제 청산 시간", flush=True)
                 break
             
-            # 다음 루프 대기
-            next_time = get_ntp_time() + timedelta(seconds=LOOP_INTERVAL)  # 🔥 NTP 시간 사용
-            remaining_minutes = LOOP_INTERVAL // 60
+            # 다음 루프 대기 (벽시계 경계 정렬 - 루프 실행 시간만큼 주기가 밀리지 않음)
+            next_time = loop_ticker.next_due  # 🔥 NTP 시간 기준
+            mode_label = "테스트 모드" if is_test_mode() else "실제 모드"
+            print(f"\n⏳ [{mode_label}] {loop_interval}초 주기 - 다음 루프 {next_time.strftime('%H:%M:%S')}", flush=True)
             
-            # 🔥 모드별 대기시간 및 메시지
-            if is_test_mode():
-                print(f"\n⏳ [테스트 모드] 30초 후 다음 루프 ({next_time.strftime('%H:%M:%S')})", flush=True)
-                time.sleep(30)
-            else:
-                print(f"\n⏳ [실제 모드] {remaining_minutes}분 후 다음 루프 ({next_time.strftime('%H:%M:%S')})", flush=True)
-                time.sleep(LOOP_INTERVAL)
+            tick = loop_ticker.wait_blocking()
+            if tick.lateness > LATE_TOLERANCE:
+                print(f"[WARN] 루프 {tick.lateness:.1f}초 지연 (밀린 주기 {tick.merged}개 합쳐 실행)", flush=True)
             
         except KeyboardInterrupt:
             print(f"\n[INFO] 사용자 중단 요청 - 강제 청산 진행", flush=True)
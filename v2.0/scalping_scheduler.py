@@ -0,0 +1,206 @@
+"""
+🔥 V3.4 벽시계 정렬 스케줄러 - 고정 경계(:00, :30 ...)에 실행, 늦은 틱 정책, 지연 기록
+Drift-free wall-clock-aligned scheduler with late-tick policies and lateness history
+"""
+
+import asyncio
+from collections import deque
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, time as dtime
+from typing import Callable, Dict, List, Optional, Any
+
+from market_clock import market_now, real_seconds, market_sleep_blocking
+from trading_calendar import get_trading_calendar, TRADING_START_TIME, TRADING_END_TIME, FORCE_SELL_TIME
+
+# ================================================================================
+# 스케줄 설정
+# ================================================================================
+LATE_SKIP = "skip"                 # 허용 지연을 넘긴 틱은 버리고 다음 경계를 기다림
+LATE_MERGE = "merge"               # 밀린 틱을 한 번으로 합쳐 즉시 실행
+LATE_CATCH_UP = "catch_up"         # 밀린 틱을 하나씩 모두 실행
+LATE_TOLERANCE = 1.0               # 이 이상 늦으면 늦은 틱 (초)
+TICK_HISTORY_SIZE = 500            # 스케줄별 틱 기록 보관 수
+
+@dataclass
+class Tick:
+    """실행 한 번의 기록"""
+    name: str
+    scheduled: datetime             # 예정 경계 시각
+    fired: datetime                 # 실제 실행 시각
+    lateness: float                 # 예정보다 늦은 시간 (초)
+    merged: int = 1                 # 이 실행이 대신한 경계 수 (merge)
+    skipped: int = 0                # 직전에 버린 경계 수 (skip)
+
+class IntervalSchedule:
+    """⏱️ 자정 기준 interval초 경계 (offset초만큼 밀 수 있음) - 30초면 :00, :30"""
+
+    def __init__(self, interval: float, offset: float = 0.0):
+        if interval <= 0:
+            raise ValueError("interval은 0보다 커야 합니다")
+        self.interval = interval
+        self.offset = offset % interval
+
+    def next_boundary(self, now: datetime) -> datetime:
+        """now 이후(초과) 첫 경계"""
+        midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        elapsed = (now - midnight).total_seconds() - self.offset
+        index = int(elapsed // self.interval) + 1
+        return midnight + timedelta(seconds=index * self.interval + self.offset)
+
+    def count_between(self, start: datetime, end: datetime) -> int:
+        """(start, end] 구간 경계 수 (start는 경계라고 가정)"""
+        if end <= start:
+            return 0
+        return int((end - start).total_seconds() // self.interval)
+
+    def __repr__(self) -> str:
+        return f"매 {self.interval:g}초"
+
+class DailySchedule:
+    """📅 매일 정해진 시각 (09:05, 14:00, 15:10 등) - day_filter가 있으면 그날만 (예: 개장일)"""
+
+    def __init__(self, times: List[dtime], day_filter: Callable[[date], bool] = None):
+        if not times:
+            raise ValueError("시각이 하나 이상 필요합니다")
+        self.times = sorted(times)
+        self.day_filter = day_filter
+
+    def next_boundary(self, now: datetime) -> datetime:
+        """now 이후(초과) 첫 시각"""
+        day = now.date()
+        for _ in range(366):
+            if not self.day_filter or self.day_filter(day):
+                for t in self.times:
+                    at = datetime.combine(day, t)
+                    if at > now:
+                        return at
+            day += timedelta(days=1)
+        raise ValueError("1년 안에 실행할 날이 없습니다")
+
+    def count_between(self, start: datetime, end: datetime) -> int:
+        """(start, end] 구간 시각 수"""
+        count = 0
+        at = self.next_boundary(start)
+        while at <= end:
+            count += 1
+            at = self.next_boundary(at)
+        return count
+
+    def __repr__(self) -> str:
+        return "매일 " + ", ".join(t.strftime('%H:%M') for t in self.times)
+
+class WallClockTicker:
+    """⏰ 스케줄 경계마다 깨어나는 대기기
+
+    매 대기마다 다음 경계까지 남은 시간을 시계로 다시 계산하므로, 작업 실행 시간만큼
+    주기가 밀리지 않는다. 작업이 길어져 경계를 놓치면 late_policy로 처리한다.
+    실제 대기 시간은 공용 시계 배속을 따른다 (모의 시계면 그만큼 짧게 잠듦).
+    """
+
+    def __init__(self, name: str, schedule, clock: Callable[[], datetime] = market_now,
+                 late_policy: str = LATE_MERGE, tolerance: float = LATE_TOLERANCE, start: datetime = None):
+        if late_policy not in (LATE_SKIP, LATE_MERGE, LATE_CATCH_UP):
+            raise ValueError(f"알 수 없는 지연 정책: {late_policy}")
+        self.name = name
+        self.schedule = schedule
+        self.clock = clock
+        self.late_policy = late_policy
+        self.tolerance = tolerance
+        self.history: deque = deque(maxlen=TICK_HISTORY_SIZE)
+        self.skipped_total = 0
+        self.merged_total = 0
+        self._due = schedule.next_boundary(start or clock())
+
+    @property
+    def next_due(self) -> datetime:
+        return self._due
+
+    def seconds_until_due(self) -> float:
+        return (self._due - self.clock()).total_seconds()
+
+    def poll(self) -> Optional[Tick]:
+        """예정 시각이 지났으면 정책을 적용해 틱 반환 (아직이면 None)"""
+        now = self.clock()
+        if now < self._due:
+            return None
+
+        lateness = (now - self._due).total_seconds()
+        if lateness <= self.tolerance:
+            return self._fire(self._due, now, lateness)
+
+        missed = self.schedule.count_between(self._due, now)   # 예정 경계 이후 지나간 경계 수
+
+        if self.late_policy == LATE_CATCH_UP:
+            return self._fire(self._due, now, lateness)
+
+        if self.late_policy == LATE_MERGE:
+            tick = self._fire(self._due, now, lateness, merged=missed + 1)
+            self._due = self.schedule.next_boundary(now)
+            return tick
+
+        # LATE_SKIP: 가장 최근 경계가 허용 지연 안이면 그것만 실행, 아니면 다음 경계까지 대기
+        latest = self._due
+        for _ in range(missed):
+            latest = self.schedule.next_boundary(latest)
+        latest_lateness = (now - latest).total_seconds()
+        if latest_lateness <= self.tolerance:
+            self.skipped_total += missed
+            return self._fire(latest, now, latest_lateness, skipped=missed)
+
+        self.skipped_total += missed + 1
+        self._due = self.schedule.next_boundary(now)
+        return None
+
+    def _fire(self, scheduled: datetime, now: datetime, lateness: float,
+              merged: int = 1, skipped: int = 0) -> Tick:
+        tick = Tick(self.name, scheduled, now, lateness, merged, skipped)
+        self.history.append(tick)
+        self.merged_total += merged - 1
+        self._due = self.schedule.next_boundary(scheduled)
+        return tick
+
+    async def wait(self, interrupt: asyncio.Event = None) -> Optional[Tick]:
+        """다음 틱까지 대기 (interrupt가 먼저 set되면 None)"""
+        while True:
+            tick = self.poll()
+            if tick:
+                return tick
+            delay = real_seconds(self.seconds_until_due())
+            if interrupt is None:
+                await asyncio.sleep(delay)
+                continue
+            try:
+                await asyncio.wait_for(interrupt.wait(), timeout=delay)
+                return None
+            except asyncio.TimeoutError:
+                pass
+
+    def wait_blocking(self) -> Optional[Tick]:
+        """다음 틱까지 대기 (동기 루프용)"""
+        while True:
+            tick = self.poll()
+            if tick:
+                return tick
+            market_sleep_blocking(self.seconds_until_due())
+
+    def get_summary(self) -> Dict[str, Any]:
+        """지연 통계"""
+        lateness = [t.lateness for t in self.history]
+        return {
+            "name": self.name,
+            "schedule": repr(self.schedule),
+            "policy": self.late_policy,
+            "ticks": len(self.history),
+            "late": len([l for l in lateness if l > self.tolerance]),
+            "skipped": self.skipped_total,
+            "merged": self.merged_total,
+            "max_lateness": max(lateness, default=0.0),
+            "avg_lateness": sum(lateness) / len(lateness) if lateness else 0.0,
+            "next_due": self._due.strftime('%H:%M:%S')
+        }
+
+def session_ticker(name: str, at: dtime, clock: Callable[[], datetime] = market_now) -> WallClockTicker:
+    """장 세션 시각 타이머 - 개장일에만 실행 (오늘 시각이 이미 지났으면 첫 대기에서 바로 실행)"""
+    midnight = clock().replace(hour=0, minute=0, second=0, microsecond=0)
+    schedule = DailySchedule([at], day_filter=get_trading_calendar().is_trading_day)
+    return WallClockTicker(name, schedule, clock, LATE_MERGE, start=midnight - timedelta(microseconds=1))
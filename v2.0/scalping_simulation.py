@@ -0,0 +1,239 @@
+"""
+🔥 V3.4 모의 장 실행 - 모의 시계 + 모의 시장으로 09:00~15:30 하루 장을 수 초 안에 돌리는 배속 실행
+Accelerated end-to-end session (simulated clock + stand-in market) for soak tests and backtests
+"""
+
+import asyncio
+import io
+import math
+import random
+import tempfile
+import threading
+import time
+from contextlib import contextmanager, nullcontext, redirect_stdout
+from datetime import date, datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import scalping_engine
+from scalping_engine import ScalpingEngine, find_scalping_targets, normalize_code
+from scalping_candidates import get_candidate_limit
+from scalping_tasks import TradingTaskGraph, EXIT_WATCH_INTERVAL
+from virtual_money_manager import VirtualMoneyManager
+from market_clock import SimulatedClock, use_market_clock, market_timestamp
+from trading_calendar import (get_trading_calendar, MARKET_OPEN_TIME, TRADING_START_TIME,
+                              TRADING_END_TIME, FORCE_SELL_TIME)
+
+# ================================================================================
+# 모의 실행 설정
+# ================================================================================
+SIM_SESSION_SPEED = 3600           # 배속 (3600이면 실제 1초에 모의 1시간 → 하루 장 약 7초)
+SIM_STOCK_COUNT = 60               # 모의 종목 수
+SIM_MATCHES_PER_CONDITION = 15     # 조건검색식당 편입 종목 수
+SIM_CONDITION_REFRESH = 300        # 조건검색 결과가 바뀌는 주기 (모의 초)
+SIM_VOLATILITY = 0.0004            # 모의 초당 가격 변동성 (로그 수익률 표준편차)
+SIM_SCAN_INTERVAL = 60             # 후보 스캔 주기 (모의 초)
+SIM_TOKEN = "SIMULATED"            # 모의 시장용 토큰 (실제 API 호출 없음)
+
+# 모의 시장으로 바꿔 끼우는 scalping_engine 시세/조건검색 함수
+PATCHED_FUNCTIONS = ("get_stock_info", "get_stock_infos_bulk", "get_current_price",
+                     "get_stock_master", "get_condition_codes")
+
+def round_to_tick(price: float) -> int:
+    """10원 단위 호가로 반올림 (최소 10원)"""
+    return max(10, int(round(price / 10)) * 10)
+
+class SimulatedMarket:
+    """🎲 모의 시장 - 시계에 묶인 종목별 랜덤워크 시세와 주기적으로 바뀌는 조건검색 결과
+
+    scalping_engine의 시세/조건검색 함수와 같은 시그니처를 제공한다. 시세는 조회 시점까지
+    경과한 모의 시간만큼 한 번에 움직이므로 배속과 상관없이 시간당 변동폭이 같다.
+    """
+
+    def __init__(self, seed: int = 0, stock_count: int = SIM_STOCK_COUNT,
+                 clock: Callable[[], float] = market_timestamp,
+                 volatility: float = SIM_VOLATILITY):
+        self.seed = seed
+        self.clock = clock
+        self.volatility = volatility
+        self.random = random.Random(seed)
+        self.requests = 0
+        self._lock = threading.Lock()
+
+        now = clock()
+        self.stocks: Dict[str, Dict[str, Any]] = {}
+        for i in range(stock_count):
+            code = normalize_code(f"{900000 + i:06d}")
+            price = round_to_tick(self.random.uniform(2_000, 80_000))
+            self.stocks[code] = {
+                "name": f"모의종목{i + 1:02d}",
+                "open": price,
+                "price": price,
+                "volume": self.random.randint(10_000, 500_000),
+                "volume_rate": self.random.uniform(5, 200),   # 모의 초당 거래량
+                "updated": now
+            }
+
+    def _advance(self, code: str) -> Optional[Dict[str, Any]]:
+        """조회 시각까지 시세 진행"""
+        stock = self.stocks.get(normalize_code(code))
+        if not stock:
+            return None
+        now = self.clock()
+        elapsed = now - stock["updated"]
+        if elapsed > 0:
+            shock = self.random.gauss(0.0, self.volatility * math.sqrt(elapsed))
+            stock["price"] = round_to_tick(stock["price"] * math.exp(shock))
+            stock["volume"] += int(stock["volume_rate"] * elapsed)
+            stock["updated"] = now
+        return stock
+
+    def _info(self, code: str) -> Dict[str, Any]:
+        stock = self._advance(code)
+        if not stock:
+            return {}
+        return {"name": stock["name"], "price": stock["price"], "volume": stock["volume"],
+                "amount": stock["price"] * stock["volume"]}
+
+    # ------------------------------------------------------------------
+    # scalping_engine 호환 함수
+    # ------------------------------------------------------------------
+    def get_stock_info(self, stock_code: str, token: str) -> Dict[str, Any]:
+        with self._lock:
+            self.requests += 1
+            return self._info(stock_code)
+
+    def get_stock_infos_bulk(self, stock_codes: List[str], token: str) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            self.requests += 1
+            infos = {normalize_code(code): self._info(code) for code in stock_codes}
+            return {code: info for code, info in infos.items() if info}
+
+    def get_current_price(self, stock_code: str, token: str) -> int:
+        return self.get_stock_info(stock_code, token).get("price", 0)
+
+    def get_stock_master(self, token: str, markets: Tuple[str, ...] = ("0", "10")) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            self.requests += 1
+            return {code: {"name": s["name"], "price": s["open"]} for code, s in self.stocks.items()}
+
+    async def get_condition_codes(self, seq: int, token: str) -> Tuple[List[str], str]:
+        """조건식·구간별로 고정된 편입 종목 (SIM_CONDITION_REFRESH마다 교체)"""
+        window = int(self.clock() // SIM_CONDITION_REFRESH)
+        picker = random.Random(self.seed * 1_000_003 + seq * 10_007 + window)
+        codes = list(self.stocks)
+        return picker.sample(codes, min(SIM_MATCHES_PER_CONDITION, len(codes))), f"모의조건{seq}"
+
+    def get_summary(self) -> Dict[str, Any]:
+        """시장 요약 (종목 수, 조회 수, 평균 등락률)"""
+        with self._lock:
+            changes = [(s["price"] - s["open"]) / s["open"] * 100 for s in self.stocks.values()]
+        return {
+            "stocks": len(self.stocks),
+            "requests": self.requests,
+            "avg_change": sum(changes) / len(changes) if changes else 0.0
+        }
+
+@contextmanager
+def simulated_market(market):
+    """with 블록 동안 scalping_engine의 시세/조건검색 함수를 market이 제공하는 것으로 교체"""
+    names = [name for name in PATCHED_FUNCTIONS if hasattr(market, name)]
+    originals = {name: getattr(scalping_engine, name) for name in names}
+    try:
+        for name in names:
+            setattr(scalping_engine, name, getattr(market, name))
+        yield market
+    finally:
+        for name, function in originals.items():
+            setattr(scalping_engine, name, function)
+
+async def run_simulated_session(day: date = None, speed: float = SIM_SESSION_SPEED, seed: int = 0,
+                                initial_capital: int = 500_000, save_dir: str = None,
+                                scan_interval: float = SIM_SCAN_INTERVAL, quiet: bool = True) -> Dict[str, Any]:
+    """🧪 모의 시계 + 모의 시장으로 하루 장 배속 실행 → 결과 요약
+
+    실제 러너와 같은 작업 구성(청산 감시, 후보 스캔/매수, 09:05·14:00·15:10 세션 타이머)을
+    TradingTaskGraph로 돌리고 15:10에 강제 청산한다. save_dir를 주지 않으면 임시
+    디렉토리에 저장한다 (결과의 save_dir). quiet면 엔진 출력은 숨긴다.
+    """
+    day = day or get_trading_calendar().next_trading_day(date.today())
+    clock = SimulatedClock(datetime.combine(day, MARKET_OPEN_TIME), speed)
+    market = SimulatedMarket(seed, clock=clock.timestamp)
+    save_dir = save_dir or tempfile.mkdtemp(prefix="scalping_sim_")
+    output = io.StringIO()
+    real_start = time.time()
+
+    with use_market_clock(clock), simulated_market(market), \
+            (redirect_stdout(output) if quiet else nullcontext()):
+        engine = ScalpingEngine(money_manager=VirtualMoneyManager(initial_capital, save_dir))
+        graph = TradingTaskGraph()
+        trading_open = False
+        scan_count = 0
+
+        async def trading_start_step():
+            nonlocal trading_open
+            trading_open = True
+            graph.wake("scanner")
+
+        async def trading_end_step():
+            nonlocal trading_open
+            trading_open = False
+
+        async def force_sell_step():
+            graph.stop("force_sell")
+
+        async def exit_step():
+            if engine.positions:
+                engine.check_exit_conditions(SIM_TOKEN)
+
+        async def scan_step():
+            nonlocal scan_count
+            if not trading_open:
+                return
+            _, max_positions = engine.update_trading_strategy()
+            slots = max_positions - len(engine.positions)
+            if slots <= 0:
+                return
+            scan_count += 1
+            candidates = await find_scalping_targets(engine, SIM_TOKEN, max_candidates=get_candidate_limit(slots))
+            if candidates:
+                await engine.buy_available_stocks_concurrently(candidates, slots, SIM_TOKEN)
+
+        graph.add_timer("trading_start", TRADING_START_TIME, trading_start_step)
+        graph.add_timer("trading_end", TRADING_END_TIME, trading_end_step)
+        graph.add_timer("force_sell", FORCE_SELL_TIME, force_sell_step)
+        graph.add_periodic("exit_watcher", EXIT_WATCH_INTERVAL, exit_step)
+        graph.add_periodic("scanner", scan_interval, scan_step)
+
+        stop_reason = await graph.run()
+        forced = engine.force_sell_all(SIM_TOKEN)
+        engine.money_manager.save_daily_data()
+        portfolio = engine.money_manager.get_portfolio_value()
+        ended_at = clock.now()
+
+    return {
+        "day": day.isoformat(),
+        "stop_reason": stop_reason,
+        "ended_at": ended_at.strftime('%H:%M:%S'),
+        "real_seconds": time.time() - real_start,
+        "speed": speed,
+        "scans": scan_count,
+        "buys": len(engine.money_manager.buy_transactions),
+        "sells": len(engine.money_manager.sell_transactions),
+        "force_sold": forced,
+        "daily_pnl": portfolio["daily_pnl"],
+        "total_value": portfolio["total_value"],
+        "market": market.get_summary(),
+        "save_dir": save_dir
+    }
+
+def print_simulation_summary(result: Dict[str, Any]):
+    """모의 실행 결과 출력"""
+    print(f"\n🧪 모의 장 {result['day']} (x{result['speed']:g}) - 실제 {result['real_seconds']:.1f}초, "
+          f"종료 {result['ended_at']} ({result['stop_reason']})")
+    print(f"   스캔 {result['scans']}회 | 매수 {result['buys']}건 | 매도 {result['sells']}건 "
+          f"(강제청산 {result['force_sold']}건) | 시세 조회 {result['market']['requests']}회")
+    print(f"   일 손익 {result['daily_pnl']:+,}원 | 평가금액 {result['total_value']:,}원 | "
+          f"시장 평균 {result['market']['avg_change']:+.2f}% | 저장 {result['save_dir']}")
+
+if __name__ == "__main__":
+    print_simulation_summary(asyncio.run(run_simulated_session()))
@@ -0,0 +1,233 @@
+"""
+🔥 V3.4 작업 그래프 - 청산 감시 / 후보 스캔 / 보고·저장을 각자 주기의 asyncio 작업으로 분리
+Decoupled asyncio task graph (independent cadences, queues between tasks, one clock, clean shutdown)
+"""
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, time as dtime
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from tabulate import tabulate
+
+from market_clock import market_now
+from scalping_scheduler import WallClockTicker, IntervalSchedule, session_ticker, LATE_MERGE
+
+# ================================================================================
+# 작업 주기 설정
+# ================================================================================
+EXIT_WATCH_INTERVAL = 3            # 청산 감시 주기 (초)
+PERSIST_INTERVAL = 60              # 백그라운드 저장 주기 (초)
+TASK_STOP_TIMEOUT = 10             # 종료 요청 후 작업 정리 대기 (초)
+
+@dataclass
+class TaskEvent:
+    """작업 간 큐로 전달되는 이벤트 (kind: candidates / buy / exit / ...)"""
+    kind: str
+    source: str
+    payload: Any = None
+    timestamp: datetime = field(default_factory=market_now)
+
+@dataclass
+class TaskStats:
+    """작업별 실행 통계"""
+    runs: int = 0
+    errors: int = 0
+    last_duration: float = 0.0
+    max_duration: float = 0.0
+    last_error: str = ""
+
+class TradingTaskGraph:
+    """🧵 독립 주기 작업 묶음
+
+    - 주기 작업(add_periodic): 시작 시 한 번, 이후 벽시계 interval 경계마다 실행 (늦은 틱은 late_policy)
+      wake(name)로 경계를 기다리지 않고 즉시 한 번 더 실행 가능 (푸시 이벤트)
+    - 시각 작업(add_timer): 매일 정해진 시각에 실행 (오늘 시각이 이미 지났으면 바로 실행)
+    - 소비 작업(add_consumer): 큐 이벤트 처리, latest_only면 밀린 이벤트 중 최신 것만 처리
+    - stop(reason): 주기 작업 종료 → 큐에 남은 이벤트 처리 → 소비 작업 종료 순으로 정리
+    모든 작업은 같은 clock(now())을 본다.
+    """
+
+    def __init__(self, clock: Callable[[], datetime] = market_now):
+        self.clock = clock
+        self.stop_reason = ""
+        self.queues: Dict[str, asyncio.Queue] = {}
+        self.stats: Dict[str, TaskStats] = {}
+        self.tickers: Dict[str, WallClockTicker] = {}
+
+        self._stop_event: Optional[asyncio.Event] = None
+        self._wake_events: Dict[str, asyncio.Event] = {}
+        self._periodic: List[tuple] = []     # (name, interval, step, late_policy)
+        self._timers: List[tuple] = []       # (name, at, step)
+        self._consumers: List[tuple] = []    # (name, queue_name, handler, latest_only)
+
+    def now(self) -> datetime:
+        """공용 시계"""
+        return self.clock()
+
+    @property
+    def stopping(self) -> bool:
+        return self._stop_event is not None and self._stop_event.is_set()
+
+    def queue(self, name: str) -> asyncio.Queue:
+        """이름으로 큐 조회 (없으면 생성)"""
+        if name not in self.queues:
+            self.queues[name] = asyncio.Queue()
+        return self.queues[name]
+
+    def publish(self, queue_name: str, kind: str, source: str, payload: Any = None):
+        """큐에 이벤트 전달"""
+        self.queue(queue_name).put_nowait(TaskEvent(kind, source, payload, self.now()))
+
+    def add_periodic(self, name: str, interval: float, step: Callable[[], Awaitable[None]],
+                     late_policy: str = LATE_MERGE):
+        """주기 작업 등록"""
+        self._periodic.append((name, interval, step, late_policy))
+        self.stats[name] = TaskStats()
+
+    def add_timer(self, name: str, at: dtime, step: Callable[[], Awaitable[None]]):
+        """매일 정해진 시각 작업 등록 (장 시작/종료/강제청산 등)"""
+        self._timers.append((name, at, step))
+        self.stats[name] = TaskStats()
+
+    def add_consumer(self, name: str, queue_name: str, handler: Callable[[TaskEvent], Awaitable[None]],
+                     latest_only: bool = False):
+        """큐 소비 작업 등록"""
+        self.queue(queue_name)
+        self._consumers.append((name, queue_name, handler, latest_only))
+        self.stats[name] = TaskStats()
+
+    def wake(self, name: str):
+        """주기 작업을 다음 주기까지 기다리지 않고 즉시 실행"""
+        event = self._wake_events.get(name)
+        if event:
+            event.set()
+
+    def stop(self, reason: str = "stop"):
+        """종료 요청 (처음 요청한 사유만 기록)"""
+        if self.stopping:
+            return
+        self.stop_reason = reason
+        if self._stop_event:
+            self._stop_event.set()
+        for event in self._wake_events.values():
+            event.set()
+
+    async def run(self) -> str:
+        """▶️ 모든 작업 실행 후 stop() 될 때까지 대기 - 종료 사유 반환"""
+        self._stop_event = asyncio.Event()
+        if self.stop_reason:
+            self._stop_event.set()
+
+        periodic_tasks = []
+        for name, at, step in self._timers:
+            self.tickers[name] = session_ticker(name, at, self.clock)
+            periodic_tasks.append(asyncio.create_task(self._run_timer(name, step), name=name))
+        for name, interval, step, late_policy in self._periodic:
+            self._wake_events[name] = asyncio.Event()
+            self.tickers[name] = WallClockTicker(name, IntervalSchedule(interval), self.clock, late_policy)
+            periodic_tasks.append(asyncio.create_task(self._run_periodic(name, step), name=name))
+
+        consumer_tasks = [asyncio.create_task(self._run_consumer(name, queue_name, handler, latest_only), name=name)
+                          for name, queue_name, handler, latest_only in self._consumers]
+
+        try:
+            await self._stop_event.wait()
+
+            # 1. 주기 작업 정리 (진행 중인 단계는 끝까지 기다림)
+            await self._drain(periodic_tasks)
+
+            # 2. 남은 이벤트 처리 후 소비 작업 종료
+            for _, queue_name, _, _ in self._consumers:
+                self.queues[queue_name].put_nowait(None)
+            await self._drain(consumer_tasks)
+        finally:
+            for task in periodic_tasks + consumer_tasks:
+                if not task.done():
+                    task.cancel()
+
+        return self.stop_reason
+
+    async def _drain(self, tasks: List[asyncio.Task]):
+        """작업 종료 대기 (시한 초과 시 취소)"""
+        if not tasks:
+            return
+        _, pending = await asyncio.wait(tasks, timeout=TASK_STOP_TIMEOUT)
+        for task in pending:
+            print(f"[WARN] 작업 종료 시한 초과 - 취소: {task.get_name()}")
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    async def _run_step(self, name: str, coroutine: Awaitable[None]):
+        """단계 실행 + 통계 (예외는 기록만 하고 작업은 계속)"""
+        stats = self.stats[name]
+        start = time.time()
+        try:
+            await coroutine
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            stats.errors += 1
+            stats.last_error = str(e)
+            print(f"[ERROR] 작업 '{name}' 실패: {e}")
+        finally:
+            stats.runs += 1
+            stats.last_duration = time.time() - start
+            stats.max_duration = max(stats.max_duration, stats.last_duration)
+
+    async def _run_periodic(self, name: str, step: Callable[[], Awaitable[None]]):
+        wake = self._wake_events[name]
+        ticker = self.tickers[name]
+        while not self.stopping:
+            await self._run_step(name, step())
+
+            if self.stopping:
+                break
+            await ticker.wait(interrupt=wake)   # 다음 경계 또는 wake/stop
+            wake.clear()
+
+    async def _run_timer(self, name: str, step: Callable[[], Awaitable[None]]):
+        ticker = self.tickers[name]
+        while not self.stopping:
+            if await ticker.wait(interrupt=self._stop_event) is None:
+                break
+            await self._run_step(name, step())
+
+    async def _run_consumer(self, name: str, queue_name: str, handler: Callable[[TaskEvent], Awaitable[None]],
+                            latest_only: bool):
+        queue = self.queues[queue_name]
+        while True:
+            event = await queue.get()
+            finished = event is None
+
+            if latest_only:
+                while not queue.empty():
+                    newer = queue.get_nowait()
+                    if newer is None:
+                        finished = True
+                    else:
+                        event = newer
+
+            if event is not None:
+                await self._run_step(name, handler(event))
+            if finished:
+                return
+
+    def print_stats(self):
+        """📊 작업별 실행 통계 출력"""
+        table_data = []
+        for name, stats in self.stats.items():
+            ticker = self.tickers.get(name)
+            if ticker:
+                summary = ticker.get_summary()
+                lateness = f"{summary['max_lateness']:.2f}초"
+                late_text = f"{summary['late']}/{summary['merged']}/{summary['skipped']}"
+            else:
+                lateness, late_text = "-", "-"
+            table_data.append([name, stats.runs, stats.errors, f"{stats.last_duration:.2f}초",
+                               f"{stats.max_duration:.2f}초", lateness, late_text, stats.last_error[:40]])
+        print(tabulate(table_data, headers=["작업", "실행", "오류", "최근 소요", "최대 소요", "최대 지연",
+                                            "지연/합침/버림", "최근 오류"], tablefmt="simple"))
+        if self.stop_reason:
+            print(f"🏁 종료 사유: {self.stop_reason}")
@@ -0,0 +1,98 @@
+"""
+🔥 V3.4 이벤트 기반 대기 - 다음 마감 시각 또는 이벤트까지 잠들고, 화면 갱신은 선택적·저빈도
+Event-driven waiting (sleep to the next deadline or event, optional low-rate display refresh)
+"""
+
+import asyncio
+import os
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Dict, Optional
+
+from market_clock import market_now, real_seconds
+
+# ================================================================================
+# 대기 설정
+# ================================================================================
+WAIT_REFRESH_SECONDS = 30          # 대기 화면 갱신 주기 (초)
+WAIT_REASON_DEADLINE = "deadline"  # 마감 시각 도달
+
+def is_headless() -> bool:
+    """헤드리스 실행 여부 (SCALPING_HEADLESS=1이면 대기 화면 갱신 없음)"""
+    return os.getenv('SCALPING_HEADLESS') == '1'
+
+def get_refresh_seconds(default: float = WAIT_REFRESH_SECONDS) -> float:
+    """대기 화면 갱신 주기 (SCALPING_WAIT_REFRESH로 변경, 헤드리스면 0)"""
+    if is_headless():
+        return 0
+    try:
+        return float(os.getenv('SCALPING_WAIT_REFRESH', default))
+    except ValueError:
+        return default
+
+@dataclass
+class WaitResult:
+    """대기 결과 (reason: deadline 또는 먼저 발생한 이벤트 이름)"""
+    reason: str
+    waited: float                   # 실제 대기 시간 (초)
+    woke_at: datetime
+
+    @property
+    def reached_deadline(self) -> bool:
+        return self.reason == WAIT_REASON_DEADLINE
+
+async def wait_until(deadline: datetime, clock: Callable[[], datetime] = market_now,
+                     events: Dict[str, asyncio.Event] = None,
+                     on_refresh: Callable[[datetime, float], None] = None,
+                     refresh_seconds: Optional[float] = None) -> WaitResult:
+    """⏳ deadline 또는 events 중 하나가 먼저 일어날 때까지 대기
+
+    on_refresh(현재 시각, 남은 초)는 refresh_seconds마다만 호출된다 (0이면 호출 없음).
+    깨어날 때마다 남은 시간을 clock으로 다시 계산하므로 시계 보정도 반영된다.
+    refresh_seconds와 남은 시간은 시계 기준이고, 실제 대기는 공용 시계 배속을 따른다.
+    """
+    events = events or {}
+    if refresh_seconds is None:
+        refresh_seconds = get_refresh_seconds()
+    if not on_refresh:
+        refresh_seconds = 0
+
+    start = clock()
+    while True:
+        now = clock()
+        for name, event in events.items():
+            if event.is_set():
+                return WaitResult(name, (now - start).total_seconds(), now)
+
+        remaining = (deadline - now).total_seconds()
+        if remaining <= 0:
+            return WaitResult(WAIT_REASON_DEADLINE, (now - start).total_seconds(), now)
+
+        if refresh_seconds > 0:
+            on_refresh(now, remaining)
+            timeout = min(remaining, refresh_seconds)
+        else:
+            timeout = remaining
+        timeout = real_seconds(timeout)
+
+        if events:
+            waiters = [asyncio.create_task(event.wait()) for event in events.values()]
+            try:
+                await asyncio.wait(waiters, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                for waiter in waiters:
+                    waiter.cancel()
+        else:
+            await asyncio.sleep(timeout)
+
+def format_remaining(seconds: float) -> str:
+    """남은 시간 표시 (1일 2시간 3분 / 4분 5초)"""
+    total = int(max(0, seconds))
+    days, rest = divmod(total, 86400)
+    hours, rest = divmod(rest, 3600)
+    minutes, secs = divmod(rest, 60)
+    if days > 0:
+        return f"{days}일 {hours}시간 {minutes}분"
+    if hours > 0:
+        return f"{hours}시간 {minutes}분"
+    return f"{minutes}분 {secs}초"
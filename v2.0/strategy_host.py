@@ -0,0 +1,368 @@
+"""
+🔥 V3.4 멀티 전략 호스트 - 한 프로세스·한 토큰으로 여러 엔진을 돌리고 조건검색/시세는 공유 계층에서 한 번만 조회
+Multi-strategy host: N engines (own parameters, money manager, save dir) over one shared market-data layer
+"""
+
+import asyncio
+import json
+import os
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from tabulate import tabulate
+
+import scalping_engine
+from scalping_engine import (ScalpingEngine, TradingStrategy, find_scalping_targets, normalize_code,
+                             ensure_token_for_full_trading_day)
+from scalping_candidates import get_candidate_limit
+from scalping_simulation import simulated_market, PATCHED_FUNCTIONS
+from scalping_tasks import TradingTaskGraph, EXIT_WATCH_INTERVAL, PERSIST_INTERVAL
+from virtual_money_manager import VirtualMoneyManager
+from exit_rules import build_exit_rules
+from market_clock import market_now, market_timestamp
+from trading_calendar import TRADING_START_TIME, TRADING_END_TIME, FORCE_SELL_TIME
+
+# ================================================================================
+# 호스트 설정
+# ================================================================================
+STRATEGY_HOST_CONFIG = "strategy_host.json"   # 전략 목록 파일 (없으면 DEFAULT_STRATEGIES)
+STRATEGY_BASE_DIR = "virtual_money_data"      # 전략별 저장 폴더의 상위 폴더
+QUOTE_SHARE_TTL = 1.0              # 시세 공유 유효 시간 (초) - 같은 청산 감시 주기의 엔진끼리 공유
+CONDITION_SHARE_TTL = 20.0         # 조건검색 결과 공유 유효 시간 (초) - 같은 스캔 주기의 엔진끼리 공유
+MASTER_SHARE_TTL = 6 * 3600        # 종목마스터 공유 유효 시간 (초) - 하루 1회
+
+# 기본 전략 (실전 + 그림자 전략)
+DEFAULT_STRATEGIES = [
+    {"name": "scalping_v3_real"},
+    {"name": "scalping_v3_test", "profit_target": 3.0, "stop_loss": -2.0,
+     "exit_rules": {"trailing_stop": 1.0, "trailing_activate": 1.5}}
+]
+
+@dataclass
+class StrategySpec:
+    """호스트에서 돌릴 전략 1개 설정"""
+    name: str
+    initial_capital: int = 500_000
+    profit_target: Optional[float] = None          # None이면 VirtualMoneyManager 기본값
+    stop_loss: Optional[float] = None
+    scan_interval: float = scalping_engine.LOOP_INTERVAL
+    conditions: Optional[List[int]] = None         # 사용할 조건검색식 (None이면 전체)
+    tiers: Optional[List[Tuple[int, int, int, int, str]]] = None
+    exit_rules: Dict[str, Any] = field(default_factory=dict)
+    optimize_sizing: bool = True
+    save_dir: Optional[str] = None                 # None이면 STRATEGY_BASE_DIR/name
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "StrategySpec":
+        known = set(cls.__dataclass_fields__)
+        unknown = set(data) - known
+        if unknown:
+            print(f"[WARN] 전략 {data.get('name', '?')}: 알 수 없는 설정 무시 ({', '.join(sorted(unknown))})")
+        spec = cls(**{k: v for k, v in data.items() if k in known})
+        if spec.tiers:
+            spec.tiers = [tuple(tier) for tier in spec.tiers]
+        return spec
+
+def load_strategy_specs(path: str = STRATEGY_HOST_CONFIG) -> List[StrategySpec]:
+    """전략 목록 로드 (파일이 없으면 기본 전략)"""
+    data = DEFAULT_STRATEGIES
+    if os.path.exists(path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception as e:
+            print(f"[WARN] {path} 로드 실패 - 기본 전략 사용: {e}")
+    specs = [StrategySpec.from_dict(item) for item in data]
+    names = [spec.name for spec in specs]
+    if len(set(names)) != len(names):
+        raise ValueError(f"전략 이름 중복: {names}")
+    return specs
+
+class SharedMarketData:
+    """📡 엔진들이 함께 쓰는 조건검색/시세 계층
+
+    scalping_engine의 조회 함수와 같은 시그니처를 제공하고 (simulated_market으로 교체),
+    유효 시간 안의 같은 요청은 캐시로, 동시에 들어온 같은 요청은 한 번의 실제 조회로 합친다.
+    source는 원래 함수를 가진 객체 (기본 scalping_engine 모듈, 모의 실행은 SimulatedMarket).
+    """
+
+    def __init__(self, source=scalping_engine, clock: Callable[[], float] = market_timestamp,
+                 quote_ttl: float = QUOTE_SHARE_TTL, condition_ttl: float = CONDITION_SHARE_TTL):
+        self._source = {name: getattr(source, name) for name in PATCHED_FUNCTIONS if hasattr(source, name)}
+        self.clock = clock
+        self.quote_ttl = quote_ttl
+        self.condition_ttl = condition_ttl
+        self._cache: Dict[Any, Tuple[float, Any]] = {}
+        self._pending: Dict[Any, threading.Event] = {}
+        self._condition_tasks: Dict[int, asyncio.Task] = {}
+        self._lock = threading.Lock()
+        self.upstream: Dict[str, int] = {name: 0 for name in self._source}
+        self.served: Dict[str, int] = {name: 0 for name in self._source}
+
+    def _fresh(self, key, ttl: float):
+        entry = self._cache.get(key)
+        if entry and self.clock() - entry[0] < ttl:
+            return entry
+        return None
+
+    def _shared(self, kind: str, key, ttl: float, fetch: Callable[[], Any]):
+        """캐시 → 진행 중인 같은 조회 대기 → 직접 조회 (실패는 캐시하지 않음)"""
+        with self._lock:
+            self.served[kind] += 1
+        while True:
+            with self._lock:
+                entry = self._fresh(key, ttl)
+                if entry:
+                    return entry[1]
+                pending = self._pending.get(key)
+                if pending is None:
+                    self._pending[key] = threading.Event()
+                    break
+            pending.wait()
+        try:
+            self.upstream[kind] += 1
+            value = fetch()
+            with self._lock:
+                self._cache[key] = (self.clock(), value)
+            return value
+        finally:
+            with self._lock:
+                self._pending.pop(key).set()
+
+    # ------------------------------------------------------------------
+    # scalping_engine 호환 함수
+    # ------------------------------------------------------------------
+    def get_stock_info(self, stock_code: str, token: str) -> Dict[str, Any]:
+        code = normalize_code(stock_code)
+        return self._shared("get_stock_info", ("info", code), self.quote_ttl,
+                            lambda: self._source["get_stock_info"](stock_code, token))
+
+    def get_current_price(self, stock_code: str, token: str) -> int:
+        return (self.get_stock_info(stock_code, token) or {}).get("price", 0)
+
+    def get_stock_infos_bulk(self, stock_codes: List[str], token: str) -> Dict[str, Dict[str, Any]]:
+        """캐시에 있는 종목은 그대로, 다른 엔진이 조회 중인 종목은 그 결과를 기다리고, 나머지만 한 번에 조회"""
+        result: Dict[str, Dict[str, Any]] = {}
+        remaining = list(dict.fromkeys(normalize_code(code) for code in stock_codes))
+        with self._lock:
+            self.served["get_stock_infos_bulk"] += 1
+        while remaining:
+            claimed, waiting = [], []
+            event = threading.Event()
+            with self._lock:
+                for code in remaining:
+                    entry = self._fresh(("info", code), self.quote_ttl)
+                    if entry:
+                        if entry[1]:
+                            result[code] = entry[1]
+                    elif ("info", code) in self._pending:
+                        waiting.append(code)
+                    else:
+                        self._pending[("info", code)] = event
+                        claimed.append(code)
+            if claimed:
+                try:
+                    self.upstream["get_stock_infos_bulk"] += 1
+                    fetched = {normalize_code(code): info for code, info in
+                               self._source["get_stock_infos_bulk"](claimed, token).items()}
+                    now = self.clock()
+                    with self._lock:
+                        for code in claimed:
+                            self._cache[("info", code)] = (now, fetched.get(code))
+                    result.update(fetched)
+                finally:
+                    with self._lock:
+                        for code in claimed:
+                            self._pending.pop(("info", code), None)
+                    event.set()
+            for code in waiting:
+                pending = self._pending.get(("info", code))
+                if pending is not None:
+                    pending.wait()
+            remaining = [code for code in waiting if code not in result]
+        return result
+
+    def get_stock_master(self, token: str, markets: Tuple[str, ...] = ("0", "10")) -> Dict[str, Dict[str, Any]]:
+        return self._shared("get_stock_master", ("master", tuple(markets)), MASTER_SHARE_TTL,
+                            lambda: self._source["get_stock_master"](token, markets))
+
+    async def get_condition_codes(self, seq: int, token: str) -> Tuple[List[str], str]:
+        """같은 조건식은 유효 시간 동안 한 번만 조회 (진행 중이면 그 결과를 함께 기다림)"""
+        with self._lock:
+            self.served["get_condition_codes"] += 1
+            entry = self._fresh(("condition", seq), self.condition_ttl)
+        if entry:
+            return entry[1]
+
+        loop = asyncio.get_running_loop()
+        task = self._condition_tasks.get(seq)
+        if task is None or task.done() or task.get_loop() is not loop:
+            task = loop.create_task(self._fetch_condition(seq, token))
+            self._condition_tasks[seq] = task
+        return await asyncio.shield(task)
+
+    async def _fetch_condition(self, seq: int, token: str) -> Tuple[List[str], str]:
+        self.upstream["get_condition_codes"] += 1
+        value = await self._source["get_condition_codes"](seq, token)
+        with self._lock:
+            self._cache[("condition", seq)] = (self.clock(), value)
+        return value
+
+    def get_summary(self) -> Dict[str, Any]:
+        """함수별 요청 수 / 실제 조회 수"""
+        return {name: {"served": self.served[name], "upstream": self.upstream[name]} for name in self._source}
+
+@dataclass
+class HostedStrategy:
+    """호스트 안의 전략 1개 (엔진 + 상태)"""
+    spec: StrategySpec
+    engine: ScalpingEngine
+    scans: int = 0
+    force_sold: int = 0
+
+def build_engine(spec: StrategySpec) -> ScalpingEngine:
+    """전략 설정 → 자체 자금 관리자/저장 폴더를 가진 엔진"""
+    save_dir = spec.save_dir or os.path.join(STRATEGY_BASE_DIR, spec.name)
+    manager = VirtualMoneyManager(spec.initial_capital, save_dir)
+    if spec.profit_target is not None:
+        manager.profit_target = spec.profit_target
+    if spec.stop_loss is not None:
+        manager.stop_loss = spec.stop_loss
+    return ScalpingEngine(log_dir=save_dir, money_manager=manager,
+                          trading_strategy=TradingStrategy(spec.tiers),
+                          exit_rules=build_exit_rules(spec.exit_rules),
+                          optimize_sizing=spec.optimize_sizing)
+
+class StrategyHost:
+    """🏠 여러 전략을 한 작업 그래프에서 실행
+
+    장 시작/종료/강제청산 타이머와 청산 감시는 하나를 공유하고 (보유 종목 합집합 1회 조회),
+    후보 스캔 주기 작업은 전략마다 따로 등록한다. 모든 조회는 SharedMarketData를 거치므로 전략을 늘려도 API 호출은 늘지 않고
+    (같은 주기면 캐시 적중), 엔진 계산만 늘어난다.
+    """
+
+    def __init__(self, specs: List[StrategySpec], market: SharedMarketData = None):
+        self.market = market or SharedMarketData()
+        self.strategies: List[HostedStrategy] = []
+        with simulated_market(self.market):
+            for spec in specs:
+                self.strategies.append(HostedStrategy(spec, build_engine(spec)))
+
+    async def run(self, token: str) -> str:
+        """▶️ 15:10 강제 청산(또는 stop)까지 실행 - 종료 사유 반환"""
+        with simulated_market(self.market):
+            graph = TradingTaskGraph(clock=market_now)
+            now = market_now().time()
+            trading_open = TRADING_START_TIME <= now < TRADING_END_TIME
+
+            async def trading_start_step():
+                nonlocal trading_open
+                trading_open = True
+                for hosted in self.strategies:
+                    graph.wake(f"scanner:{hosted.spec.name}")
+
+            async def trading_end_step():
+                nonlocal trading_open
+                trading_open = False
+
+            async def force_sell_step():
+                graph.stop("force_sell")
+
+            async def persist_step():
+                for hosted in self.strategies:
+                    hosted.engine.money_manager.save_daily_data()
+
+            graph.add_periodic("exit_watcher", EXIT_WATCH_INTERVAL, self._exit_step(token))
+            for hosted in self.strategies:
+                graph.add_periodic(f"scanner:{hosted.spec.name}", hosted.spec.scan_interval,
+                                   self._scan_step(hosted, token, lambda: trading_open))
+            graph.add_timer("trading_start", TRADING_START_TIME, trading_start_step)
+            graph.add_timer("trading_end", TRADING_END_TIME, trading_end_step)
+            graph.add_timer("force_sell", FORCE_SELL_TIME, force_sell_step)
+            graph.add_periodic("persister", PERSIST_INTERVAL, persist_step)
+
+            stop_reason = await graph.run()
+            if stop_reason == "force_sell":
+                for hosted in self.strategies:
+                    hosted.force_sold = hosted.engine.force_sell_all(token)
+            for hosted in self.strategies:
+                hosted.engine.money_manager.save_daily_data()
+                if stop_reason == "force_sell":
+                    hosted.engine.money_manager.finalize_day()
+        return stop_reason
+
+    def _exit_step(self, token: str):
+        """전 전략 보유 종목 합집합을 한 번에 조회해 두고 (엔진별 일괄 조회는 캐시 적중) 전략별 청산"""
+        async def step():
+            codes = list(dict.fromkeys(p.code for hosted in self.strategies for p in hosted.engine.positions))
+            if codes:
+                try:
+                    await asyncio.to_thread(self.market.get_stock_infos_bulk, codes, token)
+                except Exception as e:
+                    print(f"[WARN] 보유 종목 공유 시세 조회 실패: {e}")
+            for hosted in self.strategies:
+                engine = hosted.engine
+                signals = await asyncio.to_thread(engine.collect_exit_signals, token)
+                exit_count = engine.execute_exits(signals)
+                if exit_count > 0:
+                    engine.log_activity(f"✅ [{hosted.spec.name}] 청산 완료: {exit_count}개 포지션")
+        return step
+
+    def _scan_step(self, hosted: HostedStrategy, token: str, is_open: Callable[[], bool]):
+        async def step():
+            if not is_open():
+                return
+            engine = hosted.engine
+            _, max_positions = engine.update_trading_strategy()
+            slots = max_positions - len(engine.positions)
+            if slots <= 0:
+                return
+            hosted.scans += 1
+            candidates = await find_scalping_targets(engine, token, max_candidates=get_candidate_limit(slots),
+                                                     condition_seqs=hosted.spec.conditions)
+            if candidates:
+                await engine.buy_available_stocks_concurrently(candidates, slots, token)
+        return step
+
+    def get_summary(self) -> List[Dict[str, Any]]:
+        rows = []
+        for hosted in self.strategies:
+            manager = hosted.engine.money_manager
+            portfolio = manager.get_portfolio_value()
+            rows.append({
+                "name": hosted.spec.name,
+                "scans": hosted.scans,
+                "buys": len(manager.buy_transactions),
+                "sells": len(manager.sell_transactions),
+                "force_sold": hosted.force_sold,
+                "daily_pnl": portfolio["daily_pnl"],
+                "total_value": portfolio["total_value"],
+                "intraday_max_drawdown": portfolio["intraday_max_drawdown"]
+            })
+        return rows
+
+    def print_summary(self):
+        table = [[r["name"], r["scans"], r["buys"], r["sells"], r["force_sold"], f"{r['daily_pnl']:+,}",
+                  f"{r['total_value']:,}", f"{r['intraday_max_drawdown']:.2f}%"] for r in self.get_summary()]
+        print(tabulate(table, headers=["전략", "스캔", "매수", "매도", "강제청산", "일 손익", "평가금액", "장중 낙폭"],
+                       tablefmt="grid"))
+        usage = self.market.get_summary()
+        served = sum(u["served"] for u in usage.values())
+        upstream = sum(u["upstream"] for u in usage.values())
+        print(f"📡 공유 조회: 요청 {served:,}회 → 실제 API {upstream:,}회 "
+              f"({(1 - upstream / served) * 100 if served else 0:.1f}% 절감, 전략 {len(self.strategies)}개)")
+
+if __name__ == "__main__":
+    async def main():
+        specs = load_strategy_specs()
+        print(f"🏠 멀티 전략 호스트 시작 ({datetime.now():%Y-%m-%d %H:%M:%S}) - "
+              f"{', '.join(spec.name for spec in specs)}")
+        token = ensure_token_for_full_trading_day()
+        host = StrategyHost(specs)
+        stop_reason = await host.run(token)
+        print(f"\n🏁 호스트 종료 ({stop_reason})")
+        host.print_summary()
+
+    asyncio.run(main())
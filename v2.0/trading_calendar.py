@@ -0,0 +1,192 @@
+"""
+🔥 V3.4 KRX 거래일 달력 - 휴장일 데이터 파일에서 여러 해를 한 번에 계산, 상수 시간 조회
+Precomputed multi-year KRX trading calendar (O(1) trading-day / next open / previous close / phase)
+"""
+
+import json
+import os
+import threading
+from datetime import date, datetime, timedelta, time as dtime
+from typing import Dict, List, Optional, Tuple
+
+# ================================================================================
+# 장 운영 시각
+# ================================================================================
+MARKET_OPEN_TIME = dtime(9, 0)     # 장 시작
+TRADING_START_TIME = dtime(9, 5)   # 매매 시작
+TRADING_END_TIME = dtime(14, 0)    # 신규 매매 종료
+FORCE_SELL_TIME = dtime(15, 10)    # 강제 청산
+MARKET_CLOSE_TIME = dtime(15, 30)  # 장 마감
+
+KRX_HOLIDAY_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "krx_holidays.json")
+
+# 장 구간 (session_phase 반환값)
+PHASE_HOLIDAY = "holiday"          # 휴장일
+PHASE_PRE_MARKET = "pre_market"    # 장 시작 전
+PHASE_OPENING = "opening"          # 09:00~09:05 장 시작, 매매 대기
+PHASE_TRADING = "trading"          # 09:05~14:00 매매
+PHASE_EXIT_ONLY = "exit_only"      # 14:00~15:10 청산만
+PHASE_LIQUIDATION = "liquidation"  # 15:10~15:30 강제 청산
+PHASE_CLOSED = "closed"            # 장 마감 후
+
+PHASE_NAMES = {
+    PHASE_HOLIDAY: "휴장일",
+    PHASE_PRE_MARKET: "장시작전",
+    PHASE_OPENING: "장시작 (매매 대기)",
+    PHASE_TRADING: "매매 가능",
+    PHASE_EXIT_ONLY: "신규 매매 종료 (청산만)",
+    PHASE_LIQUIDATION: "강제 청산",
+    PHASE_CLOSED: "장종료"
+}
+
+class TradingCalendar:
+    """📅 거래일 달력 - 생성 시 날짜별 개장 여부와 전후 거래일 색인을 미리 계산
+
+    범위 밖 날짜는 주말만 휴장으로 보는 규칙으로 계산한다.
+    """
+
+    def __init__(self, holidays: Dict[date, str], first_year: int, last_year: int):
+        self.holidays = dict(holidays)
+        self.start = date(first_year, 1, 1)
+        self.end = date(last_year, 12, 31)
+
+        size = (self.end - self.start).days + 1
+        self._is_trading = bytearray(size)
+        self._days: List[date] = []
+        for i in range(size):
+            day = self.start + timedelta(days=i)
+            if day.weekday() < 5 and day not in self.holidays:
+                self._is_trading[i] = 1
+                self._days.append(day)
+
+        # 날짜 색인 → 그날 이후(포함) 첫 거래일 / 이전(포함) 마지막 거래일의 _days 색인
+        self._next_index = [0] * size
+        self._prev_index = [0] * size
+        position = len(self._days)
+        for i in range(size - 1, -1, -1):
+            if self._is_trading[i]:
+                position -= 1
+            self._next_index[i] = position
+        position = -1
+        for i in range(size):
+            if self._is_trading[i]:
+                position += 1
+            self._prev_index[i] = position
+
+    def _offset(self, day: date) -> Optional[int]:
+        offset = (day - self.start).days
+        return offset if 0 <= offset < len(self._is_trading) else None
+
+    # ------------------------------------------------------------------
+    # 거래일
+    # ------------------------------------------------------------------
+    def is_trading_day(self, day: date) -> bool:
+        """개장일 여부"""
+        offset = self._offset(day)
+        if offset is None:
+            return day.weekday() < 5
+        return bool(self._is_trading[offset])
+
+    def holiday_reason(self, day: date) -> Tuple[bool, str]:
+        """(휴장 여부, 사유) - 사유: 주말 / 공휴일명 / 개장일"""
+        if day.weekday() >= 5:
+            return True, "주말"
+        if day in self.holidays:
+            return True, self.holidays[day]
+        return False, "개장일"
+
+    def next_trading_day(self, day: date, include_today: bool = True) -> date:
+        """다음 개장일 (include_today면 오늘 포함)"""
+        if not include_today:
+            day += timedelta(days=1)
+        offset = self._offset(day)
+        if offset is not None and self._next_index[offset] < len(self._days):
+            return self._days[self._next_index[offset]]
+
+        while not self.is_trading_day(day):
+            day += timedelta(days=1)
+        return day
+
+    def previous_trading_day(self, day: date, include_today: bool = True) -> date:
+        """이전 개장일 (include_today면 오늘 포함)"""
+        if not include_today:
+            day -= timedelta(days=1)
+        offset = self._offset(day)
+        if offset is not None and self._prev_index[offset] >= 0:
+            return self._days[self._prev_index[offset]]
+
+        while not self.is_trading_day(day):
+            day -= timedelta(days=1)
+        return day
+
+    # ------------------------------------------------------------------
+    # 장 시각
+    # ------------------------------------------------------------------
+    def session_boundaries(self, day: date) -> Dict[str, datetime]:
+        """그날 장 운영 시각 (스케줄러용)"""
+        return {
+            "market_open": datetime.combine(day, MARKET_OPEN_TIME),
+            "trading_start": datetime.combine(day, TRADING_START_TIME),
+            "trading_end": datetime.combine(day, TRADING_END_TIME),
+            "force_sell": datetime.combine(day, FORCE_SELL_TIME),
+            "market_close": datetime.combine(day, MARKET_CLOSE_TIME)
+        }
+
+    def next_session_time(self, now: datetime, at: dtime) -> datetime:
+        """now 이후(포함) 개장일의 at 시각 (09:00 → 다음 장 시작, 09:05 → 다음 매매 시작)"""
+        today = now.date()
+        if self.is_trading_day(today) and now.time() < at:
+            return datetime.combine(today, at)
+        return datetime.combine(self.next_trading_day(today, include_today=False), at)
+
+    def next_open(self, now: datetime) -> datetime:
+        """다음 장 시작 (09:00)"""
+        return self.next_session_time(now, MARKET_OPEN_TIME)
+
+    def previous_close(self, now: datetime) -> datetime:
+        """마지막 장 마감 (15:30)"""
+        today = now.date()
+        if self.is_trading_day(today) and now.time() >= MARKET_CLOSE_TIME:
+            return datetime.combine(today, MARKET_CLOSE_TIME)
+        return datetime.combine(self.previous_trading_day(today, include_today=False), MARKET_CLOSE_TIME)
+
+    def session_phase(self, now: datetime) -> str:
+        """현재 장 구간 (PHASE_*)"""
+        if not self.is_trading_day(now.date()):
+            return PHASE_HOLIDAY
+        t = now.time()
+        if t < MARKET_OPEN_TIME:
+            return PHASE_PRE_MARKET
+        if t < TRADING_START_TIME:
+            return PHASE_OPENING
+        if t < TRADING_END_TIME:
+            return PHASE_TRADING
+        if t < FORCE_SELL_TIME:
+            return PHASE_EXIT_ONLY
+        if t < MARKET_CLOSE_TIME:
+            return PHASE_LIQUIDATION
+        return PHASE_CLOSED
+
+def load_trading_calendar(path: str = KRX_HOLIDAY_FILE) -> TradingCalendar:
+    """휴장일 파일로 달력 생성 (파일이 없으면 주말만 휴장으로 보는 올해 전후 달력)"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        holidays = {datetime.strptime(d, '%Y-%m-%d').date(): name for d, name in data.get('holidays', {}).items()}
+        years = data.get('years') or sorted({d.year for d in holidays})
+        return TradingCalendar(holidays, min(years), max(years))
+    except Exception as e:
+        print(f"[WARN] 휴장일 파일 로드 실패 ({path}): {e} - 주말만 휴장으로 계산")
+        year = date.today().year
+        return TradingCalendar({}, year - 1, year + 1)
+
+_calendar: Optional[TradingCalendar] = None
+_calendar_lock = threading.Lock()
+
+def get_trading_calendar() -> TradingCalendar:
+    """프로세스 공용 달력 (처음 호출 시 한 번 생성)"""
+    global _calendar
+    with _calendar_lock:
+        if _calendar is None:
+            _calendar = load_trading_calendar()
+        return _calendar
@@ -0,0 +1,90 @@
+"""
+🔥 V3.3 거래 ID 생성기 - 밀리초 시각 + 순번, 프로세스 내 공유, 재시작 후에도 단조 증가
+Collision-free monotonic transaction IDs (sub-second timestamp + persisted sequence)
+"""
+
+import json
+import os
+import threading
+from datetime import datetime
+from typing import Callable, Optional
+
+from market_clock import market_timestamp
+
+TXID_STATE_FILE = "txid_state.json"
+
+class TransactionIdGenerator:
+    """🆔 거래 ID 생성기 - PREFIX_YYYYMMDD_HHMMSS_mmm_순번_종목코드
+
+    같은 밀리초에 여러 건이 생겨도 순번으로 구분되고, 시계가 뒤로 가도
+    마지막 시각을 유지해 ID 순서가 뒤집히지 않는다. 순번과 마지막 시각은
+    state_file에 저장되어 재시작 후에도 이어진다.
+    """
+
+    def __init__(self, state_file: Optional[str] = None, clock: Callable[[], float] = market_timestamp):
+        self.state_file = state_file
+        self.clock = clock
+        self.sequence = 0
+        self.last_ms = 0
+        self._lock = threading.Lock()
+        self._load_state()
+
+    def _load_state(self):
+        """저장된 순번/시각 복원"""
+        if not self.state_file or not os.path.exists(self.state_file):
+            return
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            self.sequence = int(state.get('sequence', 0))
+            self.last_ms = int(state.get('last_ms', 0))
+        except Exception as e:
+            print(f"[WARN] 거래 ID 상태 로드 실패: {e}")
+
+    def reload(self):
+        """상태 파일 다시 읽기 - 다른 프로세스가 이어서 발급한 순번/시각 반영 (뒤로 가지 않음)"""
+        with self._lock:
+            sequence, last_ms = self.sequence, self.last_ms
+            self._load_state()
+            self.sequence = max(self.sequence, sequence)
+            self.last_ms = max(self.last_ms, last_ms)
+
+    def _save_state(self):
+        """순번/시각 저장 (임시 파일 교체로 중간 상태가 남지 않게)"""
+        if not self.state_file:
+            return
+        try:
+            tmp_file = self.state_file + ".tmp"
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump({'sequence': self.sequence, 'last_ms': self.last_ms}, f)
+            os.replace(tmp_file, self.state_file)
+        except Exception as e:
+            print(f"[WARN] 거래 ID 상태 저장 실패: {e}")
+
+    def next_id(self, prefix: str, code: str = "") -> str:
+        """새 거래 ID 발급"""
+        with self._lock:
+            now_ms = max(int(self.clock() * 1000), self.last_ms)
+            self.sequence += 1
+            self.last_ms = now_ms
+            self._save_state()
+            sequence = self.sequence
+
+        stamp = datetime.fromtimestamp(now_ms / 1000).strftime('%Y%m%d_%H%M%S')
+        txid = f"{prefix}_{stamp}_{now_ms % 1000:03d}_{sequence:06d}"
+        return f"{txid}_{code}" if code else txid
+
+_generator: Optional[TransactionIdGenerator] = None
+_generator_lock = threading.Lock()
+
+def get_txid_generator(save_dir: Optional[str] = None) -> TransactionIdGenerator:
+    """프로세스 공용 생성기 (처음 호출한 save_dir에 상태 저장, 이후 호출은 같은 생성기 공유)"""
+    global _generator
+    with _generator_lock:
+        if _generator is None:
+            state_file = None
+            if save_dir:
+                os.makedirs(save_dir, exist_ok=True)
+                state_file = os.path.join(save_dir, TXID_STATE_FILE)
+            _generator = TransactionIdGenerator(state_file)
+        return _generator
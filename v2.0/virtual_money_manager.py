@@ -5,12 +5,17 @@ Real-time cumulative returns tracking with comprehensive backtesting analysis
 
 import json
 import os
+import threading
 from datetime import datetime, timedelta
 from typing import List, Dict, Any, Optional, Tuple
 from dataclasses import dataclass, asdict
 from tabulate import tabulate
 import glob
 
+from transaction_ids import get_txid_generator, TransactionIdGenerator
+from market_clock import market_now
+from equity_sampler import EquitySampler
+
 @dataclass
 class VirtualTransaction:
     """가상 거래 내역"""
@@ -40,6 +45,8 @@ class DailyReturn:
     daily_return: float
     cumulative_return: float
     trades_count: int
+    intraday_peak: int = 0              # 장중 시가 평가 고점
+    intraday_max_drawdown: float = 0.0  # 장중 시가 평가 최대 낙폭 (%)
 
 @dataclass
 class PeriodAnalysis:
@@ -63,6 +70,7 @@ class VirtualMoneyManager:
     def __init__(self, initial_capital: int = 500_000, save_dir: str = "virtual_money_data"):
         self.save_dir = save_dir
         self.ensure_save_dir()
+        self.txid_generator = self._create_txid_generator()  # 🆔 프로세스 공용 거래 ID 생성기
         
         # 🔥 전날 결과 및 히스토리 로드 (누적 방식)
         previous_result = self.load_previous_day_result()
@@ -101,6 +109,17 @@ class VirtualMoneyManager:
         self.sell_transactions: List[VirtualTransaction] = []
         self.daily_pnl = 0
         
+        # 🔒 동시 주문용 자금 예약 (예약 → 체결 확정 / 실패 시 반환)
+        self.reservations: Dict[str, int] = {}
+        self._reservation_seq = 0
+        self._lock = threading.RLock()
+        
+        # 📈 장중 시가 평가금액 샘플러 (보유 종목 미실현 손익 포함 고점/낙폭)
+        self.equity_sampler = EquitySampler(self.available_cash)
+        
+        # 📓 핫 스탠바이 복제용 거래 저널 (hot_standby.TradeJournal - 없으면 None)
+        self.journal = None
+        
         # 오늘 거래 내역 로드 (복구 기능)
         self.load_today_transactions()
     
@@ -109,11 +128,14 @@ class VirtualMoneyManager:
         if not os.path.exists(self.save_dir):
             os.makedirs(self.save_dir, exist_ok=True)
     
+    def _create_txid_generator(self) -> TransactionIdGenerator:
+        return get_txid_generator(self.save_dir)
+    
     def load_previous_day_result(self) -> Optional[Dict]:
         """🔥 전날 최종 결과 로드 (누적 방식)"""
         # 최근 7일간 검색
         for days_back in range(1, 8):
-            check_date = datetime.now() - timedelta(days=days_back)
+            check_date = market_now() - timedelta(days=days_back)
             date_str = check_date.strftime('%Y%m%d')
             file_path = os.path.join(self.save_dir, f"virtual_transactions_{date_str}.json")
             
@@ -165,7 +187,7 @@ class VirtualMoneyManager:
     
     def load_today_transactions(self):
         """오늘 거래 내역 로드 (복구 기능)"""
-        today_str = datetime.now().strftime('%Y%m%d')
+        today_str = market_now().strftime('%Y%m%d')
         file_path = os.path.join(self.save_dir, f"virtual_transactions_{today_str}.json")
         
         try:
@@ -557,17 +579,28 @@ class VirtualMoneyManager:
     # 기존 기능들 (간소화)
     # ================================================================================
     
+    @property
+    def reserved_cash(self) -> int:
+        """진행 중인 주문이 예약한 자금 합계"""
+        return sum(self.reservations.values())
+    
+    @property
+    def free_cash(self) -> int:
+        """예약분을 제외한 신규 주문 가능 자금"""
+        return self.available_cash - self.reserved_cash
+    
     def can_afford(self, amount: int) -> bool:
-        """투자 가능 여부 확인"""
-        return self.available_cash >= amount
+        """투자 가능 여부 확인 (예약 자금 제외)"""
+        return self.free_cash >= amount
     
     def get_adjusted_investment_amount(self, target_amount: int) -> int:
-        """🔥 자금 상황에 따른 투자금액 조정"""
-        if self.available_cash >= target_amount:
+        """🔥 자금 상황에 따른 투자금액 조정 (예약 자금 제외)"""
+        free_cash = self.free_cash
+        if free_cash >= target_amount:
             return target_amount
         
         # 자금이 부족하면 가용 자금의 90%로 조정
-        adjusted = int(self.available_cash * 0.9)
+        adjusted = int(free_cash * 0.9)
         
         # 최소 투자 금액 (1만원) 확인
         if adjusted < 10_000:
@@ -575,54 +608,95 @@ class VirtualMoneyManager:
         
         return adjusted
     
+    # ================================================================================
+    # 🔒 자금 예약 (동시 주문용 2단계: 예약 → 확정/반환)
+    # ================================================================================
+    
+    def reserve_cash(self, target_amount: int) -> Optional[Tuple[str, int]]:
+        """💰 주문 자금 예약 - (예약ID, 예약금액) 반환, 자금 부족 시 None
+        
+        예약된 금액은 확정/반환 전까지 다른 주문이 사용할 수 없다.
+        """
+        with self._lock:
+            amount = self.get_adjusted_investment_amount(target_amount)
+            if amount == 0:
+                return None
+            
+            self._reservation_seq += 1
+            reservation_id = f"RSV_{self._reservation_seq:06d}"
+            self.reservations[reservation_id] = amount
+            return reservation_id, amount
+    
+    def release_reservation(self, reservation_id: str) -> int:
+        """↩️ 예약 반환 (이미 확정/반환된 예약이면 0)"""
+        with self._lock:
+            return self.reservations.pop(reservation_id, 0)
+    
+    def commit_reservation(self, reservation_id: str, code: str, name: str, price: int,
+                           condition_seq: int = 0, target_amount: int = None) -> Optional[VirtualTransaction]:
+        """✅ 예약 자금으로 매수 확정 - 체결 금액만 차감하고 남은 예약은 반환"""
+        with self._lock:
+            investment_amount = self.reservations.pop(reservation_id, 0)
+            
+            if investment_amount == 0:
+                print(f"[매수 실패] 유효하지 않은 자금 예약: {reservation_id}")
+                return None
+            
+            if not self._journal_allows_trade():
+                return None
+            
+            # 수량 계산
+            quantity = investment_amount // price if price > 0 else 0
+            if quantity <= 0:
+                print(f"[매수 실패] 수량 부족: {investment_amount:,}원 ÷ {price:,}원 = {quantity}주")
+                return None
+            
+            # 실제 투자 금액
+            actual_amount = quantity * price
+            
+            # 거래 실행
+            transaction = VirtualTransaction(
+                transaction_id=self.txid_generator.next_id("BUY", code),
+                timestamp=market_now().strftime('%Y-%m-%d %H:%M:%S'),
+                type="buy",
+                code=code,
+                name=name,
+                quantity=quantity,
+                price=price,
+                amount=actual_amount,
+                condition_seq=condition_seq
+            )
+            
+            # 자금 업데이트
+            self.available_cash -= actual_amount
+            self.total_invested += actual_amount
+            self.buy_transactions.append(transaction)
+            self._journal_trade("buy", transaction)
+            
+            # 🔥 자금 조정 안내
+            if target_amount is not None and investment_amount != target_amount:
+                print(f"[자금 조정] 목표 {target_amount:,}원 → 실제 {actual_amount:,}원")
+            
+            self.save_daily_data()
+            return transaction
+    
     def execute_virtual_buy(self, code: str, name: str, price: int, 
                            target_amount: int, condition_seq: int = 0) -> Optional[VirtualTransaction]:
-        """🔥 가상 매수 실행 (자금 조정 포함)"""
+        """🔥 가상 매수 실행 (자금 조정 포함) - 예약 후 즉시 확정"""
         
-        # 투자 금액 조정
-        investment_amount = self.get_adjusted_investment_amount(target_amount)
-        
-        if investment_amount == 0:
-            print(f"[매수 실패] 자금 부족: 가용 {self.available_cash:,}원 < 최소 10,000원")
-            return None
+        # 투자 금액 조정 및 예약
+        reservation = self.reserve_cash(target_amount)
         
-        # 수량 계산
-        quantity = investment_amount // price
-        if quantity <= 0:
-            print(f"[매수 실패] 수량 부족: {investment_amount:,}원 ÷ {price:,}원 = {quantity}주")
+        if reservation is None:
+            print(f"[매수 실패] 자금 부족: 가용 {self.free_cash:,}원 < 최소 10,000원")
             return None
         
-        # 실제 투자 금액
-        actual_amount = quantity * price
-        
-        # 거래 실행
-        transaction = VirtualTransaction(
-            transaction_id=f"BUY_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{code}",
-            timestamp=datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-            type="buy",
-            code=code,
-            name=name,
-            quantity=quantity,
-            price=price,
-            amount=actual_amount,
-            condition_seq=condition_seq
-        )
-        
-        # 자금 업데이트
-        self.available_cash -= actual_amount
-        self.total_invested += actual_amount
-        self.buy_transactions.append(transaction)
-        
-        # 🔥 자금 조정 안내
-        if investment_amount != target_amount:
-            print(f"[자금 조정] 목표 {target_amount:,}원 → 실제 {actual_amount:,}원")
-        
-        self.save_daily_data()
-        return transaction
+        reservation_id, _ = reservation
+        return self.commit_reservation(reservation_id, code, name, price, condition_seq, target_amount)
     
-    def execute_virtual_sell(self, buy_transaction: VirtualTransaction, 
-                           current_price: int, reason: str = "") -> Optional[VirtualTransaction]:
-        """🔥 가상 매도 실행 (수익률 기록 강화)"""
+    def _record_virtual_sell(self, buy_transaction: VirtualTransaction, 
+                             current_price: int, reason: str = "") -> VirtualTransaction:
+        """매도 거래 생성 및 자금 반영 (저장/출력 없음)"""
         
         # 매도 금액 계산
         sell_amount = buy_transaction.quantity * current_price
@@ -631,8 +705,8 @@ class VirtualMoneyManager:
         
         # 거래 실행
         transaction = VirtualTransaction(
-            transaction_id=f"SELL_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{buy_transaction.code}",
-            timestamp=datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            transaction_id=self.txid_generator.next_id("SELL", buy_transaction.code),
+            timestamp=market_now().strftime('%Y-%m-%d %H:%M:%S'),
             type="sell",
             code=buy_transaction.code,
             name=buy_transaction.name,
@@ -646,23 +720,116 @@ class VirtualMoneyManager:
         )
         
         # 자금 업데이트
-        self.available_cash += sell_amount
-        self.total_invested -= buy_transaction.amount
-        self.daily_pnl += profit_amount
-        self.sell_transactions.append(transaction)
+        with self._lock:
+            self.available_cash += sell_amount
+            self.total_invested -= buy_transaction.amount
+            self.daily_pnl += profit_amount
+            self.sell_transactions.append(transaction)
+            self._journal_trade("sell", transaction)
         
         # 🔥 누적 통계 업데이트
         current_total = self.available_cash + self.total_invested
         self.max_capital = max(self.max_capital, current_total)
         self.min_capital = min(self.min_capital, current_total)
         
-        # 🔥 실시간 수익률 출력
+        return transaction
+    
+    def _print_cumulative_after_sell(self):
+        """🔥 실시간 수익률 출력"""
+        current_total = self.available_cash + self.total_invested
         cumulative_return = ((current_total - self.original_capital) / self.original_capital * 100) if self.original_capital > 0 else 0
         print(f"[매도 완료] 누적 수익률: {cumulative_return:+.2f}% (총액: {current_total:,}원)")
+    
+    def execute_virtual_sell(self, buy_transaction: VirtualTransaction, 
+                           current_price: int, reason: str = "") -> Optional[VirtualTransaction]:
+        """🔥 가상 매도 실행 (수익률 기록 강화)"""
+        if not self._journal_allows_trade():
+            return None
+        transaction = self._record_virtual_sell(buy_transaction, current_price, reason)
+        self._print_cumulative_after_sell()
         
         self.save_daily_data()
         return transaction
     
+    def execute_virtual_sells_batch(self, orders: List[Tuple[VirtualTransaction, int, str]]) -> List[Optional[VirtualTransaction]]:
+        """🚨 여러 건 가상 매도를 한 번에 반영 (강제 청산용, 저장 1회)
+        
+        orders: (매수 거래, 매도가, 사유) 목록 → 같은 순서의 매도 거래 목록
+        (임대를 잃어 거래가 차단되면 전부 None - 호출 측은 None인 주문을 매도로 처리하지 않음)
+        """
+        if not self._journal_allows_trade():
+            return [None] * len(orders)
+        transactions = [self._record_virtual_sell(buy_tx, price, reason) for buy_tx, price, reason in orders]
+        
+        if transactions:
+            self._print_cumulative_after_sell()
+            self.save_daily_data()
+        return transactions
+    
+    # ================================================================================
+    # 📓 거래 저널 (핫 스탠바이 복제)
+    # ================================================================================
+    
+    def snapshot_state(self) -> Dict[str, Any]:
+        """장부 전체 상태 (저널 snapshot 기록용)"""
+        with self._lock:
+            return {
+                'available_cash': self.available_cash,
+                'initial_capital': self.initial_capital,
+                'original_capital': self.original_capital,
+                'cumulative_days': self.cumulative_days,
+                'max_capital': self.max_capital,
+                'min_capital': self.min_capital,
+                'total_invested': self.total_invested,
+                'daily_pnl': self.daily_pnl,
+                'buy_transactions': [asdict(tx) for tx in self.buy_transactions],
+                'sell_transactions': [asdict(tx) for tx in self.sell_transactions]
+            }
+    
+    def attach_journal(self, journal):
+        """📓 거래 저널 연결 - 현재 장부 전체를 snapshot으로 먼저 기록, 이후 매수/매도마다 1줄"""
+        with self._lock:
+            self.journal = journal
+            journal.append("snapshot", state=self.snapshot_state())
+    
+    def _journal_allows_trade(self) -> bool:
+        """저널 임대 확인 - 다른 프로세스가 인계했으면 거래 차단 (중복 주문 방지)"""
+        if self.journal is None or self.journal.writable():
+            return True
+        print("[ERROR] 주 프로세스 임대 상실 (다른 프로세스가 인계) - 거래 차단")
+        return False
+    
+    def _journal_trade(self, kind: str, transaction: VirtualTransaction):
+        """거래 1건 저널 기록 (기록 후 현금/투자금/손익 포함)"""
+        if self.journal is None:
+            return
+        try:
+            self.journal.append(kind, tx=asdict(transaction), cash=self.available_cash,
+                                invested=self.total_invested, daily_pnl=self.daily_pnl)
+        except Exception as e:
+            print(f"[ERROR] 거래 저널 기록 실패: {e}")
+    
+    def record_equity(self, positions: List[Any], quotes: Dict[str, int]) -> int:
+        """📈 보유 종목 시가 평가 (시세 없으면 원가) → 샘플러 반영, 최고/최저 자금 갱신"""
+        with self._lock:
+            equity = self.available_cash + sum(
+                position.quantity * quotes[position.code] if quotes.get(position.code) else position.cost
+                for position in positions
+            )
+            self.max_capital = max(self.max_capital, equity)
+            self.min_capital = min(self.min_capital, equity)
+        self.equity_sampler.observe(equity)
+        return equity
+    
+    def save_equity_curve(self, date_str: str):
+        """장중 평가금액 곡선 저장 (압축 JSON)"""
+        if not len(self.equity_sampler):
+            return
+        try:
+            self.equity_sampler.save(os.path.join(self.save_dir, f"equity_curve_{date_str}.json"))
+        except Exception as e:
+            print(f"[ERROR] 평가금액 곡선 저장 실패: {e}")
+    
     def calculate_detailed_returns(self) -> Dict[str, Any]:
         """🔥 상세 누적 수익률 계산"""
         current_total = self.available_cash + self.total_invested
@@ -755,6 +922,7 @@ class VirtualMoneyManager:
         # 리스크 분석
         print(f"🏔️  최대 자금: {self.max_capital:,}원")
         print(f"🕳️  최대 손실률: {returns['max_drawdown']:.2f}%")
+        print(f"📉 장중 최대 낙폭: {self.equity_sampler.max_drawdown:.2f}% (시가 평가 고점 {self.equity_sampler.peak:,}원)")
         print(f"⚖️  샤프 비율: {returns['sharpe_ratio']:.2f}")
         print(f"")
         
@@ -808,21 +976,65 @@ class VirtualMoneyManager:
             tablefmt="grid"
         ))
     
+    def collect_trade_returns(self) -> Tuple[List[float], float]:
+        """🔥 전체 매도 수익률(시간순)과 거래일당 평균 매도 수"""
+        historical_data = self.load_all_historical_data()
+        today_str = market_now().strftime('%Y%m%d')
+        
+        rates = []
+        counts = []
+        for date_str, data in sorted(historical_data.items()):
+            sells = data.get('sell_transactions', [])
+            if sells:
+                rates.extend(tx.get('profit_rate', 0) for tx in sells)
+                counts.append(len(sells))
+        
+        # 아직 저장되지 않은 오늘 매도
+        if today_str not in historical_data and self.sell_transactions:
+            rates.extend(tx.profit_rate for tx in self.sell_transactions)
+            counts.append(len(self.sell_transactions))
+        
+        trades_per_day = sum(counts) / len(counts) if counts else 0.0
+        return rates, trades_per_day
+    
+    def print_monte_carlo_analysis(self, paths: int = None, seed: int = None):
+        """🔥 몬테카를로 리스크 분석 (일별/매매별 부트스트랩, 현재 자금 구간 비중 적용)"""
+        from monte_carlo import run_monte_carlo, MC_PATHS, MC_MIN_SAMPLES
+        
+        daily_returns = [dr.daily_return for dr in self.daily_returns_history]
+        trade_rates, trades_per_day = self.collect_trade_returns()
+        if len(daily_returns) < MC_MIN_SAMPLES and len(trade_rates) < MC_MIN_SAMPLES:
+            print(f"[INFO] 충분한 데이터가 없습니다. (일별 또는 매매 기록 최소 {MC_MIN_SAMPLES}개 필요)")
+            return
+        
+        current_total = self.available_cash + self.total_invested
+        print(f"\n🎲 몬테카를로 리스크 분석 (일별 {len(daily_returns)}일, 매매 {len(trade_rates)}건, "
+              f"하루 평균 {trades_per_day:.1f}건)")
+        print("="*70)
+        for result in run_monte_carlo(daily_returns, trade_rates, trades_per_day, current_total,
+                                      paths=paths or MC_PATHS, seed=seed):
+            result.print_summary()
+    
     def finalize_day(self):
-        """🔥 하루 마감 시 일별 수익률 기록"""
+        """🔥 하루 마감 시 일별 수익률 기록 (인계당한 프로세스는 기록하지 않음)"""
+        if self.journal is not None and not self.journal.writable():
+            print("[WARN] 주 프로세스 임대 상실 - 일별 기록 생략")
+            return
         current_total = self.available_cash + self.total_invested
         daily_return_rate = (self.daily_pnl / self.initial_capital * 100) if self.initial_capital > 0 else 0
         cumulative_return_rate = ((current_total - self.original_capital) / self.original_capital * 100) if self.original_capital > 0 else 0
         
         # 오늘 데이터 생성
         today_return = DailyReturn(
-            date=datetime.now().strftime('%Y%m%d'),
+            date=market_now().strftime('%Y%m%d'),
             start_capital=self.initial_capital,
             end_capital=current_total,
             daily_pnl=self.daily_pnl,
             daily_return=daily_return_rate,
             cumulative_return=cumulative_return_rate,
-            trades_count=len(self.sell_transactions)
+            trades_count=len(self.sell_transactions),
+            intraday_peak=self.equity_sampler.peak,
+            intraday_max_drawdown=self.equity_sampler.max_drawdown
         )
         
         # 기존 기록에서 오늘 데이터 제거 후 추가 (중복 방지)
@@ -830,8 +1042,9 @@ class VirtualMoneyManager:
                                      if dr.date != today_return.date]
         self.daily_returns_history.append(today_return)
         
-        # 히스토리 저장
+        # 히스토리 + 장중 평가금액 곡선 저장
         self.save_daily_returns_history()
+        self.save_equity_curve(today_return.date)
         
         print(f"[일별 기록] {today_return.date} 수익률: {daily_return_rate:+.2f}% 기록완료")
     
@@ -843,11 +1056,13 @@ class VirtualMoneyManager:
         # 🔥 누적 수익률 계산
         cumulative_return = ((total_value - self.original_capital) / self.original_capital * 100) if self.original_capital > 0 else 0
         
-        # 🔥 드로우다운 계산
-        drawdown = ((self.max_capital - total_value) / self.max_capital * 100) if self.max_capital > 0 else 0
+        # 🔥 드로우다운 계산 (보유 종목은 마지막 시가 평가 기준)
+        equity = self.equity_sampler.last_equity if self.equity_sampler.observations else total_value
+        drawdown = ((self.max_capital - equity) / self.max_capital * 100) if self.max_capital > 0 else 0
         
         return {
             'available_cash': self.available_cash,
+            'reserved_cash': self.reserved_cash,  # 🔒 진행 중인 주문 예약분
             'total_invested': self.total_invested,
             'total_value': total_value,
             'daily_pnl': self.daily_pnl,
@@ -857,6 +1072,9 @@ class VirtualMoneyManager:
             'max_capital': self.max_capital,  # 🔥 최고 자금
             'min_capital': self.min_capital,  # 🔥 최저 자금
             'drawdown': drawdown,  # 🔥 드로우다운
+            'equity': equity,  # 📈 시가 평가금액
+            'intraday_peak': self.equity_sampler.peak,  # 📈 장중 평가 고점
+            'intraday_max_drawdown': self.equity_sampler.max_drawdown,  # 📈 장중 최대 낙폭
             'original_capital': self.original_capital  # 🔥 최초 원금
         }
     
@@ -864,17 +1082,14 @@ class VirtualMoneyManager:
         """🔥 누적 자금 현황 출력 (상세 수익률 포함)"""
         self.print_detailed_returns()  # 상세 수익률 정보 출력
     
-    def save_daily_data(self):
-        """일별 데이터 저장"""
-        today_str = datetime.now().strftime('%Y%m%d')
-        filename = f"virtual_transactions_{today_str}.json"
-        filepath = os.path.join(self.save_dir, filename)
-        
+    def build_daily_data(self) -> Dict[str, Any]:
+        """일별 저장 데이터 (포트폴리오 요약 + 오늘 거래 내역)"""
+        today_str = market_now().strftime('%Y%m%d')
         portfolio = self.get_portfolio_value()
         
-        data = {
+        return {
             'date': today_str,
-            'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'timestamp': market_now().strftime('%Y-%m-%d %H:%M:%S'),
             'portfolio_summary': portfolio,
             'buy_transactions': [asdict(tx) for tx in self.buy_transactions],
             'sell_transactions': [asdict(tx) for tx in self.sell_transactions],
@@ -884,6 +1099,14 @@ class VirtualMoneyManager:
                 'active_positions': len(self.buy_transactions) - len(self.sell_transactions)
             }
         }
+    
+    def save_daily_data(self):
+        """일별 데이터 저장 (인계당한 프로세스는 저장하지 않음 - 새 주 프로세스 파일 보호)"""
+        if self.journal is not None and not self.journal.writable():
+            print("[WARN] 주 프로세스 임대 상실 - 데이터 저장 생략")
+            return
+        data = self.build_daily_data()
+        filepath = os.path.join(self.save_dir, f"virtual_transactions_{data['date']}.json")
         
         try:
             with open(filepath, 'w', encoding='utf-8') as f:
@@ -1025,10 +1248,11 @@ class VirtualMoneyManager:
             print(f"5. 📈 최근 성과 차트")
             print(f"6. 📝 하루 마감 처리")
             print(f"7. ⚠️  모든 데이터 초기화")
+            print(f"8. 🎲 몬테카를로 리스크 분석")
             print(f"0. 🚪 종료")
             
             try:
-                choice = input(f"\n선택하세요 (0-7): ").strip()
+                choice = input(f"\n선택하세요 (0-8): ").strip()
                 
                 if choice == '0':
                     print("👋 가상 자금 관리 시스템을 종료합니다.")
@@ -1048,8 +1272,10 @@ class VirtualMoneyManager:
                     print("✅ 하루 마감 처리 완료!")
                 elif choice == '7':
                     self.reset_virtual_money()
+                elif choice == '8':
+                    self.print_monte_carlo_analysis()
                 else:
-                    print("❌ 올바른 번호를 입력해주세요. (0-7)")
+                    print("❌ 올바른 번호를 입력해주세요. (0-8)")
                     
             except KeyboardInterrupt:
                 print(f"\n\n👋 사용자가 종료를 요청했습니다.")
@@ -1057,6 +1283,75 @@ class VirtualMoneyManager:
             except Exception as e:
                 print(f"❌ 오류 발생: {e}")
 
+class InMemoryMoneyManager(VirtualMoneyManager):
+    """🧪 디스크에 쓰지 않는 자금 관리자 (백테스트용)
+
+    일별 데이터와 수익률 히스토리를 파일 대신 store에 보관한다. 같은 store를 여러 날
+    넘기면 실제처럼 전날 결과로 이어서 시작하고 (누적 모드), 기간 분석도 store로 한다.
+    """
+    
+    def __init__(self, initial_capital: int = 500_000, store: Dict[str, Any] = None):
+        self.store = store if store is not None else {}
+        self.store.setdefault('days', {})      # 날짜 → (저장 시각, 포트폴리오 요약, 매수, 매도 거래 목록)
+        self.store.setdefault('history', [])   # DailyReturn 목록
+        super().__init__(initial_capital, save_dir="")
+    
+    def ensure_save_dir(self):
+        pass
+    
+    def _create_txid_generator(self) -> TransactionIdGenerator:
+        return TransactionIdGenerator()
+    
+    def load_previous_day_result(self) -> Optional[Dict]:
+        """store에서 오늘 이전 마지막 날 결과"""
+        today_str = market_now().strftime('%Y%m%d')
+        previous_dates = [d for d in self.store['days'] if d < today_str]
+        if not previous_dates:
+            return None
+        
+        portfolio = self.store['days'][max(previous_dates)][1]
+        return {
+            'final_cash': portfolio['total_value'],
+            'cumulative_days': portfolio.get('cumulative_days', 0),
+            'original_capital': portfolio.get('original_capital', 500_000),
+            'max_capital': portfolio.get('max_capital', portfolio['total_value']),
+            'min_capital': portfolio.get('min_capital', portfolio['total_value'])
+        }
+    
+    def load_daily_returns_history(self) -> List[DailyReturn]:
+        return list(self.store['history'])
+    
+    def save_daily_returns_history(self):
+        self.store['history'] = list(self.daily_returns_history)
+    
+    def load_today_transactions(self):
+        pass
+    
+    def save_equity_curve(self, date_str: str):
+        if len(self.equity_sampler):
+            self.store.setdefault('equity', {})[date_str] = self.equity_sampler.to_compact()
+    
+    def load_all_historical_data(self) -> Dict[str, Dict]:
+        """store → 파일과 같은 형식 (거래 내역 변환은 조회 시에만)"""
+        historical_data = {}
+        for date_str, (timestamp, portfolio, buys, sells) in sorted(self.store['days'].items()):
+            historical_data[date_str] = {
+                'date': date_str,
+                'timestamp': timestamp,
+                'portfolio_summary': portfolio,
+                'buy_transactions': [asdict(tx) for tx in buys],
+                'sell_transactions': [asdict(tx) for tx in sells]
+            }
+        return historical_data
+    
+    def save_daily_data(self):
+        """매 거래마다 불리므로 요약과 거래 목록 참조만 보관"""
+        now = market_now()
+        self.store['days'][now.strftime('%Y%m%d')] = (
+            now.strftime('%Y-%m-%d %H:%M:%S'), self.get_portfolio_value(),
+            list(self.buy_transactions), list(self.sell_transactions)
+        )
+
 # ================================================================================
 # 메인 실행부 (백테스팅 분석 메뉴)
 # ================================================================================
@@ -0,0 +1,190 @@
+"""
+🔥 V3.4 워크포워드 최적화 - 학습 구간에서 청산/비중 설정을 고르고 다음 검증 구간에 적용, 검증 구간만 이어 붙임
+Walk-forward optimization over the backtester (rolling train/test windows, stitched out-of-sample equity)
+"""
+
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Tuple
+from tabulate import tabulate
+
+from scalping_backtest import BacktestDay, load_backtest_days, BACKTEST_DATA_DIR
+from parameter_sweep import (SharedHistory, expand_grid, run_tasks, task_key, format_params,
+                             SWEEP_PROCESSES, SWEEP_CACHE_DIR, SWEEP_RANK_KEYS)
+
+# ================================================================================
+# 워크포워드 설정
+# ================================================================================
+WF_TRAIN_DAYS = 60                 # 학습 구간 (거래일)
+WF_TEST_DAYS = 20                  # 검증 구간 (거래일) - 창은 이만큼씩 이동
+WF_MIN_TRADES = 10                 # 학습 구간 최소 거래 수 (미만이면 선택 제외)
+
+# 구간마다 다시 고르는 청산/비중 설정
+WF_GRID = {
+    "profit_target": [1.0, 2.0, 3.0, 5.0],
+    "stop_loss": [-1.0, -2.0, -3.0],
+    "position_scale": [0.5, 1.0, 1.5]
+}
+
+@dataclass
+class WalkForwardWindow:
+    """창 1개 결과"""
+    index: int
+    train: Tuple[str, str]                      # 학습 기간 (YYYYMMDD)
+    test: Tuple[str, str]                       # 검증 기간
+    params: Dict[str, Any]                      # 학습 구간 최적 설정
+    train_metrics: Dict[str, Any]
+    test_metrics: Dict[str, Any]
+
+@dataclass
+class WalkForwardResult:
+    """워크포워드 결과 - 검증 구간을 이은 equity가 실제 기대 성과"""
+    windows: List[WalkForwardWindow]
+    equity: List[Tuple[str, float]]             # (날짜, 검증 구간 누적 자산)
+    metrics: Dict[str, Any]                     # 이어 붙인 검증 구간 전체 지표
+    configs: int
+    real_seconds: float = 0.0
+
+    def print_report(self):
+        if not self.windows:
+            print("📝 워크포워드 창을 만들 데이터가 부족합니다.")
+            return
+        table = []
+        for w in self.windows:
+            table.append([
+                w.index, f"{w.train[0]}~{w.train[1]}", f"{w.test[0]}~{w.test[1]}", format_params(w.params),
+                f"{w.train_metrics['sharpe']:.2f}", f"{w.test_metrics['total_return']:+.2f}%",
+                f"{w.test_metrics['max_drawdown']:.2f}%", f"{w.test_metrics['win_rate']:.1f}%"
+            ])
+        print(tabulate(table, headers=["창", "학습", "검증", "선택 설정", "학습 샤프", "검증 수익률", "검증 낙폭", "검증 승률"],
+                       tablefmt="grid"))
+        m = self.metrics
+        print(f"\n🚶 워크포워드 검증 {m['trading_days']}일 (창 {len(self.windows)}개, 설정 {self.configs}개): "
+              f"총 {m['total_return']:+.2f}% | 최대낙폭 {m['max_drawdown']:.2f}% | 승률 {m['win_rate']:.1f}% | "
+              f"샤프 {m['sharpe']:.2f} | 실제 {self.real_seconds:.1f}초")
+
+def make_windows(dates: List[str], train_days: int = WF_TRAIN_DAYS,
+                 test_days: int = WF_TEST_DAYS) -> List[Tuple[List[str], List[str]]]:
+    """거래일 목록 → [(학습 날짜들, 검증 날짜들)] (검증 구간이 겹치지 않게 test_days씩 이동)"""
+    windows = []
+    start = 0
+    while start + train_days < len(dates):
+        train = dates[start:start + train_days]
+        test = dates[start + train_days:start + train_days + test_days]
+        windows.append((train, test))
+        start += test_days
+    return windows
+
+def month_blocks(dates: List[str]) -> List[Tuple[str, str]]:
+    """날짜 → 월 단위 구간 (ISO 날짜). 창 경계와 무관한 고정 단위라 창끼리 결과를 공유하고,
+    데이터가 늘어도 마지막 달만 다시 계산한다."""
+    blocks: Dict[str, List[str]] = {}
+    for d in dates:
+        blocks.setdefault(d[:6], []).append(d)
+    return [(_iso(days[0]), _iso(days[-1])) for _, days in sorted(blocks.items())]
+
+def _iso(date_str: str) -> str:
+    return f"{date_str[:4]}-{date_str[4:6]}-{date_str[6:]}"
+
+def combine_daily(records: List[list]) -> Dict[str, Any]:
+    """날짜별 [날짜, 일수익률, 매도, 수익 매도] → 복리 누적 지표 (PeriodAnalysis와 같은 정의)"""
+    if not records:
+        return {"total_return": 0.0, "daily_avg_return": 0.0, "volatility": 0.0, "max_drawdown": 0.0,
+                "win_rate": 0.0, "sharpe": 0.0, "trades": 0, "trading_days": 0}
+
+    returns = [r[1] for r in records]
+    equity, peak, max_drawdown = 1.0, 1.0, 0.0
+    for r in returns:
+        equity *= 1 + r / 100
+        peak = max(peak, equity)
+        max_drawdown = max(max_drawdown, (peak - equity) / peak * 100)
+
+    mean = sum(returns) / len(returns)
+    volatility = (sum((r - mean) ** 2 for r in returns) / (len(returns) - 1)) ** 0.5 if len(returns) > 1 else 0.0
+    trades = sum(r[2] for r in records)
+    wins = sum(r[3] for r in records)
+    return {
+        "total_return": (equity - 1) * 100,
+        "daily_avg_return": mean,
+        "volatility": volatility,
+        "max_drawdown": max_drawdown,
+        "win_rate": wins / trades * 100 if trades else 0.0,
+        "sharpe": mean / volatility if volatility > 0 else 0.0,
+        "trades": trades,
+        "trading_days": len(records)
+    }
+
+def select_best(daily_by_config: List[Dict[str, list]], dates: List[str], rank_by: str,
+                min_trades: int = WF_MIN_TRADES) -> Tuple[int, Dict[str, Any]]:
+    """학습 날짜에서 rank_by가 가장 좋은 설정 색인 (거래 수 부족 설정은 후순위)"""
+    best_index, best_metrics, best_key = 0, None, None
+    for index, daily in enumerate(daily_by_config):
+        metrics = combine_daily([daily[d] for d in dates if d in daily])
+        value = metrics[rank_by] if rank_by != "max_drawdown" else -metrics[rank_by]
+        key = (metrics["trades"] >= min_trades, value)
+        if best_key is None or key > best_key:
+            best_index, best_metrics, best_key = index, metrics, key
+    return best_index, best_metrics
+
+def run_walk_forward(days: List[BacktestDay] = None, data_dir: str = BACKTEST_DATA_DIR,
+                     grid: Dict[str, List[Any]] = None, train_days: int = WF_TRAIN_DAYS,
+                     test_days: int = WF_TEST_DAYS, processes: int = SWEEP_PROCESSES,
+                     cache_dir: str = SWEEP_CACHE_DIR, initial_capital: int = 500_000,
+                     rank_by: str = "sharpe") -> WalkForwardResult:
+    """🚶 워크포워드 실행
+
+    모든 설정을 월 단위 구간별로 (매일 같은 자본으로 시작하는 reset_daily 모드) 한 번씩만
+    백테스트해 날짜별 결과를 캐시에 남기고, 각 창의 학습/검증 지표는 그 날짜별 결과를
+    복리로 다시 합쳐 계산한다. 겹치는 창은 같은 계산을 공유하고, 중단 후 재실행하거나
+    데이터가 늘면 캐시에 없는 (설정, 월)만 계산한다.
+    """
+    if rank_by not in SWEEP_RANK_KEYS:
+        raise ValueError(f"알 수 없는 순위 기준: {rank_by} ({', '.join(SWEEP_RANK_KEYS)})")
+    real_start = time.time()
+    days = days if days is not None else load_backtest_days(data_dir)
+    dates = [d.day.strftime('%Y%m%d') for d in sorted(days, key=lambda d: d.day)]
+    windows = make_windows(dates, train_days, test_days)
+    configs = [dict(params, reset_daily=True) for params in expand_grid(grid or WF_GRID)]
+
+    if not windows:
+        print(f"[WARN] 워크포워드 데이터 부족: {len(dates)}일 (학습 {train_days} + 검증 1일 이상 필요)")
+        return WalkForwardResult([], [], combine_daily([]), len(configs), time.time() - real_start)
+
+    used = sorted({d for train, test in windows for d in train + test})
+    blocks = month_blocks(used)
+    shared = SharedHistory(days)
+    try:
+        results = run_tasks(shared, [(params, block) for params in configs for block in blocks],
+                            processes, cache_dir, initial_capital, days)
+    finally:
+        shared.close()
+
+    # 설정별 {날짜: 기록}
+    daily_by_config = []
+    for params in configs:
+        daily = {}
+        for block in blocks:
+            for record in results[task_key(params, block, initial_capital)]["daily"]:
+                daily[record[0]] = record
+        daily_by_config.append(daily)
+
+    result_windows = []
+    stitched = []
+    for index, (train, test) in enumerate(windows, 1):
+        best, train_metrics = select_best(daily_by_config, train, rank_by)
+        test_records = [daily_by_config[best][d] for d in test if d in daily_by_config[best]]
+        stitched.extend(test_records)
+        params = {k: v for k, v in configs[best].items() if k != "reset_daily"}
+        result_windows.append(WalkForwardWindow(index, (train[0], train[-1]), (test[0], test[-1]), params,
+                                                train_metrics, combine_daily(test_records)))
+
+    equity = []
+    value = float(initial_capital)
+    for record in stitched:
+        value *= 1 + record[1] / 100
+        equity.append((record[0], value))
+
+    return WalkForwardResult(result_windows, equity, combine_daily(stitched), len(configs), time.time() - real_start)
+
+if __name__ == "__main__":
+    run_walk_forward().print_report()